@@ -10,6 +10,10 @@ Output files will be produced as follows: for ntuples in XXX/DATASET, individual
 pairs files will be in XXX/DATASET, whilst the hadded final file will be in
 XXX/pairs
 
+With --manifest, the individual pairs files are not hadded (or deleted):
+instead a manifest listing them is written to XXX/pairs, which can be given
+directly to runCalibration.py, checkCalibration.py, etc (see pairs_dataset.py).
+
 Requires the htcondenser package: https://github.com/raggleton/htcondenser
 
 TODO: some fancier way of switching between MC & Data setups?
@@ -139,7 +143,7 @@ LOG_DIR = '/storage/%s/L1JEC/%s/L1JetEnergyCorrections/jobs/pairs/%s' % (os.envi
 
 def submit_all_matcher_dags(exe, ntuple_dirs, log_dir, append,
                             l1_dir, ref_dir, deltaR, ref_min_pt, cleaning_cut,
-                            force_submit):
+                            force_submit, manifest=False):
     """Create and submit DAG checkCalibration jobs for all pairs files.
 
     Parameters
@@ -177,6 +181,9 @@ def submit_all_matcher_dags(exe, ntuple_dirs, log_dir, append,
         If True, forces job submission even if proposed output files
         already exists.
         Oherwise, program quits before submission.
+
+    manifest : bool, optional
+        If True, write a manifest of the pairs files instead of hadd-ing them.
     """
     # Update the matcher script for the worker nodes
     setup_script = 'worker_setup.sh'
@@ -195,7 +202,8 @@ def submit_all_matcher_dags(exe, ntuple_dirs, log_dir, append,
                                    l1_dir=l1_dir, ref_dir=ref_dir,
                                    deltaR=deltaR, ref_min_pt=ref_min_pt,
                                    cleaning_cut=cleaning_cut,
-                                   append=append, force_submit=force_submit)
+                                   append=append, force_submit=force_submit,
+                                   manifest=manifest)
         status_files.append(sfile)
 
     if status_files:
@@ -204,10 +212,11 @@ def submit_all_matcher_dags(exe, ntuple_dirs, log_dir, append,
 
 
 def submit_matcher_dag(exe, ntuple_dir, log_dir, l1_dir, ref_dir, deltaR, ref_min_pt, cleaning_cut,
-                       append, force_submit):
+                       append, force_submit, manifest=False):
     """Submit one matcher DAG for one directory of ntuples.
 
-    This will run `exe` over all Ntuple files and then hadd the results together.
+    This will run `exe` over all Ntuple files and then hadd the results together,
+    or list them in a manifest file.
 
     Parameters
     ----------
@@ -239,6 +248,9 @@ def submit_matcher_dag(exe, ntuple_dir, log_dir, l1_dir, ref_dir, deltaR, ref_mi
         If True, forces job submission even if proposed output files
         already exists.
         Oherwise, program quits before submission.
+
+    manifest : bool
+        If True, write a manifest of the pairs files instead of hadd-ing them.
     """
     # DAG for jobs
     stem = 'matcher_%s_%s' % (strftime("%H%M%S"), cc.rand_str(3))
@@ -316,6 +328,8 @@ def submit_matcher_dag(exe, ntuple_dir, log_dir, l1_dir, ref_dir, deltaR, ref_mi
     final_dir = os.path.join(os.path.dirname(ntuple_dir.rstrip('/')), 'pairs')
     cc.check_create_dir(final_dir, info=True)
     final_file = os.path.join(final_dir, final_file)
+    if manifest:
+        final_file = os.path.splitext(final_file)[0] + '.txt'
     log.info("Final file: %s", final_file)
 
     # Check if any of the output files already exists - maybe we mucked up?
@@ -326,6 +340,11 @@ def submit_matcher_dag(exe, ntuple_dir, log_dir, l1_dir, ref_dir, deltaR, ref_mi
                 raise RuntimeError('ERROR: output file already exists - not submitting.'
                                    '\nTo bypass, use -f flag. \nFILE: %s' % f)
 
+    if manifest:
+        write_manifest(final_file, match_output_files)
+        matcher_dag.submit()
+        return matcher_dag.status_file
+
     # Add in hadding jobs
     # ---------------------------------------------------------------------
     hadd_jobs = add_hadd_jobs(matcher_dag, matcher_jobs.jobs.values(), final_file, log_dir)
@@ -359,6 +378,15 @@ def submit_matcher_dag(exe, ntuple_dir, log_dir, l1_dir, ref_dir, deltaR, ref_mi
     return matcher_dag.status_file
 
 
+def write_manifest(manifest_file, pairs_files):
+    """Write manifest file listing the pairs files, one per line."""
+    with open(manifest_file, 'w') as f:
+        f.write('# pairs files, made %s\n' % strftime("%d %b %Y %H:%M:%S"))
+        for pairs_file in pairs_files:
+            f.write(pairs_file + '\n')
+    log.info("Written manifest of %d pairs files", len(pairs_files))
+
+
 def add_hadd_jobs(dagman, jobs, final_file, log_dir):
     """Add necessary hadd jobs to DAG. All jobs will be hadded together to make
     `final_file`.
@@ -467,9 +495,14 @@ if __name__ == "__main__":
                         help='Force submit - will run jobs even if final file '
                              'with same name already exists.',
                         action='store_true')
+    parser.add_argument('--manifest',
+                        help='Write a manifest of the individual pairs files '
+                             'instead of hadd-ing them together.',
+                        action='store_true')
     args = parser.parse_args()
     sys.exit(submit_all_matcher_dags(exe=EXE, ntuple_dirs=NTUPLE_DIRS, log_dir=LOG_DIR,
                                      l1_dir=L1_DIR, ref_dir=REF_DIR,
                                      deltaR=DELTA_R, ref_min_pt=PT_REF_MIN,
                                      cleaning_cut=CLEANING_CUT,
-                                     append=APPEND, force_submit=args.force))
+                                     append=APPEND, force_submit=args.force,
+                                     manifest=args.manifest))
@@ -97,7 +97,7 @@ def submit_all_showoff_jobs(configs, log_dir):
         arg_str = ' '.join(['showoffPlots.py', config['type'], config['input'],
                             config['args'], '--oDir', config['dest'],
                             '--title="%s"' % config['title'], '--zip', zip_filename,
-                            '--gifs', '--gifexe', '/software/ra12451/ImageMagick-install/bin/convert'])
+                            '--gifs'])
         log.debug(arg_str)
         submit_showoff_job(arg_str=arg_str, out_dir=config['dest'],
                            log_dir=log_dir, common_input_files=common_input_files,
@@ -19,7 +19,7 @@
 #include "L1GenericTree.h"
 #include "PileupInfoTree.h"
 #include "RunMatcherOpts.h"
-#include "JetDrawer.h"
+#include "EventDisplayRecorder.h"
 #include "SortFilterEmulator.h"
 #include "runMatcherUtils.h"
 
@@ -49,6 +49,10 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    opts.requireSingleConfig();
+    opts.requireFlatOutput();
+    opts.requireNoSummary();
+    opts.requireNoTelemetry();
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -160,16 +164,22 @@ int main(int argc, char* argv[]) {
     double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(500.), maxJetEta(5);
     // use base class smart pointer for ease of swapping in/out different
     //  matchers if so desired
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
+    std::unique_ptr<Matcher> matcher(makeMatcher(opts.matcherType(), maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
     std::cout << *matcher << std::endl;
 
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // events to draw are stored, & plotted afterwards with renderEventDisplays.py
+    std::unique_ptr<EventDisplayRecorder> eventDisplays;
+    if (opts.drawNumber() > 0) {
+        TString plotDir = TString::Format("%splots_%s_%s_%s", outDir.Data(), inStem.Data(), "gen", "l1");
+        eventDisplays.reset(new EventDisplayRecorder(EventDisplayRecorder::sideFilename(opts.outputFilename()), plotDir.Data()));
+    }
     // produce matching pairs and store
     Long64_t drawCounter = 0;
     for (Long64_t iEntry = 0; iEntry < nEntries; ++iEntry) {
-        if (iEntry % 10000 == 0) {
+        if (opts.reportInterval() > 0 && iEntry % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
         }
 
@@ -234,12 +244,8 @@ int main(int argc, char* argv[]) {
                     "%.1f < E^{gen}_{T} < %.1f GeV, " \
                     "L1 jet %.1f < E^{L1}_{T} < %.1f GeV, |#eta_{jet}| < %.1f",
                     minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
-                // get jets post pT, eta cuts
-                JetDrawer drawer(matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
-
-                TString pdfname = TString::Format("%splots_%s_%s_%s/jets_%lld.pdf",
-                    outDir.Data(), inStem.Data(), "gen", "l1", iEntry);
-                drawer.drawAndSave(pdfname);
+                // get jets post pT, eta cuts (no event number in these ntuples)
+                eventDisplays->record(iEntry, 0, matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
 
                 drawCounter++;
             }
@@ -249,6 +255,11 @@ int main(int argc, char* argv[]) {
     // save tree to new file and cleanup
     outTree.Write("", TObject::kOverwrite);
     outFile->Close();
+    if (eventDisplays) {
+        eventDisplays->close();
+        cout << "Stored " << eventDisplays->nRecorded() << " events to draw in " << eventDisplays->filename() << endl;
+        cout << "Make the plots with: renderEventDisplays.py " << eventDisplays->filename() << endl;
+    }
     return 0;
 }
 
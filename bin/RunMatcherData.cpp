@@ -25,9 +25,10 @@
 #include "DeltaR_Matcher.h"
 #include "commonRootUtils.h"
 #include "RunMatcherOpts.h"
-#include "JetDrawer.h"
+#include "EventDisplayRecorder.h"
 #include "L1GenericTree.h"
 #include "runMatcherUtils.h"
+#include "RecoJetIndexMap.h"
 
 using std::cout;
 using std::endl;
@@ -53,6 +54,10 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    opts.requireSingleConfig();
+    opts.requireFlatOutput();
+    opts.requireNoSummary();
+    opts.requireNoTelemetry();
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -206,26 +211,39 @@ int main(int argc, char* argv[]) {
     ///////////////////////
     double maxDeltaR(opts.deltaR()), minRefJetPt(opts.refJetMinPt()), maxRefJetPt(5000.);
     double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(5000.), maxJetEta(5);
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
+    std::unique_ptr<Matcher> matcher(makeMatcher(opts.matcherType(), maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
     std::cout << *matcher << std::endl;
 
     ///////////////////////
     // JET CLEANING CUTS //
     ///////////////////////
     bool doCleaningCuts = opts.cleanJets() != "";
+    JetIDQuality jetIDQuality = kLooseJetID;
     if (doCleaningCuts) {
         cout << "Applying " << opts.cleanJets() << " jet cleaning cuts" << endl;
+        jetIDQuality = parseJetIDQuality(opts.cleanJets());
     }
 
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // jet collections, re-used each event to avoid reallocating
+    JetCollection refJets, l1Jets;
+    std::vector<char> jetIDMask;
+    // to look up the reco jet for each matched pair
+    RecoJetIndexMap refJetIndex;
+    // events to draw are stored, & plotted afterwards with renderEventDisplays.py
+    std::unique_ptr<EventDisplayRecorder> eventDisplays;
+    if (opts.drawNumber() > 0) {
+        TString plotDir = TString::Format("%splots_%s_%s_%s", outDir.Data(), inStem.Data(), "reco", "l1");
+        eventDisplays.reset(new EventDisplayRecorder(EventDisplayRecorder::sideFilename(opts.outputFilename()), plotDir.Data()));
+    }
     // produce matching pairs and store
     Long64_t drawCounter(0), matchedEvent(0), cscFail(0);
     Long64_t counter(0);
     for (Long64_t iEntry = 0; counter < nEntries; ++iEntry, ++counter) {
 
-        if (counter % 10000 == 0) {
+        if (opts.reportInterval() > 0 && counter % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
         }
 
@@ -255,13 +273,14 @@ int main(int argc, char* argv[]) {
         // rescaleEnergyFractions(refData);
 
         // Get vectors of ref & L1 jets from trees, only want BX = 0 (the collision)
-        std::vector<TLorentzVector> refJets;
         if (doCleaningCuts) {
-            refJets = makeRecoTLorentzVectorsCleaned(*refData, opts.cleanJets()); // with JetID filters
+            makeJetIDMask(*refData, jetIDQuality, jetIDMask); // with JetID filters
+            fillRecoJetsCleaned(*refData, jetIDMask, refJets);
         } else {
-            refJets = makeTLorentzVectors(refData->etCorr, refData->eta, refData->phi);
+            refJets.fill(refData->etCorr, refData->eta, refData->phi);
         }
-        std::vector<TLorentzVector> l1Jets  = makeTLorentzVectors(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi, l1Data->jetBx);
+        l1Jets.fill(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi, l1Data->jetBx);
+        refJetIndex.fill(*refData);
 
         out_nL1 = l1Jets.size();
         out_nRef = refJets.size();
@@ -292,7 +311,7 @@ int main(int argc, char* argv[]) {
             out_resL1 = out_ptDiff/it.l1Jet().Et();
             out_resRef = out_ptDiff/it.refJet().Et();
 
-            int rInd = findRecoJetIndex(out_ptRef, out_etaRef, out_phiRef, *refData);
+            int rInd = refJetIndex.find(out_etaRef, out_phiRef);
             if (rInd < 0) throw std::range_error("No RecoJet");
             out_chef = refData->chef[rInd];
             out_nhef = refData->nhef[rInd];
@@ -319,11 +338,7 @@ int main(int argc, char* argv[]) {
                     "L1 jet %.1f < E^{L1}_{T} < %.1f GeV, |#eta_{jet}| < %.1f",
                     minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
                 // get jets post pT, eta cuts
-                JetDrawer drawer(matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
-
-                TString pdfname = TString::Format("%splots_%s_%s_%s/jets_%lld.pdf",
-                    outDir.Data(), inStem.Data(), "reco", "l1", iEntry);
-                drawer.drawAndSave(pdfname);
+                eventDisplays->record(iEntry, out_event, matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
 
                 drawCounter++;
             }
@@ -335,5 +350,10 @@ int main(int argc, char* argv[]) {
     outFile->Close();
     cout << matchedEvent << " events had 1+ matches, out of " << nEntries << endl;
     cout << cscFail << " events failed CSC check, out of " << nEntries << endl;
+    if (eventDisplays) {
+        eventDisplays->close();
+        cout << "Stored " << eventDisplays->nRecorded() << " events to draw in " << eventDisplays->filename() << endl;
+        cout << "Make the plots with: renderEventDisplays.py " << eventDisplays->filename() << endl;
+    }
     return 0;
 }
@@ -58,6 +58,10 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    opts.requireSingleConfig();
+    opts.requireFlatOutput();
+    opts.requireNoSummary();
+    opts.requireNoTelemetry();
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -191,7 +195,7 @@ int main(int argc, char* argv[]) {
     ///////////////////////
     double maxDeltaR(opts.deltaR()), minRefJetPt(opts.refJetMinPt()), maxRefJetPt(5000.);
     double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(5000.), maxJetEta(5);
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
+    std::unique_ptr<Matcher> matcher(makeMatcher(opts.matcherType(), maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
     std::cout << *matcher << std::endl;
 
     ///////////////////////
@@ -212,7 +216,7 @@ int main(int argc, char* argv[]) {
     Long64_t noL1Jets(0), noRefJets(0), noJets(0), noMatches(0), bothJets(0);
     for (Long64_t iEntry = 0; counter < nEntries; ++iEntry, ++counter) {
 
-        if (counter % 10000 == 0) {
+        if (opts.reportInterval() > 0 && counter % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
         }
 
@@ -26,7 +26,7 @@
 #include "commonRootUtils.h"
 #include "PileupInfoTree.h"
 #include "RunMatcherOpts.h"
-#include "JetDrawer.h"
+#include "EventDisplayRecorder.h"
 #include "L1Ntuple.h"
 
 // Other CMSSW headers
@@ -107,6 +107,10 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    opts.requireSingleConfig();
+    opts.requireFlatOutput();
+    opts.requireNoSummary();
+    opts.requireNoTelemetry();
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -214,6 +218,12 @@ int main(int argc, char* argv[]) {
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // events to draw are stored, & plotted afterwards with renderEventDisplays.py
+    std::unique_ptr<EventDisplayRecorder> eventDisplays;
+    if (opts.drawNumber() > 0) {
+        TString plotDir = TString::Format("%splots_%s_%s_%s", outDir.Data(), inStem.Data(), "reco", "l1");
+        eventDisplays.reset(new EventDisplayRecorder(EventDisplayRecorder::sideFilename(opts.outputFilename()), plotDir.Data()));
+    }
     // produce matching pairs and store
     Long64_t drawCounter = 0;
     for (Long64_t iEntry = 0; iEntry < nEntries; ++iEntry) {
@@ -223,7 +233,7 @@ int main(int argc, char* argv[]) {
         }
 
         // Printout every 10K events to show we're not stuck
-        if (iEntry % 10000 == 0) {
+        if (opts.reportInterval() > 0 && iEntry % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << endl;
         }
 
@@ -290,11 +300,7 @@ int main(int argc, char* argv[]) {
                     "L1 jet %.1f < E^{L1}_{T} < %.1f GeV, |#eta_{jet}| < %.1f",
                     minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
                 // get jets post pT, eta cuts
-                JetDrawer drawer(matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
-
-                TString pdfname = TString::Format("%splots_%s_%s_%s/jets_%lld.pdf",
-                    outDir.Data(), inStem.Data(), "reco", "l1", iEntry);
-                drawer.drawAndSave(pdfname);
+                eventDisplays->record(iEntry, out_event, matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
 
                 drawCounter++;
             }
@@ -305,7 +311,11 @@ int main(int argc, char* argv[]) {
     outTree.Write("", TObject::kOverwrite);
 
     outFile->Close();
-
+    if (eventDisplays) {
+        eventDisplays->close();
+        cout << "Stored " << eventDisplays->nRecorded() << " events to draw in " << eventDisplays->filename() << endl;
+        cout << "Make the plots with: renderEventDisplays.py " << eventDisplays->filename() << endl;
+    }
 }
 
 
@@ -61,6 +61,10 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    opts.requireSingleConfig();
+    opts.requireFlatOutput();
+    opts.requireNoSummary();
+    opts.requireNoTelemetry();
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -213,7 +217,7 @@ int main(int argc, char* argv[]) {
     ///////////////////////
     double maxDeltaR(opts.deltaR()), minRefJetPt(opts.refJetMinPt()), maxRefJetPt(5000.);
     double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(5000.), maxJetEta(5.);
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
+    std::unique_ptr<Matcher> matcher(makeMatcher(opts.matcherType(), maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
     std::cout << *matcher << std::endl;
 
     bool doCleaningCuts = opts.cleanJets() != "";
@@ -224,9 +228,11 @@ int main(int argc, char* argv[]) {
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // jet collections, re-used each event to avoid reallocating
+    JetCollection refJets, l1Jets, httRefJets, httL1Jets;
     // produce matching pairs and store
     for (Long64_t iEntry = 0; iEntry < nEntries; ++iEntry) {
-        if (iEntry % 10000 == 0) {
+        if (opts.reportInterval() > 0 && iEntry % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
         }
 
@@ -249,13 +255,12 @@ int main(int argc, char* argv[]) {
         /////////////////////////////////////////////
         // Make vectors of ref & L1 jets from trees //
         /////////////////////////////////////////////
-        std::vector<TLorentzVector> refJets = makeTLorentzVectors(refData->jetPt, refData->jetEta, refData->jetPhi);
+        refJets.fill(refData->jetPt, refData->jetEta, refData->jetPhi);
 
-        std::vector<TLorentzVector> l1Jets;
         if (doCleaningCuts) {
-            l1Jets = makeRecoTLorentzVectorsCleaned(*l1Data, opts.cleanJets()); // with JetID filters
+            fillRecoJetsCleaned(*l1Data, opts.cleanJets(), l1Jets); // with JetID filters
         } else {
-	  l1Jets = makeTLorentzVectors(l1Data->caloEt, l1Data->caloEta, l1Data->caloPhi); // etCorr used before but nEntries for it were different to eta and phi
+	  l1Jets.fill(l1Data->caloEt, l1Data->caloEta, l1Data->caloPhi); // etCorr used before but nEntries for it were different to eta and phi
         }
 
         out_nL1 = l1Jets.size();
@@ -267,7 +272,7 @@ int main(int argc, char* argv[]) {
         // Store sums //
         ////////////////
         // L1 sums
-        std::vector<TLorentzVector> httL1Jets = getJetsForHTT(l1Jets);
+        getJetsForHTT(l1Jets, httL1Jets);
         out_nL1JetsSum = httL1Jets.size();
         out_httL1 = scalarSumPt(httL1Jets);
         TLorentzVector mhtVecL1 = vectorSum(httL1Jets);
@@ -275,7 +280,7 @@ int main(int argc, char* argv[]) {
         out_mhtPhiL1 = mhtVecL1.Phi();
 
         // Ref jet sums
-        std::vector<TLorentzVector> httRefJets = getJetsForHTT(refJets);
+        getJetsForHTT(refJets, httRefJets);
         out_nRefJetsSum = httRefJets.size();
         out_httRef = scalarSumPt(httRefJets);
         TLorentzVector mhtVecRef = vectorSum(httRefJets);
@@ -30,7 +30,7 @@
 #include "L1GenericTree.h"
 #include "PileupInfoTree.h"
 #include "RunMatcherOpts.h"
-#include "JetDrawer.h"
+#include "EventDisplayRecorder.h"
 #include "runMatcherUtils.h"
 
 using std::cout;
@@ -60,6 +60,10 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    opts.requireSingleConfig();
+    opts.requireFlatOutput();
+    opts.requireNoSummary();
+    opts.requireNoTelemetry();
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -192,16 +196,24 @@ int main(int argc, char* argv[]) {
     double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(5000.), maxJetEta(5.);
     // use base class smart pointer for ease of swapping in/out different
     //  matchers if so desired
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
+    std::unique_ptr<Matcher> matcher(makeMatcher(opts.matcherType(), maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
     std::cout << *matcher << std::endl;
 
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // jet collections, re-used each event to avoid reallocating
+    JetCollection refJets, l1Jets, httRefJets, httL1Jets;
+    // events to draw are stored, & plotted afterwards with renderEventDisplays.py
+    std::unique_ptr<EventDisplayRecorder> eventDisplays;
+    if (opts.drawNumber() > 0) {
+        TString plotDir = TString::Format("%splots_%s_%s_%s", outDir.Data(), inStem.Data(), "gen", "l1");
+        eventDisplays.reset(new EventDisplayRecorder(EventDisplayRecorder::sideFilename(opts.outputFilename()), plotDir.Data()));
+    }
     // produce matching pairs and store
     Long64_t drawCounter = 0;
     for (Long64_t iEntry = 0; iEntry < nEntries; ++iEntry) {
-        if (iEntry % 10000 == 0) {
+        if (opts.reportInterval() > 0 && iEntry % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
         }
 
@@ -225,8 +237,8 @@ int main(int argc, char* argv[]) {
         /////////////////////////////////////////////
         // Make vectors of ref & L1 jets from trees //
         /////////////////////////////////////////////
-        std::vector<TLorentzVector> refJets = makeTLorentzVectors(refData->caloEt, refData->caloEta, refData->caloPhi);
-        std::vector<TLorentzVector> l1Jets = makeTLorentzVectors(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi);
+        refJets.fill(refData->caloEt, refData->caloEta, refData->caloPhi);
+        l1Jets.fill(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi);
 
         out_nL1 = l1Jets.size();
         out_nRef = refJets.size();
@@ -237,7 +249,7 @@ int main(int argc, char* argv[]) {
         // Store sums //
         ////////////////
         // L1 sums
-        std::vector<TLorentzVector> httL1Jets = getJetsForHTT(l1Jets);
+        getJetsForHTT(l1Jets, httL1Jets);
         out_nL1JetsSum = httL1Jets.size();
         out_httL1 = l1Data->sumEt[2];
         out_mhtL1 = l1Data->sumEt[3];
@@ -261,7 +273,7 @@ int main(int argc, char* argv[]) {
         out_mhtPhiL1 = mhtL1_check.Phi();
 
         // Ref jet sums
-        std::vector<TLorentzVector> httRefJets = getJetsForHTT(refJets);
+        getJetsForHTT(refJets, httRefJets);
         out_nRefJetsSum = httRefJets.size();
         out_httRef = scalarSumPt(httRefJets);
         // Pass jets to matcher, do matching
@@ -309,11 +321,7 @@ int main(int argc, char* argv[]) {
                     "L1 jet %.1f < E^{L1}_{T} < %.1f GeV, |#eta_{jet}| < %.1f",
                     minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
                 // get jets post pT, eta cuts
-                JetDrawer drawer(matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
-
-                TString pdfname = TString::Format("%splots_%s_%s_%s/jets_%lld.pdf",
-                    outDir.Data(), inStem.Data(), "gen", "l1", iEntry);
-                drawer.drawAndSave(pdfname);
+                eventDisplays->record(iEntry, out_event, matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
 
                 drawCounter++;
             }
@@ -323,6 +331,11 @@ int main(int argc, char* argv[]) {
     // save tree to new file and cleanup
     outTree.Write("", TObject::kOverwrite);
     outFile->Close();
+    if (eventDisplays) {
+        eventDisplays->close();
+        cout << "Stored " << eventDisplays->nRecorded() << " events to draw in " << eventDisplays->filename() << endl;
+        cout << "Make the plots with: renderEventDisplays.py " << eventDisplays->filename() << endl;
+    }
     return 0;
 }
 
@@ -29,8 +29,10 @@
 #include "L1GenericTree.h"
 #include "PileupInfoTree.h"
 #include "RunMatcherOpts.h"
-#include "JetDrawer.h"
+#include "EventDisplayRecorder.h"
 #include "runMatcherUtils.h"
+#include "CalibSummary.h"
+#include "MatcherTelemetry.h"
 
 using std::cout;
 using std::endl;
@@ -54,6 +56,8 @@ int main(int argc, char* argv[]) {
 
     // deal with user args
     RunMatcherOpts opts(argc, argv);
+    // gen jets have no jet ID, so there's nothing to clean
+    opts.rejectConfigKey("cleanJets", "gen reference jets have no jet ID");
 
     ///////////////////////
     // SETUP INPUT FILES //
@@ -94,12 +98,16 @@ int main(int argc, char* argv[]) {
     // SETUP OUTPUT FILES //
     ////////////////////////
 
-    // setup output file to store results
-    // check that we're not overwriting the input file!
-    if (opts.outputFilename() == opts.inputFilename()) {
-        throw std::runtime_error("Cannot use input filename as output filename!");
+    // One output file per matcher config, all filled in the same pass over the input
+    std::vector<MatcherConfig> configs = opts.matcherConfigs();
+    std::vector<TFile*> outFiles;
+    for (const auto & config: configs) {
+        // check that we're not overwriting the input file!
+        if (config.output == opts.inputFilename()) {
+            throw std::runtime_error("Cannot use input filename as output filename!");
+        }
+        outFiles.push_back(openFile(config.output, "RECREATE"));
     }
-    TFile * outFile = openFile(opts.outputFilename(), "RECREATE");
     fs::path outPath(opts.outputFilename());
     TString outDir(outPath.parent_path().c_str());
     if (outDir != "") {
@@ -107,7 +115,17 @@ int main(int argc, char* argv[]) {
     }
 
     // setup output tree to store raw variable for quick plotting/debugging
+    outFiles[0]->cd();
     TTree outTree("valid", "valid");
+    // Per-event quantities go in the pairs tree, or their own tree for the
+    // normalised layout, with each pair pointing to its event via iEvent
+    TTree * evtTree = &outTree;
+    Long64_t out_iEvent(-1);
+    if (opts.normalisedOutput()) {
+        evtTree = new TTree("events", "events"); // owned by outFiles[0]
+        evtTree->Branch("iEvent", &out_iEvent, "iEvent/L");
+        outTree.Branch("iEvent", &out_iEvent, "iEvent/L");
+    }
 
     // Quantities for L1 jets:
     float out_pt(-1.), out_eta(99.), out_phi(99.);
@@ -116,7 +134,7 @@ int main(int argc, char* argv[]) {
     outTree.Branch("pt", &out_pt, "pt/Float_t");
     outTree.Branch("eta", &out_eta, "eta/Float_t");
     outTree.Branch("phi", &out_phi, "phi/Float_t");
-    outTree.Branch("nL1", &out_nL1, "nL1/Int_t");
+    evtTree->Branch("nL1", &out_nL1, "nL1/Int_t");
     outTree.Branch("indL1", &out_ind, "indL1/Int_t");
 
     // Quantities for reference jets (GenJet, etc):
@@ -125,7 +143,7 @@ int main(int argc, char* argv[]) {
     outTree.Branch("ptRef", &out_ptRef, "ptRef/Float_t");
     outTree.Branch("etaRef", &out_etaRef, "etaRef/Float_t");
     outTree.Branch("phiRef", &out_phiRef, "phiRef/Float_t");
-    outTree.Branch("nRef", &out_nRef, "nRef/Int_t");
+    evtTree->Branch("nRef", &out_nRef, "nRef/Int_t");
     outTree.Branch("inRef", &out_indRef, "indRef/Int_t");
 
     // Quantities to describe relationship between the two:
@@ -140,36 +158,53 @@ int main(int argc, char* argv[]) {
     outTree.Branch("dphi", &out_dphi, "dphi/Float_t");
     outTree.Branch("resL1", &out_resL1, "resL1/Float_t"); // resolution = L1 - Ref / L1
     outTree.Branch("resRef", &out_resRef, "resRef/Float_t"); // resolution = L1 - Ref / Ref
-    outTree.Branch("nMatches", &out_nMatches, "nMatches/Int_t");
+    evtTree->Branch("nMatches", &out_nMatches, "nMatches/Int_t");
     
     // PU quantities
     float out_trueNumInteractions(-1.), out_numPUVertices(-1.);
     int out_recoNVtx(0);
-    outTree.Branch("trueNumInteractions", &out_trueNumInteractions, "trueNumInteractions/Float_t");
-    outTree.Branch("numPUVertices", &out_numPUVertices, "numPUVertices/Float_t");
-    outTree.Branch("recoNVtx", &out_recoNVtx, "recoNVtx/Int_t");
+    evtTree->Branch("trueNumInteractions", &out_trueNumInteractions, "trueNumInteractions/Float_t");
+    evtTree->Branch("numPUVertices", &out_numPUVertices, "numPUVertices/Float_t");
+    evtTree->Branch("recoNVtx", &out_recoNVtx, "recoNVtx/Int_t");
 
     // Event number
     ULong64_t out_event(0);
-    outTree.Branch("event", &out_event, "event/Int_t");
+    evtTree->Branch("event", &out_event, "event/Int_t");
 
     // L1 sums
     int out_nL1JetsSum(0);
     float out_httL1(0.);
     float out_mhtL1(0.), out_mhtPhiL1(0.);
-    outTree.Branch("nL1JetsSum", &out_nL1JetsSum);
-    outTree.Branch("httL1", &out_httL1);
-    outTree.Branch("mhtL1", &out_mhtL1);
-    outTree.Branch("mhtPhiL1", &out_mhtPhiL1);
+    evtTree->Branch("nL1JetsSum", &out_nL1JetsSum);
+    evtTree->Branch("httL1", &out_httL1);
+    evtTree->Branch("mhtL1", &out_mhtL1);
+    evtTree->Branch("mhtPhiL1", &out_mhtPhiL1);
 
     // Reference jet Sums
     int out_nRefJetsSum(0);
     float out_httRef(0.);
     float out_mhtRef(0.), out_mhtPhiRef(0.);
-    outTree.Branch("nRefJetsSum", &out_nRefJetsSum);
-    outTree.Branch("httRef", &out_httRef);
-    outTree.Branch("mhtRef", &out_mhtRef);
-    outTree.Branch("mhtPhiRef", &out_mhtPhiRef);
+    evtTree->Branch("nRefJetsSum", &out_nRefJetsSum);
+    evtTree->Branch("httRef", &out_httRef);
+    evtTree->Branch("mhtRef", &out_mhtRef);
+    evtTree->Branch("mhtPhiRef", &out_mhtPhiRef);
+
+    // Output trees for the other configs: same branches, filled from same variables
+    std::vector<TTree*> outTrees = {&outTree};
+    std::vector<TTree*> evtTrees = {evtTree};
+    for (unsigned iCfg = 1; iCfg < configs.size(); ++iCfg) {
+        outFiles[iCfg]->cd();
+        outTrees.push_back(outTree.CloneTree(0));
+        evtTrees.push_back(opts.normalisedOutput() ? evtTree->CloneTree(0) : outTrees.back());
+    }
+
+    // Histograms for runCalibration.py, filled alongside (or instead of) the pairs
+    std::vector<std::unique_ptr<CalibSummary>> summaries;
+    if (opts.writeSummary()) {
+        for (unsigned iCfg = 0; iCfg < configs.size(); ++iCfg) {
+            summaries.emplace_back(new CalibSummary(opts.summaryEtaBins(), opts.summaryPUBins()));
+        }
+    }
 
     // check # events in boths trees is same
     Long64_t nEntriesRef = refJetTree.getEntries();
@@ -182,29 +217,56 @@ int main(int argc, char* argv[]) {
         cout << "Running over " << nEntries << " events." << endl;
     }
 
-    ///////////////////////
-    // SETUP JET MATCHER //
-    ///////////////////////
-    double maxDeltaR(opts.deltaR()), minRefJetPt(opts.refJetMinPt()), maxRefJetPt(5000.);
+    ////////////////////////
+    // SETUP JET MATCHERS //
+    ////////////////////////
+    double minRefJetPt(opts.refJetMinPt()), maxRefJetPt(5000.);
     double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(5000.), maxJetEta(5.);
     // use base class smart pointer for ease of swapping in/out different
     //  matchers if so desired
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
-    std::cout << *matcher << std::endl;
+    std::vector<std::unique_ptr<Matcher>> matchers;
+    for (const auto & config: configs) {
+        matchers.emplace_back(makeMatcher(config.matcher, config.deltaR, config.refMinPt, maxRefJetPt, config.l1MinPt, maxL1JetPt, maxJetEta));
+        std::cout << config.output << ": " << *matchers.back() << std::endl;
+    }
 
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // jet collections, re-used each event to avoid reallocating
+    JetCollection refJets, l1Jets, httRefJets, httL1Jets;
+    // throughput & I/O measurements
+    MatcherTelemetry telemetry;
+    unsigned iRefTree = telemetry.addInputTree("ref", refJetTree.getTChain());
+    unsigned iL1Tree = telemetry.addInputTree("l1", l1JetTree.getTChain());
+    unsigned iEventTree = telemetry.addInputTree("event", eventTree.getTChain());
+    // events to draw are stored, & plotted afterwards with renderEventDisplays.py
+    std::unique_ptr<EventDisplayRecorder> eventDisplays;
+    if (opts.drawNumber() > 0) {
+        TString plotDir = TString::Format("%splots_%s_%s_%s", outDir.Data(), inStem.Data(), "gen", "l1");
+        eventDisplays.reset(new EventDisplayRecorder(EventDisplayRecorder::sideFilename(configs[0].output), plotDir.Data()));
+    }
     // produce matching pairs and store
     Long64_t drawCounter = 0;
     for (Long64_t iEntry = 0; iEntry < nEntries; ++iEntry) {
-        if (iEntry % 10000 == 0) {
+        if (opts.reportInterval() > 0 && iEntry % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
+            if (iEntry > 0) telemetry.printReport(cout);
         }
 
-        if (refJetTree.getEntry(iEntry) < 1 || l1JetTree.getEntry(iEntry) < 1 ||
-            eventTree.getEntry(iEntry) < 1)// || recoVtxTree.getEntry(iEntry) < 1)
+        Long64_t refBytes(0), l1Bytes(0), eventBytes(0);
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kRead);
+            refBytes = refJetTree.getEntry(iEntry);
+            l1Bytes = l1JetTree.getEntry(iEntry);
+            eventBytes = eventTree.getEntry(iEntry);
+        }
+        if (refBytes < 1 || l1Bytes < 1 || eventBytes < 1)// || recoVtxTree.getEntry(iEntry) < 1)
             break;
+        telemetry.addEvent();
+        telemetry.addBytesRead(iRefTree, refBytes);
+        telemetry.addBytesRead(iL1Tree, l1Bytes);
+        telemetry.addBytesRead(iEventTree, eventBytes);
 
         ////////////////////////
         // Generic event info //
@@ -221,8 +283,11 @@ int main(int argc, char* argv[]) {
         /////////////////////////////////////////////
         // Make vectors of ref & L1 jets from trees //
         /////////////////////////////////////////////
-        std::vector<TLorentzVector> refJets = makeTLorentzVectors(refData->jetPt, refData->jetEta, refData->jetPhi);
-        std::vector<TLorentzVector> l1Jets = makeTLorentzVectors(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi);
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kMatch);
+            refJets.fill(refData->jetPt, refData->jetEta, refData->jetPhi);
+            l1Jets.fill(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi);
+        }
 
         out_nL1 = l1Jets.size();
         out_nRef = refJets.size();
@@ -232,93 +297,137 @@ int main(int argc, char* argv[]) {
         ////////////////
         // Store sums //
         ////////////////
-        // L1 sums
-        std::vector<TLorentzVector> httL1Jets = getJetsForHTT(l1Jets);
-        out_nL1JetsSum = httL1Jets.size();
-        out_httL1 = l1Data->sumEt[2];
-        out_mhtL1 = l1Data->sumEt[3];
-        out_mhtPhiL1 = l1Data->sumPhi[3];
-        float httL1_check = scalarSumPt(httL1Jets);
-
-        // Check my calc with stored value
-        // Doens't make sense to do this when applying calibrations on the fly
-        // if (fabs(out_httL1 - httL1_check) > 0.01 && out_httL1 < 2047.5) {
-        //     cout << "HTT L1 not agreeing with calculation: " + lexical_cast<std::string>(out_httL1) + " vs " + lexical_cast<std::string>(httL1_check) << endl;
-        //     for (const auto& itr: l1Jets) {
-        //         cout << itr.Pt() << " " << itr.Eta() << endl;
-        //     }
-        // }
-
-        TLorentzVector mhtL1_check = vectorSum(httL1Jets);
-
-        // Override sums with calibrated jets
-        out_httL1 = httL1_check;
-        out_mhtL1 = mhtL1_check.Pt();
-        out_mhtPhiL1 = mhtL1_check.Phi();
-
-        // Ref jet sums
-        std::vector<TLorentzVector> httRefJets = getJetsForHTT(refJets);
-        out_nRefJetsSum = httRefJets.size();
-        out_httRef = scalarSumPt(httRefJets);
-        // Pass jets to matcher, do matching
-        TLorentzVector mhtVecRef = vectorSum(httRefJets);
-        out_mhtRef = mhtVecRef.Pt();
-        out_mhtPhiRef = mhtVecRef.Phi();
-
-        ///////////////////////////////////////
-        // Pass jets to matcher, do matching //
-        ///////////////////////////////////////
-        matcher->setRefJets(refJets);
-        matcher->setL1Jets(l1Jets);
-        std::vector<MatchedPair> matchResults = matcher->getMatchingPairs();
-        // matcher->printMatches(); // for debugging
-
-        //////////////////////////////////////////
-        // store L1 & ref jet variables in tree //
-        //////////////////////////////////////////
-        out_nMatches = matchResults.size();
-        for (const auto &it: matchResults) {
-            // std::cout << it << std::endl;
-            out_pt = it.l1Jet().Et();
-            out_eta = it.l1Jet().Eta();
-            out_phi = it.l1Jet().Phi();
-            out_dr = it.refJet().DeltaR(it.l1Jet());
-            out_deta = it.refJet().Eta() - it.l1Jet().Eta();
-            out_dphi = it.refJet().DeltaPhi(it.l1Jet());
-            out_ptRef = it.refJet().Pt();
-            out_etaRef = it.refJet().Eta();
-            out_phiRef = it.refJet().Phi();
-            out_ptDiff = out_pt - out_ptRef;
-            out_rsp = out_pt/out_ptRef;
-            out_resL1 = out_ptDiff/out_pt;
-            out_resRef = out_ptDiff/out_ptRef;
-            outTree.Fill();
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kSums);
+            // L1 sums
+            getJetsForHTT(l1Jets, httL1Jets);
+            out_nL1JetsSum = httL1Jets.size();
+            out_httL1 = l1Data->sumEt[2];
+            out_mhtL1 = l1Data->sumEt[3];
+            out_mhtPhiL1 = l1Data->sumPhi[3];
+            float httL1_check = scalarSumPt(httL1Jets);
+
+            // Check my calc with stored value
+            // Doens't make sense to do this when applying calibrations on the fly
+            // if (fabs(out_httL1 - httL1_check) > 0.01 && out_httL1 < 2047.5) {
+            //     cout << "HTT L1 not agreeing with calculation: " + lexical_cast<std::string>(out_httL1) + " vs " + lexical_cast<std::string>(httL1_check) << endl;
+            //     for (const auto& itr: l1Jets) {
+            //         cout << itr.Pt() << " " << itr.Eta() << endl;
+            //     }
+            // }
+
+            TLorentzVector mhtL1_check = vectorSum(httL1Jets);
+
+            // Override sums with calibrated jets
+            out_httL1 = httL1_check;
+            out_mhtL1 = mhtL1_check.Pt();
+            out_mhtPhiL1 = mhtL1_check.Phi();
+
+            // Ref jet sums
+            getJetsForHTT(refJets, httRefJets);
+            out_nRefJetsSum = httRefJets.size();
+            out_httRef = scalarSumPt(httRefJets);
+            // Pass jets to matcher, do matching
+            TLorentzVector mhtVecRef = vectorSum(httRefJets);
+            out_mhtRef = mhtVecRef.Pt();
+            out_mhtPhiRef = mhtVecRef.Phi();
         }
 
-        ///////////////////////////////////////////////////
-        // debugging plot - plots eta vs phi map of jets //
-        ///////////////////////////////////////////////////
-        if (drawCounter < opts.drawNumber()) {
-            if (matchResults.size() > 0) {
-                TString label = TString::Format(
-                    "%.1f < E^{gen}_{T} < %.1f GeV, " \
-                    "L1 jet %.1f < E^{L1}_{T} < %.1f GeV, |#eta_{jet}| < %.1f",
-                    minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
-                // get jets post pT, eta cuts
-                JetDrawer drawer(matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
-
-                TString pdfname = TString::Format("%splots_%s_%s_%s/jets_%lld.pdf",
-                    outDir.Data(), inStem.Data(), "gen", "l1", iEntry);
-                drawer.drawAndSave(pdfname);
-
-                drawCounter++;
+        for (unsigned iCfg = 0; iCfg < configs.size(); ++iCfg) {
+            ///////////////////////////////////////
+            // Pass jets to matcher, do matching //
+            ///////////////////////////////////////
+            Matcher * matcher = matchers[iCfg].get();
+            std::vector<MatchedPair> matchResults;
+            {
+                MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kMatch);
+                matcher->setRefJets(refJets);
+                matcher->setL1Jets(l1Jets);
+                matchResults = matcher->getMatchingPairs();
             }
-        }
+            if (iCfg == 0) telemetry.addPairs(matchResults.size());
+            // matcher->printMatches(); // for debugging
+
+            //////////////////////////////////////////
+            // store L1 & ref jet variables in tree //
+            //////////////////////////////////////////
+            {
+                MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kFill);
+                out_nMatches = matchResults.size();
+                if (opts.normalisedOutput() && !opts.summaryOnly() && out_nMatches > 0) {
+                    out_iEvent = evtTrees[iCfg]->GetEntries();
+                    evtTrees[iCfg]->Fill();
+                }
+                for (const auto &it: matchResults) {
+                    // std::cout << it << std::endl;
+                    out_pt = it.l1Jet().Et();
+                    out_eta = it.l1Jet().Eta();
+                    out_phi = it.l1Jet().Phi();
+                    out_dr = it.refJet().DeltaR(it.l1Jet());
+                    out_deta = it.refJet().Eta() - it.l1Jet().Eta();
+                    out_dphi = it.refJet().DeltaPhi(it.l1Jet());
+                    out_ptRef = it.refJet().Pt();
+                    out_etaRef = it.refJet().Eta();
+                    out_phiRef = it.refJet().Phi();
+                    out_ptDiff = out_pt - out_ptRef;
+                    out_rsp = out_pt/out_ptRef;
+                    out_resL1 = out_ptDiff/out_pt;
+                    out_resRef = out_ptDiff/out_ptRef;
+                    if (!opts.summaryOnly()) {
+                        outTrees[iCfg]->Fill();
+                    }
+                    if (opts.writeSummary()) {
+                        summaries[iCfg]->fill(out_eta, out_pt, out_ptRef, out_numPUVertices);
+                    }
+                }
+            }
+
+            ///////////////////////////////////////////////////
+            // debugging plot - plots eta vs phi map of jets //
+            ///////////////////////////////////////////////////
+            // only for the main config
+            if (iCfg == 0 && drawCounter < opts.drawNumber()) {
+                if (matchResults.size() > 0) {
+                    TString label = TString::Format(
+                        "%.1f < E^{gen}_{T} < %.1f GeV, " \
+                        "L1 jet %.1f < E^{L1}_{T} < %.1f GeV, |#eta_{jet}| < %.1f",
+                        minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
+                    // get jets post pT, eta cuts
+                    eventDisplays->record(iEntry, out_event, matcher->getRefJets(), matcher->getL1Jets(), matchResults, label);
+
+                    drawCounter++;
+                }
+            }
+        } // end of loop over configs
     } // end of loop over entries
 
-    // save tree to new file and cleanup
-    outTree.Write("", TObject::kOverwrite);
-    outFile->Close();
+    // save trees to new files and cleanup
+    {
+        MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kWrite);
+        for (unsigned iCfg = 0; iCfg < configs.size(); ++iCfg) {
+            outFiles[iCfg]->cd();
+            outTrees[iCfg]->Write("", TObject::kOverwrite);
+            if (opts.normalisedOutput()) {
+                // index so the events tree can be used as a friend of the pairs tree
+                evtTrees[iCfg]->BuildIndex("iEvent");
+                evtTrees[iCfg]->Write("", TObject::kOverwrite);
+            }
+            outFiles[iCfg]->Close();
+            if (opts.writeSummary()) {
+                summaries[iCfg]->write(CalibSummary::summaryFilename(configs[iCfg].output));
+            }
+        }
+    }
+
+    if (opts.reportInterval() > 0) telemetry.printReport(cout);
+    if (opts.writeTelemetry()) {
+        telemetry.writeSummary(MatcherTelemetry::summaryFilename(configs[0].output));
+    }
+    if (eventDisplays) {
+        eventDisplays->close();
+        cout << "Stored " << eventDisplays->nRecorded() << " events to draw in " << eventDisplays->filename() << endl;
+        cout << "Make the plots with: renderEventDisplays.py " << eventDisplays->filename() << endl;
+    }
     return 0;
 }
 
@@ -1,4 +1,5 @@
 #include <fstream>
+#include <map>
 
 // ROOT headers
 #include "TChain.h"
@@ -28,6 +29,9 @@
 #include "L1GenericTree.h"
 #include "PileupInfoTree.h"
 #include "runMatcherUtils.h"
+#include "RecoJetIndexMap.h"
+#include "CalibSummary.h"
+#include "MatcherTelemetry.h"
 
 using std::cout;
 using std::endl;
@@ -92,32 +96,46 @@ int main(int argc, char* argv[]) {
     // SETUP OUTPUT FILES //
     ////////////////////////
 
-    // setup output file to store results
-    // check that we're not overwriting the input file!
-    if (opts.outputFilename() == opts.inputFilename()) {
-        throw std::runtime_error("Cannot use input filename as output filename!");
+    // One output file per matcher config, all filled in the same pass over the input
+    std::vector<MatcherConfig> configs = opts.matcherConfigs();
+    std::vector<TFile*> outFiles;
+    for (const auto & config: configs) {
+        // check that we're not overwriting the input file!
+        if (config.output == opts.inputFilename()) {
+            throw std::runtime_error("Cannot use input filename as output filename!");
+        }
+        outFiles.push_back(openFile(config.output, "RECREATE"));
     }
-    TFile * outFile = openFile(opts.outputFilename(), "RECREATE");
     fs::path outPath(opts.outputFilename());
     TString outDir(outPath.parent_path().c_str());
     if (outDir != "") outDir += "/";
 
     // setup output tree to store raw variable for quick plotting/debugging
+    outFiles[0]->cd();
     TTree outTree("valid", "valid");
+    // Per-event quantities go in the pairs tree, or their own tree for the
+    // normalised layout, with each pair pointing to its event via iEvent
+    TTree * evtTree = &outTree;
+    Long64_t out_iEvent(-1);
+    if (opts.normalisedOutput()) {
+        evtTree = new TTree("events", "events"); // owned by outFiles[0]
+        evtTree->Branch("iEvent", &out_iEvent, "iEvent/L");
+        outTree.Branch("iEvent", &out_iEvent, "iEvent/L");
+    }
     // Quantities for L1 jets:
     float out_pt(-1.), out_eta(99.), out_phi(99.);
     int out_nL1(-1); // number of jets in the event,
     outTree.Branch("pt", &out_pt, "pt/F");
     outTree.Branch("eta", &out_eta, "eta/F");
     outTree.Branch("phi", &out_phi, "phi/F");
-    outTree.Branch("nL1", &out_nL1, "nL1/I");
+    evtTree->Branch("nL1", &out_nL1, "nL1/I");
     // Quantities for reference jets (GenJet, etc):
     float out_ptRef(-1.), out_etaRef(99.), out_phiRef(99.);
     int out_nRef(-1);
     outTree.Branch("ptRef", &out_ptRef, "ptRef/F");
     outTree.Branch("etaRef", &out_etaRef, "etaRef/F");
     outTree.Branch("phiRef", &out_phiRef, "phiRef/F");
-    outTree.Branch("nRef", &out_nRef, "nRef/I");
+    evtTree->Branch("nRef", &out_nRef, "nRef/I");
     // Cleaning vars
     float out_chef(-1.), out_nhef(-1.), out_pef(-1.), out_eef(-1.), out_mef(-1.), out_hfhef(-1.), out_hfemef(-1.);
     short out_chMult(-1), out_nhMult(-1), out_phMult(-1), out_elMult(-1), out_muMult(-1), out_hfhMult(-1), out_hfemMult(-1);
@@ -148,36 +166,53 @@ int main(int argc, char* argv[]) {
     outTree.Branch("dphi", &out_dphi, "dphi/F");
     outTree.Branch("resL1", &out_resL1, "resL1/F"); // resolution = L1 - Ref / L1
     outTree.Branch("resRef", &out_resRef, "resRef/F"); // resolution = L1 - Ref / Ref
-    outTree.Branch("nMatches", &out_nMatches, "nMatches/Int_t");
+    evtTree->Branch("nMatches", &out_nMatches, "nMatches/Int_t");
 
     // PU quantities
     float out_trueNumInteractions(-1.), out_numPUVertices(-1.);
     int out_recoNVtx(0);
-    outTree.Branch("trueNumInteractions", &out_trueNumInteractions, "trueNumInteractions/Float_t");
-    outTree.Branch("numPUVertices", &out_numPUVertices, "numPUVertices/Float_t");
-    outTree.Branch("recoNVtx", &out_recoNVtx, "recoNVtx/Int_t");
+    evtTree->Branch("trueNumInteractions", &out_trueNumInteractions, "trueNumInteractions/Float_t");
+    evtTree->Branch("numPUVertices", &out_numPUVertices, "numPUVertices/Float_t");
+    evtTree->Branch("recoNVtx", &out_recoNVtx, "recoNVtx/Int_t");
 
     // Event info
     ULong64_t out_event(0);
-    outTree.Branch("event", &out_event, "event/l");
+    evtTree->Branch("event", &out_event, "event/l");
 
     // L1 sums
     int out_nL1JetsSum(0);
     float out_httL1(0.);
     float out_mhtL1(0.), out_mhtPhiL1(0.);
-    outTree.Branch("nL1JetsSum", &out_nL1JetsSum);
-    outTree.Branch("httL1", &out_httL1);
-    outTree.Branch("mhtL1", &out_mhtL1);
-    outTree.Branch("mhtPhiL1", &out_mhtPhiL1);
+    evtTree->Branch("nL1JetsSum", &out_nL1JetsSum);
+    evtTree->Branch("httL1", &out_httL1);
+    evtTree->Branch("mhtL1", &out_mhtL1);
+    evtTree->Branch("mhtPhiL1", &out_mhtPhiL1);
 
     // Reference jet Sums
     int out_nRefJetsSum(0);
     float out_httRef(0.);
     float out_mhtRef(0.), out_mhtPhiRef(0.);
-    outTree.Branch("nRefJetsSum", &out_nRefJetsSum);
-    outTree.Branch("httRef", &out_httRef);
-    outTree.Branch("mhtRef", &out_mhtRef);
-    outTree.Branch("mhtPhiRef", &out_mhtPhiRef);
+    evtTree->Branch("nRefJetsSum", &out_nRefJetsSum);
+    evtTree->Branch("httRef", &out_httRef);
+    evtTree->Branch("mhtRef", &out_mhtRef);
+    evtTree->Branch("mhtPhiRef", &out_mhtPhiRef);
+
+    // Output trees for the other configs: same branches, filled from same variables
+    std::vector<TTree*> outTrees = {&outTree};
+    std::vector<TTree*> evtTrees = {evtTree};
+    for (unsigned iCfg = 1; iCfg < configs.size(); ++iCfg) {
+        outFiles[iCfg]->cd();
+        outTrees.push_back(outTree.CloneTree(0));
+        evtTrees.push_back(opts.normalisedOutput() ? evtTree->CloneTree(0) : outTrees.back());
+    }
+
+    // Histograms for runCalibration.py, filled alongside (or instead of) the pairs
+    std::vector<std::unique_ptr<CalibSummary>> summaries;
+    if (opts.writeSummary()) {
+        for (unsigned iCfg = 0; iCfg < configs.size(); ++iCfg) {
+            summaries.emplace_back(new CalibSummary(opts.summaryEtaBins(), opts.summaryPUBins()));
+        }
+    }
 
     Long64_t nEntriesRef = refJetTree.getEntries();
     Long64_t nEntriesL1  = l1JetTree.getEntries();
@@ -189,38 +224,71 @@ int main(int argc, char* argv[]) {
         cout << "Running over " << nEntries << " events." << endl;
     }
 
-    ///////////////////////
-    // SETUP JET MATCHER //
-    ///////////////////////
-    double maxDeltaR(opts.deltaR()), minRefJetPt(opts.refJetMinPt()), maxRefJetPt(5000.);
-    double minL1JetPt(opts.l1JetMinPt()), maxL1JetPt(5000.), maxJetEta(5);
-    std::unique_ptr<Matcher> matcher(new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta));
-    std::cout << *matcher << std::endl;
+    ////////////////////////
+    // SETUP JET MATCHERS //
+    ////////////////////////
+    double maxRefJetPt(5000.), maxL1JetPt(5000.), maxJetEta(5);
+    std::vector<std::unique_ptr<Matcher>> matchers;
+    for (const auto & config: configs) {
+        matchers.emplace_back(makeMatcher(config.matcher, config.deltaR, config.refMinPt, maxRefJetPt, config.l1MinPt, maxL1JetPt, maxJetEta));
+        std::cout << config.output << ": " << *matchers.back() << std::endl;
+    }
 
     ///////////////////////
     // JET CLEANING CUTS //
     ///////////////////////
-    bool doCleaningCuts = opts.cleanJets() != "";
-    if (doCleaningCuts) {
-        cout << "Applying " << opts.cleanJets() << " jet cleaning cuts" << endl;
+    // Reference jets for each cleaning level used by the configs ("" = no cleaning),
+    // so each level is only made once per event
+    std::map<std::string, JetCollection> refJetsByCleaning;
+    std::map<std::string, JetIDQuality> jetIDByCleaning;
+    for (const auto & config: configs) {
+        if (config.cleanJets != "" && !refJetsByCleaning.count(config.cleanJets)) {
+            cout << "Applying " << config.cleanJets << " jet cleaning cuts" << endl;
+            jetIDByCleaning[config.cleanJets] = parseJetIDQuality(config.cleanJets);
+        }
+        refJetsByCleaning[config.cleanJets];
     }
+    std::vector<char> jetIDMask;
+    // to look up the reco jet for each matched pair
+    RecoJetIndexMap refJetIndex;
 
     //////////////////////
     // LOOP OVER EVENTS //
     //////////////////////
+    // jet collections, re-used each event to avoid reallocating
+    JetCollection l1Jets, httRefJets, httL1Jets;
+    // throughput & I/O measurements
+    MatcherTelemetry telemetry;
+    unsigned iRefTree = telemetry.addInputTree("ref", refJetTree.getTChain());
+    unsigned iL1Tree = telemetry.addInputTree("l1", l1JetTree.getTChain());
+    unsigned iEventTree = telemetry.addInputTree("event", eventTree.getTChain());
+    unsigned iVtxTree = telemetry.addInputTree("vertex", recoVtxTree.getTChain());
     // produce matching pairs and store
-    Long64_t matchedEvent(0);
+    std::vector<Long64_t> matchedEvent(configs.size(), 0);
     Long64_t counter(0);
     for (Long64_t iEntry = 0; counter < nEntries; ++iEntry, ++counter) {
 
-        if (counter % 10000 == 0) {
+        if (opts.reportInterval() > 0 && counter % opts.reportInterval() == 0) {
             cout << "Entry: " << iEntry << " at " << getCurrentTime() << endl;
+            if (counter > 0) telemetry.printReport(cout);
         }
 
         // Make sure to add any other Trees here!
-        if (refJetTree.getEntry(iEntry) < 1 || l1JetTree.getEntry(iEntry) < 1 ||
-            eventTree.getEntry(iEntry) < 1 || recoVtxTree.getEntry(iEntry) < 1)
+        Long64_t refBytes(0), l1Bytes(0), eventBytes(0), vtxBytes(0);
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kRead);
+            refBytes = refJetTree.getEntry(iEntry);
+            l1Bytes = l1JetTree.getEntry(iEntry);
+            eventBytes = eventTree.getEntry(iEntry);
+            vtxBytes = recoVtxTree.getEntry(iEntry);
+        }
+        if (refBytes < 1 || l1Bytes < 1 || eventBytes < 1 || vtxBytes < 1)
             break;
+        telemetry.addEvent();
+        telemetry.addBytesRead(iRefTree, refBytes);
+        telemetry.addBytesRead(iL1Tree, l1Bytes);
+        telemetry.addBytesRead(iEventTree, eventBytes);
+        telemetry.addBytesRead(iVtxTree, vtxBytes);
 
         ////////////////////////
         // Generic event info //
@@ -237,91 +305,144 @@ int main(int argc, char* argv[]) {
         /////////////////////////////////////////////
         // Get vectors of ref & L1 jets from trees //
         /////////////////////////////////////////////
-        std::vector<TLorentzVector> refJets;
-        if (doCleaningCuts) {
-            refJets = makeRecoTLorentzVectorsCleaned(*refData, opts.cleanJets()); // with JetID filters
-        } else {
-            refJets = makeTLorentzVectors(refData->et, refData->eta, refData->phi);
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kMatch);
+            for (auto & refItr: refJetsByCleaning) {
+                if (refItr.first != "") {
+                    makeJetIDMask(*refData, jetIDByCleaning.at(refItr.first), jetIDMask); // with JetID filters
+                    fillRecoJetsCleaned(*refData, jetIDMask, refItr.second);
+                } else {
+                    refItr.second.fill(refData->et, refData->eta, refData->phi);
+                }
+            }
+            l1Jets.fill(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi, l1Data->jetBx);
+            refJetIndex.fill(*refData);
         }
-        std::vector<TLorentzVector> l1Jets  = makeTLorentzVectors(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi, l1Data->jetBx);
 
         out_nL1 = l1Jets.size();
-        out_nRef = refJets.size();
-
-        if (out_nL1 == 0 || out_nRef == 0) continue;
+        if (out_nL1 == 0) continue;
 
         ////////////////
         // Store sums //
         ////////////////
-        // L1 sums
-        std::vector<TLorentzVector> httL1Jets = getJetsForHTT(l1Jets);
-        out_nL1JetsSum = httL1Jets.size();
-        out_httL1 = l1Data->sumEt[2];
-        out_mhtL1 = l1Data->sumEt[3];
-        out_mhtPhiL1 = l1Data->sumPhi[3];
-
-        // Ref jet sums
-        std::vector<TLorentzVector> httRefJets = getJetsForHTT(refJets);
-        out_nRefJetsSum = httRefJets.size();
-        out_httRef = scalarSumPt(httRefJets);
-        TLorentzVector mhtVecRef = vectorSum(httRefJets);
-        out_mhtRef = mhtVecRef.Pt();
-        out_mhtPhiRef = mhtVecRef.Phi();
-
-        ///////////////////////////////////////
-        // Pass jets to matcher, do matching //
-        ///////////////////////////////////////
-        matcher->setRefJets(refJets);
-        matcher->setL1Jets(l1Jets);
-        std::vector<MatchedPair> matchResults = matcher->getMatchingPairs();
-
-        if (matchResults.size()>0) matchedEvent++;
-
-        //////////////////////////////////////////
-        // store L1 & ref jet variables in tree //
-        //////////////////////////////////////////
-        out_nMatches = matchResults.size();
-        for (const auto &it: matchResults) {
-            // std::cout << it << std::endl;
-            out_pt = it.l1Jet().Et();
-            out_eta = it.l1Jet().Eta();
-            out_phi = it.l1Jet().Phi();
-            out_rsp = it.l1Jet().Et()/it.refJet().Et();
-            out_rsp_inv =  it.refJet().Et()/it.l1Jet().Et();
-            out_dr = it.refJet().DeltaR(it.l1Jet());
-            out_deta = it.refJet().Eta() - it.l1Jet().Eta();
-            out_dphi = it.refJet().DeltaPhi(it.l1Jet());
-            out_ptRef = it.refJet().Pt();
-            out_etaRef = it.refJet().Eta();
-            out_phiRef = it.refJet().Phi();
-            out_ptDiff = it.l1Jet().Et() - it.refJet().Et();
-            out_resL1 = out_ptDiff/it.l1Jet().Et();
-            out_resRef = out_ptDiff/it.refJet().Et();
-
-            int rInd = findRecoJetIndex(out_ptRef, out_etaRef, out_phiRef, *refData);
-            if (rInd < 0) throw std::range_error("No RecoJet");
-            out_chef = refData->chef[rInd];
-            out_nhef = refData->nhef[rInd];
-            out_pef = refData->pef[rInd];
-            out_eef = refData->eef[rInd];
-            out_mef = refData->mef[rInd];
-            out_hfhef = refData->hfhef[rInd];
-            out_hfemef = refData->hfemef[rInd];
-            out_chMult = refData->chMult[rInd];
-            out_nhMult = refData->nhMult[rInd];
-            out_phMult = refData->phMult[rInd];
-            out_elMult = refData->elMult[rInd];
-            out_muMult = refData->muMult[rInd];
-            out_hfhMult = refData->hfhMult[rInd];
-            out_hfemMult = refData->hfemMult[rInd];
-            outTree.Fill();
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kSums);
+            // L1 sums
+            getJetsForHTT(l1Jets, httL1Jets);
+            out_nL1JetsSum = httL1Jets.size();
+            out_httL1 = l1Data->sumEt[2];
+            out_mhtL1 = l1Data->sumEt[3];
+            out_mhtPhiL1 = l1Data->sumPhi[3];
         }
 
+        for (unsigned iCfg = 0; iCfg < configs.size(); ++iCfg) {
+            const JetCollection & refJets = refJetsByCleaning[configs[iCfg].cleanJets];
+            out_nRef = refJets.size();
+
+            if (out_nRef == 0) continue;
+
+            {
+                MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kSums);
+                // Ref jet sums
+                getJetsForHTT(refJets, httRefJets);
+                out_nRefJetsSum = httRefJets.size();
+                out_httRef = scalarSumPt(httRefJets);
+                TLorentzVector mhtVecRef = vectorSum(httRefJets);
+                out_mhtRef = mhtVecRef.Pt();
+                out_mhtPhiRef = mhtVecRef.Phi();
+            }
+
+            ///////////////////////////////////////
+            // Pass jets to matcher, do matching //
+            ///////////////////////////////////////
+            std::vector<MatchedPair> matchResults;
+            {
+                MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kMatch);
+                matchers[iCfg]->setRefJets(refJets);
+                matchers[iCfg]->setL1Jets(l1Jets);
+                matchResults = matchers[iCfg]->getMatchingPairs();
+            }
+            if (iCfg == 0) telemetry.addPairs(matchResults.size());
+
+            if (matchResults.size()>0) matchedEvent[iCfg]++;
+
+            //////////////////////////////////////////
+            // store L1 & ref jet variables in tree //
+            //////////////////////////////////////////
+            {
+                MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kFill);
+                out_nMatches = matchResults.size();
+                if (opts.normalisedOutput() && !opts.summaryOnly() && out_nMatches > 0) {
+                    out_iEvent = evtTrees[iCfg]->GetEntries();
+                    evtTrees[iCfg]->Fill();
+                }
+                for (const auto &it: matchResults) {
+                    // std::cout << it << std::endl;
+                    out_pt = it.l1Jet().Et();
+                    out_eta = it.l1Jet().Eta();
+                    out_phi = it.l1Jet().Phi();
+                    out_rsp = it.l1Jet().Et()/it.refJet().Et();
+                    out_rsp_inv =  it.refJet().Et()/it.l1Jet().Et();
+                    out_dr = it.refJet().DeltaR(it.l1Jet());
+                    out_deta = it.refJet().Eta() - it.l1Jet().Eta();
+                    out_dphi = it.refJet().DeltaPhi(it.l1Jet());
+                    out_ptRef = it.refJet().Pt();
+                    out_etaRef = it.refJet().Eta();
+                    out_phiRef = it.refJet().Phi();
+                    out_ptDiff = it.l1Jet().Et() - it.refJet().Et();
+                    out_resL1 = out_ptDiff/it.l1Jet().Et();
+                    out_resRef = out_ptDiff/it.refJet().Et();
+
+                    int rInd = refJetIndex.find(out_etaRef, out_phiRef);
+                    if (rInd < 0) throw std::range_error("No RecoJet");
+                    out_chef = refData->chef[rInd];
+                    out_nhef = refData->nhef[rInd];
+                    out_pef = refData->pef[rInd];
+                    out_eef = refData->eef[rInd];
+                    out_mef = refData->mef[rInd];
+                    out_hfhef = refData->hfhef[rInd];
+                    out_hfemef = refData->hfemef[rInd];
+                    out_chMult = refData->chMult[rInd];
+                    out_nhMult = refData->nhMult[rInd];
+                    out_phMult = refData->phMult[rInd];
+                    out_elMult = refData->elMult[rInd];
+                    out_muMult = refData->muMult[rInd];
+                    out_hfhMult = refData->hfhMult[rInd];
+                    out_hfemMult = refData->hfemMult[rInd];
+                    if (!opts.summaryOnly()) {
+                        outTrees[iCfg]->Fill();
+                    }
+                    if (opts.writeSummary()) {
+                        summaries[iCfg]->fill(out_eta, out_pt, out_ptRef, out_numPUVertices);
+                    }
+                }
+            }
+        } // end of loop over configs
+
     }
 
-    // save tree to new file and cleanup
-    outTree.Write("", TObject::kOverwrite);
-    outFile->Close();
-    cout << matchedEvent << " events had 1+ matches, out of " << nEntries << endl;
+    // save trees to new files and cleanup
+    {
+        MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kWrite);
+        for (unsigned iCfg = 0; iCfg < configs.size(); ++iCfg) {
+            outFiles[iCfg]->cd();
+            outTrees[iCfg]->Write("", TObject::kOverwrite);
+            if (opts.normalisedOutput()) {
+                // index so the events tree can be used as a friend of the pairs tree
+                evtTrees[iCfg]->BuildIndex("iEvent");
+                evtTrees[iCfg]->Write("", TObject::kOverwrite);
+            }
+            outFiles[iCfg]->Close();
+            if (opts.writeSummary()) {
+                summaries[iCfg]->write(CalibSummary::summaryFilename(configs[iCfg].output));
+            }
+            cout << configs[iCfg].output << ": " << matchedEvent[iCfg] << " events had 1+ matches, out of " << nEntries << endl;
+        }
+    }
+
+    if (opts.reportInterval() > 0) telemetry.printReport(cout);
+    if (opts.writeTelemetry()) {
+        telemetry.writeSummary(MatcherTelemetry::summaryFilename(configs[0].output));
+    }
     return 0;
 }
@@ -0,0 +1,264 @@
+"""
+Render a batch of plots in parallel, skipping any that are already up to date.
+
+Each plot is described by a PlotTask: the plotting function, plus the
+arguments to call it with. ROOT objects can't be passed between processes,
+so any ROOT inputs are given as InputRef objects (a filename, and optionally
+the name of an object in that file), which each worker opens for itself.
+Every worker is a separate process with its own ROOT instance, and keeps its
+input files open between tasks.
+
+A cache file in the output directory stores a hash for each task, made from:
+the input files (size & modification time), the task arguments, the source
+code of the plotting function's module and of any modules in this directory
+that it uses (e.g. common_utils), and a dict of style parameters (title, etc).
+If none of those have changed since the last run, and the plot files it
+returned still exist, then the task is skipped and its previous result reused.
+Changes to code outside this directory (e.g. ROOT itself) aren't spotted,
+so remake the plots with force=True (--force in showoffPlots.py) after
+updating those.
+
+Usage:
+
+tasks = [PlotTask(plot_dR, InputRef("pairs.root", "valid"), oDir="plots")]
+results = render_tasks(tasks, n_jobs=4, cache_filename="plots/.plot_cache.json")
+"""
+
+
+import ROOT
+import os
+import json
+import hashlib
+import inspect
+import traceback
+from multiprocessing import Pool
+import common_utils as cu
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(True)
+
+
+class InputRef(object):
+    """Stand-in for a ROOT file, or an object in it, that is opened by the worker."""
+
+    def __init__(self, filename, obj_name=None):
+        self.filename = cu.cleanup_filepath(filename)
+        self.obj_name = obj_name
+
+    def __repr__(self):
+        if self.obj_name:
+            return "InputRef(%s:%s)" % (self.filename, self.obj_name)
+        return "InputRef(%s)" % self.filename
+
+    def fingerprint(self):
+        """Describe the current state of the input file, to spot if it has changed."""
+        stat = os.stat(self.filename)
+        return [self.filename, self.obj_name, stat.st_size, stat.st_mtime]
+
+
+class PlotTask(object):
+    """Store a plotting function & the arguments to call it with."""
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def key(self):
+        """Unique name for this task, used to identify it in the cache."""
+        arg_strs = [_arg_str(a) for a in self.args]
+        arg_strs.extend(["%s=%s" % (k, _arg_str(v)) for k, v in sorted(self.kwargs.items())])
+        return "%s(%s)" % (self.func.__name__, ", ".join(arg_strs))
+
+    def digest(self, style=None):
+        """Hash of everything that determines the plot output."""
+        h = hashlib.md5()
+        h.update(self.key())
+        h.update(json.dumps(style, sort_keys=True))
+        source_files = set(_source_files(self.func))
+        for arg in list(self.args) + self.kwargs.values():
+            if isinstance(arg, InputRef):
+                h.update(json.dumps(arg.fingerprint()))
+            elif callable(arg):
+                # e.g. the function used to make each frame of an animation
+                source_files.update(_source_files(arg))
+        for filename in sorted(source_files):
+            h.update(_file_md5(filename))
+        return h.hexdigest()
+
+
+def _source_files(func):
+    """Get the source files with code that func may call.
+
+    This is the module that defines func, plus any modules in the same
+    directory that it uses, either directly (e.g. cu.get_xy) or by importing
+    names from them.
+    """
+    own_file = os.path.abspath(inspect.getsourcefile(func))
+    own_dir = os.path.dirname(own_file)
+    files = [own_file]
+    for obj in getattr(func, '__globals__', {}).values():
+        if not (inspect.ismodule(obj) or inspect.isfunction(obj) or inspect.isclass(obj)):
+            continue
+        try:
+            filename = inspect.getsourcefile(obj)
+        except TypeError:
+            # builtin module or class, no python source
+            continue
+        if filename and os.path.dirname(os.path.abspath(filename)) == own_dir:
+            files.append(os.path.abspath(filename))
+    return files
+
+
+# md5 of source files, so each file is only read once per process
+_file_digests = {}
+
+
+def _file_md5(filename):
+    """Get the md5 hex digest of a file's contents."""
+    if filename not in _file_digests:
+        with open(filename, 'rb') as f:
+            _file_digests[filename] = hashlib.md5(f.read()).hexdigest()
+    return _file_digests[filename]
+
+
+def _arg_str(arg):
+    """String representation of a task argument that is the same across runs."""
+    if callable(arg) and hasattr(arg, '__name__'):
+        return arg.__name__
+    return repr(arg)
+
+
+# Input files opened by this process, so tasks in the same worker can share them
+_open_files = {}
+
+
+def _resolve(arg):
+    """Turn an InputRef into the actual ROOT object. Other args are untouched."""
+    if not isinstance(arg, InputRef):
+        return arg
+    if arg.filename not in _open_files:
+        _open_files[arg.filename] = cu.open_root_file(arg.filename)
+    tfile = _open_files[arg.filename]
+    if arg.obj_name:
+        return cu.get_from_file(tfile, arg.obj_name)
+    return tfile
+
+
+def close_inputs():
+    """Close all input files opened by this process."""
+    for tfile in _open_files.values():
+        tfile.Close()
+    _open_files.clear()
+
+
+def _run_task(task):
+    """Execute one task. Returns (key, result, error message)."""
+    try:
+        args = [_resolve(a) for a in task.args]
+        kwargs = {k: _resolve(v) for k, v in task.kwargs.items()}
+        return task.key(), task.func(*args, **kwargs), None
+    except Exception:
+        return task.key(), None, traceback.format_exc()
+
+
+def _outputs_exist(result):
+    """Check that the plot file(s) returned by a plotting function still exist.
+
+    Plotting functions that return nothing can't be checked, so are assumed ok.
+    """
+    if isinstance(result, basestring):
+        return os.path.isfile(result)
+    if isinstance(result, (list, dict)):
+        values = result.values() if isinstance(result, dict) else result
+        return all(_outputs_exist(r) for r in values)
+    return True
+
+
+def load_cache(cache_filename):
+    """Get dict of task key : {digest, result} from a cache file."""
+    if not cache_filename or not os.path.isfile(cache_filename):
+        return {}
+    try:
+        with open(cache_filename) as f:
+            return json.load(f)
+    except ValueError:
+        print "Warning: cannot read plot cache %s, ignoring it" % cache_filename
+        return {}
+
+
+def save_cache(cache, cache_filename):
+    """Write task cache to file."""
+    if not cache_filename:
+        return
+    with open(cache_filename, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+
+def render_tasks(tasks, n_jobs=1, cache_filename=None, style=None, force=False):
+    """Run all tasks, in parallel if n_jobs > 1, skipping any that are up to date.
+
+    Parameters
+    ----------
+    tasks : list[PlotTask]
+        Tasks to render. Duplicate tasks are only rendered once.
+    n_jobs : int, optional
+        Number of worker processes. If 1, everything is run in this process.
+    cache_filename : str, optional
+        JSON file to store task hashes & results in. If None, no caching is done.
+    style : dict, optional
+        Any global parameters that change how plots look, e.g. title.
+        Changing any of these re-renders all plots.
+    force : bool, optional
+        If True, ignore the cache and re-render everything.
+
+    Returns
+    -------
+    list
+        Return value of the plotting function for each task, in the same order
+        as tasks. Failed tasks have a None result.
+    """
+    cache = load_cache(cache_filename)
+    digests = {}
+    todo = []
+    for task in tasks:
+        key = task.key()
+        if key in digests:
+            continue
+        digests[key] = task.digest(style)
+        entry = cache.get(key)
+        if (not force and entry and entry['digest'] == digests[key]
+                and _outputs_exist(entry['result'])):
+            continue
+        todo.append(task)
+
+    print "Rendering %d plot tasks, %d up to date" % (len(todo), len(digests) - len(todo))
+
+    if n_jobs > 1 and len(todo) > 1:
+        pool = Pool(processes=n_jobs)
+        outputs = pool.imap_unordered(_run_task, todo)
+    else:
+        pool = None
+        outputs = (_run_task(t) for t in todo)
+
+    n_failed = 0
+    for key, result, err in outputs:
+        if err:
+            n_failed += 1
+            print "! Plot task %s failed:\n%s" % (key, err)
+            cache.pop(key, None)
+        else:
+            cache[key] = {'digest': digests[key], 'result': result}
+
+    if pool:
+        pool.close()
+        pool.join()
+    else:
+        close_inputs()
+
+    if n_failed:
+        print "! %d plot tasks failed" % n_failed
+
+    save_cache(cache, cache_filename)
+    return [cache[t.key()]['result'] if t.key() in cache else None for t in tasks]
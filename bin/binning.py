@@ -8,6 +8,7 @@ For future, may need to split up into GCT/Stage1 Vs Stage 2...
 import ROOT
 import numpy as np
 from itertools import tee, izip
+from collections import OrderedDict
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -64,6 +65,18 @@ pt_bins_8_wide.append(250)
 # check_pt_bins = [[0, 20], [20, 40], [40, 60], [60, 80], [80, 120], [120, 200], [200, 300], [300, 500], [500, 1000]]
 check_pt_bins = [[0, 20], [20, 30], [30, 40], [40, 50], [50, 60], [60, 80], [80, 100], [100, 300], [300, 500], [500, 1000]]  # for HTT studies, focussing on low pt
 
+# All the pt bin setups above by name, for binning studies
+pt_bin_schemes = OrderedDict([
+    ("pt_bins", pt_bins),
+    ("pt_bins_wide", pt_bins_wide),
+    ("pt_bins_stage2_old", pt_bins_stage2_old),
+    ("pt_bins_stage2", pt_bins_stage2),
+    ("pt_bins_stage2_hf", pt_bins_stage2_hf),
+    ("pt_bins_8", pt_bins_8),
+    ("pt_bins_8_wide", pt_bins_8_wide),
+    ("check_pt_bins", [lo for lo, hi in check_pt_bins] + [check_pt_bins[-1][1]]),
+])
+
 ############
 # ETA BINS
 ############
@@ -186,6 +199,26 @@ eta_bins_label = "_etaBinsSel16"
 
 
 
+# All the |eta| bin setups above by label, so binning studies can compare them
+# without editing this file (e.g. with makeResponseCube.py)
+eta_bin_schemes = OrderedDict([
+    ("_etaBinsOriginal", [0.0, 0.348, 0.695, 1.044, 1.392, 1.74, 2.172, 3.0, 3.5, 4.0, 4.5, 5]),
+    ("_etaBinsVersion2", [0.000, 0.175, 0.350, 0.525, 0.700, 0.875, 1.050, 1.225, 1.400, 1.575, 1.750, 1.925,
+                          2.100, 2.500, 3.000, 3.500, 3.900, 4.100, 4.500, 5.000]),
+    ("_etaBinsVersion3", [0.000, 0.174, 0.348, 0.552, 0.696, 0.870, 1.044, 1.218, 1.305, 1.392, 1.479, 1.566,
+                          1.653, 1.740, 1.830, 1.930, 2.043, 2.172, 2.322, 2.500, 2.650, 2.964, 3.139, 3.314,
+                          3.489, 3.664, 3.839, 4.013, 4.191, 4.363, 4.538, 4.716, 4.889, 5.191]),
+    ("_etaBinsVersion4", [0.000, 0.174, 0.348, 0.552, 0.696, 0.870, 1.044, 1.218, 1.305, 1.392, 1.479, 1.566,
+                          1.653, 1.740, 1.830, 1.930, 2.043, 2.172, 2.322, 2.500, 2.650, 3.139, 3.314, 3.489,
+                          3.664, 3.839, 4.013, 4.191, 4.363, 4.538]),
+    ("_etaBinsAllTT", [0.000, 0.087, 0.174, 0.261, 0.348, 0.435, 0.522, 0.609, 0.696, 0.783, 0.870, 0.957,
+                       1.044, 1.131, 1.218, 1.305, 1.392, 1.479, 1.566, 1.653, 1.740, 1.830, 1.930, 2.043,
+                       2.172, 2.322, 2.500, 2.650, 2.964, 3.139, 3.314, 3.489, 3.664, 3.839, 4.013, 4.191,
+                       4.363, 4.538, 4.716, 4.889, 5.191]),
+    ("_etaBinsSel16", [0.000, 0.435, 0.783, 1.131, 1.305, 1.479, 1.653, 1.830, 1.930,
+                       2.043, 2.172, 2.322, 2.500, 2.964, 3.489, 4.191, 5.191]),
+])
+
 eta_bins_central = [eta for eta in eta_bins if eta < 3.1]
 eta_bins_forward = [eta for eta in eta_bins if eta > 2.9]
 # a handy palette of colours. TODO: add more colours as we now have more bins
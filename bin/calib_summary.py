@@ -0,0 +1,105 @@
+"""
+Read the calibration summary histograms made by the matcher with --summary
+(see interface/CalibSummary.h).
+
+These are the histograms make_correction_curves() in runCalibration.py would
+otherwise make from the pairs, filled in the matcher event loop instead, so
+runCalibration.py only has to read a small file.
+
+Like the pairs, a summary can be a single file, a glob pattern, or a manifest
+of files (see pairs_dataset.py): the histograms from each file are added.
+
+Usage:
+
+summary = CalibSummary("pairs_summary.root")
+hists = summary.get_hists(0, 0.435, pu_min=-100, pu_max=1200)
+"""
+
+
+import ROOT
+from array import array
+import common_utils as cu
+from pairs_dataset import get_shard_filenames
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+
+
+SUMMARY_SUFFIX = "_summary.root"
+
+# TDirectory with hists for all PU
+ALL_PU_DIR = "PU_all"
+
+# Any PU range that covers this is treated as no PU cut
+NO_PU_CUT_RANGE = (0, 999)
+
+
+def generate_summary_filename(pairs_filename):
+    """Get summary filename made by the matcher for a pairs file,
+    e.g. pairs.root -> pairs_summary.root"""
+    stem = pairs_filename[:-len(".root")] if pairs_filename.endswith(".root") else pairs_filename
+    return stem + SUMMARY_SUFFIX
+
+
+def get_pu_dir_name(pu_min, pu_max):
+    return "PU_%g_%g" % (pu_min, pu_max)
+
+
+def get_hist_names(absetamin, absetamax):
+    """Get names of hists stored for each eta bin"""
+    return ["hrsp_eta_%g_%g" % (absetamin, absetamax), "h2d_rsp_gen", "hprof_pt_gen", "hprof_ptref_gen"]
+
+
+def rebin_profile(hprof, bin_edges, new_name):
+    """Rebin a TProfile to the given bin edges, which must line up with its
+    bin edges. Each bin then has the mean (& error on mean) for that range."""
+    return hprof.Rebin(len(bin_edges) - 1, new_name, array('d', bin_edges))
+
+
+class CalibSummary(object):
+    """Calibration summary hists, summed over one or more summary files.
+
+    Parameters
+    ----------
+    dataset : str
+        Summary filename, glob pattern, or manifest filename
+    """
+
+    def __init__(self, dataset):
+        self.name = dataset
+        self.filenames = get_shard_filenames(dataset)
+        print "Summary %s has %d file(s)" % (dataset, len(self.filenames))
+
+    def get_dir_name(self, tfile, absetamin, absetamax, pu_min, pu_max):
+        pu_dir = get_pu_dir_name(pu_min, pu_max)
+        if not cu.exists_in_file(tfile, pu_dir):
+            if pu_min <= NO_PU_CUT_RANGE[0] and pu_max >= NO_PU_CUT_RANGE[1]:
+                pu_dir = ALL_PU_DIR
+            else:
+                raise KeyError("No hists for PU range %g - %g in %s, " \
+                               "use --summaryPUBins in the matcher" % (pu_min, pu_max, tfile.GetName()))
+        return "%s/eta_%g_%g" % (pu_dir, absetamin, absetamax)
+
+    def get_hists(self, absetamin, absetamax, pu_min, pu_max):
+        """Get summed hists for one eta bin & PU range.
+
+        Returns
+        -------
+        dict
+            {hist name: ROOT.TH1}, hists not attached to any directory
+        """
+        hists = {}
+        for filename in self.filenames:
+            tfile = cu.open_root_file(filename)
+            dir_name = self.get_dir_name(tfile, absetamin, absetamax, pu_min, pu_max)
+            if not cu.exists_in_file(tfile, dir_name):
+                raise KeyError("No hists for eta bin %g - %g in %s" % (absetamin, absetamax, filename))
+            for name in get_hist_names(absetamin, absetamax):
+                hist = cu.get_from_file(tfile, "%s/%s" % (dir_name, name))
+                if name in hists:
+                    hists[name].Add(hist)
+                else:
+                    hists[name] = hist.Clone(name)
+                    hists[name].SetDirectory(0)
+            tfile.Close()
+        return hists
@@ -4,6 +4,9 @@ This script takes as input the output file from RunMatcher, and loops over
 matched genjet/L1 jet pairs, producing some plots that show off how
 calibrated (or uncalibrated) the jets are.
 
+The input can also be a glob pattern or manifest of pairs files, which are
+used without hadd-ing them (see pairs_dataset.py).
+
 Usage: see
 python checkCalibration.py -h
 
@@ -18,6 +21,8 @@ import argparse
 import binning
 from binning import pairwise
 import common_utils as cu
+from pairs_dataset import PairsDataset, DrawRequest
+from hist_booking import HistStore
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -27,7 +32,7 @@ ROOT.gStyle.SetOptFit(1111)
 ROOT.TH1.SetDefaultSumw2(True)
 
 
-def plot_checks(inputfile, outputfile, absetamin, absetamax, max_pt, pu_min, pu_max):
+def plot_checks(pairs, outputfile, absetamin, absetamax, max_pt, pu_min, pu_max):
     """
     Do all the relevant response 1D and 2D hists, for one eta bin.
 
@@ -37,9 +42,6 @@ def plot_checks(inputfile, outputfile, absetamin, absetamax, max_pt, pu_min, pu_
 
     print "Doing eta bin: %g - %g, max L1 jet pt: %g" % (absetamin, absetamax, max_pt)
 
-    # Input tree
-    tree_raw = inputfile.Get("valid")
-
     # Output folders
     output_f = outputfile.mkdir('eta_%g_%g' % (absetamin, absetamax))
     output_f_hists = output_f.mkdir("Histograms")
@@ -54,9 +56,24 @@ def plot_checks(inputfile, outputfile, absetamin, absetamax, max_pt, pu_min, pu_
     avoidSaturation_cut = "pt < 1023.1"
     cutStr = " && ".join([eta_cutStr, pt_cutStr, pu_cutStr, avoidSaturation_cut])
 
-    # Draw response (pT^L1/pT^Gen) for all pt bins
-    tree_raw.Draw("rsp>>hrsp_eta_%g_%g(100,0,5)" % (absetamin, absetamax), cutStr)
-    hrsp_eta = ROOT.gROOT.FindObject("hrsp_eta_%g_%g" % (absetamin, absetamax))
+    # nb_pt, pt_min, pt_max = 63, 0, 252  # for GCT/Stage 1
+    nb_pt, pt_min, pt_max = 512, 0, 1024  # for Stage 2
+    nb_rsp, rsp_min, rsp_max = 100, 0, 5
+
+    # Draw all the hists in one pass over the pairs:
+    # - response (pT^L1/pT^Gen) for all pt bins
+    # - rsp (pT^L1/pT^Gen) Vs GenJet pT
+    # - rsp (pT^L1/pT^Gen) Vs L1 pT
+    # - pT^Gen Vs pT^L1
+    store = HistStore()
+    eta_range = dict(absetamin=absetamin, absetamax=absetamax)
+    hrsp_eta, h2d_rsp_gen, h2d_rsp_l1, h2d_gen_l1 = map(store.adopt, pairs.draw_many([
+        DrawRequest("rsp>>hrsp_eta_%g_%g(100,0,5)" % (absetamin, absetamax), cutStr, **eta_range),
+        DrawRequest("rsp:ptRef>>h2d_rsp_gen(%d,%g,%g,%d,%g,%g)" % (nb_pt, pt_min, pt_max, nb_rsp, rsp_min, rsp_max), cutStr, **eta_range),
+        DrawRequest("rsp:pt>>h2d_rsp_l1(%d,%g,%g,%d,%g,%g)" % (nb_pt, pt_min, pt_max, nb_rsp, rsp_min, rsp_max), cutStr, **eta_range),
+        DrawRequest("pt:ptRef>>h2d_gen_l1(%d,%g,%g,%d,%g,%g)" % (nb_pt, pt_min, pt_max, nb_pt, pt_min, pt_max), cutStr, **eta_range)
+    ]))
+
     hrsp_eta.SetTitle(";response (p_{T}^{L1}/p_{T}^{Ref});")
     if absetamin < 2.9:
         fit_result = hrsp_eta.Fit("gaus", "QER", "",
@@ -70,38 +87,27 @@ def plot_checks(inputfile, outputfile, absetamin, absetamax, max_pt, pu_min, pu_
 
     # mean = hrsp_eta.GetFunction("gaus").GetParameter(1)
     # err = hrsp_eta.GetFunction("gaus").GetParError(1)
-    output_f_hists.WriteTObject(hrsp_eta)
-
-    # nb_pt, pt_min, pt_max = 63, 0, 252  # for GCT/Stage 1
-    nb_pt, pt_min, pt_max = 512, 0, 1024  # for Stage 2
-    nb_rsp, rsp_min, rsp_max = 100, 0, 5
+    store.write(output_f_hists, hrsp_eta, free=True)
 
-    # Draw rsp (pT^L1/pT^Gen) Vs GenJet pT
-    tree_raw.Draw("rsp:ptRef>>h2d_rsp_gen(%d,%g,%g,%d,%g,%g)" % (nb_pt, pt_min, pt_max, nb_rsp, rsp_min, rsp_max), cutStr)
-    h2d_rsp_gen = ROOT.gROOT.FindObject("h2d_rsp_gen")
     h2d_rsp_gen.SetTitle(";p_{T}^{Ref} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})")
     output_f_hists.WriteTObject(h2d_rsp_gen)
 
-    h2d_rsp_gen_norm = cu.norm_vertical_bins(h2d_rsp_gen)
-    output_f_hists.WriteTObject(h2d_rsp_gen_norm)
+    h2d_rsp_gen_norm = store.adopt(cu.norm_vertical_bins(h2d_rsp_gen))
+    store.write(output_f_hists, h2d_rsp_gen_norm, free=True)
+    store.free(h2d_rsp_gen)
 
-    # Draw rsp (pT^L1/pT^Gen) Vs L1 pT
-    tree_raw.Draw("rsp:pt>>h2d_rsp_l1(%d,%g,%g,%d,%g,%g)" % (nb_pt, pt_min, pt_max, nb_rsp, rsp_min, rsp_max), cutStr)
-    h2d_rsp_l1 = ROOT.gROOT.FindObject("h2d_rsp_l1")
     h2d_rsp_l1.SetTitle(";p_{T}^{L1} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})")
     output_f_hists.WriteTObject(h2d_rsp_l1)
 
-    h2d_rsp_l1_norm = cu.norm_vertical_bins(h2d_rsp_l1)
-    output_f_hists.WriteTObject(h2d_rsp_l1_norm)
+    h2d_rsp_l1_norm = store.adopt(cu.norm_vertical_bins(h2d_rsp_l1))
+    store.write(output_f_hists, h2d_rsp_l1_norm, free=True)
+    store.free(h2d_rsp_l1)
 
-    # Draw pT^Gen Vs pT^L1
-    tree_raw.Draw("pt:ptRef>>h2d_gen_l1(%d,%g,%g,%d,%g,%g)" % (nb_pt, pt_min, pt_max, nb_pt, pt_min, pt_max), cutStr)
-    h2d_gen_l1 = ROOT.gROOT.FindObject("h2d_gen_l1")
     h2d_gen_l1.SetTitle(";p_{T}^{Ref} [GeV];p_{T}^{L1} [GeV]")
-    output_f_hists.WriteTObject(h2d_gen_l1)
+    store.write(output_f_hists, h2d_gen_l1, free=True)
 
 
-def plot_rsp_eta(inputfile, outputfile, eta_bins, pt_min, pt_max, pt_var, pu_min, pu_max):
+def plot_rsp_eta(pairs, outputfile, eta_bins, pt_min, pt_max, pt_var, pu_min, pu_max):
     """Plot graph of response in bins of eta
 
     If the response hist for each bin exists already, then we use that.
@@ -113,20 +119,11 @@ def plot_rsp_eta(inputfile, outputfile, eta_bins, pt_min, pt_max, pt_var, pu_min
 
     gr_rsp_eta = ROOT.TGraphErrors()
 
-    # Input tree
-    tree_raw = inputfile.Get("valid")
-
     # Output folders
-    output_f = outputfile.GetDirectory('eta_%g_%g' % (eta_bins[0], eta_bins[-1]))
-    output_f_hists = None
-    if not output_f:
-        output_f = outputfile.mkdir('eta_%g_%g' % (eta_bins[0], eta_bins[-1]))
-        output_f_hists = output_f.mkdir("Histograms")
-    else:
-        output_f_hists = output_f.GetDirectory("Histograms")
+    output_f, output_f_hists = get_output_dirs(outputfile, 'eta_%g_%g' % (eta_bins[0], eta_bins[-1]))
 
-    # Go through eta bins, get response hist, fit with Gaussian and add to
-    # the overall graph
+    # Draw the response hists for all eta bins in one pass over the pairs
+    requests = []
     for i, eta in enumerate(eta_bins[:-1]):
         absetamin = eta
         absetamax = eta_bins[i + 1] # Eta cut string
@@ -142,8 +139,16 @@ def plot_rsp_eta(inputfile, outputfile, eta_bins, pt_min, pt_max, pt_var, pu_min
         nb_rsp = 100
         rsp_min, rsp_max = 0, 5
         rsp_name = 'hrsp_eta_%g_%g_%s_%g_%g' % (absetamin, absetamax, pt_var, pt_min, pt_max)
-        tree_raw.Draw("rsp>>%s(%d,%g,%g)" % (rsp_name, nb_rsp, rsp_min, rsp_max), cutStr)
-        h_rsp = ROOT.gROOT.FindObject(rsp_name)
+        ranges = dict(absetamin=absetamin, absetamax=absetamax)
+        if pt_var == "ptRef":
+            ranges.update(pt_ref_min=pt_min, pt_ref_max=pt_max)
+        requests.append(DrawRequest("rsp>>%s(%d,%g,%g)" % (rsp_name, nb_rsp, rsp_min, rsp_max), cutStr, **ranges))
+    store = HistStore()
+    h_rsps = map(store.adopt, pairs.draw_many(requests))
+
+    # Go through eta bins, get response hist, fit with Gaussian and add to
+    # the overall graph
+    for absetamin, absetamax, h_rsp in zip(eta_bins[:-1], eta_bins[1:], h_rsps):
         h_rsp.SetTitle(";response (p_{T}^{L1}/p_{T}^{Ref});")
 
         print 'Integral', h_rsp.Integral()
@@ -152,29 +157,9 @@ def plot_rsp_eta(inputfile, outputfile, eta_bins, pt_min, pt_max, pt_var, pu_min
             print "No entries - skipping"
             continue
 
-        # Fit with Gaussian
-        peak = h_rsp.GetBinCenter(h_rsp.GetMaximumBin())
-        if absetamin < 2.9:
-            fit_result = h_rsp.Fit("gaus", "QER", "",
-                                   h_rsp.GetMean() - h_rsp.GetRMS(),
-                                   h_rsp.GetMean() + h_rsp.GetRMS())
-        else:
-            fit_result = h_rsp.Fit("gaus", "QER", "",
-                                   peak - (0.5 * h_rsp.GetRMS()),
-                                   peak + (0.5 * h_rsp.GetRMS()))
-
-        mean = h_rsp.GetMean()
-        err = h_rsp.GetMeanError()
-
-        check_fit = True
-        if check_fit:
-            if int(fit_result) == 0:
-                mean = h_rsp.GetFunction("gaus").GetParameter(1)
-                err = h_rsp.GetFunction("gaus").GetParError(1)
-            else:
-                print "cannot fit with Gaussian - using raw mean instead"
+        mean, err = fit_rsp_eta_hist(h_rsp, absetamin)
 
-        output_f_hists.WriteTObject(h_rsp)
+        store.write(output_f_hists, h_rsp, free=True)
 
         # add to graph
         N = gr_rsp_eta.GetN()
@@ -185,6 +170,44 @@ def plot_rsp_eta(inputfile, outputfile, eta_bins, pt_min, pt_max, pt_var, pu_min
     gr_rsp_eta.SetTitle(";|#eta^{L1}|; <response> = <p_{T}^{L1}/p_{T}^{Ref}>")
     gr_rsp_eta.SetName("gr_rsp_eta_%g_%g_%s_%g_%g" % (eta_bins[0], eta_bins[-1], pt_var, pt_min, pt_max))
     output_f.WriteTObject(gr_rsp_eta)
+    store.free()
+
+
+def get_output_dirs(outputfile, dirname):
+    """Get output TDirectory, and its Histograms subdirectory, making them if necessary"""
+    output_f = outputfile.GetDirectory(dirname)
+    if not output_f:
+        output_f = outputfile.mkdir(dirname)
+        return output_f, output_f.mkdir("Histograms")
+    return output_f, output_f.GetDirectory("Histograms")
+
+
+def fit_rsp_eta_hist(h_rsp, absetamin):
+    """Fit response hist for one eta bin with a Gaussian.
+
+    Returns (mean, error) from the fit, or the raw mean if the fit fails.
+    """
+    peak = h_rsp.GetBinCenter(h_rsp.GetMaximumBin())
+    if absetamin < 2.9:
+        fit_result = h_rsp.Fit("gaus", "QER", "",
+                               h_rsp.GetMean() - h_rsp.GetRMS(),
+                               h_rsp.GetMean() + h_rsp.GetRMS())
+    else:
+        fit_result = h_rsp.Fit("gaus", "QER", "",
+                               peak - (0.5 * h_rsp.GetRMS()),
+                               peak + (0.5 * h_rsp.GetRMS()))
+
+    mean = h_rsp.GetMean()
+    err = h_rsp.GetMeanError()
+
+    check_fit = True
+    if check_fit:
+        if int(fit_result) == 0:
+            mean = h_rsp.GetFunction("gaus").GetParameter(1)
+            err = h_rsp.GetFunction("gaus").GetParError(1)
+        else:
+            print "cannot fit with Gaussian - using raw mean instead"
+    return mean, err
 
 
 def check_gaus_fit(hist):
@@ -197,7 +220,7 @@ def check_gaus_fit(hist):
     return (abs(hist.GetFunction('gaus').GetParameter(1) - x_peak) / abs(x_peak)) < 0.1
 
 
-def plot_rsp_pt(inputfile, outputfile, absetamin, absetamax, pt_bins, pt_var, pt_max, pu_min, pu_max):
+def plot_rsp_pt(pairs, outputfile, absetamin, absetamax, pt_bins, pt_var, pt_max, pu_min, pu_max):
     """Make a graph of response Vs pt for given eta bin
 
     pt_var allows the user to specify which pT to bin in & plot against.
@@ -206,19 +229,8 @@ def plot_rsp_pt(inputfile, outputfile, absetamin, absetamax, pt_bins, pt_var, pt
         avoid including saturation effects)
     """
 
-    # Input tree
-    tree_raw = inputfile.Get("valid")
-
     # Output folders
-    output_f = outputfile.GetDirectory('eta_%g_%g' % (absetamin, absetamax))
-    output_f_hists = None
-    if not output_f:
-        output_f = outputfile.mkdir('eta_%g_%g' % (absetamin, absetamax))
-        output_f_hists = output_f.mkdir("Histograms")
-    else:
-        output_f_hists = output_f.GetDirectory("Histograms")
-
-    gr_rsp_pt = ROOT.TGraphErrors()
+    output_f, output_f_hists = get_output_dirs(outputfile, 'eta_%g_%g' % (absetamin, absetamax))
 
     # Cut strings
     eta_cutStr = "TMath::Abs(eta) < %f && TMath::Abs(eta) > %f" % (absetamax, absetamin)
@@ -235,18 +247,41 @@ def plot_rsp_pt(inputfile, outputfile, absetamin, absetamax, pt_bins, pt_var, pt
     pt_array = array('d', pt_bins)
 
     # First make a 2D plot
-    h2d_rsp_pt = ROOT.TH2D("h2d_rsp_%s_%g_%g" % (pt_var, absetamin, absetamax),
+    store = HistStore()
+    h2d_rsp_pt = store.adopt(ROOT.TH2D("h2d_rsp_%s_%g_%g" % (pt_var, absetamin, absetamax),
                            "%g < |#eta| < %g;p_{T};response" % (absetamin, absetamax),
                            len(pt_bins) - 1, pt_array,
-                           n_rsp_bins, rsp_min, rsp_max)
-    tree_raw.Draw("rsp:%s>>h2d_rsp_%s_%g_%g" % (pt_var, pt_var, absetamin, absetamax), cutStr)
+                           n_rsp_bins, rsp_min, rsp_max))
+    pt_ref_max = pt_bins[-1] if pt_var == "ptRef" else None
+    pairs.draw("rsp:%s>>h2d_rsp_%s_%g_%g" % (pt_var, pt_var, absetamin, absetamax), cutStr,
+               absetamin=absetamin, absetamax=absetamax, pt_ref_max=pt_ref_max, hist=h2d_rsp_pt)
 
     output_f_hists.WriteTObject(h2d_rsp_pt)
 
-    # Now for each pt bin, do a projection on 1D hist of response and fit a Gaussian
+    gr_rsp_pt = make_rsp_pt_graph(h2d_rsp_pt, pt_bins, pt_var, output_f_hists)
+    store.free()
+
+    # Save the graph
+    gr_rsp_pt.SetTitle("%g < |#eta^{L1}| < %g;p_{T}; <response> = <p_{T}^{L1}/p_{T}^{Ref}>" % (absetamin, absetamax))
+    gr_rsp_pt.SetName("gr_rsp_%s_eta_%g_%g" % (pt_var, absetamin, absetamax))
+
+    output_f.WriteTObject(gr_rsp_pt)
+
+
+def make_rsp_pt_graph(h2d_rsp_pt, pt_bins, pt_var, output_f_hists):
+    """Make a graph of response Vs pt from a 2D hist of response Vs pt,
+    by fitting a Gaussian to the response in each pt bin.
+
+    pt_var is only used to name the 1D response hists, which are written
+    to output_f_hists.
+    """
+    gr_rsp_pt = ROOT.TGraphErrors()
+    store = HistStore()
+
+    # For each pt bin, do a projection on 1D hist of response and fit a Gaussian
     print pt_bins
     for i, (pt_min, pt_max) in enumerate(pairwise(pt_bins)):
-        h_rsp = h2d_rsp_pt.ProjectionY("rsp_%s_%g_%g" % (pt_var, pt_min, pt_max), i + 1, i + 1)
+        h_rsp = store.adopt(h2d_rsp_pt.ProjectionY("rsp_%s_%g_%g" % (pt_var, pt_min, pt_max), i + 1, i + 1))
         print i, pt_min, pt_max
 
         if h_rsp.Integral() <= 0:
@@ -279,17 +314,14 @@ def plot_rsp_pt(inputfile, outputfile, absetamin, absetamax, pt_bins, pt_var, pt
         else:
             print "Cannot fit Gaussian in plot_rsp_pt, using raw mean instead"
 
-    # Save the graph
-    gr_rsp_pt.SetTitle("%g < |#eta^{L1}| < %g;p_{T}; <response> = <p_{T}^{L1}/p_{T}^{Ref}>" % (absetamin, absetamax))
-    gr_rsp_pt.SetName("gr_rsp_%s_eta_%g_%g" % (pt_var, absetamin, absetamax))
-
-    output_f.WriteTObject(gr_rsp_pt)
+    store.free()
+    return gr_rsp_pt
 
 
 def main(in_args=sys.argv[1:]):
     print in_args
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("input", help="input ROOT filename")
+    parser.add_argument("input", help="input ROOT filename, or glob pattern/manifest of pairs files")
     parser.add_argument("output", help="output ROOT filename")
     parser.add_argument("--incl", action="store_true", help="Do inclusive eta plots")
     parser.add_argument("--excl", action="store_true", help="Do exclusive eta plots")
@@ -313,14 +345,16 @@ def main(in_args=sys.argv[1:]):
                         help="Maximum number of PU vertices (refers to *actual* "
                              "number of PU vertices in the event, not the centre "
                              "of of the distribution)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of processes to use for filling hists from several pairs files")
     args = parser.parse_args(args=in_args)
 
     # Open input & output files, check
-    input_file = cu.open_root_file(args.input, "READ")
+    pairs = PairsDataset(args.input, n_jobs=args.jobs)
     output_file = cu.open_root_file(args.output, "RECREATE")
     print "IN:", args.input
     print "OUT:", args.output
-    if not input_file or not output_file:
+    if not output_file:
         raise Exception("Input or output files cannot be opened")
 
     etaBins = binning.eta_bins
@@ -343,27 +377,28 @@ def main(in_args=sys.argv[1:]):
             eta_min = eta
             eta_max = etaBins[i + 1]
 
-            plot_checks(input_file, output_file, eta_min, eta_max, args.maxPt, args.PUmin, args.PUmax)
+            plot_checks(pairs, output_file, eta_min, eta_max, args.maxPt, args.PUmin, args.PUmax)
             # Do a response vs pt graph
-            plot_rsp_pt(input_file, output_file, eta_min, eta_max, ptBins, "pt", args.maxPt, args.PUmin, args.PUmax)
-            plot_rsp_pt(input_file, output_file, eta_min, eta_max, ptBins, "ptRef", args.maxPt, args.PUmin, args.PUmax)
+            plot_rsp_pt(pairs, output_file, eta_min, eta_max, ptBins, "pt", args.maxPt, args.PUmin, args.PUmax)
+            plot_rsp_pt(pairs, output_file, eta_min, eta_max, ptBins, "ptRef", args.maxPt, args.PUmin, args.PUmax)
+            cu.print_memory_usage("eta bin %g - %g" % (eta_min, eta_max))
 
     # Do an inclusive plot for all eta bins
     if args.incl and len(etaBins) > 2:
-        plot_checks(input_file, output_file, etaBins[0], etaBins[-1], args.maxPt, args.PUmin, args.PUmax)
+        plot_checks(pairs, output_file, etaBins[0], etaBins[-1], args.maxPt, args.PUmin, args.PUmax)
         # Do a response vs pt graph
         # ptBins_wide = list(np.arange(10, 250, 8))
-        plot_rsp_pt(input_file, output_file, etaBins[0], etaBins[-1], ptBins, "pt", args.maxPt, args.PUmin, args.PUmax)
-        plot_rsp_pt(input_file, output_file, etaBins[0], etaBins[-1], ptBins, "ptRef", args.maxPt, args.PUmin, args.PUmax)
+        plot_rsp_pt(pairs, output_file, etaBins[0], etaBins[-1], ptBins, "pt", args.maxPt, args.PUmin, args.PUmax)
+        plot_rsp_pt(pairs, output_file, etaBins[0], etaBins[-1], ptBins, "ptRef", args.maxPt, args.PUmin, args.PUmax)
         # Do a response vs eta graph, inclusive over all pt
-        plot_rsp_eta(input_file, output_file, etaBins, 0, 1000, 'pt', args.PUmin, args.PUmax)
+        plot_rsp_eta(pairs, output_file, etaBins, 0, 1000, 'pt', args.PUmin, args.PUmax)
 
         # Sub-binned by pt
         for pt_min, pt_max in binning.check_pt_bins:
-            plot_rsp_eta(input_file, output_file, etaBins, pt_min, pt_max, 'pt', args.PUmin, args.PUmax)
-            plot_rsp_eta(input_file, output_file, etaBins, pt_min, pt_max, 'ptRef', args.PUmin, args.PUmax)
+            plot_rsp_eta(pairs, output_file, etaBins, pt_min, pt_max, 'pt', args.PUmin, args.PUmax)
+            plot_rsp_eta(pairs, output_file, etaBins, pt_min, pt_max, 'ptRef', args.PUmin, args.PUmax)
+        cu.print_memory_usage("inclusive eta bin %g - %g" % (etaBins[0], etaBins[-1]))
 
-    input_file.Close()
     output_file.Close()
     return 0
 
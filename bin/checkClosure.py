@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""
+Check the closure of a set of correction functions, without rerunning the matcher.
+
+Takes an *uncalibrated* pairs file from RunMatcher, and the output file from
+runCalibration.py. The fitfcneta_* correction functions are applied to the L1
+jet pT of all pairs in memory, in the same way as RunMatcher --correct does,
+then the same response Vs pt & eta graphs as checkCalibration.py are made.
+
+The pair quantities are cached as numpy arrays next to the pairs file
+(see pair_columns.py), so trying another set of correction functions on the
+same pairs only has to read the cache.
+
+If the pairs have an event number, the HTT & MHT of the matched jets in each
+event are also calculated, before & after corrections. These only include
+matched jets (the pairs file doesn't have unmatched ones), so the L1 sums are
+compared to the sums of the matched reference jets.
+
+Usage: see
+python checkClosure.py -h
+"""
+
+
+import ROOT
+import sys
+import argparse
+import numpy as np
+from array import array
+import binning
+from binning import pairwise
+import common_utils as cu
+from pair_columns import load_pair_columns, get_tree_branches, EVENT_INDEX_BRANCH
+from pairs_index import load_pairs_index, get_entry_slice
+from checkCalibration import get_output_dirs, fit_rsp_eta_hist, make_rsp_pt_graph
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gStyle.SetOptStat(0)
+ROOT.gROOT.SetBatch(1)
+ROOT.gStyle.SetOptFit(1111)
+ROOT.TH1.SetDefaultSumw2(True)
+
+
+def load_correction_functions(corr_filename, eta_bins):
+    """Get correction function for each eta bin from runCalibration output.
+
+    Like loadCorrectionFunctions() in RunMatcher, bins without a function
+    are not corrected, and have None instead.
+    """
+    corr_file = cu.open_root_file(corr_filename)
+    corr_fns = []
+    for eta_min, eta_max in pairwise(eta_bins):
+        fn_name = "fitfcneta_%g_%g" % (eta_min, eta_max)
+        fn = corr_file.Get(fn_name)
+        if fn:
+            corr_fns.append(fn.Clone())
+        else:
+            print "No correction fn found for eta bin %g - %g: will not correct jets in this bin" % (eta_min, eta_max)
+            corr_fns.append(None)
+    corr_file.Close()
+    return corr_fns
+
+
+def apply_corrections(pt, eta, corr_fns, eta_bins, min_pt=-1):
+    """Apply correction functions to arrays of L1 jet pt & eta.
+
+    Same logic as correctJets() in RunMatcher: if min_pt < 0, only jets within
+    the range of the correction function are corrected, otherwise all jets with
+    pt >= min_pt. Corrected pt must be between 0 and 1000 GeV, otherwise the
+    original pt is kept.
+
+    The function is only evaluated once for each unique pt value in each eta bin,
+    since L1 jet pt is quantised.
+
+    Returns
+    -------
+    numpy.ndarray
+        Corrected pt
+    """
+    pt_corr = np.array(pt, dtype=float)
+    # bin i has eta_bins[i] < |eta| <= eta_bins[i+1], as in correctJets()
+    bin_ind = np.searchsorted(eta_bins, np.abs(eta), side='left') - 1
+    for ind, fn in enumerate(corr_fns):
+        if fn is None:
+            continue
+        mask = bin_ind == ind
+        if not mask.any():
+            continue
+        pt_bin = pt_corr[mask]
+        if min_pt < 0:
+            fit_min, fit_max = ROOT.Double(), ROOT.Double()
+            fn.GetRange(fit_min, fit_max)
+            do_corr = (pt_bin > fit_min) & (pt_bin < fit_max)
+        else:
+            do_corr = pt_bin >= min_pt
+        unique_pt, inverse = np.unique(pt_bin, return_inverse=True)
+        new_pt = pt_bin * np.array([fn.Eval(x) for x in unique_pt])[inverse]
+        # safeguard against crazy values
+        do_corr &= (new_pt < 1000.) & (new_pt > 0.)
+        pt_corr[mask] = np.where(do_corr, new_pt, pt_bin)
+    return pt_corr
+
+
+def calc_event_sums(event, pt, eta, phi):
+    """Calculate HTT & MHT for each event, from jets passing the HTT cut
+    (pT > 30, |eta| <= 3, as in passHTTCut()).
+
+    Parameters
+    ----------
+    event : numpy.ndarray
+        Event number for each jet
+    pt, eta, phi : numpy.ndarray
+        Jet kinematics
+
+    Returns
+    -------
+    numpy.ndarray, numpy.ndarray, numpy.ndarray
+        Unique event numbers, HTT & MHT for each of those events
+    """
+    unique_events, event_ind = np.unique(event, return_inverse=True)
+    n_events = len(unique_events)
+    pass_cut = (pt > 30) & (np.abs(eta) <= 3)
+    pt_cut = np.where(pass_cut, pt, 0.)
+    htt = np.bincount(event_ind, weights=pt_cut, minlength=n_events)
+    mhx = np.bincount(event_ind, weights=pt_cut * np.cos(phi), minlength=n_events)
+    mhy = np.bincount(event_ind, weights=pt_cut * np.sin(phi), minlength=n_events)
+    return unique_events, htt, np.hypot(mhx, mhy)
+
+
+def fill_hist(hist, x, y=None):
+    """Fill 1D or 2D hist from numpy arrays in one go"""
+    x = np.ascontiguousarray(x, dtype=float)
+    weights = np.ones_like(x)
+    if y is None:
+        hist.FillN(len(x), x, weights)
+    else:
+        hist.FillN(len(x), x, np.ascontiguousarray(y, dtype=float), weights)
+
+
+def plot_rsp_pt(cols, outputfile, absetamin, absetamax, pt_bins, pt_var, pt_max, pairs_index=None):
+    """Make a graph of response Vs pt for given eta bin, from arrays.
+
+    Same output as checkCalibration.plot_rsp_pt()
+    If the pairs are sorted (pairs_index), only the slice for the eta bin is used.
+    """
+    output_f, output_f_hists = get_output_dirs(outputfile, 'eta_%g_%g' % (absetamin, absetamax))
+
+    cols = {k: v[get_entry_slice(pairs_index, len(v), absetamin, absetamax)] for k, v in cols.iteritems()}
+    abs_eta = np.abs(cols['eta'])
+    mask = ((abs_eta < absetamax) & (abs_eta > absetamin)
+            & (cols[pt_var] < pt_bins[-1]) & (cols['pt'] < pt_max) & cols['base_mask'])
+
+    h2d_rsp_pt = ROOT.TH2D("h2d_rsp_%s_%g_%g" % (pt_var, absetamin, absetamax),
+                           "%g < |#eta| < %g;p_{T};response" % (absetamin, absetamax),
+                           len(pt_bins) - 1, array('d', pt_bins),
+                           100, 0, 5)
+    fill_hist(h2d_rsp_pt, cols[pt_var][mask], cols['rsp'][mask])
+    output_f_hists.WriteTObject(h2d_rsp_pt)
+
+    gr_rsp_pt = make_rsp_pt_graph(h2d_rsp_pt, pt_bins, pt_var, output_f_hists)
+    gr_rsp_pt.SetTitle("%g < |#eta^{L1}| < %g;p_{T}; <response> = <p_{T}^{L1}/p_{T}^{Ref}>" % (absetamin, absetamax))
+    gr_rsp_pt.SetName("gr_rsp_%s_eta_%g_%g" % (pt_var, absetamin, absetamax))
+    output_f.WriteTObject(gr_rsp_pt)
+
+
+def plot_rsp_eta(cols, outputfile, eta_bins, pt_min, pt_max, pt_var, pairs_index=None):
+    """Plot graph of response in bins of eta, from arrays.
+
+    Same output as checkCalibration.plot_rsp_eta()
+    If the pairs are sorted (pairs_index), only the slice for each eta bin is used.
+    """
+    gr_rsp_eta = ROOT.TGraphErrors()
+    output_f, output_f_hists = get_output_dirs(outputfile, 'eta_%g_%g' % (eta_bins[0], eta_bins[-1]))
+
+    n_pairs = len(cols['eta'])
+    for absetamin, absetamax in pairwise(eta_bins):
+        if pt_var == "ptRef":
+            sl = get_entry_slice(pairs_index, n_pairs, absetamin, absetamax, pt_min, pt_max)
+        else:
+            sl = get_entry_slice(pairs_index, n_pairs, absetamin, absetamax)
+        abs_eta = np.abs(cols['eta'][sl])
+        pt = cols[pt_var][sl]
+        mask = (pt < pt_max) & (pt > pt_min) & cols['base_mask'][sl] & (abs_eta < absetamax) & (abs_eta > absetamin)
+        rsp_name = 'hrsp_eta_%g_%g_%s_%g_%g' % (absetamin, absetamax, pt_var, pt_min, pt_max)
+        h_rsp = ROOT.TH1D(rsp_name, ";response (p_{T}^{L1}/p_{T}^{Ref});", 100, 0, 5)
+        fill_hist(h_rsp, cols['rsp'][sl][mask])
+
+        if h_rsp.Integral() <= 0:
+            print "No entries - skipping"
+            continue
+
+        mean, err = fit_rsp_eta_hist(h_rsp, absetamin)
+        output_f_hists.WriteTObject(h_rsp)
+
+        N = gr_rsp_eta.GetN()
+        gr_rsp_eta.SetPoint(N, 0.5 * (absetamin + absetamax), mean)
+        gr_rsp_eta.SetPointError(N, 0.5 * (absetamax - absetamin), err)
+
+    gr_rsp_eta.SetTitle(";|#eta^{L1}|; <response> = <p_{T}^{L1}/p_{T}^{Ref}>")
+    gr_rsp_eta.SetName("gr_rsp_eta_%g_%g_%s_%g_%g" % (eta_bins[0], eta_bins[-1], pt_var, pt_min, pt_max))
+    output_f.WriteTObject(gr_rsp_eta)
+
+
+def plot_sum_rsp(ref_sum, l1_sum, outputfile, sum_name, sum_label, sum_bins):
+    """Make graph of L1 / ref response Vs ref value, for an energy sum (HTT/MHT).
+
+    sum_name is used to name the hists & graph, sum_label for the axis titles.
+    """
+    output_f, output_f_hists = get_output_dirs(outputfile, 'sums')
+    mask = (ref_sum > 0) & (ref_sum < sum_bins[-1])
+    h2d_rsp = ROOT.TH2D("h2d_rsp_%s" % sum_name,
+                        ";%s^{Ref} [GeV];%s^{L1} / %s^{Ref}" % (sum_label, sum_label, sum_label),
+                        len(sum_bins) - 1, array('d', sum_bins),
+                        100, 0, 5)
+    fill_hist(h2d_rsp, ref_sum[mask], l1_sum[mask] / ref_sum[mask])
+    output_f_hists.WriteTObject(h2d_rsp)
+
+    gr_rsp = make_rsp_pt_graph(h2d_rsp, sum_bins, sum_name, output_f_hists)
+    gr_rsp.SetTitle(";%s^{Ref} [GeV];<%s^{L1} / %s^{Ref}>" % (sum_label, sum_label, sum_label))
+    gr_rsp.SetName("gr_rsp_%s" % sum_name)
+    output_f.WriteTObject(gr_rsp)
+
+
+def main(in_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("input", help="input ROOT filename, with pairs made from uncalibrated L1 jets")
+    parser.add_argument("corrections", help="ROOT file with correction functions, from runCalibration.py")
+    parser.add_argument("output", help="output ROOT filename")
+    parser.add_argument("--corrMinPt", default=-1, type=float,
+                        help="Minimum L1 jet pT to apply corrections. If < 0, will use whatever "
+                        "the fit limits were, as in RunMatcher.")
+    parser.add_argument("--central", action='store_true',
+                        help="Do central eta bins only (eta <= 3)")
+    parser.add_argument("--forward", action='store_true',
+                        help="Do forward eta bins only (eta >= 3)")
+    parser.add_argument("--maxPt", default=500, type=float,
+                        help="Maximum pT for L1 Jets")
+    parser.add_argument("--PUmin", default=-99, type=float,
+                        help="Minimum number of PU vertices")
+    parser.add_argument("--PUmax", default=999, type=float,
+                        help="Maximum number of PU vertices")
+    parser.add_argument("--cacheDir", default=None,
+                        help="Directory to store column cache in, if not next to input file")
+    args = parser.parse_args(args=in_args)
+
+    eta_bins = binning.eta_bins
+    if args.central:
+        eta_bins = binning.eta_bins_central
+    elif args.forward:
+        eta_bins = binning.eta_bins_forward
+    pt_bins = binning.pt_bins_stage2
+
+    branches = ["pt", "eta", "phi", "ptRef", "etaRef", "phiRef", "numPUVertices"]
+    tree_branches = get_tree_branches(args.input)
+    # the event index is unique, unlike event numbers from several runs
+    event_key = EVENT_INDEX_BRANCH if EVENT_INDEX_BRANCH in tree_branches else "event"
+    do_sums = event_key in tree_branches
+    if do_sums:
+        branches.append(event_key)
+    cols = load_pair_columns(args.input, branches, cache_dir=args.cacheDir)
+    print "Loaded %d pairs" % len(cols['pt'])
+
+    # correction functions are always made for the full set of eta bins
+    corr_fns = load_correction_functions(args.corrections, binning.eta_bins)
+    pt_uncorr = cols['pt']
+    cols['pt'] = apply_corrections(pt_uncorr, cols['eta'], corr_fns, binning.eta_bins, args.corrMinPt)
+    cols['rsp'] = cols['pt'] / cols['ptRef']
+    # PU & saturated L1 jet cuts, applied to everything as in checkCalibration
+    cols['base_mask'] = ((cols['numPUVertices'] <= args.PUmax) & (cols['numPUVertices'] >= args.PUmin)
+                       & (pt_uncorr < 1023.1))
+
+    # arrays are in file order, so for sorted pairs each eta bin is a slice
+    pairs_index = load_pairs_index(args.input)
+
+    output_file = cu.open_root_file(args.output, "RECREATE")
+
+    for eta_min, eta_max in pairwise(eta_bins):
+        for pt_var in ["pt", "ptRef"]:
+            plot_rsp_pt(cols, output_file, eta_min, eta_max, pt_bins, pt_var, args.maxPt, pairs_index)
+
+    if len(eta_bins) > 2:
+        for pt_var in ["pt", "ptRef"]:
+            plot_rsp_pt(cols, output_file, eta_bins[0], eta_bins[-1], pt_bins, pt_var, args.maxPt, pairs_index)
+        plot_rsp_eta(cols, output_file, eta_bins, 0, 1000, 'pt', pairs_index)
+        for pt_min, pt_max in binning.check_pt_bins:
+            plot_rsp_eta(cols, output_file, eta_bins, pt_min, pt_max, 'pt', pairs_index)
+            plot_rsp_eta(cols, output_file, eta_bins, pt_min, pt_max, 'ptRef', pairs_index)
+
+    if do_sums:
+        sum_bins = list(np.arange(0, 1010, 20))
+        _, htt_ref, mht_ref = calc_event_sums(cols[event_key], cols['ptRef'], cols['etaRef'], cols['phiRef'])
+        _, htt_uncorr, mht_uncorr = calc_event_sums(cols[event_key], pt_uncorr, cols['eta'], cols['phi'])
+        _, htt_corr, mht_corr = calc_event_sums(cols[event_key], cols['pt'], cols['eta'], cols['phi'])
+        print "Calculated HTT & MHT for %d events" % len(htt_ref)
+        plot_sum_rsp(htt_ref, htt_uncorr, output_file, "httUncorr", "HTT", sum_bins)
+        plot_sum_rsp(htt_ref, htt_corr, output_file, "htt", "HTT", sum_bins)
+        plot_sum_rsp(mht_ref, mht_uncorr, output_file, "mhtUncorr", "MHT", sum_bins)
+        plot_sum_rsp(mht_ref, mht_corr, output_file, "mht", "MHT", sum_bins)
+    else:
+        print "No event numbers in pairs, not calculating HTT/MHT"
+
+    output_file.Close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,14 @@
 
 import ROOT
 import os
+import errno
 from subprocess import call
 from sys import platform as _platform
 import numpy as np
 import math
 import argparse
+import resource
+from hist_arrays import hist_array, hist_sumw2_array, inner_bins, reset_stats, graph_arrays, graph_error_arrays
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -32,6 +35,31 @@ def open_pdf(pdf_filename):
         call(["start", pdf_filename])
 
 
+#
+# Memory fns
+#
+def get_peak_rss_mb():
+    """Get peak resident memory of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on OS X, kB on Linux
+    return peak / (1024. ** 2 if _platform == "darwin" else 1024.)
+
+
+def get_rss_mb():
+    """Get current resident memory of this process, in MB.
+    Only available on Linux, otherwise the peak is returned."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024. ** 2
+    except IOError:
+        return get_peak_rss_mb()
+
+
+def print_memory_usage(label):
+    """Print current & peak resident memory, e.g. after each eta bin."""
+    print "Memory after %s: RSS %.1f MB, peak RSS %.1f MB" % (label, get_rss_mb(), get_peak_rss_mb())
+
+
 #
 # Filepath/directory fns
 #
@@ -57,9 +85,16 @@ def check_dir_exists(filepath):
 
 
 def check_dir_exists_create(filepath):
-    """Check if directory exists. If not, create it."""
+    """Check if directory exists. If not, create it.
+
+    Safe to call from several processes at once.
+    """
     if not check_dir_exists(filepath):
-        os.makedirs(cleanup_filepath(filepath))
+        try:
+            os.makedirs(cleanup_filepath(filepath))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
 
 
 #
@@ -101,6 +136,27 @@ def get_from_file(tfile, obj_name, info=False):
         return tfile.Get(obj_name)
 
 
+def get_pairs_tree(tfile, tree_name="valid", events_name="events"):
+    """Get TTree of pairs from a RunMatcher output file.
+
+    Files made with RunMatcher --normalised store per-event quantities
+    (PU, sums, etc) once per event in a separate TTree, with an iEvent branch
+    in the pairs TTree. That TTree is added as a friend, so per-event branches
+    can still be used in Draw() & cuts as with the flat layout. The event for
+    each pair is only read when needed, via the iEvent index.
+    """
+    tree = get_from_file(tfile, tree_name)
+    friends = tree.GetListOfFriends()
+    if friends and friends.FindObject(events_name):
+        return tree  # already set up by an earlier call
+    if exists_in_file(tfile, events_name):
+        events = tfile.Get(events_name)
+        if not events.GetTreeIndex():
+            events.BuildIndex("iEvent")
+        tree.AddFriend(events)
+    return tree
+
+
 def check_exp(n):
     """
     Checks if number has stupidly larger exponent
@@ -117,18 +173,16 @@ def get_xy(graph):
     """
     Return lists of x, y points from a graph, because it's such a PITA
     """
-    xarr = list(np.ndarray(graph.GetN(), 'd', graph.GetX()))
-    yarr = list(np.ndarray(graph.GetN(), 'd', graph.GetY()))
-    return xarr, yarr
+    xarr, yarr = graph_arrays(graph)
+    return list(xarr), list(yarr)
 
 
 def get_exey(graph):
     """
     Return lists of errors on x, y points from a graph, because it's such a PITA
     """
-    xarr = list(np.ndarray(graph.GetN(), 'd', graph.GetEX()))
-    yarr = list(np.ndarray(graph.GetN(), 'd', graph.GetEY()))
-    return xarr, yarr
+    xarr, yarr = graph_error_arrays(graph)
+    return list(xarr), list(yarr)
 
 
 def norm_vertical_bins(hist, rescale_peaks=False):
@@ -147,39 +201,30 @@ def norm_vertical_bins(hist, rescale_peaks=False):
     """
 
     hnew = hist.Clone(hist.GetName() + "_normX")
-    nbins_y = hnew.GetNbinsY()
-    maximums = []
-    for i in range(1, hnew.GetNbinsX() + 1, 1):
-        y_int = hnew.Integral(i, i + 1, 1, nbins_y)
-        peak = 0
-        if y_int > 0:
-            scale_factor = 1. / y_int
-            for j in range(1, nbins_y + 1, 1):
-                if hnew.GetBinContent(i, j) > 0:
-                    new_bin_value = hist.GetBinContent(i, j) * scale_factor
-                    if new_bin_value > peak:
-                        peak = new_bin_value
-                    hnew.SetBinContent(i, j, new_bin_value)
-                    hnew.SetBinError(i, j, hist.GetBinError(i, j) * scale_factor)
-        maximums.append(peak)
+    # [ybin, xbin] views of the new hist's storage, so it gets updated in place
+    contents = inner_bins(hist_array(hnew))
+    errors_sq = inner_bins(hist_sumw2_array(hnew))
+
+    # only bins with content > 0 in x bins with integral > 0 are changed
+    y_int = contents.sum(axis=0, dtype=np.float64)
+    scale_factors = np.divide(1., y_int, out=np.zeros_like(y_int), where=y_int > 0)
+    positive = (contents > 0) & (y_int > 0)
+    maximums = np.where(positive, contents * scale_factors, 0).max(axis=0)
 
     # Rescale so all peaks have same value = same color
     if rescale_peaks:
-        max_peak = max(maximums)
-        for i in range(1, hnew.GetNbinsX() + 1, 1):
-            if maximums[i - 1] == 0:
-                continue
-            sf = 1. * max_peak / maximums[i - 1]
-            for j in range(1, hnew.GetNbinsY()):
-                if hnew.GetBinContent(i, j) > 0:
-                    hnew.SetBinContent(i, j, hnew.GetBinContent(i, j) * sf)
-                    hnew.SetBinError(i, j, hist.GetBinError(i, j) * sf)
+        max_peak = maximums.max()
+        scale_factors *= np.divide(max_peak, maximums, out=np.ones_like(maximums), where=maximums > 0)
+
+    scale_factors = np.broadcast_to(scale_factors, contents.shape)
+    contents[positive] *= scale_factors[positive]
+    errors_sq[positive] *= scale_factors[positive]**2
+    reset_stats(hnew)
 
     # rescale Z axis otherwise it just removes a lot of small bins
     # set new minimum such that it includes all points, and the z axis min is
     # a negative integer power of 10
     min_bin = hnew.GetMinimum(0)
-    max_bin = max(maximums) if rescale_peaks else hnew.GetMaximum()
     max_bin = hnew.GetMaximum()
     hnew.SetAxisRange(10**math.floor(math.log10(min_bin)), max_bin, 'Z')
     return hnew
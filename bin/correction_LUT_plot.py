@@ -20,11 +20,13 @@ import os
 import argparse
 import binning
 import common_utils as cu
-from runCalibration import generate_eta_graph_name, set_fit_params
+from runCalibration import generate_eta_graph_name, generate_eta_band_name, set_fit_params
 from correction_LUT_GCT import print_GCT_lut_file
 from correction_LUT_stage1 import print_Stage1_lut_file
 from correction_LUT_stage2 import print_Stage2_lut_files, print_Stage2_func_file
 from multifunc import MultiFunc
+from extract_const import (subgraph_means, jackknife_means, histogram_peak,
+                           bootstrap_subgraph_peaks, fill_hist)
 import csv
 from pprint import pprint
 
@@ -86,6 +88,41 @@ def get_functions_graphs_params_rootfile(root_filename):
     return all_fits, all_fit_params, all_graphs
 
 
+def get_bootstrap_bands_rootfile(root_filename):
+    """Get the uncertainty bands on the correction functions from ROOT file.
+
+    These are made by running runCalibration.py with --bootstrap.
+
+    Parameters
+    ----------
+    root_filename : str
+        Name of ROOT file to get things from
+
+    Returns
+    -------
+    list[(numpy.array, numpy.array, numpy.array)]
+        One entry per eta bin: pt values, and the lower & upper band edges
+        relative to the central value. None for eta bins without a band.
+    """
+    in_file = cu.open_root_file(root_filename)
+    bands = []
+    etaBins = binning.eta_bins
+    for eta_min, eta_max in izip(etaBins[:-1], etaBins[1:]):
+        band_name = generate_eta_band_name(eta_min, eta_max)
+        if not cu.exists_in_file(in_file, band_name):
+            bands.append(None)
+            continue
+        band = cu.get_from_file(in_file, band_name)
+        n = band.GetN()
+        pt = np.ndarray(n, 'd', band.GetX()).copy()
+        central = np.ndarray(n, 'd', band.GetY())
+        err_lo = np.ndarray(n, 'd', band.GetEYlow())
+        err_hi = np.ndarray(n, 'd', band.GetEYhigh())
+        bands.append((pt, (central - err_lo) / central, (central + err_hi) / central))
+    in_file.Close()
+    return bands
+
+
 def get_functions_params_textfile(text_filename):
     """Get function parameters from textfile, create MultiFunc objects from them.
 
@@ -314,7 +351,7 @@ def do_constant_hf_fits(fits, graphs, plot_dir):
     return new_functions
 
 
-def do_constant_fit(graph, eta_min, eta_max, output_dir):
+def do_constant_fit(graph, eta_min, eta_max, output_dir, n_bootstrap=0):
     """Do constant-value fit to graph and plot the jackknife procedure.
 
     We derive the constant fit value by jack-knifing. There are 2 forms here:
@@ -336,6 +373,9 @@ def do_constant_fit(graph, eta_min, eta_max, output_dir):
         Eta bin boundaries, purely for the plots
     output_dir : str
         Output directory for plots.
+    n_bootstrap : int, optional
+        Number of bootstrap samples used to estimate the uncertainty on the
+        constant value. If 0, don't bootstrap.
 
     Returns
     -------
@@ -345,20 +385,13 @@ def do_constant_fit(graph, eta_min, eta_max, output_dir):
     print 'Doing constant-value fit'
 
     xarr, yarr = cu.get_xy(graph)
-    xarr, yarr = np.array(xarr), np.array(yarr)  # use numpy array for easy slicing
-
-    # "my jackknifing": Loop over all possible subgraphs, and calculate a mean for each
-    end = len(yarr)
-    means = []
-    while end > 0:
-        start = 0
-        while start < end:
-            means.append(yarr[start:end].mean())
-            start += 1
-        end -= 1
+    yarr = np.array(yarr)
+
+    # "my jackknifing": calculate a mean for all possible subgraphs
+    means = subgraph_means(yarr)
 
     # "proper" Jackknife means
-    jack_means = [np.delete(yarr, i).mean() for i in range(len(yarr))]
+    jack_means = jackknife_means(yarr)
 
     # Do plotting & peak finding, for both methods
     plot_name = os.path.join(output_dir, 'means_hist_%g_%g_myjackknife.pdf' % (eta_min, eta_max))
@@ -371,6 +404,10 @@ def do_constant_fit(graph, eta_min, eta_max, output_dir):
     print 'my jackknife mean:', mean
     print 'jackknife peak:', jackpeak
     print 'jackknfe mean:', jackmean
+    if n_bootstrap > 0:
+        peaks = bootstrap_subgraph_peaks(yarr, n_bootstrap)
+        print 'my jackknife peak bootstrap: %g +/- %g (68%% interval: %g - %g)' % (
+            peaks.mean(), peaks.std(), np.percentile(peaks, 16), np.percentile(peaks, 84))
     const_fn = ROOT.TF1("constant", '[0]', 0, 1024)
     const_fn.SetParameter(0, peak)
     const_multifn = MultiFunc({(0, np.inf): const_fn})
@@ -396,15 +433,10 @@ def find_peak_and_average_plot(values, eta_min, eta_max, plot_filename, title='J
     float, float
         Peak mean, and average mean.
     """
-    values = np.array(values)
-    # auto-generate histogram x axis limits using min/max of values + spacer
-    num_bins = 75 if len(values) > 200 else 50
-    hist = ROOT.TH1D('h_mean', '', num_bins, 0.95 * values.min(), 1.05 * values.max())
-    for m in values:
-        hist.Fill(m)
-    # find peak
-    peak_bin = hist.GetMaximumBin()
-    peak = hist.GetBinCenter(peak_bin)
+    values = np.asarray(values)
+    peak, counts, edges = histogram_peak(values)
+    hist = ROOT.TH1D('h_mean', '', len(counts), edges[0], edges[-1])
+    fill_hist(hist, counts)
     # plot
     canv = ROOT.TCanvas('c', '', 600, 600)
     canv.SetTicks(1, 1)
@@ -649,11 +681,15 @@ def main(in_args=sys.argv[1:]):
     all_fit_params = []
     all_fits = []
     all_graphs = []
+    all_bands = None
 
     if args.text:
         all_fits, all_fit_params = get_functions_params_textfile(args.input)
     else:
         all_fits, all_fit_params, all_graphs = get_functions_graphs_params_rootfile(args.input)
+        all_bands = get_bootstrap_bands_rootfile(args.input)
+        if not any(all_bands):
+            all_bands = None
 
     # Check we have the correct number
     etaBins = binning.eta_bins
@@ -722,7 +758,8 @@ def main(in_args=sys.argv[1:]):
                                    read_pt_compression=args.ptCompressionFile,
                                    target_num_pt_bins=2**4,
                                    merge_criterion=1.05,
-                                   merge_algorithm='greedy')  # greedy or kmeans
+                                   merge_algorithm='greedy',  # greedy or kmeans
+                                   corr_bands=all_bands)
         else:
             print_Stage2_func_file(fits, args.lut)
 
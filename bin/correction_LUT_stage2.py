@@ -952,7 +952,8 @@ def print_Stage2_lut_files(fit_functions,
                            read_pt_compression=None,
                            target_num_pt_bins=2**4,
                            merge_criterion=1.05,
-                           merge_algorithm='greedy' # or 'kmeans'
+                           merge_algorithm='greedy', # or 'kmeans'
+                           corr_bands=None
                            ):
     """Make LUTs for Stage 2.
 
@@ -1015,6 +1016,13 @@ def print_Stage2_lut_files(fit_functions,
 
         kmeans: use k-means algorithm in scikit-learn
 
+    corr_bands : list[(numpy.array, numpy.array, numpy.array)], optional
+        Statistical uncertainty band on each correction function, e.g. from
+        bootstrapping in runCalibration.py. One entry per eta bin (or None
+        if there is no band for that bin), with 3 arrays: pt values, and the
+        lower & upper edges of the band, relative to the correction function.
+        If specified, reports which HW multipliers are statistically significant.
+
     Raises
     ------
     IndexError
@@ -1114,6 +1122,19 @@ def print_Stage2_lut_files(fit_functions,
         map_info['hw_pt_post_hw_corr_compressed'] = hw_pt_post
         map_info['pt_post_hw_corr_compressed'] = hw_pt_post * 0.5
 
+        # redo HW correction factors for lower & upper edges of uncertainty band
+        if corr_bands and corr_bands[eta_ind]:
+            band_pt, band_lo, band_hi = corr_bands[eta_ind]
+            for key, band_edge in [('hw_corr_compressed_lo', band_lo), ('hw_corr_compressed_hi', band_hi)]:
+                band_map_info = dict(map_info)
+                band_pt_post = pt_orig * corr_orig * np.interp(pt_orig, band_pt, band_edge)
+                band_map_info['hw_pt_post_corr_orig'] = (band_pt_post * 2.).astype(int)
+                map_info[key], _ = calc_hw_correction_addition_ints(band_map_info,
+                                                                    corr_matrix_add_none,
+                                                                    right_shift,
+                                                                    num_add_bits,
+                                                                    max_hw_pt)
+
         all_mapping_info[eta_ind] = map_info
 
         if eta_ind in [13, 14]:
@@ -1136,6 +1157,68 @@ def print_Stage2_lut_files(fit_functions,
     write_stage2_addition_lut(add_lut_filename, all_mapping_info)
     write_stage2_addend_multiplicative_lut(add_mult_lut_filename, all_mapping_info, num_add_bits, num_corr_bits)
 
+    if corr_bands:
+        report_hw_multiplier_significance(all_mapping_info,
+                                          os.path.join(plot_dir, 'hw_multiplier_significance.txt'))
+
+
+def report_hw_multiplier_significance(mapping_info, report_filename=None):
+    """Report which HW multipliers are statistically significant.
+
+    Uses the multipliers calculated for the lower & upper edges of the
+    uncertainty band on each correction function. A multiplier is deemed
+    significantly different from the one in the previous compressed pt bin
+    if their bands do not overlap. Those that are not could be merged
+    without any statistically meaningful change.
+
+    Parameters
+    ----------
+    mapping_info : dict
+        All the info. Eta bins without 'hw_corr_compressed_lo/hi' entries are skipped.
+    report_filename : str, optional
+        If set, also write the report to this file.
+
+    Returns
+    -------
+    dict{int : list[bool]}
+        For each eta bin, whether each compressed pt bin multiplier is
+        significantly different from the previous one. The first is always True.
+    """
+    lines = ['HW multipliers with 68% band from correction function uncertainty',
+             'eta bin : pt bin : multiplier : band : band width (LSB) : significant vs previous pt bin']
+    significance = OrderedDict()
+    n_total, n_stable = 0, 0
+    for eta_ind, map_info in mapping_info.iteritems():
+        if 'hw_corr_compressed_lo' not in map_info:
+            continue
+        pt_indices = list(map_info['pt_index'])
+        first_inds = [pt_indices.index(x) for x in sorted(set(pt_indices))]
+        significance[eta_ind] = []
+        last_lo, last_hi = None, None
+        for pt_ind, i in enumerate(first_inds):
+            mult = map_info['hw_corr_compressed'][i]
+            band_lo = min(map_info['hw_corr_compressed_lo'][i], map_info['hw_corr_compressed_hi'][i])
+            band_hi = max(map_info['hw_corr_compressed_lo'][i], map_info['hw_corr_compressed_hi'][i])
+            is_significant = last_lo is None or band_lo > last_hi or band_hi < last_lo
+            significance[eta_ind].append(is_significant)
+            n_total += 1
+            if band_lo == band_hi:
+                n_stable += 1
+            lines.append('%d : %d : %d : [%d, %d] : %d : %s' % (eta_ind, pt_ind, mult, band_lo, band_hi,
+                                                              band_hi - band_lo,
+                                                              'yes' if is_significant else 'NO'))
+            last_lo, last_hi = band_lo, band_hi
+
+    n_insignificant = sum(not x for sig in significance.values() for x in sig)
+    lines.append('%d / %d multipliers unchanged across the band' % (n_stable, n_total))
+    lines.append('%d / %d multipliers not significantly different from the previous pt bin'
+                 % (n_insignificant, n_total))
+    print '\n'.join(lines)
+    if report_filename:
+        with open(report_filename, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+    return significance
+
 
 def print_map_info(map_info):
     """Print out contents of dict, entry by entry"""
@@ -7,6 +7,14 @@ It then plots all those means in a histogram, and finds the peak. This is our 'a
 the idea being that the majority of the graph contributes to this average, and bits that
 fluctuate up or down get washed out.
 
+The uncertainty on the peak can be estimated by bootstrapping: resampling the
+graph points with replacement many times, and taking the spread of the peaks.
+
+All the subgraph means, jackknife means and histograms are calculated with
+numpy array operations (using cumulative sums), so this is fast enough to be
+repeated thousands of times. These functions are also used by
+correction_LUT_plot.py for the HF constant corrections.
+
 Improvements:
 - allow skipping of points?
 - fit curve to get better peak estimate?
@@ -20,7 +28,13 @@ import argparse
 import binning
 import common_utils as cu
 from runCalibration import generate_eta_graph_name
-import matplotlib.pyplot as plt
+
+USE_MPL = True
+try:
+    import matplotlib.pyplot as plt
+except ImportError:
+    print "Can't use matplotlib to make plots"
+    USE_MPL = False
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -31,7 +45,159 @@ ROOT.gStyle.SetOptFit(1111)
 
 # filename = "../Stage2_HF_QCDFlatSpring15BX25HCALFix_10Feb_2dd1043_noJEC_v2/output/output_QCDFlatSpring15BX25PU10to30HCALFix_MP_ak4_ref10to5000_l10to5000_dr0p4_PU15to25.root"
 
-def process_file(filename, eta_bins=binning.eta_bins_forward):
+def subgraph_means(yarr):
+    """Calculate the mean of every contiguous subgraph (i.e. no skipping points).
+
+    Uses cumulative sums, so the sum of any slice yarr[i:j] is just
+    csum[j] - csum[i], and all N(N+1)/2 means are calculated in one go.
+
+    Parameters
+    ----------
+    yarr : numpy.ndarray
+        Graph y values. If 2D, each row is treated as a separate graph.
+
+    Returns
+    -------
+    numpy.ndarray
+        Subgraph means. If yarr is 2D, one row of means per row of yarr.
+    """
+    yarr = np.asarray(yarr, dtype=float)
+    n_points = yarr.shape[-1]
+    zeros = np.zeros(yarr.shape[:-1] + (1,))
+    csum = np.concatenate([zeros, np.cumsum(yarr, axis=-1)], axis=-1)
+    starts, ends = np.triu_indices(n_points + 1, k=1)
+    return (csum[..., ends] - csum[..., starts]) / (ends - starts)
+
+
+def jackknife_means(yarr):
+    """Calculate the mean of every subgraph with one point removed.
+
+    Parameters
+    ----------
+    yarr : numpy.ndarray
+        Graph y values.
+
+    Returns
+    -------
+    numpy.ndarray
+        Jackknife means, where element i is the mean without point i.
+
+    Raises
+    ------
+    ValueError
+        If yarr has fewer than 2 points, as there is nothing left to average.
+    """
+    yarr = np.asarray(yarr, dtype=float)
+    if len(yarr) < 2:
+        raise ValueError("Need at least 2 points for jackknife means, got %d" % len(yarr))
+    return (yarr.sum() - yarr) / (len(yarr) - 1)
+
+
+def mean_hist_binning(values):
+    """Get the number of bins & range to use for a histogram of means.
+
+    Auto-generates x axis limits using min/max of values + spacer.
+    Works along the last axis if values is 2D.
+
+    Returns
+    -------
+    int, numpy.ndarray, numpy.ndarray
+        Number of bins, lower and upper limits.
+    """
+    num_bins = 75 if values.shape[-1] > 200 else 50
+    return num_bins, 0.95 * values.min(axis=-1), 1.05 * values.max(axis=-1)
+
+
+def histogram_peak(values):
+    """Histogram values, and find the centre of the bin with the most entries.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Collection of values.
+
+    Returns
+    -------
+    float, numpy.ndarray, numpy.ndarray
+        Peak value, histogram bin contents & histogram bin edges.
+        If all values are the same, the peak is that value.
+    """
+    values = np.asarray(values, dtype=float)
+    num_bins, x_min, x_max = mean_hist_binning(values)
+    counts, edges = np.histogram(values, bins=num_bins, range=(x_min, x_max))
+    if values.min() == values.max():
+        return values[0], counts, edges
+    peak_bin = counts.argmax()
+    return 0.5 * (edges[peak_bin] + edges[peak_bin + 1]), counts, edges
+
+
+def histogram_peaks(values):
+    """Find the histogram peak for each row of a 2D array in one go.
+
+    Same as calling histogram_peak on each row, but avoids looping in python.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        2D array, each row is a collection of values to histogram.
+
+    Returns
+    -------
+    numpy.ndarray
+        Peak value for each row. Rows where all values are the same give that value.
+    """
+    n_rows = values.shape[0]
+    num_bins, x_min, x_max = mean_hist_binning(values)
+    width = ((x_max - x_min) / num_bins)[:, np.newaxis]
+    # if all values in a row are the same, the bin width is 0 when they're all 0,
+    # and the bin centre isn't the value otherwise, so use the value as the peak
+    constant = (values.min(axis=1) == values.max(axis=1))
+    width[constant] = 1.
+    bin_inds = np.clip(((values - x_min[:, np.newaxis]) / width).astype(int), 0, num_bins - 1)
+    # offset each row so that one bincount can do all rows
+    bin_inds += num_bins * np.arange(n_rows)[:, np.newaxis]
+    counts = np.bincount(bin_inds.ravel(), minlength=n_rows * num_bins).reshape(n_rows, num_bins)
+    peaks = x_min + (counts.argmax(axis=1) + 0.5) * width[:, 0]
+    peaks[constant] = values[constant, 0]
+    return peaks
+
+
+def bootstrap_subgraph_peaks(yarr, n_samples=1000, seed=None):
+    """Estimate the spread of the subgraph mean peak by bootstrapping.
+
+    Each sample draws the graph points with replacement, keeping them in their
+    original order so that contiguous subgraphs still make sense, and finds
+    the peak of the subgraph means.
+
+    Parameters
+    ----------
+    yarr : numpy.ndarray
+        Graph y values.
+    n_samples : int, optional
+        Number of bootstrap samples.
+    seed : int, optional
+        Seed for random number generator, for reproducibility.
+
+    Returns
+    -------
+    numpy.ndarray
+        Peak for each bootstrap sample.
+    """
+    yarr = np.asarray(yarr, dtype=float)
+    rng = np.random.RandomState(seed)
+    inds = np.sort(rng.randint(0, len(yarr), size=(n_samples, len(yarr))), axis=1)
+    return histogram_peaks(subgraph_means(yarr[inds]))
+
+
+def fill_hist(hist, counts):
+    """Set contents & errors of a ROOT histogram from an array of bin counts."""
+    for i, count in enumerate(counts, 1):
+        hist.SetBinContent(i, count)
+        hist.SetBinError(i, np.sqrt(count))
+    hist.SetEntries(counts.sum())
+
+
+def process_file(filename, eta_bins=binning.eta_bins_forward, n_bootstrap=0):
     """Process a ROOT file with graphs, print a mean & mean histogram for each.
 
     Parameters
@@ -40,6 +206,9 @@ def process_file(filename, eta_bins=binning.eta_bins_forward):
         Name of ROOT file to process (from runCalibration.py)
     eta_bins : list[[float, float]]
         Eta bin edges.
+    n_bootstrap : int, optional
+        Number of bootstrap samples to estimate the uncertainty on the peak.
+        If 0, don't bootstrap.
     """
     f = cu.open_root_file(filename)
 
@@ -49,20 +218,13 @@ def process_file(filename, eta_bins=binning.eta_bins_forward):
             raise RuntimeError("Can't get graph")
 
         xarr, yarr = cu.get_xy(gr)
-        xarr, yarr = np.array(xarr), np.array(yarr)  # use numpy array for easy slicing
-
-        # Loop over all possible subgraphs, and calculate a mean for each
-        end = len(yarr)
-        means = []
-        while end > 0:
-            start = 0
-            while start < end:
-                means.append(yarr[start:end].mean())
-                start += 1
-            end -= 1
+        yarr = np.array(yarr)
+
+        # Calculate a mean for all possible subgraphs
+        means = subgraph_means(yarr)
 
         # Jackknife means
-        jack_means = [np.delete(yarr, i).mean() for i in range(len(yarr))]
+        jack_means = jackknife_means(yarr)
 
         # Do plotting & peak finding in both ROOT and MPL...not sure which is better?
         # peak = plot_find_peak_mpl(means, eta_min, eta_max, os.path.dirname(os.path.realpath(filename)))
@@ -71,7 +233,11 @@ def process_file(filename, eta_bins=binning.eta_bins_forward):
         print 'Eta bin:', eta_min, '-', eta_max
         print peak
         print 'jackknife mean:'
-        print np.array(jack_means).mean()
+        print jack_means.mean()
+        if n_bootstrap > 0:
+            peaks = bootstrap_subgraph_peaks(yarr, n_bootstrap)
+            print 'bootstrap peak: %g +/- %g (68%% interval: %g - %g)' % (
+                peaks.mean(), peaks.std(), np.percentile(peaks, 16), np.percentile(peaks, 84))
 
     f.Close()
 
@@ -94,15 +260,10 @@ def plot_jacknife_root(means, eta_min, eta_max, output_dir):
     float
         Peak mean.
     """
-    means = np.array(means)
-    # auto-generate histogram x axis limits using min/max of means + spacer
-    num_bins = 75 if len(means) > 200 else 50
-    hist = ROOT.TH1D('h_mean', '', num_bins, 0.95 * means.min(), 1.05 * means.max())
-    for m in means:
-        hist.Fill(m)
-    # find peak
-    peak_bin = hist.GetMaximumBin()
-    peak = hist.GetBinCenter(peak_bin)
+    means = np.asarray(means)
+    peak, counts, edges = histogram_peak(means)
+    hist = ROOT.TH1D('h_mean', '', len(counts), edges[0], edges[-1])
+    fill_hist(hist, counts)
     # plot
     canv = ROOT.TCanvas('c', '', 600, 600)
     canv.SetTicks(1, 1)
@@ -140,15 +301,10 @@ def plot_find_peak_root(means, eta_min, eta_max, output_dir):
     float
         Peak mean.
     """
-    means = np.array(means)
-    # auto-generate histogram x axis limits using min/max of means + spacer
-    num_bins = 75 if len(means) > 200 else 50
-    hist = ROOT.TH1D('h_mean', '', num_bins, 0.95 * means.min(), 1.05 * means.max())
-    for m in means:
-        hist.Fill(m)
-    # find peak
-    peak_bin = hist.GetMaximumBin()
-    peak = hist.GetBinCenter(peak_bin)
+    means = np.asarray(means)
+    peak, counts, edges = histogram_peak(means)
+    hist = ROOT.TH1D('h_mean', '', len(counts), edges[0], edges[-1])
+    fill_hist(hist, counts)
     # plot
     canv = ROOT.TCanvas('c', '', 600, 600)
     canv.SetTicks(1, 1)
@@ -181,10 +337,10 @@ def plot_find_peak_mpl(means, eta_min, eta_max, output_dir):
     float
         Peak mean.
     """
-    means = np.array(means)
+    means = np.asarray(means)
     print len(means)
     # Plot
-    num_bins = 75 if len(means) > 200 else 50
+    num_bins, _, _ = mean_hist_binning(means)
     n, bins, patches = plt.hist(means, bins=num_bins)
     plt.show()
     # Find peak
@@ -205,6 +361,8 @@ def plot_find_peak_mpl(means, eta_min, eta_max, output_dir):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("input", help="input ROOT filename")
+    parser.add_argument("--bootstrap", type=int, default=0,
+                        help="Number of bootstrap samples to estimate the uncertainty on each peak")
     args = parser.parse_args()
 
-    process_file(args.input)
+    process_file(args.input, n_bootstrap=args.bootstrap)
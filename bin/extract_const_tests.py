@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""Unit tests for the subgraph & jackknife means used for constant fits"""
+
+
+import extract_const as ec
+import unittest
+import numpy as np
+
+
+def loop_subgraph_means(yarr):
+    """Mean of every contiguous subgraph, by looping over start & end points"""
+    end = len(yarr)
+    means = []
+    while end > 0:
+        start = 0
+        while start < end:
+            means.append(yarr[start:end].mean())
+            start += 1
+        end -= 1
+    return np.array(means)
+
+
+def delete_jackknife_means(yarr):
+    """Mean of the graph with each point removed in turn"""
+    return np.array([np.delete(yarr, i).mean() for i in range(len(yarr))])
+
+
+class TestExtractConst(unittest.TestCase):
+    def setUp(self):
+        self.yarr = np.array([1.52, 1.31, 1.24, 1.20, 1.18, 1.17, 1.19, 1.16, 1.15, 1.35])
+
+    def test_subgraph_means(self):
+        means = ec.subgraph_means(self.yarr)
+        n = len(self.yarr)
+        self.assertEqual(len(means), n * (n + 1) / 2)
+        self.assertTrue(np.allclose(np.sort(means), np.sort(loop_subgraph_means(self.yarr))))
+
+    def test_subgraph_means_2d(self):
+        yarr2d = np.vstack([self.yarr, self.yarr[::-1], 2 * self.yarr])
+        means = ec.subgraph_means(yarr2d)
+        for row, y in zip(means, yarr2d):
+            self.assertTrue(np.allclose(row, ec.subgraph_means(y)))
+
+    def test_jackknife_means(self):
+        self.assertTrue(np.allclose(ec.jackknife_means(self.yarr), delete_jackknife_means(self.yarr)))
+
+    def test_jackknife_means_too_few_points(self):
+        with self.assertRaises(ValueError):
+            ec.jackknife_means([1.2])
+        with self.assertRaises(ValueError):
+            ec.jackknife_means([])
+
+    def test_histogram_peak(self):
+        means = loop_subgraph_means(self.yarr)
+        peak, counts, edges = ec.histogram_peak(means)
+        self.assertEqual(len(counts), 50)
+        self.assertEqual(counts.sum(), len(means))
+        self.assertAlmostEqual(edges[0], 0.95 * means.min())
+        self.assertAlmostEqual(edges[-1], 1.05 * means.max())
+        peak_bin = counts.argmax()
+        self.assertTrue(edges[peak_bin] < peak < edges[peak_bin + 1])
+        self.assertEqual(counts[peak_bin], np.sum((means >= edges[peak_bin]) & (means < edges[peak_bin + 1])))
+
+    def test_histogram_peaks(self):
+        values = ec.subgraph_means(np.vstack([self.yarr, self.yarr[::-1] + 0.1]))
+        peaks = ec.histogram_peaks(values)
+        for peak, row in zip(peaks, values):
+            self.assertAlmostEqual(peak, ec.histogram_peak(row)[0])
+
+    def test_histogram_peaks_constant_rows(self):
+        values = np.vstack([np.zeros(10), np.full(10, 1.3), loop_subgraph_means(self.yarr)[:10]])
+        peaks = ec.histogram_peaks(values)
+        self.assertFalse(np.any(np.isnan(peaks)))
+        self.assertEqual(peaks[0], 0.)
+        self.assertEqual(peaks[1], 1.3)
+        self.assertAlmostEqual(peaks[2], ec.histogram_peak(values[2])[0])
+        self.assertEqual(ec.histogram_peak(values[0])[0], 0.)
+        self.assertEqual(ec.histogram_peak(values[1])[0], 1.3)
+
+    def test_bootstrap_subgraph_peaks(self):
+        peaks = ec.bootstrap_subgraph_peaks(self.yarr, n_samples=20, seed=3)
+        self.assertEqual(peaks.shape, (20,))
+        self.assertTrue(np.array_equal(peaks, ec.bootstrap_subgraph_peaks(self.yarr, n_samples=20, seed=3)))
+        # each sample is the peak of the subgraph means of the resampled graph
+        rng = np.random.RandomState(3)
+        inds = np.sort(rng.randint(0, len(self.yarr), size=(20, len(self.yarr))), axis=1)
+        for peak, sample_inds in zip(peaks, inds):
+            resampled = self.yarr[sample_inds]
+            self.assertAlmostEqual(peak, ec.histogram_peak(loop_subgraph_means(resampled))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+NumPy views of the storage of ROOT histograms & graphs, without copying.
+
+Looping over bins in python with GetBinContent()/SetBinContent() is very slow
+for big hists (e.g. 2048 x 150 bins). Instead, get an array that points at the
+hist's own storage, do vectorised operations on it, and the hist is updated
+in one go. Since they are views, the hist must outlive the arrays.
+
+Hist arrays include the underflow & overflow bins, as in ROOT.
+For 2D hists, the array has shape (nbins_y + 2, nbins_x + 2), and is indexed
+as [ybin, xbin], to match ROOT's storage order. Use inner_bins() to get the
+view without the underflow & overflow bins.
+
+After modifying a hist through its arrays, call reset_stats() so its
+statistics (entries, mean, etc) match the new contents.
+
+Usage:
+
+contents = hist_array(h2d)
+contents[contents < 0] = 0
+reset_stats(h2d)
+"""
+
+
+import ROOT
+import numpy as np
+
+
+# numpy type code for the storage of each hist type
+# (TH1D & TH2D store doubles, TH1F & TH2F floats, etc)
+HIST_DTYPES = [
+    ("TArrayD", 'd'),
+    ("TArrayF", 'f'),
+    ("TArrayI", 'i'),
+    ("TArrayS", 'h'),
+    ("TArrayC", 'b'),
+]
+
+
+def get_hist_dtype(hist):
+    """Get numpy dtype of bin contents storage for a hist"""
+    for array_class, dtype in HIST_DTYPES:
+        if hist.InheritsFrom(array_class):
+            return np.dtype(dtype)
+    raise TypeError("Unknown storage type for %s (%s)" % (hist.GetName(), hist.ClassName()))
+
+
+def get_hist_shape(hist):
+    """Shape of hist storage, including underflow & overflow bins, in ROOT storage order"""
+    shape = [hist.GetNbinsX() + 2]
+    if hist.GetDimension() > 1:
+        shape.insert(0, hist.GetNbinsY() + 2)
+    if hist.GetDimension() > 2:
+        shape.insert(0, hist.GetNbinsZ() + 2)
+    return tuple(shape)
+
+
+def _view(buf, shape, dtype):
+    """Make numpy array that uses buf as its memory"""
+    size = int(np.prod(shape))
+    if size == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.ndarray(shape, dtype, buf)
+
+
+def hist_array(hist):
+    """Get numpy view of bin contents, including underflow & overflow bins.
+
+    For TProfiles, this is the sum of y in each bin, not the mean.
+    """
+    return _view(hist.GetArray(), get_hist_shape(hist), get_hist_dtype(hist))
+
+
+def hist_sumw2_array(hist):
+    """Get numpy view of the sum of weights^2 in each bin (i.e. bin error^2).
+
+    If the hist doesn't store these yet, they are made first with Sumw2(),
+    from the bin contents as ROOT does.
+    """
+    if hist.GetSumw2N() == 0:
+        hist.Sumw2()
+    return _view(hist.GetSumw2().GetArray(), get_hist_shape(hist), np.float64)
+
+
+def inner_bins(arr):
+    """Get view of array from hist_array() without the underflow & overflow bins"""
+    return arr[(slice(1, -1),) * arr.ndim]
+
+
+def reset_stats(hist):
+    """Recalculate hist statistics from the bin contents, after changing them in bulk"""
+    hist.ResetStats()
+
+
+def hist_bin_contents(hist):
+    """Get copy of the bin contents of a 1D hist, without underflow & overflow, as float64"""
+    return inner_bins(hist_array(hist)).astype(np.float64)
+
+
+def graph_arrays(graph):
+    """Get numpy views of the x & y points of a graph"""
+    n = graph.GetN()
+    return _view(graph.GetX(), (n,), np.float64), _view(graph.GetY(), (n,), np.float64)
+
+
+def graph_error_arrays(graph):
+    """Get numpy views of the x & y errors of a TGraphErrors"""
+    n = graph.GetN()
+    return _view(graph.GetEX(), (n,), np.float64), _view(graph.GetEY(), (n,), np.float64)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+"""Unit tests for NumPy views of ROOT hists & graphs"""
+
+
+import ROOT
+import hist_arrays as ha
+import common_utils as cu
+import unittest
+import numpy as np
+
+
+ROOT.TH1.SetDefaultSumw2(True)
+
+
+class TestHistArrays(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.h1 = ROOT.TH1F("h1_test", "", 20, 0, 10)
+        for x in rng.normal(5, 2, 1000):
+            self.h1.Fill(x)
+        self.h2 = ROOT.TH2D("h2_test", "", 30, 0, 300, 20, 0, 2)
+        for x, y in zip(rng.exponential(50, 5000), rng.normal(1, 0.2, 5000)):
+            self.h2.Fill(x, y)
+
+    def tearDown(self):
+        self.h1.Delete()
+        self.h2.Delete()
+
+    def test_1d_contents(self):
+        arr = ha.hist_array(self.h1)
+        self.assertEqual(arr.dtype, np.float32)
+        self.assertEqual(arr.shape, (22,))
+        for i in range(22):
+            self.assertEqual(arr[i], self.h1.GetBinContent(i))
+        contents = ha.hist_bin_contents(self.h1)
+        self.assertEqual(len(contents), 20)
+        self.assertEqual(contents[0], self.h1.GetBinContent(1))
+
+    def test_2d_contents_order(self):
+        arr = ha.hist_array(self.h2)
+        self.assertEqual(arr.shape, (22, 32))
+        for i, j in [(1, 1), (5, 10), (30, 20), (0, 3), (31, 21)]:
+            self.assertEqual(arr[j, i], self.h2.GetBinContent(i, j))
+
+    def test_view_writes_back(self):
+        arr = ha.hist_array(self.h2)
+        arr[3, 4] = 123.
+        self.assertEqual(self.h2.GetBinContent(4, 3), 123.)
+        errors_sq = ha.hist_sumw2_array(self.h2)
+        errors_sq[3, 4] = 16.
+        self.assertAlmostEqual(self.h2.GetBinError(4, 3), 4.)
+
+    def test_graph_arrays(self):
+        gr = ROOT.TGraphErrors(3)
+        for i in range(3):
+            gr.SetPoint(i, i, 2 * i)
+            gr.SetPointError(i, 0.1 * i, 0.2 * i)
+        x, y = ha.graph_arrays(gr)
+        ex, ey = ha.graph_error_arrays(gr)
+        self.assertTrue(np.allclose(x, [0, 1, 2]))
+        self.assertTrue(np.allclose(y, [0, 2, 4]))
+        self.assertTrue(np.allclose(ex, [0, 0.1, 0.2]))
+        self.assertTrue(np.allclose(ey, [0, 0.2, 0.4]))
+
+    def check_norm_vertical_bins(self, rescale_peaks):
+        hnew = cu.norm_vertical_bins(self.h2, rescale_peaks=rescale_peaks)
+        nx, ny = self.h2.GetNbinsX(), self.h2.GetNbinsY()
+        peaks = []
+        for i in range(1, nx + 1):
+            y_int = sum(self.h2.GetBinContent(i, j) for j in range(1, ny + 1))
+            if y_int <= 0:
+                continue
+            peaks.append(max(hnew.GetBinContent(i, j) for j in range(1, ny + 1)))
+            total = sum(hnew.GetBinContent(i, j) for j in range(1, ny + 1))
+            for j in range(1, ny + 1):
+                if self.h2.GetBinContent(i, j) > 0:
+                    # errors scale the same as the contents
+                    self.assertAlmostEqual(hnew.GetBinError(i, j) / hnew.GetBinContent(i, j),
+                                           self.h2.GetBinError(i, j) / self.h2.GetBinContent(i, j))
+            if not rescale_peaks:
+                self.assertAlmostEqual(total, 1.)
+        return peaks
+
+    def test_norm_vertical_bins(self):
+        self.check_norm_vertical_bins(rescale_peaks=False)
+
+    def test_norm_vertical_bins_rescale_peaks(self):
+        peaks = self.check_norm_vertical_bins(rescale_peaks=True)
+        self.assertTrue(np.allclose(peaks, peaks[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
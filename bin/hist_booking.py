@@ -0,0 +1,129 @@
+"""
+Book histograms with explicit storage, rather than whatever TTree::Draw()
+and TH1.SetDefaultSumw2(True) give.
+
+Each hist is booked with:
+
+- storage: "float" (TH1F/TH2F, 4 bytes per bin) or "double" (TH1D/TH2D,
+  8 bytes per bin). Float is fine for counts up to 2^24 per bin, so is used
+  for the big 2D hists, where most bins have few entries.
+- sumw2: whether to store the sum of weights^2 per bin (another 8 bytes per
+  bin). Only needed if the hist is filled with weights other than 1, since
+  otherwise the bin error is sqrt(content) anyway.
+
+e.g. a 2048 x 2048 TH2F without Sumw2 is 16 MB, rather than 50 MB for the
+TH2F with Sumw2 that TTree::Draw() makes.
+
+The hists are not attached to any directory. Pass them to a DrawRequest
+(see pairs_dataset.py) to fill them.
+
+Note that sparse storage (THnSparse) is not offered, since TTree::Draw()
+can only fill TH1-derived hists.
+
+HistStore owns the hists made for one unit of work (e.g. one eta bin),
+so they can be freed as soon as they are written, rather than piling up
+in gROOT or the output file until the end of the job.
+
+Usage:
+
+h2d = book_hist("h2d_gen_l1", ";p_{T}^{Ref};p_{T}^{L1}", (2048, 0, 1024), (2048, 0, 1024))
+pairs.draw("pt:ptRef>>h2d_gen_l1", cut, hist=h2d)
+
+store = HistStore()
+hrsp = store.adopt(h2d.ProjectionY("hrsp", 1, 10))
+store.write(output_dir, hrsp, free=True)
+...
+store.free()
+"""
+
+
+import ROOT
+from hist_arrays import get_hist_dtype
+
+
+HIST_CLASSES = {
+    ("float", 1): ROOT.TH1F,
+    ("float", 2): ROOT.TH2F,
+    ("double", 1): ROOT.TH1D,
+    ("double", 2): ROOT.TH2D,
+}
+
+
+def book_hist(name, title, xbinning, ybinning=None, storage="float", sumw2=False):
+    """Make a new 1D or 2D hist with the chosen storage.
+
+    Parameters
+    ----------
+    name, title : str
+        Hist name & title
+    xbinning, ybinning : (int, float, float)
+        (nbins, min, max) for each axis. If ybinning is None, a 1D hist is made.
+    storage : str, optional
+        "float" or "double"
+    sumw2 : bool, optional
+        Whether to store the sum of weights^2. Use if filling with weights.
+
+    Returns
+    -------
+    ROOT.TH1
+        New hist, not attached to any directory.
+    """
+    ndim = 1 if ybinning is None else 2
+    if (storage, ndim) not in HIST_CLASSES:
+        raise ValueError("Unknown hist storage %s, should be float or double" % storage)
+    binning = list(xbinning) + (list(ybinning) if ybinning else [])
+    hist = HIST_CLASSES[(storage, ndim)](name, title, *binning)
+    hist.SetDirectory(0)
+    # undo TH1.SetDefaultSumw2(True)
+    hist.Sumw2(sumw2)
+    return hist
+
+
+def get_hist_memory(hist):
+    """Get approximate memory (bytes) used by the bins of a hist, including Sumw2."""
+    n_cells = hist.GetNcells()
+    return n_cells * (get_hist_dtype(hist).itemsize + (8 if hist.GetSumw2N() > 0 else 0))
+
+
+class HistStore(object):
+    """Owns ROOT objects, detached from any TDirectory, until they are freed.
+
+    Since nothing is left in a TDirectory, ROOT's lookups by name (e.g. in
+    ProjectionX/Y, which reuse an existing hist with the same name) never
+    find a stale object from a previous eta bin.
+    """
+
+    def __init__(self):
+        self.objects = []
+
+    def book(self, *args, **kwargs):
+        """Book a new hist, see book_hist() for arguments."""
+        return self.adopt(book_hist(*args, **kwargs))
+
+    def adopt(self, obj):
+        """Take ownership of an object made elsewhere, e.g. a projection,
+        clone, or hist from PairsDataset.draw_many(). Returns obj."""
+        if hasattr(obj, "SetDirectory"):
+            obj.SetDirectory(0)
+        self.objects.append(obj)
+        return obj
+
+    def write(self, tdir, obj, free=False):
+        """Write obj to a TDirectory, optionally freeing it afterwards."""
+        tdir.WriteTObject(obj)
+        if free:
+            self.free(obj)
+
+    def free(self, *objs):
+        """Delete the given objects, or all owned objects if none are given.
+        They must not be used afterwards."""
+        to_free = objs or self.objects
+        ids = set(id(obj) for obj in to_free)
+        for obj in to_free:
+            # python must not delete it again
+            ROOT.SetOwnership(obj, False)
+            obj.Delete()
+        self.objects = [obj for obj in self.objects if id(obj) not in ids]
+
+    def __len__(self):
+        return len(self.objects)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""Unit tests for hist booking & ownership"""
+
+
+import ROOT
+import hist_booking as hb
+import unittest
+
+
+ROOT.TH1.SetDefaultSumw2(True)
+
+
+class TestBookHist(unittest.TestCase):
+    def test_storage(self):
+        h1 = hb.book_hist("h1_book_test", "", (10, 0, 10), storage="double")
+        self.assertEqual(h1.ClassName(), "TH1D")
+        h2 = hb.book_hist("h2_book_test", "", (10, 0, 10), (5, 0, 5))
+        self.assertEqual(h2.ClassName(), "TH2F")
+        self.assertRaises(ValueError, hb.book_hist, "h_bad", "", (10, 0, 10), storage="int")
+
+    def test_sumw2(self):
+        h = hb.book_hist("h_nosumw2_test", "", (10, 0, 10))
+        self.assertEqual(h.GetSumw2N(), 0)
+        self.assertEqual(hb.get_hist_memory(h), 12 * 4)
+        h = hb.book_hist("h_sumw2_test", "", (10, 0, 10), sumw2=True)
+        self.assertEqual(h.GetSumw2N(), 12)
+        self.assertEqual(hb.get_hist_memory(h), 12 * (4 + 8))
+
+    def test_detached(self):
+        h = hb.book_hist("h_detached_test", "", (10, 0, 10))
+        self.assertFalse(h.GetDirectory())
+        self.assertFalse(ROOT.gROOT.FindObject("h_detached_test"))
+
+
+class TestHistStore(unittest.TestCase):
+    def test_adopt_detaches(self):
+        store = hb.HistStore()
+        h2 = store.book("h2_store_test", "", (10, 0, 10), (10, 0, 10))
+        h2.Fill(1, 1)
+        ROOT.gROOT.cd()
+        proj = store.adopt(h2.ProjectionY("h_proj_store_test"))
+        self.assertFalse(proj.GetDirectory())
+        self.assertFalse(ROOT.gROOT.FindObject("h_proj_store_test"))
+        self.assertEqual(len(store), 2)
+        store.free()
+        self.assertEqual(len(store), 0)
+
+    def test_write_free(self):
+        store = hb.HistStore()
+        h = store.book("h_write_store_test", "", (10, 0, 10))
+        h.Fill(5)
+        tfile = ROOT.TMemFile("hist_booking_test.root", "RECREATE")
+        store.write(tfile, h, free=True)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(tfile.Get("h_write_store_test").GetEntries(), 1)
+        tfile.Close()
+
+
+if __name__ == '__main__':
+    unittest.main()
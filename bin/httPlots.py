@@ -356,25 +356,31 @@ def make_htt_plots(input_filename, output_dir):
         os.makedirs(output_dir)
 
     f = cu.open_root_file(input_filename)
-    tree = cu.get_from_file(f, "valid")
+    tree = cu.get_pairs_tree(f)
 
     common_cut = COMMON_CUT
-    norm_cut = '1./nMatches'  # normalisation, for event-level quantities, since we store it for each match in an event
-    if common_cut != '':
-        norm_cut += ' && %s' % common_cut
+    if cu.exists_in_file(f, "events"):
+        # normalised layout: event-level quantities are stored once per event
+        event_tree = cu.get_from_file(f, "events")
+        norm_cut = common_cut
+    else:
+        event_tree = tree
+        norm_cut = '1./nMatches'  # normalisation, for event-level quantities, since we store it for each match in an event
+        if common_cut != '':
+            norm_cut += ' && %s' % common_cut
 
-    do_htt_plots(tree, output_dir, norm_cut)
+    do_htt_plots(event_tree, output_dir, norm_cut)
 
-    do_mht_plots(tree, output_dir, norm_cut)
+    do_mht_plots(event_tree, output_dir, norm_cut)
 
     # Do plots where y axis is some variable of interest
     do_dr_plots(tree, output_dir, common_cut)
 
     do_rsp_plots(tree, output_dir, common_cut)
 
-    do_nvtx_plots(tree, output_dir, norm_cut)
+    do_nvtx_plots(event_tree, output_dir, norm_cut)
 
-    do_njets_plots(tree, output_dir, norm_cut)
+    do_njets_plots(event_tree, output_dir, norm_cut)
 
     do_jet_pt_plots(tree, output_dir, common_cut)
 
@@ -522,6 +528,9 @@ def do_rsp_plots(tree, output_dir, cut=''):
         make_2d_plot(tree, 'httRef', HTT_REF_STR, NB_HTT, HTT_MIN, HTT_MAX, 'rsp', RSP_STR, NB_RSP, RSP_MIN, RSP_MAX,
                      os.path.join(output_dir, 'rsp_httRef.pdf'), logz=logz, normx=normx,
                      cut=cut, title=TITLE, horizontal_line=True)
+        make_2d_plot(tree, 'rsp', RSP_STR, 50, RSP_MIN, RSP_MAX, 'numPUVertices', NVTX_STR, 20, 0, 20,
+                     os.path.join(output_dir, 'nvtx_rsp.pdf'), logz=logz, normx=normx,
+                     cut=cut, title=TITLE)
         make_2d_plot(tree, 'httL1/httRef', HTT_RATIO_STR, NB_HTT_RATIO, HTT_RATIO_MIN, HTT_RATIO_MAX,
                      'rsp', RSP_STR, NB_RSP, RSP_MIN, RSP_MAX,
                      os.path.join(output_dir, 'rsp_httRatio.pdf'), logz=logz, normx=normx,
@@ -562,9 +571,6 @@ def do_nvtx_plots(tree, output_dir, cut=''):
         make_2d_plot(tree, 'httRef', HTT_REF_STR, NB_HTT, HTT_MIN, HTT_MAX, 'numPUVertices', NVTX_STR, 20, 0, 20,
                      os.path.join(output_dir, 'nvtx_httRef.pdf'), logz=logz, normx=normx,
                      cut=cut, title=TITLE)
-        make_2d_plot(tree, 'rsp', RSP_STR, 50, RSP_MIN, RSP_MAX, 'numPUVertices', NVTX_STR, 20, 0, 20,
-                     os.path.join(output_dir, 'nvtx_rsp.pdf'), logz=logz, normx=normx,
-                     cut=cut, title=TITLE)
         make_2d_plot(tree, 'httL1/httRef', HTT_RATIO_STR, NB_HTT_RATIO, HTT_RATIO_MIN, HTT_RATIO_MAX, 'numPUVertices', NVTX_STR, 20, 0, 20,
                      os.path.join(output_dir, 'nvtx_httRatio.pdf'), logz=logz, normx=normx,
                      cut=cut, title=TITLE)
@@ -21,6 +21,9 @@ This is done in bins of pT(L1). Stored as `resL1_<eta_min>_<eta_max>_diff`.
 This is done in bins of pT(Ref). Stored as `resRefRef_<eta_min>_<eta_max>_diff`.
 This is the correct one for performance plots, and is the one used by `showoffPlots.py`.
 
+The input can also be a glob pattern or manifest of pairs files, which are
+used without hadd-ing them (see pairs_dataset.py).
+
 Usage:
 
 python makeResolutionPlots -h
@@ -37,6 +40,9 @@ import os
 import argparse
 import binning
 from binning import pairwise
+from pairs_dataset import PairsDataset, DrawRequest
+from hist_booking import HistStore
+import common_utils as cu
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -51,9 +57,9 @@ ROOT.gStyle.SetOptStat(1);
 # ROOT.gROOT.ForceStyle();
 
 
-def check_var_stored(tree, var):
-    """Check to see if TTree has branch with name var"""
-    return tree.GetListOfBranches().FindObject(var)
+def check_var_stored(pairs, var):
+    """Check to see if pairs have branch with name var"""
+    return pairs.has_branch(var)
 
 def check_fit_mean(fit_res, hist):
     """Check fit ok by comparing means - ASSUMES GAUSSIAN"""
@@ -90,7 +96,8 @@ def plot_bin_fit(res_2d, ptmin, ptmax, hist_title, hist_name, graph, output, div
     pt_width = 0.5 * (ptmax - ptmin)
 
     # Proper:
-    h_pt = res_2d.ProjectionX("pt_%g_%g" % (ptmin, ptmax))
+    store = HistStore()
+    h_pt = store.adopt(res_2d.ProjectionX("pt_%g_%g" % (ptmin, ptmax)))
     h_pt.GetXaxis().SetRangeUser(ptmin, ptmax)
     pt_mid = h_pt.GetMean()
 
@@ -98,7 +105,7 @@ def plot_bin_fit(res_2d, ptmin, ptmax, hist_title, hist_name, graph, output, div
     # Get bin indices corresponding to physical pt values
     bin_low = res_2d.GetXaxis().FindBin(ptmin)
     bin_high = res_2d.GetXaxis().FindBin(ptmax)-1
-    h_res = res_2d.ProjectionY(hist_name, bin_low, bin_high)
+    h_res = store.adopt(res_2d.ProjectionY(hist_name, bin_low, bin_high))
     h_res.SetTitle(hist_title)
 
     if h_res.GetEntries() > 0:
@@ -129,17 +136,15 @@ def plot_bin_fit(res_2d, ptmin, ptmax, hist_title, hist_name, graph, output, div
     else:
         print "0 entries in resolution plot"
     output.WriteTObject(h_res)
+    store.free()
 
 
-def plot_resolution(inputfile, outputfile, ptBins, absetamin, absetamax):
+def plot_resolution(pairs, outputfile, ptBins, absetamin, absetamax):
     """Do various resolution plots for given eta bin, for all pT bins"""
 
     print "Doing eta bin: %g - %g" % (absetamin, absetamax)
     print "Doing pt bins:", ptBins
 
-    # Input tree
-    tree_raw = inputfile.Get("valid")
-
     # Output folders
     output_f = outputfile.mkdir('eta_%g_%g' % (absetamin, absetamax))
     output_f_hists = output_f.mkdir("Histograms")
@@ -165,73 +170,75 @@ def plot_resolution(inputfile, outputfile, ptBins, absetamin, absetamax):
 
     # Ref jet pt from tree - old ones don't store ptRef, so construct from pt/rsp
     # - or should it be pt * rsp for old style rsp?
-    ptRef = "ptRef" if check_var_stored(tree_raw, "ptRef") else "(pt/rsp)"
+    ptRef = "ptRef" if check_var_stored(pairs, "ptRef") else "(pt/rsp)"
 
     # 1D plot of ptDifference
     # tree_raw.Draw("ptDiff>>ptDiff(%d, %g, %g)" % (nbins_diff, diff_min, diff_max), eta_cut + "&&" + pt_cut_all)
     # ptDiff = ROOT.gROOT.FindObject("ptDiff")
 
-    # 2d plots of pt difference vs L1 pt
-    var = "ptDiff" if check_var_stored(tree_raw, "ptDiff") else "(pt-%s)" % ptRef
-    tree_raw.Draw("%s:pt>>ptDiff_l1_2d(%d, %g, %g, %d, %g, %g)" % (var, nbins_et, pt_bin_min, pt_bin_max, nbins_diff, diff_min, diff_max), eta_cut + "&&" + pt_cut_all)
-    ptDiff_l1_2d = ROOT.gROOT.FindObject("ptDiff_l1_2d")
+    var_diff = "ptDiff" if check_var_stored(pairs, "ptDiff") else "(pt-%s)" % ptRef
+    var_res_l1 = "resL1" if check_var_stored(pairs, "resL1") else "(pt-%s)/pt" % (ptRef)  # for old pair files
+    var_res_ref = "resRef" if check_var_stored(pairs, "resRef") else "(pt-%s)/%s" % (ptRef, ptRef)
+
+    res_min = -5
+    res_max = 2
+    nbins_res = 210
+    res_ref_min = -2
+    nbins_res_ref = 120
+
+    # Draw all the 2D plots in one pass over the pairs:
+    # - pt difference vs L1 pt
+    # - pt difference vs ref pt
+    # - L1-Ref/L1 VS L1
+    # - L1-Ref/Ref VS L1
+    # - L1-Ref/Ref VS Ref
+    cut = eta_cut + "&&" + pt_cut_all
+    store = HistStore()
+    eta_range = dict(absetamin=absetamin, absetamax=absetamax)
+    ptDiff_l1_2d, ptDiff_ref_2d, res_l1_2d, res_refVsl1_2d, res_refVsref_2d = map(store.adopt, pairs.draw_many([
+        DrawRequest("%s:pt>>ptDiff_l1_2d(%d, %g, %g, %d, %g, %g)" % (var_diff, nbins_et, pt_bin_min, pt_bin_max, nbins_diff, diff_min, diff_max), cut, **eta_range),
+        DrawRequest("%s:%s>>ptDiff_ref_2d(%d, %g, %g, %d, %g, %g)" % (var_diff, ptRef, nbins_et, pt_bin_min, pt_bin_max, nbins_diff, diff_min, diff_max), cut, **eta_range),
+        DrawRequest("%s:pt>>res_l1_2d(%d, %g, %g, %d, %g, %g)" % (var_res_l1, nbins_et, pt_bin_min, pt_bin_max, nbins_res, res_min, res_max), cut, **eta_range),
+        DrawRequest("%s:pt>>res_refVsl1_2d(%d, %g, %g, %d, %g, %g)" % (var_res_ref, nbins_et, pt_bin_min, pt_bin_max, nbins_res_ref, res_ref_min, res_max), cut, **eta_range),
+        DrawRequest("%s:%s>>res_refVsref_2d(%d, %g, %g, %d, %g, %g)" % (var_res_ref, ptRef, nbins_et, pt_bin_min, pt_bin_max, nbins_res_ref, res_ref_min, res_max), cut, **eta_range)
+    ]))
+
     ptDiff_l1_2d.SetTitle("%s;E_{T}^{L1} [GeV];E_{T}^{L1} - E_{T}^{Ref} [GeV]" % title)
     output_f_hists.WriteTObject(ptDiff_l1_2d)
 
     # 1D plot of ptDiff
-    ptDiff = ptDiff_l1_2d.ProjectionY("ptDiff")
+    ptDiff = store.adopt(ptDiff_l1_2d.ProjectionY("ptDiff"))
     ptDiff.SetTitle(";E_{T}^{L1} - E_{T}^{Ref} [GeV];N")
     fit_res = ptDiff.Fit("gaus", "QESR", "R", ptDiff.GetMean() - 1. * ptDiff.GetRMS(), ptDiff.GetMean() + 1. * ptDiff.GetRMS())
-    output_f_hists.WriteTObject(ptDiff)
+    store.write(output_f_hists, ptDiff, free=True)
 
     # 1D plot of L1 pt
-    ptL1 = ptDiff_l1_2d.ProjectionX("pt")
+    ptL1 = store.adopt(ptDiff_l1_2d.ProjectionX("pt"))
     ptL1.SetTitle(";E_{T}^{L1}[GeV];N")
     fit_res = ptL1.Fit("gaus", "QESR", "R", ptL1.GetMean() - 1. * ptL1.GetRMS(), ptL1.GetMean() + 1. * ptL1.GetRMS())
-    output_f_hists.WriteTObject(ptL1)
+    store.write(output_f_hists, ptL1, free=True)
 
-    # 2d plots of pt difference vs ref pt
-    tree_raw.Draw("%s:%s>>ptDiff_ref_2d(%d, %g, %g, %d, %g, %g)" % (var, ptRef, nbins_et, pt_bin_min, pt_bin_max, nbins_diff, diff_min, diff_max), eta_cut + "&&" + pt_cut_all)
-    ptDiff_ref_2d = ROOT.gROOT.FindObject("ptDiff_ref_2d")
     ptDiff_ref_2d.SetTitle("%s;E_{T}^{Ref} [GeV];E_{T}^{L1} - E_{T}^{Ref} [GeV]" % title)
     output_f_hists.WriteTObject(ptDiff_ref_2d)
 
-    res_min = -5
-    res_max = 2
-    nbins_res = 210
-
-    # 2D plot of L1-Ref/L1 VS L1
-    var = "resL1" if check_var_stored(tree_raw, "resL1") else "(pt-%s)/pt" % (ptRef)  # for old pair files
-    tree_raw.Draw("%s:pt>>res_l1_2d(%d, %g, %g, %d, %g, %g)" % (var, nbins_et, pt_bin_min, pt_bin_max, nbins_res, res_min, res_max), eta_cut + "&&" + pt_cut_all)
-    res_l1_2d = ROOT.gROOT.FindObject("res_l1_2d")
     res_l1_2d.SetTitle("%s;E_{T}^{L1} [GeV];(E_{T}^{L1} - E_{T}^{Ref})/E_{T}^{L1}" % title)
     output_f_hists.WriteTObject(res_l1_2d)
 
     # 1D plot of L1-ref/L1
-    res_l1 = res_l1_2d.ProjectionY("res_l1")
+    res_l1 = store.adopt(res_l1_2d.ProjectionY("res_l1"))
     res_l1.SetTitle(";E_{T}^{L1} - E_{T}^{Ref}/E_{T}^{L1};N")
     fit_res = res_l1.Fit("gaus", "QESR", "R", res_l1.GetMean() - 1. * res_l1.GetRMS(), res_l1.GetMean() + 1. * res_l1.GetRMS())
-    output_f_hists.WriteTObject(res_l1)
-
-    # 2D plot of L1-Ref/Ref VS L1
-    var = "resRef" if check_var_stored(tree_raw, "resRef") else "(pt-%s)/%s" % (ptRef, ptRef)
-    res_min = -2
-    nbins_res = 120
-    tree_raw.Draw("%s:pt>>res_refVsl1_2d(%d, %g, %g, %d, %g, %g)" % (var, nbins_et, pt_bin_min, pt_bin_max, nbins_res, res_min, res_max), eta_cut + "&&" + pt_cut_all)
-    res_refVsl1_2d = ROOT.gROOT.FindObject("res_refVsl1_2d")
+    store.write(output_f_hists, res_l1, free=True)
+
     res_refVsl1_2d.SetTitle("%s;E_{T}^{L1} [GeV];(E_{T}^{L1} - E_{T}^{Ref})/E_{T}^{Ref}" % title)
     output_f_hists.WriteTObject(res_refVsl1_2d)
 
     # 1D plot of L1-ref/ref
-    res_ref = res_refVsl1_2d.ProjectionY("res_ref")
+    res_ref = store.adopt(res_refVsl1_2d.ProjectionY("res_ref"))
     res_ref.SetTitle(";E_{T}^{L1} - E_{T}^{Ref}/E_{T}^{L1};N")
     fit_res = res_ref.Fit("gaus", "QESR", "R", res_ref.GetMean() - 1. * res_ref.GetRMS(), res_ref.GetMean() + 1. * res_ref.GetRMS())
-    output_f_hists.WriteTObject(res_ref)
+    store.write(output_f_hists, res_ref, free=True)
 
-    # 2D plot of L1-Ref/Ref VS Ref
-    var = "resRef" if check_var_stored(tree_raw, "resRef") else "(pt-%s)/%s" % (ptRef, ptRef)
-    tree_raw.Draw("%s:%s>>res_refVsref_2d(%d, %g, %g, %d, %g, %g)" % (var, ptRef, nbins_et, pt_bin_min, pt_bin_max, nbins_res, res_min, res_max), eta_cut + "&&" + pt_cut_all)
-    res_refVsref_2d = ROOT.gROOT.FindObject("res_refVsref_2d")
     res_refVsref_2d.SetTitle("%s;E_{T}^{Ref} [GeV];(E_{T}^{L1} - E_{T}^{Ref})/E_{T}^{Ref}" % title)
     output_f_hists.WriteTObject(res_refVsref_2d)
 
@@ -295,13 +302,14 @@ def plot_resolution(inputfile, outputfile, ptBins, absetamin, absetamax):
     output_f.WriteTObject(res_graph_refVsl1)
     output_f.WriteTObject(res_graph_refVsref)
     output_f.WriteTObject(res_graph_refVsref_diff)
+    store.free()
 
 
 ########### MAIN ########################
 def main(in_args=sys.argv[1:]):
     print in_args
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("input", help="input ROOT filename")
+    parser.add_argument("input", help="input ROOT filename, or glob pattern/manifest of pairs files")
     parser.add_argument("output", help="output ROOT filename")
     parser.add_argument("--incl", action="store_true", help="Do inclusive eta plots")
     parser.add_argument("--excl", action="store_true", help="Do exclusive eta plots")
@@ -315,14 +323,16 @@ def main(in_args=sys.argv[1:]):
                         "This overrides --central/--forward. " \
                         "Handy for batch mode. " \
                         "IMPORTANT: MUST PUT AT VERY END")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of processes to use for filling hists from several pairs files")
     args = parser.parse_args(args=in_args)
 
-    inputf = ROOT.TFile(args.input, "READ")
+    pairs = PairsDataset(args.input, n_jobs=args.jobs)
     outputf = ROOT.TFile(args.output, "RECREATE")
     print "Reading from", args.input
     print "Writing to", args.output
 
-    if not inputf or not outputf:
+    if not outputf:
         raise Exception("Couldn't open input or output files")
 
     # Setup eta bins
@@ -349,20 +359,21 @@ def main(in_args=sys.argv[1:]):
             # ptBins = binning.pt_bins_8 if not forward_bin else binning.pt_bins_8_wide
             ptBins = binning.pt_bins if not forward_bin else binning.pt_bins_wide
 
-            plot_resolution(inputf, outputf, ptBins[4:], eta_min, eta_max)
+            plot_resolution(pairs, outputf, ptBins[4:], eta_min, eta_max)
+            cu.print_memory_usage("eta bin %g - %g" % (eta_min, eta_max))
 
     # Do plots for inclusive eta
     # Skip if doing exlcusive and only 2 bins, or if only 1 bin
     if args.incl and ((not args.excl and len(etaBins) >= 2) or (args.excl and len(etaBins)>2)):
         print "Doing inclusive eta"
         # ptBins = binning.pt_bins if not etaBins[0] > 2.9 else binning.pt_bins_wide
-        plot_resolution(inputf, outputf, binning.pt_bins[4:], etaBins[0], etaBins[-1])
+        plot_resolution(pairs, outputf, binning.pt_bins[4:], etaBins[0], etaBins[-1])
+        cu.print_memory_usage("inclusive eta bin %g - %g" % (etaBins[0], etaBins[-1]))
 
     if not args.incl and not args.excl:
         print "Not doing inclusive or exclusive - you must specify at least one!"
         return 1
 
-    inputf.Close()
     outputf.Close()
     return 0
 
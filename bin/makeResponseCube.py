@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Make the fine-grained response cube for a pairs file (see response_cube.py),
+and compare the |eta| & pt binning schemes in binning.py with it, without
+re-running over the pairs.
+
+The cube is made once, with the same PU & saturation cuts as runCalibration.py,
+and stored next to the pairs file. Later runs reuse it, unless the pairs
+file has changed.
+
+For each |eta| bin of the chosen schemes, prints the number of pairs, the
+mean response, and how many pt bins have too few pairs to fit.
+
+Usage:
+
+$ python makeResponseCube.py pairs.root --list
+$ python makeResponseCube.py pairs.root --etaScheme _etaBinsAllTT --ptScheme pt_bins_stage2
+$ python makeResponseCube.py pairs.root --etaScheme _etaBinsSel16 _etaBinsVersion2 --minPairs 200
+"""
+
+
+import sys
+import argparse
+import numpy as np
+import binning
+import response_cube as rc
+from pair_columns import load_pair_columns
+
+
+def get_cube(pairs_filename, pt_var, pu_min, pu_max, force=False):
+    """Load the cube for the pairs file if it's up to date, otherwise make & save it"""
+    # cubes with PU cuts are stored separately to the one for all pairs
+    label = "" if (pu_min, pu_max) == (-100, 1200) else "_PU%g_%g" % (pu_min, pu_max)
+    cube_filename = rc.generate_cube_filename(pairs_filename, pt_var, label)
+    cube = None if force else rc.load_response_cube(cube_filename, pairs_filename)
+    if cube is not None:
+        print "Using response cube", cube_filename
+        return cube
+    columns = load_pair_columns(pairs_filename, rc.CUBE_BRANCHES + ["numPUVertices"])
+    # same cuts as runCalibration.py
+    mask = ((columns['numPUVertices'] >= pu_min) & (columns['numPUVertices'] <= pu_max) &
+            (columns['pt'] < 1023.1))
+    cube = rc.make_response_cube(columns, pt_var=pt_var, mask=mask)
+    try:
+        rc.save_response_cube(cube, cube_filename, pairs_filename)
+        print "Saved response cube to", cube_filename
+    except IOError as e:
+        print "Cannot save response cube to %s: %s" % (cube_filename, e)
+    return cube
+
+
+def print_scheme_summary(cube, eta_scheme, pt_scheme, min_pairs):
+    """Print pairs & mean response per |eta| bin, for the cube rebinned to the schemes"""
+    coarse = cube.rebin(binning.eta_bin_schemes[eta_scheme], binning.pt_bin_schemes[pt_scheme])
+    n = coarse.sum("n")
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_rsp = np.where(n.sum(axis=1) > 0, coarse.sum("rsp").sum(axis=1) / n.sum(axis=1), np.nan)
+    print ""
+    print "%s x %s (%s): %d |eta| bins, %d pt bins" % (eta_scheme, pt_scheme, cube.pt_var,
+                                                        n.shape[0], n.shape[1])
+    print "%15s %10s %8s %10s %12s" % ("|eta|", "nPairs", "<rsp>", "min/ptBin", "nLow (<%d)" % min_pairs)
+    for i, (eta_min, eta_max) in enumerate(binning.pairwise(coarse.eta_edges)):
+        print "%6.3f - %-6.3f %10d %8.3f %10d %12d" % (eta_min, eta_max, n[i].sum(), mean_rsp[i],
+                                                        n[i].min(), np.sum(n[i] < min_pairs))
+
+
+def main(in_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("input",
+                        help="Input ROOT file with matched pairs from RunMatcher")
+    parser.add_argument("--ptVar", choices=["ptRef", "pt"], default="ptRef",
+                        help="Quantity to bin in pt: ptRef for runCalibration.py, pt for checkCalibration.py")
+    parser.add_argument("--etaScheme", nargs="+", choices=binning.eta_bin_schemes.keys(),
+                        default=[binning.eta_bins_label],
+                        help="|eta| binning scheme(s) from binning.py")
+    parser.add_argument("--ptScheme", nargs="+", choices=binning.pt_bin_schemes.keys(),
+                        default=["pt_bins_stage2"],
+                        help="pt binning scheme(s) from binning.py")
+    parser.add_argument("--minPairs", type=int, default=100,
+                        help="Count pt bins with fewer pairs than this")
+    parser.add_argument("--PUmin", type=float, default=-100,
+                        help="Minimum number of PU vertices (refers to *actual* " \
+                        "number of PU vertices in the event, not the more " \
+                        "accurate trueNumInteractions)")
+    parser.add_argument("--PUmax", type=float, default=1200,
+                        help="Maximum number of PU vertices (refers to *actual* " \
+                        "number of PU vertices in the event, not the more " \
+                        "accurate trueNumInteractions)")
+    parser.add_argument("--force", action='store_true',
+                        help="Remake the cube even if there is an up to date one")
+    parser.add_argument("--list", action='store_true',
+                        help="List the binning schemes & exit")
+    args = parser.parse_args(args=in_args)
+
+    if args.list:
+        for label, edges in binning.eta_bin_schemes.items() + binning.pt_bin_schemes.items():
+            print "%-20s %3d bins, %g - %g" % (label, len(edges) - 1, edges[0], edges[-1])
+        return 0
+
+    cube = get_cube(args.input, args.ptVar, args.PUmin, args.PUmax, force=args.force)
+    for eta_scheme in args.etaScheme:
+        for pt_scheme in args.ptScheme:
+            print_scheme_summary(cube, eta_scheme, pt_scheme, args.minPairs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+Read pair quantities from a pairs file into numpy arrays, with a cache.
+
+Reading columns from the TTree is the slow part of any in-memory analysis of
+the pairs, so the arrays are saved to a sidecar .npz file next to the pairs
+file. The sidecar stores the size & modification time of the pairs file, so
+it is ignored if the pairs file changes. Branches not in the sidecar are read
+from the TTree and added to it.
+
+Pairs files with the normalised layout (RunMatcher --normalised) store
+per-event quantities once per event, in the "events" TTree. These are read &
+cached once per event, and only expanded to one value per pair (using the
+iEvent branch of each pair) when asked for in load_pair_columns().
+
+Usage:
+
+cols = load_pair_columns("pairs.root", ["pt", "eta", "ptRef", "numPUVertices"])
+rsp = cols['pt'] / cols['ptRef']
+events = load_event_columns("pairs.root", ["httL1", "httRef"])
+"""
+
+
+import ROOT
+import os
+import numpy as np
+import common_utils as cu
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+
+
+CACHE_SUFFIX = ".cols.npz"
+
+# key for the pairs file stamp in the sidecar
+STAMP_KEY = "_stamp"
+
+# TTree with per-event quantities in the normalised layout,
+# and the branch in the pairs TTree that holds the entry in it
+EVENTS_TREE_NAME = "events"
+EVENT_INDEX_BRANCH = "iEvent"
+
+# prefix for keys of per-event columns in the sidecar
+EVENT_KEY_PREFIX = "events."
+
+
+def read_tree_columns(tree, branches, cut="", entry_range=None):
+    """Read branches for all entries that pass cut into numpy arrays.
+
+    Branches are read 4 at a time, since that's all TTree::Draw() can store.
+    entry_range is the (nentries, firstentry) to look at, by default all of them.
+
+    Returns
+    -------
+    dict
+        {branch name: numpy.ndarray}, all arrays of float64
+    """
+    tree.SetEstimate(tree.GetEntries() + 1)  # otherwise only the 1st 1M entries are kept
+    if entry_range is None:
+        entry_range = (tree.GetEntries(), 0)
+    columns = {}
+    for i in range(0, len(branches), 4):
+        chunk = branches[i:i + 4]
+        n_entries = tree.Draw(":".join(chunk), cut, "goff", *entry_range)
+        if n_entries <= 0:
+            columns.update({b: np.zeros(0) for b in chunk})
+            continue
+        buffers = [tree.GetV1(), tree.GetV2(), tree.GetV3(), tree.GetV4()]
+        # copy since the TTree reuses its buffers on the next Draw()
+        columns.update({b: np.ndarray(n_entries, 'd', buf).copy() for b, buf in zip(chunk, buffers)})
+    return columns
+
+
+def file_stamp(filename):
+    stat = os.stat(filename)
+    return np.array([stat.st_size, int(stat.st_mtime)])
+
+
+def generate_cache_filename(pairs_filename, cache_dir=None):
+    """Get sidecar filename for pairs file. Stored alongside the pairs file
+    unless cache_dir is specified."""
+    basename = os.path.basename(pairs_filename) + CACHE_SUFFIX
+    if cache_dir:
+        return os.path.join(cache_dir, basename)
+    return os.path.join(os.path.dirname(cu.cleanup_filepath(pairs_filename)), basename)
+
+
+def load_cached_columns(cache_filename, pairs_filename):
+    """Get dict of columns from sidecar file. Returns an empty dict if the
+    sidecar doesn't exist, or is out of date compared to the pairs file."""
+    if not os.path.isfile(cache_filename):
+        return {}
+    with np.load(cache_filename) as cache:
+        if not np.array_equal(cache[STAMP_KEY], file_stamp(pairs_filename)):
+            print "Column cache %s out of date" % cache_filename
+            return {}
+        return {k: cache[k] for k in cache.files if k != STAMP_KEY}
+
+
+def save_cached_columns(columns, cache_filename, pairs_filename):
+    """Write columns to sidecar file"""
+    contents = dict(columns)
+    contents[STAMP_KEY] = file_stamp(pairs_filename)
+    # np.savez adds .npz if not already there, so use a file object
+    with open(cache_filename, "wb") as f:
+        np.savez(f, **contents)
+
+
+def get_tree_names(pairs_filename):
+    """Get names of all TTrees in the pairs file"""
+    tfile = cu.open_root_file(pairs_filename)
+    names = [k.GetName() for k in tfile.GetListOfKeys() if k.GetClassName() == "TTree"]
+    tfile.Close()
+    return names
+
+
+def get_tree_branches(pairs_filename, tree_name="valid"):
+    """Get list of branch names available for each pair, including per-event
+    branches for the normalised layout."""
+    tfile = cu.open_root_file(pairs_filename)
+    tree = cu.get_from_file(tfile, tree_name)
+    branches = [b.GetName() for b in tree.GetListOfBranches()]
+    if cu.exists_in_file(tfile, EVENTS_TREE_NAME):
+        events_tree = tfile.Get(EVENTS_TREE_NAME)
+        branches.extend([b.GetName() for b in events_tree.GetListOfBranches()
+                         if b.GetName() not in branches])
+    tfile.Close()
+    return branches
+
+
+def get_event_branches(pairs_filename):
+    """Get list of branch names in the per-event TTree of the normalised layout"""
+    tfile = cu.open_root_file(pairs_filename)
+    events_tree = cu.get_from_file(tfile, EVENTS_TREE_NAME)
+    branches = [b.GetName() for b in events_tree.GetListOfBranches()]
+    tfile.Close()
+    return branches
+
+
+def _read_missing_columns(columns, pairs_filename, branches, tree_name, cache_filename):
+    """Read any branches not already in columns from the pairs file, and
+    update the sidecar.
+
+    Branches not in the pairs TTree are read from the events TTree, and stored
+    with EVENT_KEY_PREFIX, along with the iEvent branch of the pairs.
+    """
+    missing = [b for b in branches if b not in columns and EVENT_KEY_PREFIX + b not in columns]
+    if not missing:
+        return columns
+    print "Reading %s from %s" % (", ".join(missing), pairs_filename)
+    tfile = cu.open_root_file(pairs_filename)
+    tree = cu.get_from_file(tfile, tree_name)
+    pair_branches = set(b.GetName() for b in tree.GetListOfBranches())
+    pair_missing = [b for b in missing if b in pair_branches]
+    event_missing = [b for b in missing if b not in pair_branches]
+    if event_missing:
+        events_tree = cu.get_from_file(tfile, EVENTS_TREE_NAME)
+        event_columns = read_tree_columns(events_tree, event_missing)
+        columns.update({EVENT_KEY_PREFIX + b: c for b, c in event_columns.iteritems()})
+        if EVENT_INDEX_BRANCH not in columns and EVENT_INDEX_BRANCH not in pair_missing:
+            pair_missing.append(EVENT_INDEX_BRANCH)
+    if pair_missing:
+        columns.update(read_tree_columns(tree, pair_missing))
+    tfile.Close()
+    try:
+        save_cached_columns(columns, cache_filename, pairs_filename)
+    except IOError as e:
+        print "Cannot save column cache to %s: %s" % (cache_filename, e)
+    return columns
+
+
+def load_pair_columns(pairs_filename, branches, tree_name="valid", cache_dir=None):
+    """Get numpy arrays of branches for all entries in the pairs TTree,
+    using the sidecar cache if possible.
+
+    For the normalised layout, per-event branches are joined to the pairs
+    using the iEvent index, so every array has one entry per pair.
+
+    Parameters
+    ----------
+    pairs_filename : str
+        Pairs ROOT file, from RunMatcher
+    branches : list[str]
+        Branches to read
+    tree_name : str, optional
+        Name of TTree with pairs
+    cache_dir : str, optional
+        Directory to store sidecar in, if the pairs directory isn't writable.
+
+    Returns
+    -------
+    dict
+        {branch name: numpy.ndarray}
+    """
+    cache_filename = generate_cache_filename(pairs_filename, cache_dir)
+    columns = load_cached_columns(cache_filename, pairs_filename)
+    columns = _read_missing_columns(columns, pairs_filename, branches, tree_name, cache_filename)
+    result = {}
+    for b in branches:
+        if b in columns:
+            result[b] = columns[b]
+        else:
+            event_ind = columns[EVENT_INDEX_BRANCH].astype(np.int64)
+            result[b] = columns[EVENT_KEY_PREFIX + b][event_ind]
+    return result
+
+
+def load_event_columns(pairs_filename, branches, tree_name="valid", cache_dir=None):
+    """Get numpy arrays of per-event branches, with one entry per event
+    that has 1 or more pairs.
+
+    For the flat layout, the values are taken from the first pair in each
+    event: the pairs of an event are stored together, and each stores the
+    number of pairs in its event (nMatches).
+
+    Parameters
+    ----------
+    pairs_filename : str
+        Pairs ROOT file, from RunMatcher
+    branches : list[str]
+        Per-event branches to read, e.g. httL1
+    tree_name : str, optional
+        Name of TTree with pairs
+    cache_dir : str, optional
+        Directory to store sidecar in, if the pairs directory isn't writable.
+
+    Returns
+    -------
+    dict
+        {branch name: numpy.ndarray}
+
+    Raises
+    ------
+    ValueError
+        For the normalised layout, if a branch isn't in the events TTree.
+    """
+    cache_filename = generate_cache_filename(pairs_filename, cache_dir)
+    columns = load_cached_columns(cache_filename, pairs_filename)
+    if EVENT_INDEX_BRANCH in columns or EVENTS_TREE_NAME in get_tree_names(pairs_filename):
+        missing = [b for b in branches if EVENT_KEY_PREFIX + b not in columns]
+        if missing:
+            event_branches = get_event_branches(pairs_filename)
+            for b in missing:
+                if b not in event_branches:
+                    raise ValueError("%s is not a branch of the %s TTree in %s"
+                                     % (b, EVENTS_TREE_NAME, pairs_filename))
+        columns = _read_missing_columns(columns, pairs_filename, branches, tree_name, cache_filename)
+        return {b: columns[EVENT_KEY_PREFIX + b] for b in branches}
+
+    columns = _read_missing_columns(columns, pairs_filename, list(branches) + ["nMatches"],
+                                    tree_name, cache_filename)
+    first_pairs = _first_pair_indices(columns["nMatches"])
+    return {b: columns[b][first_pairs] for b in branches}
+
+
+def _first_pair_indices(n_matches):
+    """Get the index of the first pair of each event, for the flat layout.
+
+    The pairs of an event are stored together, and each stores the number of
+    pairs in the event, so within a run of pairs with the same nMatches, a new
+    event starts every nMatches pairs. nMatches can only change between events.
+
+    Parameters
+    ----------
+    n_matches : numpy.ndarray
+        nMatches for each pair
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices of the first pair of each event
+    """
+    n_matches = np.maximum(np.asarray(n_matches).astype(np.int64), 1)
+    inds = np.arange(len(n_matches))
+    new_run = np.ones(len(n_matches), dtype=bool)
+    new_run[1:] = n_matches[1:] != n_matches[:-1]
+    run_start = np.maximum.accumulate(np.where(new_run, inds, 0))
+    return np.flatnonzero((inds - run_start) % n_matches == 0)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Unit tests for reading per-event columns from pairs files"""
+
+
+import ROOT
+import pair_columns as pc
+from array import array
+import unittest
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+def loop_first_pair_indices(n_matches):
+    """Index of the first pair of each event, by jumping from event to event"""
+    first_pairs = []
+    i = 0
+    while i < len(n_matches):
+        first_pairs.append(i)
+        i += max(n_matches[i], 1)
+    return np.array(first_pairs, dtype=np.int64)
+
+
+class TestFirstPairIndices(unittest.TestCase):
+    def test_simple(self):
+        # events with 2, 2, 1, 3, 3, 1 pairs
+        n_matches = np.array([2, 2, 2, 2, 1, 3, 3, 3, 3, 3, 3, 1])
+        self.assertTrue(np.array_equal(pc._first_pair_indices(n_matches), [0, 2, 4, 5, 8, 11]))
+
+    def test_random_events(self):
+        rng = np.random.RandomState(7)
+        n_per_event = rng.poisson(2, 1000) + 1
+        n_matches = np.repeat(n_per_event, n_per_event).astype(float)
+        inds = pc._first_pair_indices(n_matches)
+        self.assertEqual(len(inds), len(n_per_event))
+        self.assertTrue(np.array_equal(inds, loop_first_pair_indices(n_matches.astype(int))))
+
+    def test_empty(self):
+        self.assertEqual(len(pc._first_pair_indices(np.zeros(0))), 0)
+
+
+class TestNormalisedEventColumns(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "pairs.root")
+        tfile = ROOT.TFile(self.filename, "RECREATE")
+        tree = ROOT.TTree("valid", "valid")
+        pt, i_event = array('f', [0]), array('l', [0])
+        tree.Branch("pt", pt, "pt/F")
+        tree.Branch(pc.EVENT_INDEX_BRANCH, i_event, pc.EVENT_INDEX_BRANCH + "/L")
+        events_tree = ROOT.TTree(pc.EVENTS_TREE_NAME, pc.EVENTS_TREE_NAME)
+        htt = array('f', [0])
+        events_tree.Branch("httL1", htt, "httL1/F")
+        for i, n_pairs in enumerate([2, 1, 3]):
+            htt[0] = 100. * (i + 1)
+            events_tree.Fill()
+            for j in range(n_pairs):
+                pt[0], i_event[0] = 10. * (j + 1), i
+                tree.Fill()
+        tfile.Write()
+        tfile.Close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_event_branch(self):
+        cols = pc.load_event_columns(self.filename, ["httL1"], cache_dir=self.tmp_dir)
+        self.assertTrue(np.array_equal(cols['httL1'], [100., 200., 300.]))
+
+    def test_bad_branch(self):
+        for branch in ["pt", "htL1"]:
+            with self.assertRaises(ValueError):
+                pc.load_event_columns(self.filename, [branch], cache_dir=self.tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
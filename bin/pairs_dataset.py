@@ -0,0 +1,236 @@
+"""
+Treat a set of pairs files (shards) as one dataset, without hadd-ing them.
+
+A dataset can be specified as:
+
+- a single pairs ROOT file,
+- a glob pattern, e.g. "pairs/pairs_QCD_*.root" (quote it on the command line),
+- a manifest: a text file (.txt or .list) with one pairs file or glob pattern
+  per line. Relative paths are relative to the manifest, and anything after a #
+  is ignored.
+
+Histograms are filled separately for each shard (map), in parallel worker
+processes if n_jobs > 1, and then added together (reduce). Since histograms
+add exactly, including their statistics (mean, RMS, etc), the result is the
+same as running on the hadd-ed file.
+
+Each shard is opened with common_utils.get_pairs_tree(), so the normalised
+layout works (the per-event index is per shard, which is why a TChain can't
+be used), and with its own sorted-pairs index if it has one (see sortPairs.py).
+
+Usage:
+
+pairs = PairsDataset("pairs_manifest.txt", n_jobs=4)
+h_rsp, h_pt = pairs.draw_many([DrawRequest("rsp>>h_rsp(100,0,5)", cut, absetamin=0, absetamax=0.435),
+                               DrawRequest("pt>>h_pt(100,0,500)", cut)])
+"""
+
+
+import ROOT
+import os
+import glob
+from multiprocessing import Pool
+import numpy as np
+import common_utils as cu
+from pair_columns import read_tree_columns
+from pairs_index import load_pairs_index, get_draw_range
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+
+
+MANIFEST_EXTENSIONS = [".txt", ".list"]
+
+
+def is_glob_pattern(filename):
+    return any(c in filename for c in "*?[")
+
+
+def read_manifest(manifest_filename):
+    """Get list of filenames & glob patterns from a manifest file."""
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_filename))
+    entries = []
+    with open(manifest_filename) as f:
+        for line in f:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            entries.append(os.path.join(manifest_dir, line))  # no-op for absolute paths
+    return entries
+
+
+def get_shard_filenames(dataset):
+    """Get list of pairs files from a filename, glob pattern, or manifest."""
+    if os.path.splitext(dataset)[1] in MANIFEST_EXTENSIONS and not is_glob_pattern(dataset):
+        entries = read_manifest(dataset)
+    else:
+        entries = [dataset]
+    filenames = []
+    for entry in entries:
+        if is_glob_pattern(entry):
+            filenames.extend(sorted(glob.glob(entry)))
+        else:
+            filenames.append(entry)
+    if not filenames:
+        raise IOError("No pairs files found for %s" % dataset)
+    return filenames
+
+
+class DrawRequest(object):
+    """One TTree::Draw() to do on every shard.
+
+    Parameters
+    ----------
+    varexp : str
+        Variable expression, must include ">>histname", e.g. "rsp>>hrsp(100,0,5)"
+    cut : str or ROOT.TCut
+        Selection
+    absetamin, absetamax : float, optional
+        |eta| range that the cut selects, to only read the entries for it
+        in sorted shards.
+    pt_ref_min, pt_ref_max : float, optional
+        ptRef range that the cut selects, as above.
+    hist : ROOT.TH1, optional
+        Hist to fill, for binning that can't be given in varexp
+        (e.g. variable bin widths). Its contents are replaced.
+    """
+
+    def __init__(self, varexp, cut="", absetamin=0, absetamax=float("inf"),
+                 pt_ref_min=None, pt_ref_max=None, hist=None):
+        self.varexp = varexp
+        # store as string, so it can be sent to worker processes
+        self.cut = cut.GetTitle() if isinstance(cut, ROOT.TCut) else str(cut)
+        self.hist_name = varexp.split(">>")[1].split("(")[0].strip()
+        self.ranges = (absetamin, absetamax, pt_ref_min, pt_ref_max)
+        self.hist = hist
+
+
+def _draw_shard(args):
+    """Do all the DrawRequests for one shard.
+
+    Returns the hist for each, and the total number of entries scanned.
+    """
+    filename, requests = args
+    tfile = cu.open_root_file(filename)
+    tree = cu.get_pairs_tree(tfile)
+    pairs_index = load_pairs_index(filename)
+    ROOT.gROOT.cd()  # so the hists don't belong to the shard file
+    hists = []
+    n_scanned = 0
+    for req in requests:
+        draw_range = get_draw_range(tree, pairs_index, *req.ranges)
+        n_scanned += draw_range[0]
+        if req.hist:
+            # TTree::Draw() fills a hist with this name in the current directory.
+            # Keep a reference, otherwise python deletes the clone straight away
+            hist = req.hist.Clone(req.hist_name)
+            hist.SetDirectory(ROOT.gROOT)
+        tree.Draw(req.varexp, req.cut, "goff", *draw_range)
+        if not req.hist:
+            # the hist just made, without looking it up by name
+            hist = tree.GetHistogram()
+        hist.SetDirectory(0)  # detach, so the next shard doesn't overwrite it
+        ROOT.SetOwnership(hist, True)  # so it is freed once merged
+        hists.append(hist)
+    tfile.Close()
+    return hists, n_scanned
+
+
+def _read_shard_columns(args):
+    """Read branches for entries passing cut for one shard.
+
+    Returns the columns, and the number of entries scanned.
+    """
+    filename, branches, cut, ranges = args
+    tfile = cu.open_root_file(filename)
+    tree = cu.get_pairs_tree(tfile)
+    entry_range = get_draw_range(tree, load_pairs_index(filename), *ranges)
+    columns = read_tree_columns(tree, branches, cut, entry_range)
+    tfile.Close()
+    return columns, entry_range[0]
+
+
+class PairsDataset(object):
+    """Set of pairs files to be used as one.
+
+    Parameters
+    ----------
+    dataset : str
+        Pairs filename, glob pattern, or manifest filename
+    n_jobs : int, optional
+        Number of worker processes to fill shards in parallel
+
+    Attributes
+    ----------
+    n_entries_scanned : int
+        Total number of pair entries looked at by TTree::Draw() & reading
+        columns so far, summed over all requests.
+    """
+
+    def __init__(self, dataset, n_jobs=1):
+        self.name = dataset
+        self.filenames = get_shard_filenames(dataset)
+        self.n_jobs = n_jobs
+        self.n_entries_scanned = 0
+        print "Dataset %s has %d pairs file(s)" % (dataset, len(self.filenames))
+
+    def _map(self, fn, args):
+        if self.n_jobs > 1 and len(args) > 1:
+            pool = Pool(processes=min(self.n_jobs, len(args)))
+            results = pool.map(fn, args)
+            pool.close()
+            pool.join()
+            return results
+        return [fn(a) for a in args]
+
+    def has_branch(self, branch_name):
+        """Check if branch is available for the pairs, including per-event branches"""
+        tfile = cu.open_root_file(self.filenames[0])
+        tree = cu.get_pairs_tree(tfile)
+        result = bool(tree.GetBranch(branch_name))
+        tfile.Close()
+        return result
+
+    def draw_many(self, requests):
+        """Fill hists for several DrawRequests, with one pass over the shards.
+
+        Returns
+        -------
+        list[ROOT.TH1]
+            One hist per request, not attached to any directory.
+            For requests with a hist, it is that hist.
+        """
+        shard_results = self._map(_draw_shard, [(f, requests) for f in self.filenames])
+        self.n_entries_scanned += sum(n for _, n in shard_results)
+        shard_hists = [hists for hists, _ in shard_results]
+        results = []
+        for i, req in enumerate(requests):
+            merged = shard_hists[0][i]
+            for hists in shard_hists[1:]:
+                merged.Add(hists[i])
+            if req.hist:
+                req.hist.Reset()
+                req.hist.Add(merged)
+                merged = req.hist
+            results.append(merged)
+        return results
+
+    def draw(self, varexp, cut="", **ranges):
+        """Fill a hist from all shards, see DrawRequest for arguments."""
+        return self.draw_many([DrawRequest(varexp, cut, **ranges)])[0]
+
+    def read_columns(self, branches, cut="", absetamin=0, absetamax=float("inf"),
+                     pt_ref_min=None, pt_ref_max=None):
+        """Get numpy arrays of branches for pairs passing cut, from all shards.
+
+        Returns
+        -------
+        dict
+            {branch name: numpy.ndarray}
+        """
+        cut = cut.GetTitle() if isinstance(cut, ROOT.TCut) else str(cut)
+        ranges = (absetamin, absetamax, pt_ref_min, pt_ref_max)
+        shard_results = self._map(_read_shard_columns, [(f, branches, cut, ranges) for f in self.filenames])
+        self.n_entries_scanned += sum(n for _, n in shard_results)
+        shard_columns = [columns for columns, _ in shard_results]
+        return {b: np.concatenate([c[b] for c in shard_columns]) for b in branches}
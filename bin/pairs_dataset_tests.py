@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+"""Unit tests for filling hists from sharded pairs files"""
+
+
+import ROOT
+import pairs_dataset as pd
+import synthetic_data as sd
+import common_utils as cu
+from pair_columns import read_tree_columns
+from array import array
+import unittest
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+# variable width bins, which can't be given in a TTree::Draw() varexp
+RSP_EDGES = [0., 0.5, 0.8, 0.9, 1., 1.1, 1.3, 2., 5.]
+
+
+class TestPairsDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filenames = []
+        for seed in [1, 2]:
+            filename = os.path.join(self.tmp_dir, "pairs_%d.root" % seed)
+            sd.write_pairs_file(filename, sd.make_synthetic_jets(300, seed=seed))
+            self.filenames.append(filename)
+        self.dataset = pd.PairsDataset(os.path.join(self.tmp_dir, "pairs_*.root"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_template(self):
+        return ROOT.TH1D("hrsp_template", "", len(RSP_EDGES) - 1, array('d', RSP_EDGES))
+
+    def expected_contents(self, cut_pt=20):
+        rsp = []
+        for filename in self.filenames:
+            tfile = cu.open_root_file(filename)
+            rsp.append(read_tree_columns(tfile.Get("valid"), ["rsp"], "pt > %g" % cut_pt)['rsp'])
+            tfile.Close()
+        return np.histogram(np.concatenate(rsp), bins=RSP_EDGES)[0]
+
+    def check_binning(self, hist):
+        self.assertEqual(hist.GetNbinsX(), len(RSP_EDGES) - 1)
+        for i, edge in enumerate(RSP_EDGES):
+            self.assertAlmostEqual(hist.GetXaxis().GetBinLowEdge(i + 1), edge)
+
+    def test_shard_uses_template_binning(self):
+        template = self.make_template()
+        request = pd.DrawRequest("rsp>>hrsp_var", "pt > 20", hist=template)
+        hists, _ = pd._draw_shard((self.filenames[0], [request]))
+        self.check_binning(hists[0])
+        template.Delete()
+
+    def test_variable_binned_template(self):
+        template = self.make_template()
+        hist = self.dataset.draw_many([pd.DrawRequest("rsp>>hrsp_var", "pt > 20", hist=template)])[0]
+        self.check_binning(hist)
+        contents = [hist.GetBinContent(i) for i in range(1, hist.GetNbinsX() + 1)]
+        self.assertTrue(np.array_equal(contents, self.expected_contents()))
+        template.Delete()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Index of entry ranges for pairs files sorted by (|eta| bin, ptRef).
+
+A pairs file rewritten by sortPairs.py has all pairs in the same L1 |eta| bin
+stored together, and within each bin they are in order of increasing ptRef.
+The entry ranges for each bin are saved to a sidecar .npz file next to the
+pairs file, along with the size & modification time of the pairs file, so it
+is ignored if the pairs file changes.
+
+Tools can then only read the entries that can pass their eta (& ptRef) cuts,
+by passing the range to TTree::Draw(), or by slicing arrays. The cuts must
+still be applied, since the range can include entries from neighbouring bins.
+
+Usage:
+
+pairs_index = load_pairs_index("pairs_sorted.root")
+tree.Draw("rsp", cut, "goff", *get_draw_range(tree, pairs_index, 0, 0.435))
+"""
+
+
+import os
+import numpy as np
+from pair_columns import file_stamp
+
+
+INDEX_SUFFIX = ".index.npz"
+
+# key for the pairs file stamp in the sidecar
+STAMP_KEY = "_stamp"
+
+
+def generate_index_filename(pairs_filename):
+    """Get sidecar filename for pairs file, stored alongside it."""
+    return pairs_filename + INDEX_SUFFIX
+
+
+class PairsIndex(object):
+    """Entry ranges for each (|eta| bin, ptRef) range in a sorted pairs file.
+
+    Parameters
+    ----------
+    eta_bins : numpy.ndarray
+        Edges of |eta| bins used for sorting. Pairs beyond the last edge are in
+        an extra bin at the end.
+    pt_edges : numpy.ndarray
+        Edges of the ptRef grid used for the entry offsets within each eta bin.
+    bin_starts : numpy.ndarray
+        First entry of each eta bin, with the total number of entries at the end.
+    pt_offsets : numpy.ndarray
+        pt_offsets[i][j] is the first entry in eta bin i with ptRef >= pt_edges[j]
+    """
+
+    def __init__(self, eta_bins, pt_edges, bin_starts, pt_offsets):
+        self.eta_bins = np.asarray(eta_bins, dtype=float)
+        self.pt_edges = np.asarray(pt_edges, dtype=float)
+        self.bin_starts = np.asarray(bin_starts, dtype=np.int64)
+        self.pt_offsets = np.asarray(pt_offsets, dtype=np.int64)
+
+    def entry_range(self, absetamin, absetamax, pt_ref_min=None, pt_ref_max=None):
+        """Get the (first, last + 1) entries that cover absetamin < |eta| < absetamax.
+
+        If the range is within one eta bin, it is also narrowed to cover
+        pt_ref_min < ptRef < pt_ref_max, if specified.
+        """
+        n_bins = len(self.bin_starts) - 1
+        first_bin = max(np.searchsorted(self.eta_bins, absetamin, side='right') - 1, 0)
+        last_bin = min(np.searchsorted(self.eta_bins, absetamax, side='left') - 1, n_bins - 1)
+        if last_bin < first_bin:
+            return 0, 0
+        first, last = self.bin_starts[first_bin], self.bin_starts[last_bin + 1]
+        if first_bin == last_bin:
+            offsets = self.pt_offsets[first_bin]
+            if pt_ref_min is not None:
+                j = np.searchsorted(self.pt_edges, pt_ref_min, side='right') - 1
+                if j >= 0:
+                    first = offsets[j]
+            if pt_ref_max is not None:
+                k = np.searchsorted(self.pt_edges, pt_ref_max, side='left')
+                if k < len(self.pt_edges):
+                    last = offsets[k]
+        return int(first), int(last)
+
+
+def make_pairs_index(eta, pt_ref, eta_bins, pt_edges):
+    """Get the sorted order of pairs, and the index for the sorted pairs.
+
+    Parameters
+    ----------
+    eta, pt_ref : numpy.ndarray
+        L1 eta & ref jet pT for each pair, in their original order
+    eta_bins : list[float]
+        Edges of |eta| bins to sort by
+    pt_edges : list[float]
+        Edges of ptRef grid to store entry offsets for
+
+    Returns
+    -------
+    numpy.ndarray, PairsIndex
+        Original entry number for each entry in the sorted file, and the index.
+    """
+    eta_bins = np.asarray(eta_bins, dtype=float)
+    pt_edges = np.asarray(pt_edges, dtype=float)
+    n_bins = len(eta_bins)  # including the overflow bin
+    eta_bin = np.clip(np.searchsorted(eta_bins, np.abs(eta), side='right') - 1, 0, n_bins - 1)
+    order = np.lexsort((pt_ref, eta_bin))
+    sorted_bin = eta_bin[order]
+    sorted_pt_ref = pt_ref[order]
+    bin_starts = np.searchsorted(sorted_bin, np.arange(n_bins + 1), side='left')
+    pt_offsets = np.empty((n_bins, len(pt_edges)), dtype=np.int64)
+    for i in range(n_bins):
+        start, end = bin_starts[i], bin_starts[i + 1]
+        pt_offsets[i] = start + np.searchsorted(sorted_pt_ref[start:end], pt_edges, side='left')
+    return order, PairsIndex(eta_bins, pt_edges, bin_starts, pt_offsets)
+
+
+def save_pairs_index(pairs_index, pairs_filename):
+    """Write index to sidecar file, for the sorted pairs file"""
+    # np.savez adds .npz if not already there, so use a file object
+    with open(generate_index_filename(pairs_filename), "wb") as f:
+        np.savez(f, eta_bins=pairs_index.eta_bins, pt_edges=pairs_index.pt_edges,
+                 bin_starts=pairs_index.bin_starts, pt_offsets=pairs_index.pt_offsets,
+                 **{STAMP_KEY: file_stamp(pairs_filename)})
+
+
+def load_pairs_index(pairs_filename):
+    """Get PairsIndex for pairs file. Returns None if there isn't one,
+    or it is out of date compared to the pairs file."""
+    index_filename = generate_index_filename(pairs_filename)
+    if not os.path.isfile(index_filename):
+        return None
+    with np.load(index_filename) as contents:
+        if not np.array_equal(contents[STAMP_KEY], file_stamp(pairs_filename)):
+            print "Pairs index %s out of date, not using it" % index_filename
+            return None
+        return PairsIndex(contents['eta_bins'], contents['pt_edges'],
+                          contents['bin_starts'], contents['pt_offsets'])
+
+
+def get_draw_range(tree, pairs_index, absetamin, absetamax, pt_ref_min=None, pt_ref_max=None):
+    """Get (nentries, firstentry) arguments for TTree::Draw(), to only look at
+    entries that could pass the eta & ptRef cuts. If there is no index, all
+    entries are used."""
+    if pairs_index is None:
+        return tree.GetEntries(), 0
+    first, last = pairs_index.entry_range(absetamin, absetamax, pt_ref_min, pt_ref_max)
+    return last - first, first
+
+
+def get_entry_slice(pairs_index, n_entries, absetamin, absetamax, pt_ref_min=None, pt_ref_max=None):
+    """Get slice of pair arrays (in file order) that covers the eta & ptRef
+    cuts. If there is no index, all n_entries are used."""
+    if pairs_index is None:
+        return slice(0, n_entries)
+    return slice(*pairs_index.entry_range(absetamin, absetamax, pt_ref_min, pt_ref_max))
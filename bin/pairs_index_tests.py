@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+"""Unit tests for index of sorted pairs"""
+
+
+import pairs_index as pi
+import binning
+from binning import pairwise
+import unittest
+import numpy as np
+
+
+class TestPairsIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.eta = rng.uniform(-5.5, 5.5, 20000)
+        self.eta[:len(binning.eta_bins)] = binning.eta_bins  # on bin edges
+        self.pt_ref = rng.exponential(40, 20000)
+        self.pt_edges = np.arange(0, 1025, 1.)
+        self.order, self.index = pi.make_pairs_index(self.eta, self.pt_ref, binning.eta_bins, self.pt_edges)
+        self.sorted_abs_eta = np.abs(self.eta[self.order])
+        self.sorted_pt_ref = self.pt_ref[self.order]
+
+    def check_range_covers_cut(self, absetamin, absetamax, pt_ref_min=None, pt_ref_max=None):
+        first, last = self.index.entry_range(absetamin, absetamax, pt_ref_min, pt_ref_max)
+        mask = (self.sorted_abs_eta > absetamin) & (self.sorted_abs_eta < absetamax)
+        if pt_ref_min is not None:
+            mask &= self.sorted_pt_ref > pt_ref_min
+        if pt_ref_max is not None:
+            mask &= self.sorted_pt_ref < pt_ref_max
+        passing = np.flatnonzero(mask)
+        self.assertTrue(np.all(passing >= first))
+        self.assertTrue(np.all(passing < last))
+        return first, last
+
+    def test_order_is_permutation(self):
+        self.assertTrue(np.array_equal(np.sort(self.order), np.arange(len(self.eta))))
+
+    def test_eta_bins(self):
+        for absetamin, absetamax in pairwise(binning.eta_bins):
+            first, last = self.check_range_covers_cut(absetamin, absetamax)
+            # only entries from this bin
+            abs_eta = self.sorted_abs_eta[first:last]
+            self.assertTrue(np.all((abs_eta >= absetamin) & (abs_eta < absetamax)))
+
+    def test_all_eta(self):
+        first, last = self.check_range_covers_cut(0, 6)
+        self.assertEqual((first, last), (0, len(self.eta)))
+
+    def test_pt_ref_ranges(self):
+        for absetamin, absetamax in pairwise(binning.eta_bins):
+            for pt_ref_min, pt_ref_max in [(0, 20), (20.5, 30), (100, 300), (500, 2000)]:
+                first, last = self.check_range_covers_cut(absetamin, absetamax, pt_ref_min, pt_ref_max)
+                pt_ref = self.sorted_pt_ref[first:last]
+                self.assertTrue(np.all((pt_ref >= np.floor(pt_ref_min)) & (pt_ref < np.ceil(pt_ref_max))))
+
+    def test_draw_range_no_index(self):
+        class FakeTree(object):
+            def GetEntries(self):
+                return 10
+        self.assertEqual(pi.get_draw_range(FakeTree(), None, 0, 1), (10, 0))
+        self.assertEqual(pi.get_entry_slice(None, 10, 0, 1), slice(0, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -326,7 +326,7 @@ if __name__ == "__main__":
     pairs_filename = "/hdfs/user/ra12451/L1JEC/CMSSW_7_6_0_pre7/L1JetEnergyCorrections/Stage2_Run260627/pairs/pairs_run260627_expressNoJEC_data_ref10to5000_l10to5000_dr0p4_noCleaning_fixedEF_CSC_HLTvars.root"
 
     f_pairs = cu.open_root_file(pairs_filename)
-    pairs_tree = cu.get_from_file(f_pairs, 'valid')
+    pairs_tree = cu.get_pairs_tree(f_pairs)
 
     plot_dir = '/users/ra12451/L1JEC/CMSSW_7_6_0_pre7/src/L1Trigger/L1JetEnergyCorrections/Run260627/pfCleaning/'
     if not os.path.isdir(plot_dir):
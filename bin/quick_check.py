@@ -17,7 +17,7 @@ ROOT.TH1.SetDefaultSumw2(True)
 
 def make_plot_eta_binned(input_filename, output_filename, title=''):
     f = cu.open_root_file(input_filename)
-    tree = cu.get_from_file(f, 'valid')
+    tree = cu.get_pairs_tree(f)
 
     hists = []
 
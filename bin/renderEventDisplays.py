@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""
+Make eta-phi event displays of ref jets, L1 jets & matched pairs, from the
+side file stored by the RunMatcher programs with --draw N
+(<output>_eventDisplay.root).
+
+The matchers only store the jets of the events to draw, so drawing doesn't
+slow down matching. This makes the plots afterwards, in parallel, and can be
+re-run at any time to redraw any of the stored events, e.g. in another format.
+
+Plots look the same as those from JetDrawer, and by default go in the same
+directory the matcher used to put them in.
+
+Usage:
+
+$ python renderEventDisplays.py pairs_eventDisplay.root --jobs 4
+$ python renderEventDisplays.py pairs_eventDisplay.root --list
+$ python renderEventDisplays.py pairs_eventDisplay.root --entries 12 345 --format pdf png
+"""
+
+
+import ROOT
+import sys
+import os
+import argparse
+from array import array
+import common_utils as cu
+from batch_plots import PlotTask, InputRef, render_tasks
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(True)
+ROOT.gErrorIgnoreLevel = ROOT.kWarning
+
+
+TREE_NAME = "eventDisplay"
+PLOT_DIR_NAME = "plotDir"
+
+
+def make_graph(eta, phi, name, marker_style, marker_color, marker_size=1.2):
+    """Make a TGraph of phi vs eta, styled like in JetDrawer"""
+    graph = ROOT.TGraph(len(eta), array('d', eta), array('d', phi))
+    graph.SetName(name)
+    graph.SetMarkerStyle(marker_style)
+    graph.SetMarkerColor(marker_color)
+    graph.SetMarkerSize(marker_size)
+    return graph
+
+
+def draw_event_display(tree, i_entry, plot_dir, formats):
+    """Draw stored event i_entry of the eventDisplay TTree, & save it in all formats.
+
+    Parameters
+    ----------
+    tree : ROOT.TTree
+        eventDisplay TTree from the side file
+    i_entry : int
+        Entry in the eventDisplay TTree (not in the input ntuple)
+    plot_dir : str
+        Directory to save plots in
+    formats : list[str]
+        File extensions to save the plot as
+
+    Returns
+    -------
+    list[str]
+        Plot filenames, jets_<ntuple entry>.<format>
+    """
+    tree.GetEntry(i_entry)
+    ref_graph = make_graph(list(tree.refEta), list(tree.refPhi), "refJetGraph", 20, ROOT.kBlue)
+    l1_graph = make_graph(list(tree.l1Eta), list(tree.l1Phi), "l1JetGraph", 21, ROOT.kGreen + 1)
+    match_eta, match_phi = [], []
+    for ref_eta, ref_phi, l1_eta, l1_phi in zip(tree.pairRefEta, tree.pairRefPhi,
+                                                 tree.pairL1Eta, tree.pairL1Phi):
+        match_eta.extend([ref_eta, l1_eta])
+        match_phi.extend([ref_phi, l1_phi])
+    match_graph = make_graph(match_eta, match_phi, "matchJetGraph", 22, ROOT.kRed, 1)
+
+    graphs = ROOT.TMultiGraph("JetDrawer", ";#eta;#phi")
+    for graph in [ref_graph, l1_graph, match_graph]:
+        graphs.Add(graph, "p")
+        ROOT.SetOwnership(graph, False)  # owned by the TMultiGraph now
+
+    label_text = str(tree.label)
+    leg = ROOT.TLegend(0.1, 0.91 if label_text == "" else 0.95, 0.9, 0.99)
+    leg.SetNColumns(3)
+    leg.AddEntry(ref_graph, "Reference jets", "p")
+    leg.AddEntry(l1_graph, "L1 jets", "p")
+    leg.AddEntry(match_graph, "Matched jets", "p")
+    leg.SetTextAlign(ROOT.kHAlignCenter + ROOT.kVAlignCenter)
+    leg.SetFillColor(ROOT.kWhite)
+    leg.SetLineColor(ROOT.kWhite)
+
+    label = ROOT.TPaveText(0.1, 0.91, 0.9, 0.94, "NDC")
+    label.SetBorderSize(0)
+    label.SetFillStyle(0)
+    label.AddText(label_text)
+
+    canv = ROOT.TCanvas("c_%d" % i_entry, "", 600, 600)
+    graphs.Draw("ap")
+    graphs.GetYaxis().SetRangeUser(-1. * ROOT.TMath.Pi(), ROOT.TMath.Pi())
+    graphs.GetXaxis().SetLimits(-5., 5.)
+    graphs.Draw("ap")
+    canv.Update()
+    leg.Draw()
+    label.Draw()
+    canv.SetTicks()
+    canv.SetGrid()
+
+    cu.check_dir_exists_create(plot_dir)
+    filenames = []
+    for fmt in formats:
+        filename = os.path.join(plot_dir, "jets_%d.%s" % (tree.entry, fmt))
+        canv.SaveAs(filename)
+        filenames.append(filename)
+    canv.Close()
+    return filenames
+
+
+def get_stored_events(tree):
+    """Get (ntuple entry, event number, # ref jets, # L1 jets, # pairs)
+    for each entry in the eventDisplay TTree."""
+    events = []
+    for i in xrange(tree.GetEntries()):
+        tree.GetEntry(i)
+        events.append((tree.entry, tree.event, len(tree.refEta), len(tree.l1Eta), len(tree.pairRefEta)))
+    return events
+
+
+def get_default_plot_dir(tfile, filename):
+    """Plot directory stored by the matcher, or next to the side file if there isn't one."""
+    if cu.exists_in_file(tfile, PLOT_DIR_NAME):
+        return tfile.Get(PLOT_DIR_NAME).GetTitle()
+    return os.path.join(os.path.dirname(filename), "event_displays")
+
+
+def main(in_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("input",
+                        help="Event display file from RunMatcher --draw, <output>_eventDisplay.root")
+    parser.add_argument("--oDir",
+                        help="Directory to save plots. Default is the one used by the matcher.")
+    parser.add_argument("--entries",
+                        help="Only draw these events, given as entry numbers in the input ntuple",
+                        type=int, nargs="+")
+    parser.add_argument("--max",
+                        help="Maximum number of events to draw, -1 for all",
+                        type=int, default=-1)
+    parser.add_argument("--format",
+                        help="Format(s) for plots (pdf, png, etc)",
+                        nargs="+", default=["pdf"])
+    parser.add_argument("--list",
+                        help="Print the stored events & exit, without drawing",
+                        action='store_true')
+    parser.add_argument("--jobs", "-j",
+                        help="Number of parallel processes to render plots with",
+                        type=int, default=1)
+    parser.add_argument("--force",
+                        help="Remake all plots, even if their inputs are unchanged since the last run",
+                        action='store_true')
+    parser.add_argument("--noCache",
+                        help="Don't use or store the record of which plots are up to date",
+                        action='store_true')
+    args = parser.parse_args(args=in_args)
+
+    tfile = cu.open_root_file(args.input)
+    tree = cu.get_from_file(tfile, TREE_NAME)
+    stored_events = get_stored_events(tree)
+    plot_dir = args.oDir or get_default_plot_dir(tfile, args.input)
+    tfile.Close()
+
+    if args.list:
+        print "%d stored events in %s" % (len(stored_events), args.input)
+        print "%10s %12s %6s %6s %6s" % ("entry", "event", "nRef", "nL1", "nPairs")
+        for stored in stored_events:
+            print "%10d %12d %6d %6d %6d" % stored
+        return 0
+
+    indices = range(len(stored_events))
+    if args.entries:
+        entry_index = {stored[0]: i for i, stored in enumerate(stored_events)}
+        missing = [e for e in args.entries if e not in entry_index]
+        if missing:
+            print "Warning: no stored event for entries", missing
+        indices = [entry_index[e] for e in args.entries if e in entry_index]
+    if args.max >= 0:
+        indices = indices[:args.max]
+
+    tree_ref = InputRef(args.input, TREE_NAME)
+    tasks = [PlotTask(draw_event_display, tree_ref, i, plot_dir, args.format) for i in indices]
+    cu.check_dir_exists_create(plot_dir)
+    cache_filename = None if args.noCache else os.path.join(plot_dir, '.plot_cache.json')
+    results = render_tasks(tasks, n_jobs=args.jobs, cache_filename=cache_filename, force=args.force)
+    n_plots = sum(len(r) for r in results if r)
+    print "Made %d event displays in %s" % (n_plots, plot_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
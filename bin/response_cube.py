@@ -0,0 +1,279 @@
+"""
+Fine-grained histogram of response (L1 pT / ref pT), made once from a pairs
+file, that can be rebinned to any coarser |eta| & pT binning.
+
+Trying a new binning scheme normally means re-running over all the pairs.
+Instead, the cube stores the response histogram for each (L1 |eta| trigger
+tower, 1 GeV pT) cell, along with the sums of pT, ptRef, rsp & rsp^2 in each
+cell. Any scheme from binning.py is then made by summing cells, which takes
+seconds, with the same pairs in each bin as cutting on the pairs directly:
+
+- Stage 2 L1 jets are at the centre of a trigger tower, so a cut on L1 |eta|
+  at any edge takes whole towers. A cell is put in the bin that holds the
+  centre of its tower. (For other L1 eta values this is an approximation.)
+- pT edges must be on the cube's pT edges (integer GeV by default),
+  otherwise a ValueError is raised.
+
+The cube is saved to an .npz file next to the pairs file, along with the size &
+modification time of the pairs file, so it is ignored if the pairs file changes.
+
+Usage:
+
+cube = make_response_cube(load_pair_columns("pairs.root", CUBE_BRANCHES))
+coarse = cube.rebin(binning.eta_bins, binning.pt_bins_stage2)
+mean_rsp = coarse.mean("rsp")  # [eta bin, pt bin]
+hrsp = coarse.make_response_hist(0, 3, "Rsp_0_3")
+"""
+
+
+import ROOT
+import os
+import numpy as np
+import hist_arrays as ha
+from pair_columns import file_stamp
+from stage2_lut_emulator import TOWER_ETA_EDGES
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+
+
+CUBE_SUFFIX = ".cube.npz"
+
+# key for the pairs file stamp in the cube file
+STAMP_KEY = "_stamp"
+
+# branches needed from the pairs file
+CUBE_BRANCHES = ["pt", "eta", "ptRef", "rsp"]
+
+# 1 GeV bins, covering the last edge of all pt schemes in binning.py
+DEFAULT_PT_EDGES = np.arange(0., 1041., 1.)
+
+# same response binning as runCalibration.py
+DEFAULT_RSP_BINNING = (150, 0., 5.)
+
+# sums stored for each (eta, pt) cell: number of pairs, then sum of each
+# quantity, so means & RMS don't depend on the response binning
+SUM_NAMES = ["n", "pt", "ptRef", "rsp", "rsp2"]
+
+# how close a pt edge must be to a cube edge to be treated as the same
+EDGE_TOLERANCE = 1E-6
+
+
+class ResponseCube(object):
+    """Response histograms & sums for each (|eta|, pt) bin.
+
+    Parameters
+    ----------
+    eta_edges, pt_edges : numpy.ndarray
+        Edges of L1 |eta| & pt bins
+    rsp_binning : (int, float, float)
+        Number of bins, min & max of response histograms
+    counts : numpy.ndarray
+        Response histogram for each bin, with shape
+        (n eta bins, n pt bins, n rsp bins + 2). As in ROOT,
+        counts[..., 0] is the underflow & counts[..., -1] the overflow.
+    sums : numpy.ndarray
+        Sums for each bin, with shape (len(SUM_NAMES), n eta bins, n pt bins)
+    pt_var : str
+        Quantity binned in pt, ptRef or pt
+    """
+
+    def __init__(self, eta_edges, pt_edges, rsp_binning, counts, sums, pt_var="ptRef"):
+        self.eta_edges = np.asarray(eta_edges, dtype=float)
+        self.pt_edges = np.asarray(pt_edges, dtype=float)
+        self.rsp_binning = (int(rsp_binning[0]), float(rsp_binning[1]), float(rsp_binning[2]))
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.sums = np.asarray(sums, dtype=float)
+        self.pt_var = str(pt_var)
+
+    @property
+    def shape(self):
+        """(n eta bins, n pt bins)"""
+        return self.counts.shape[:2]
+
+    def rebin(self, eta_bins=None, pt_bins=None):
+        """Get a new cube with coarser bins, by summing cells.
+
+        Parameters
+        ----------
+        eta_bins : list[float], optional
+            Edges of L1 |eta| bins, e.g. binning.eta_bins. Default keeps the current ones.
+        pt_bins : list[float], optional
+            Edges of pt bins, e.g. binning.pt_bins_stage2. Default keeps the current ones.
+
+        Returns
+        -------
+        ResponseCube
+
+        Raises
+        ------
+        ValueError
+            If edges aren't increasing, are outside the cube, or a pt edge
+            isn't on a pt edge of the cube.
+        """
+        counts, sums = self.counts, self.sums
+        eta_edges, pt_edges = self.eta_edges, self.pt_edges
+        if eta_bins is not None:
+            inds = snap_edges(self.eta_edges, eta_bins, exact=False)
+            counts, sums = sum_slices(counts, inds, 0), sum_slices(sums, inds, 1)
+            eta_edges = eta_bins
+        if pt_bins is not None:
+            inds = snap_edges(self.pt_edges, pt_bins, exact=True)
+            counts, sums = sum_slices(counts, inds, 1), sum_slices(sums, inds, 2)
+            pt_edges = pt_bins
+        return ResponseCube(eta_edges, pt_edges, self.rsp_binning, counts, sums, self.pt_var)
+
+    def sum(self, name):
+        """Get sum of SUM_NAMES quantity for each bin, [eta bin, pt bin]"""
+        return self.sums[SUM_NAMES.index(name)]
+
+    def mean(self, name):
+        """Get mean of pt, ptRef or rsp in each bin, NaN for empty bins"""
+        n = self.sum("n")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > 0, self.sum(name) / n, np.nan)
+
+    def rms_response(self):
+        """Get RMS of response in each bin, NaN for empty bins"""
+        variance = self.mean("rsp2") - self.mean("rsp") ** 2
+        return np.sqrt(np.maximum(variance, 0))
+
+    def make_response_hist(self, i_eta, i_pt, name, title=""):
+        """Get TH1D of response for a bin, like the one runCalibration.py fits.
+
+        Bin errors are sqrt(contents). The mean & RMS are those of the binned
+        contents, as for a hist filled with TTree::Draw().
+        """
+        n_bins, rsp_min, rsp_max = self.rsp_binning
+        hist = ROOT.TH1D(name, title, n_bins, rsp_min, rsp_max)
+        hist.Sumw2()
+        counts = self.counts[i_eta, i_pt]
+        ha.hist_array(hist)[:] = counts
+        ha.hist_sumw2_array(hist)[:] = counts
+        ha.reset_stats(hist)
+        hist.SetEntries(counts.sum())
+        return hist
+
+
+def snap_edges(cube_edges, edges, exact):
+    """Get the cube bin boundary index for each edge.
+
+    Parameters
+    ----------
+    cube_edges : numpy.ndarray
+        Bin edges of one cube axis
+    edges : list[float]
+        Increasing edges of the coarser bins
+    exact : bool
+        If True, each edge must be on a cube edge. Otherwise an edge is
+        moved to the boundary after the last cube bin with its centre below it.
+
+    Returns
+    -------
+    numpy.ndarray
+        Index in cube_edges for each edge
+    """
+    edges = np.asarray(edges, dtype=float)
+    if len(edges) < 2 or np.any(np.diff(edges) <= 0):
+        raise ValueError("Bin edges must be increasing: %s" % edges)
+    if edges[0] < cube_edges[0] - EDGE_TOLERANCE or edges[-1] > cube_edges[-1] + EDGE_TOLERANCE:
+        raise ValueError("Bin edges %g - %g are outside the cube range %g - %g" %
+                         (edges[0], edges[-1], cube_edges[0], cube_edges[-1]))
+    if not exact:
+        centres = 0.5 * (cube_edges[:-1] + cube_edges[1:])
+        return np.searchsorted(centres, edges, side='left')
+    inds = np.clip(np.searchsorted(cube_edges, edges - EDGE_TOLERANCE, side='left'), 0, len(cube_edges) - 1)
+    off_edge = np.abs(cube_edges[inds] - edges) > EDGE_TOLERANCE
+    if np.any(off_edge):
+        raise ValueError("Bin edges %s are not edges of the cube, can't rebin" % edges[off_edge])
+    return inds
+
+
+def sum_slices(arr, inds, axis):
+    """Sum arr over [inds[i], inds[i+1]) along axis, for each i.
+    Empty slices give 0."""
+    before = (slice(None),) * axis
+    return np.stack([arr[before + (slice(lo, hi),)].sum(axis=axis)
+                     for lo, hi in zip(inds[:-1], inds[1:])], axis=axis)
+
+
+def make_response_cube(columns, pt_var="ptRef", eta_edges=TOWER_ETA_EDGES,
+                       pt_edges=DEFAULT_PT_EDGES, rsp_binning=DEFAULT_RSP_BINNING, mask=None):
+    """Histogram the response of pairs in fine (|eta|, pt) cells.
+
+    Parameters
+    ----------
+    columns : dict
+        {branch: numpy.ndarray} with CUBE_BRANCHES for each pair, e.g. from load_pair_columns()
+    pt_var : str, optional
+        Quantity to bin in pt, ptRef (as for runCalibration.py) or pt
+    eta_edges : list[float], optional
+        Edges of L1 |eta| cells. Default is the trigger towers.
+    pt_edges : list[float], optional
+        Edges of pt cells. Default is 1 GeV cells.
+    rsp_binning : (int, float, float), optional
+        Number of bins, min & max of response histograms
+    mask : numpy.ndarray, optional
+        Only use pairs where this is True, e.g. to cut on PU
+
+    Returns
+    -------
+    ResponseCube
+        Pairs outside the |eta| & pt edges aren't included.
+    """
+    eta_edges = np.asarray(eta_edges, dtype=float)
+    pt_edges = np.asarray(pt_edges, dtype=float)
+    n_eta, n_pt = len(eta_edges) - 1, len(pt_edges) - 1
+    n_rsp, rsp_min, rsp_max = rsp_binning
+
+    i_eta = np.searchsorted(eta_edges, np.abs(columns['eta']), side='right') - 1
+    i_pt = np.searchsorted(pt_edges, columns[pt_var], side='right') - 1
+    keep = (i_eta >= 0) & (i_eta < n_eta) & (i_pt >= 0) & (i_pt < n_pt)
+    if mask is not None:
+        keep &= mask
+    rsp = columns['rsp'][keep]
+    cell = i_eta[keep] * n_pt + i_pt[keep]
+
+    # bin 0 is the underflow, n_rsp + 1 the overflow, as in ROOT
+    i_rsp = np.floor((rsp - rsp_min) * n_rsp / (rsp_max - rsp_min)).astype(np.int64) + 1
+    i_rsp = np.clip(i_rsp, 0, n_rsp + 1)
+    n_cells = n_eta * n_pt
+    counts = np.bincount(cell * (n_rsp + 2) + i_rsp, minlength=n_cells * (n_rsp + 2))
+    values = {"n": None, "pt": columns['pt'][keep], "ptRef": columns['ptRef'][keep],
+              "rsp": rsp, "rsp2": rsp * rsp}
+    sums = np.stack([np.bincount(cell, weights=values[name], minlength=n_cells).astype(float)
+                     for name in SUM_NAMES])
+    return ResponseCube(eta_edges, pt_edges, rsp_binning,
+                        counts.reshape(n_eta, n_pt, n_rsp + 2),
+                        sums.reshape(len(SUM_NAMES), n_eta, n_pt), pt_var)
+
+
+def generate_cube_filename(pairs_filename, pt_var="ptRef", label=""):
+    """Get filename of the cube for a pairs file, stored alongside it.
+    label is added to distinguish cubes made with different cuts."""
+    return "%s.%s%s%s" % (pairs_filename, pt_var, label, CUBE_SUFFIX)
+
+
+def save_response_cube(cube, cube_filename, pairs_filename=None):
+    """Write cube to file, with the stamp of the pairs file it was made from"""
+    stamp = file_stamp(pairs_filename) if pairs_filename else np.zeros(2)
+    # np.savez adds .npz if not already there, so use a file object
+    with open(cube_filename, "wb") as f:
+        np.savez_compressed(f, eta_edges=cube.eta_edges, pt_edges=cube.pt_edges,
+                            rsp_binning=np.array(cube.rsp_binning), counts=cube.counts,
+                            sums=cube.sums, pt_var=np.array(cube.pt_var),
+                            **{STAMP_KEY: stamp})
+
+
+def load_response_cube(cube_filename, pairs_filename=None):
+    """Get ResponseCube from file. Returns None if there isn't one, or if
+    pairs_filename is given and the cube is out of date compared to it."""
+    if not os.path.isfile(cube_filename):
+        return None
+    with np.load(cube_filename) as contents:
+        if pairs_filename and not np.array_equal(contents[STAMP_KEY], file_stamp(pairs_filename)):
+            print "Response cube %s out of date, not using it" % cube_filename
+            return None
+        n_rsp, rsp_min, rsp_max = contents['rsp_binning']
+        return ResponseCube(contents['eta_edges'], contents['pt_edges'], (n_rsp, rsp_min, rsp_max),
+                            contents['counts'], contents['sums'], contents['pt_var'].item())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Unit tests for the rebinnable response cube"""
+
+
+import ROOT
+import response_cube as rc
+import synthetic_data as sd
+import binning
+import unittest
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+def bin_directly(cols, eta_bins, pt_bins, pt_var="ptRef"):
+    """Get number of pairs & sum of response in each (|eta|, pt) bin, from the pairs"""
+    i_eta = np.searchsorted(eta_bins, np.abs(cols['eta']), side='right') - 1
+    i_pt = np.searchsorted(pt_bins, cols[pt_var], side='right') - 1
+    keep = (i_eta >= 0) & (i_eta < len(eta_bins) - 1) & (i_pt >= 0) & (i_pt < len(pt_bins) - 1)
+    n = np.zeros((len(eta_bins) - 1, len(pt_bins) - 1))
+    rsp_sum = np.zeros_like(n)
+    np.add.at(n, (i_eta[keep], i_pt[keep]), 1)
+    np.add.at(rsp_sum, (i_eta[keep], i_pt[keep]), cols['rsp'][keep])
+    return n, rsp_sum
+
+
+class TestResponseCube(unittest.TestCase):
+    def setUp(self):
+        self.cols = sd.make_pair_columns(sd.make_synthetic_jets(5000, jets_per_event=6, seed=4))
+        self.cube = rc.make_response_cube(self.cols)
+
+    def test_all_pairs_in_cube(self):
+        n_pairs = np.sum(self.cols['ptRef'] < rc.DEFAULT_PT_EDGES[-1])
+        self.assertEqual(self.cube.counts.sum(), n_pairs)
+        self.assertEqual(self.cube.sum("n").sum(), n_pairs)
+        self.assertTrue(np.array_equal(self.cube.counts.sum(axis=2), self.cube.sum("n")))
+
+    def test_rebin_all_schemes(self):
+        # L1 eta is at tower centres, so every scheme is exact,
+        # even those with edges that aren't tower edges
+        for eta_bins in binning.eta_bin_schemes.values():
+            for pt_bins in binning.pt_bin_schemes.values():
+                coarse = self.cube.rebin(eta_bins, pt_bins)
+                n, rsp_sum = bin_directly(self.cols, eta_bins, pt_bins)
+                self.assertEqual(coarse.shape, n.shape)
+                self.assertTrue(np.array_equal(coarse.sum("n"), n))
+                self.assertTrue(np.allclose(coarse.sum("rsp"), rsp_sum))
+
+    def test_rebin_pt(self):
+        cube = rc.make_response_cube(self.cols, pt_var="pt")
+        pt_bins = binning.pt_bins_stage2_hf
+        coarse = cube.rebin(pt_bins=pt_bins)
+        n, _ = bin_directly(self.cols, cube.eta_edges, pt_bins, pt_var="pt")
+        self.assertTrue(np.array_equal(coarse.sum("n"), n))
+        self.assertTrue(np.array_equal(coarse.eta_edges, cube.eta_edges))
+
+    def test_rebin_twice(self):
+        once = self.cube.rebin(binning.eta_bins, [10, 30, 50, 98])
+        twice = self.cube.rebin(binning.eta_bins, binning.pt_bins_stage2).rebin(pt_bins=[10, 30, 50, 98])
+        self.assertTrue(np.array_equal(once.counts, twice.counts))
+
+    def test_bad_edges(self):
+        with self.assertRaises(ValueError):
+            self.cube.rebin(pt_bins=[10, 20.5, 30])
+        with self.assertRaises(ValueError):
+            self.cube.rebin(pt_bins=[10, 2000])
+        with self.assertRaises(ValueError):
+            self.cube.rebin(eta_bins=[0, 1, 0.5])
+
+    def test_means(self):
+        coarse = self.cube.rebin([0, 1.479, 3, 5.191], [20, 40])
+        abs_eta, pt_ref, rsp = np.abs(self.cols['eta']), self.cols['ptRef'], self.cols['rsp']
+        in_bin = (abs_eta < 1.479) & (pt_ref >= 20) & (pt_ref < 40)
+        self.assertAlmostEqual(coarse.mean("rsp")[0, 0], rsp[in_bin].mean())
+        self.assertAlmostEqual(coarse.mean("ptRef")[0, 0], pt_ref[in_bin].mean())
+        self.assertAlmostEqual(coarse.rms_response()[0, 0], rsp[in_bin].std())
+
+    def test_response_hist(self):
+        coarse = self.cube.rebin([0, 1.479], [20, 40])
+        hrsp = coarse.make_response_hist(0, 0, "hrsp_test")
+        self.assertEqual(hrsp.GetEntries(), coarse.sum("n")[0, 0])
+        self.assertEqual(hrsp.GetNbinsX(), rc.DEFAULT_RSP_BINNING[0])
+        abs_eta, pt_ref, rsp = np.abs(self.cols['eta']), self.cols['ptRef'], self.cols['rsp']
+        in_bin = (abs_eta < 1.479) & (pt_ref >= 20) & (pt_ref < 40)
+        self.assertEqual(hrsp.Integral(), np.sum(rsp[in_bin] < rc.DEFAULT_RSP_BINNING[2]))
+        hrsp.Delete()
+
+
+class TestResponseCubeFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pairs_filename = os.path.join(self.tmp_dir, "pairs.root")
+        open(self.pairs_filename, "w").write("pairs")
+        cols = sd.make_pair_columns(sd.make_synthetic_jets(500, seed=5))
+        self.cube = rc.make_response_cube(cols)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        cube_filename = rc.generate_cube_filename(self.pairs_filename)
+        rc.save_response_cube(self.cube, cube_filename, self.pairs_filename)
+        cube = rc.load_response_cube(cube_filename, self.pairs_filename)
+        self.assertTrue(np.array_equal(cube.counts, self.cube.counts))
+        self.assertTrue(np.array_equal(cube.sums, self.cube.sums))
+        self.assertTrue(np.array_equal(cube.pt_edges, self.cube.pt_edges))
+        self.assertEqual(cube.rsp_binning, self.cube.rsp_binning)
+        self.assertEqual(cube.pt_var, "ptRef")
+
+    def test_out_of_date(self):
+        cube_filename = rc.generate_cube_filename(self.pairs_filename)
+        rc.save_response_cube(self.cube, cube_filename, self.pairs_filename)
+        with open(self.pairs_filename, "a") as f:
+            f.write("more pairs")
+        self.assertIsNone(rc.load_response_cube(cube_filename, self.pairs_filename))
+        self.assertIsNone(rc.load_response_cube(cube_filename + ".missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+"""
+Time the hot paths of the calibration chain on synthetic data (see
+synthetic_data.py), and append the results to a JSON history, so the effect
+of each change can be measured offline, without CMS data.
+
+Benchmarks:
+
+- matcher: RunMatcherStage2L1Gen over a synthetic L1Ntuple, time per event
+  (from its --telemetry summary). Skipped if the executable isn't built,
+  or the L1Analysis dictionaries aren't available.
+- runCalibration: time per eta bin (from its metrics report)
+- checkCalibration, makeResolutionPlots: whole job, all eta bins
+- lut_build: print_Stage2_lut_files() for synthetic correction functions,
+  without the checking plots
+- lut_apply: Stage2LUTEmulator.correct_pt() on all synthetic pairs
+
+The scripts are run in a new process each, as they would be for real.
+Synthetic inputs & outputs are kept in --workDir, and the inputs are reused
+by later runs with the same scale & seed.
+
+Each run appends one record to --history, with the scale, git commit, host,
+and the results of each benchmark. Runs are comparable if they have the same
+scale: use --compare to print each result against the last such run.
+
+Usage: see
+python runBenchmarks.py -h
+"""
+
+
+import ROOT
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import numpy as np
+from collections import OrderedDict
+from distutils.spawn import find_executable
+import binning
+import common_utils as cu
+import correction_LUT_stage2 as cls
+from run_metrics import get_cpu_time, generate_metrics_filename
+from stage2_lut_emulator import Stage2LUTEmulator
+import synthetic_data as sd
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(1)
+
+
+BIN_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MATCHER_EXE = "RunMatcherStage2L1Gen"
+
+HISTORY_VERSION = 1
+
+
+def get_children_cpu_time():
+    """Get user + system CPU time used by finished child processes, in seconds"""
+    times = os.times()
+    return times[2] + times[3]
+
+
+def get_git_commit():
+    """Get (commit hash, whether there are uncommitted changes), or (None, None)
+    if not in a git repo"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BIN_DIR).strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BIN_DIR)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, status.strip() != ""
+
+
+def run_command(cmd, log_filename):
+    """Run a command, with all output going to a log file.
+
+    Returns
+    -------
+    (float, float)
+        Wall & CPU time in seconds
+    """
+    print " ".join(cmd)
+    cpu = get_children_cpu_time()
+    start = time.time()
+    with open(log_filename, "w") as log:
+        subprocess.check_call(cmd, stdout=log, stderr=subprocess.STDOUT, cwd=BIN_DIR)
+    return time.time() - start, get_children_cpu_time() - cpu
+
+
+def run_script(script_name, script_args, log_filename):
+    """Run one of the python scripts in bin, see run_command()"""
+    return run_command([sys.executable, os.path.join(BIN_DIR, script_name)] + script_args, log_filename)
+
+
+def time_repeated(fn, repeat):
+    """Call fn repeat times, get (fastest wall time, its CPU time) in seconds,
+    and the return value of the last call"""
+    best = None
+    for _ in range(repeat):
+        cpu = get_cpu_time()
+        start = time.time()
+        result = fn()
+        times = (time.time() - start, get_cpu_time() - cpu)
+        if best is None or times[0] < best[0]:
+            best = times
+    return best[0], best[1], result
+
+
+class BenchmarkInputs(object):
+    """Synthetic inputs for the benchmarks, made on first use.
+    Files are reused if they already exist for the same scale & seed."""
+
+    def __init__(self, work_dir, n_events, jets_per_event, pu_mean, seed, regenerate=False):
+        self.work_dir = work_dir
+        self.scale = OrderedDict([("n_events", n_events), ("jets_per_event", jets_per_event),
+                                  ("pu_mean", pu_mean), ("seed", seed)])
+        self.regenerate = regenerate
+        self._jets = None
+
+    @property
+    def jets(self):
+        if self._jets is None:
+            self._jets = sd.make_synthetic_jets(**self.scale)
+        return self._jets
+
+    def filename(self, kind, ext="root"):
+        """Get filename in the work dir that includes the scale & seed"""
+        return os.path.join(self.work_dir, "synthetic_n%(n_events)d_j%(jets_per_event)g_pu%(pu_mean)g_s%(seed)d"
+                            % self.scale + "_%s.%s" % (kind, ext))
+
+    def _make(self, kind, write_fn):
+        filename = self.filename(kind)
+        if self.regenerate or not os.path.isfile(filename):
+            write_fn(filename, self.jets)
+        return filename
+
+    def pairs_file(self):
+        return self._make("pairs", sd.write_pairs_file)
+
+    def ntuple_file(self):
+        return self._make("ntuple", sd.write_ntuple_file)
+
+    def output(self, name, ext="root"):
+        """Get filename for the output of a benchmark"""
+        return self.filename("out_" + name, ext)
+
+
+def skipped(reason):
+    print "Skipping:", reason
+    return OrderedDict([("skipped", reason)])
+
+
+def bench_matcher(inputs, args):
+    exe = find_executable(MATCHER_EXE)
+    if not exe:
+        return skipped("%s not found, build it with scram b" % MATCHER_EXE)
+    if not hasattr(ROOT, "L1Analysis"):
+        return skipped("no L1Analysis dictionaries to make the synthetic ntuple")
+    output = inputs.output("matcher")
+    wall, cpu = run_command([exe, "-I", inputs.ntuple_file(), "-O", output,
+                             "--refDir", sd.NTUPLE_REF_TREE[0], "--l1Dir", sd.NTUPLE_L1_TREE[0],
+                             "--draw", "0", "--reportInterval", "0", "--telemetry"],
+                            inputs.output("matcher", "log"))
+    with open(os.path.splitext(output)[0] + "_telemetry.json") as f:
+        telemetry = json.load(f, object_pairs_hook=OrderedDict)
+    n_events = max(telemetry['events'], 1)
+    return OrderedDict([("wall_s", wall), ("cpu_s", cpu),
+                        ("events", telemetry['events']),
+                        ("pairs", telemetry['pairs']),
+                        ("us_per_event", 1E6 * telemetry['wall_s'] / n_events),
+                        ("events_per_s", telemetry['events_per_s']),
+                        ("stages_s", telemetry['stages_s'])])
+
+
+def bench_run_calibration(inputs, args):
+    output = inputs.output("runCalibration")
+    wall, cpu = run_script("runCalibration.py", [inputs.pairs_file(), output, "--stage2"],
+                           inputs.output("runCalibration", "log"))
+    with open(generate_metrics_filename(output)) as f:
+        metrics = json.load(f, object_pairs_hook=OrderedDict)
+    eta_bin = metrics['stages']['eta_bin']
+    return OrderedDict([("wall_s", wall), ("cpu_s", cpu),
+                        ("eta_bins", eta_bin['calls']),
+                        ("s_per_eta_bin", eta_bin['wall_s'] / max(eta_bin['calls'], 1)),
+                        ("eta_bin_wall_s", [r['wall_s'] for r in metrics['records']['eta_bins']]),
+                        ("peak_rss_mb", metrics['peak_rss_mb']),
+                        ("stages_wall_s", OrderedDict((name, stage['wall_s'])
+                                                      for name, stage in metrics['stages'].items()))])
+
+
+def bench_check_calibration(inputs, args):
+    wall, cpu = run_script("checkCalibration.py",
+                           [inputs.pairs_file(), inputs.output("checkCalibration"), "--excl", "--incl"],
+                           inputs.output("checkCalibration", "log"))
+    return OrderedDict([("wall_s", wall), ("cpu_s", cpu)])
+
+
+def bench_resolution_plots(inputs, args):
+    wall, cpu = run_script("makeResolutionPlots.py",
+                           [inputs.pairs_file(), inputs.output("makeResolutionPlots"), "--excl", "--incl"],
+                           inputs.output("makeResolutionPlots", "log"))
+    return OrderedDict([("wall_s", wall), ("cpu_s", cpu)])
+
+
+def make_correction_functions():
+    """Make one correction function per eta bin: the inverse of the mean
+    synthetic response without PU, constant below the minimum jet pT"""
+    functions = []
+    for i, (eta_min, eta_max) in enumerate(binning.pairwise(binning.eta_bins)):
+        fn = ROOT.TF1("fitfcn_synthetic_%d" % i, "1./([0]*(1.-[1]/sqrt(TMath::Max(x,[2]))))", 0, 1024)
+        plateau = sd.l1_response(np.inf, 0.5 * (eta_min + eta_max), 0)
+        fn.SetParameters(plateau, 1.5, sd.PT_MIN)
+        functions.append(fn)
+    return functions
+
+
+def lut_filenames(inputs):
+    return OrderedDict((kind, inputs.output("lut_" + kind, "txt")) for kind in ["eta", "pt", "mult", "add", "add_mult"])
+
+
+def build_luts(inputs, functions):
+    filenames = lut_filenames(inputs)
+    cls.print_Stage2_lut_files(functions,
+                               filenames['eta'], filenames['pt'],
+                               filenames['mult'], filenames['add'], filenames['add_mult'],
+                               right_shift=9, num_corr_bits=10, num_add_bits=8,
+                               plot_dir=inputs.work_dir)
+    return filenames
+
+
+def bench_lut_build(inputs, args):
+    functions = make_correction_functions()
+    # only time making the LUTs, not the checking plots
+    use_mpl, cls.USE_MPL = cls.USE_MPL, False
+    try:
+        wall, cpu, _ = time_repeated(lambda: build_luts(inputs, functions), args.repeat)
+    finally:
+        cls.USE_MPL = use_mpl
+    return OrderedDict([("wall_s", wall), ("cpu_s", cpu), ("eta_bins", len(functions))])
+
+
+def bench_lut_apply(inputs, args):
+    filenames = lut_filenames(inputs)
+    if not all(os.path.isfile(f) for f in filenames.values()):
+        use_mpl, cls.USE_MPL = cls.USE_MPL, False
+        try:
+            build_luts(inputs, make_correction_functions())
+        finally:
+            cls.USE_MPL = use_mpl
+    emulator = Stage2LUTEmulator(filenames['eta'], filenames['pt'], filenames['add_mult'],
+                                 right_shift=9, num_add_bits=8, num_mult_bits=10)
+    pt, eta = inputs.jets['pt'], inputs.jets['eta']
+    wall, cpu, _ = time_repeated(lambda: emulator.correct_pt(pt, eta), args.repeat)
+    return OrderedDict([("wall_s", wall), ("cpu_s", cpu), ("pairs", len(pt)),
+                        ("ns_per_pair", 1E9 * wall / max(len(pt), 1))])
+
+
+# name: (function, main result to compare between runs)
+BENCHMARKS = OrderedDict([
+    ("matcher", (bench_matcher, "us_per_event")),
+    ("runCalibration", (bench_run_calibration, "s_per_eta_bin")),
+    ("checkCalibration", (bench_check_calibration, "wall_s")),
+    ("makeResolutionPlots", (bench_resolution_plots, "wall_s")),
+    ("lut_build", (bench_lut_build, "wall_s")),
+    ("lut_apply", (bench_lut_apply, "ns_per_pair")),
+])
+
+
+def load_history(history_filename):
+    """Get list of previous run records, oldest first"""
+    if not os.path.isfile(history_filename):
+        return []
+    with open(history_filename) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)['runs']
+
+
+def save_history(history_filename, runs):
+    with open(history_filename, "w") as f:
+        json.dump(OrderedDict([("version", HISTORY_VERSION), ("runs", runs)]), f, indent=2)
+    print "Written benchmark history to", history_filename
+
+
+def print_comparison(run, previous):
+    """Print the main result of each benchmark against a previous run"""
+    if previous is None:
+        print "No previous run with the same scale to compare to"
+        return
+    print "Compared to run at %s (%s, commit %s):" % (previous['start_time'], previous['label'],
+                                                       previous['git_commit'])
+    print "%-20s %-14s %12s %12s %8s" % ("benchmark", "result", "previous", "now", "ratio")
+    for name, result in run['benchmarks'].items():
+        key = BENCHMARKS[name][1]
+        old = previous['benchmarks'].get(name, {}).get(key)
+        new = result.get(key)
+        if old is None or new is None:
+            print "%-20s %-14s %12s %12s" % (name, key, old, new)
+            continue
+        print "%-20s %-14s %12.4g %12.4g %8.3f" % (name, key, old, new, new / old if old else np.nan)
+
+
+def main(in_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=cu.CustomFormatter)
+    parser.add_argument("--workDir", default="benchmarks",
+                        help="directory for synthetic inputs & outputs")
+    parser.add_argument("--history", default=None,
+                        help="JSON history file to append results to. "
+                        "Default is benchmark_history.json in --workDir")
+    parser.add_argument("--label", default="",
+                        help="label for this run in the history, e.g. what was changed")
+    parser.add_argument("--nEvents", type=int, default=20000, help="number of synthetic events")
+    parser.add_argument("--jetsPerEvent", type=float, default=8, help="mean number of jets per event")
+    parser.add_argument("--PUmean", type=float, default=40, help="mean number of PU vertices per event")
+    parser.add_argument("--seed", type=int, default=1, help="seed for synthetic data")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="remake the synthetic inputs even if they exist")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of times to repeat the in-process benchmarks, "
+                        "the fastest is kept")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS.keys(), default=BENCHMARKS.keys(),
+                        help="only run these benchmarks")
+    parser.add_argument("--compare", action="store_true",
+                        help="print results against the last run with the same scale")
+    args = parser.parse_args(args=in_args)
+
+    work_dir = os.path.abspath(args.workDir)
+    cu.check_dir_exists_create(work_dir)
+    history_filename = args.history or os.path.join(work_dir, "benchmark_history.json")
+
+    inputs = BenchmarkInputs(work_dir, args.nEvents, args.jetsPerEvent, args.PUmean, args.seed,
+                             regenerate=args.regenerate)
+    commit, dirty = get_git_commit()
+    run = OrderedDict([
+        ("start_time", time.strftime("%Y-%m-%dT%H:%M:%S")),
+        ("label", args.label),
+        ("git_commit", commit),
+        ("git_dirty", dirty),
+        ("host", socket.gethostname()),
+        ("python", sys.version.split()[0]),
+        ("root", ROOT.gROOT.GetVersion()),
+        ("scale", inputs.scale),
+        ("benchmarks", OrderedDict()),
+    ])
+
+    for name in args.only:
+        print "*** Benchmark:", name, "***"
+        bench_fn = BENCHMARKS[name][0]
+        try:
+            result = bench_fn(inputs, args)
+        except (subprocess.CalledProcessError, IOError, KeyError) as err:
+            print "Benchmark %s failed: %s" % (name, err)
+            result = OrderedDict([("failed", str(err))])
+        run['benchmarks'][name] = result
+        print json.dumps(result)
+
+    runs = load_history(history_filename)
+    if args.compare:
+        same_scale = [r for r in runs if r['scale'] == inputs.scale]
+        print_comparison(run, same_scale[-1] if same_scale else None)
+    runs.append(run)
+    save_history(history_filename, runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,25 @@ It can also re-fit the correction curve to an existing graph, saving time.
 In this case, use the --redo_correction_fit option, and the input file is
 the output from a previous running of this script.
 
+The input can also be a set of pairs files from the matcher, without hadd-ing
+them: give a glob pattern or a manifest file (see pairs_dataset.py). The
+hists are filled for each file in parallel with --jobs, and added together.
+
+If the matcher was run with --summary, the hists are already filled, and
+the input can be the summary file(s) instead, with the --summary option.
+This is much faster, since the pairs don't have to be read at all.
+
+To estimate the statistical uncertainty on the correction curve, use the
+--bootstrap option. This resamples the pairs many times (by giving each pair
+a Poisson-distributed weight), and redoes the response fits & correction fit
+for each sample, in parallel with --jobs. The 68% band of the resulting
+curves is stored as a TGraphAsymmErrors for each eta bin.
+
+A JSON report of the time spent in each stage (filling hists, fitting,
+writing), counters (entries scanned, fits attempted/failed/retried) and
+peak memory is written next to the output file (see run_metrics.py).
+Use --profile to also store a cProfile dump.
+
 Usage: see
 python runCalibration.py -h
 
@@ -17,12 +36,20 @@ Originally by Nick Wardle, modified(hacked to shreds) by Robin Aggleton
 import ROOT
 import os
 import sys
+import time
 import numpy as np
 import argparse
 import binning
 from binning import pairwise
 import common_utils as cu
+from pairs_dataset import PairsDataset, DrawRequest
+from calib_summary import CalibSummary, rebin_profile
+from hist_arrays import hist_bin_contents, graph_arrays
+from hist_booking import book_hist, get_hist_memory, HistStore
+from run_metrics import RunMetrics, generate_metrics_filename, generate_profile_filename
 from math import sqrt, log
+from multiprocessing import Pool
+import cProfile
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -32,6 +59,12 @@ ROOT.gStyle.SetOptFit(1111)
 ROOT.TH1.SetDefaultSumw2(True)
 
 
+# Timers & counters for this run, written out at the end of main().
+# Bootstrap fits are not counted, whether or not they are done in worker
+# processes, so the counters don't depend on --jobs.
+metrics = RunMetrics()
+
+
 # definition of the response function to fit to get our correction function
 # MAKE SURE IT'S THE SAME ONE THAT IS USED IN THE EMULATOR
 central_fit_conventional = ROOT.TF1("fitfcn", "[0]+[1]/(pow(log10(x),2)+[2])+[3]*exp(-[4]*(log10(x)-[5])*(log10(x)-[5]))")
@@ -122,7 +155,7 @@ def generate_eta_graph_name(absetamin, absetamax):
 
 
 def get_hist_bin_contents(hist):
-    return np.array([hist.GetBinContent(i) for i in range(1, hist.GetNbinsX() + 1)])
+    return hist_bin_contents(hist)
 
 
 def do_gauss_response_hist_fit(hrsp):
@@ -135,11 +168,15 @@ def do_gauss_response_hist_fit(hrsp):
         # Try the fit mutliple times, beacuse it can converge on the 2nd or 3rd
         # iteration but not on the 1st...
         fit_counter = 3
+        metrics.count("rsp_fits")
         while fitStatus != 0 and fit_counter > 0:
             fitStatus = int(hrsp.Fit("gaus", "QER", "",
                                      hrsp.GetMean() - 1. * hrsp.GetRMS(),
                                      hrsp.GetMean() + 1. * hrsp.GetRMS()))
             # fitStatus = int(hrsp.Fit("burr", "QER", "", 0, 2))
+            metrics.count("rsp_fit_calls")
+            if fit_counter < 3:
+                metrics.count("rsp_fit_retries")
             fit_counter -= 1
             if fitStatus == 0:
                 mean = hrsp.GetFunction("gaus").GetParameter(1)
@@ -151,6 +188,7 @@ def do_gauss_response_hist_fit(hrsp):
     # check if we have a bad fit - either fit status != 0, or
     # fit mean is not close to raw mean. in either case use raw mean
     if fitStatus != 0:  # or (xlow > 50 and abs((mean / hrsp.GetMean()) - 1) > 0.2):
+        metrics.count("rsp_fit_failures")
         print "Poor Fit: fit mean:", mean, "raw mean:", hrsp.GetMean(), "fit status:", fitStatus
         mean = hrsp.GetMean()
         err = hrsp.GetMeanError()
@@ -224,9 +262,13 @@ def do_burr_response_hist_fit(hrsp, setup_fn):
         hrsp.Rebin(2)
         fit_counter = 3
         setup_fn()
+        metrics.count("rsp_fits")
         while fitStatus != 0 and fit_counter > 0:
             print 'Iterations left', fit_counter
             fitStatus = int(hrsp.Fit("burr3", "QE"))
+            metrics.count("rsp_fit_calls")
+            if fit_counter < 3:
+                metrics.count("rsp_fit_retries")
             fit_counter -= 1
             if fitStatus == 0 and hrsp.GetFunction("burr3").GetMaximumX() > 0:
                 burr_fn = hrsp.GetFunction("burr3")
@@ -248,15 +290,72 @@ def do_burr_response_hist_fit(hrsp, setup_fn):
     if (fitStatus != 0 or mode <= 0 or err <= 0 or
         (hrsp.GetFunction("burr3").GetMaximum() / hrsp.GetMaximum()) < 0.8 or
         (hrsp.GetFunction("burr3").GetMaximum() / hrsp.GetMaximum()) > 1.2 ):
+        metrics.count("rsp_fit_failures")
         print "Poor Fit: fit mode:", mode, "raw mean:", hrsp.GetMean(), "fit status:", fitStatus
         mode = hrsp.GetMean()
         err = hrsp.GetMeanError()
     return mode, err
 
 
-def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetamax,
+def draw_calib_hists(pairs, ptBins, absetamin, absetamax, total_cut, pt_binning, do_genjet_plots, lean=False):
+    """Fill all the hists for one eta bin in one pass over the pairs:
+
+    - response (pT^L1/pT^Gen) for all pt bins
+    - rsp Vs GenJet pT, rsp Vs L1 pT, pT^L1 Vs pT^Gen
+    - pT L1 (& pT Gen) for each pT Gen bin
+
+    pt_binning: (nbins, min, max) for the pT axes of the 2D hists.
+
+    lean: if True, don't make the rsp Vs L1 pT and pT^L1 Vs pT^Gen hists,
+    which are only for debugging.
+
+    All fills are unweighted, so hists are booked without Sumw2, and the 2D
+    hists use float storage (see hist_booking.py).
+
+    Returns a dict of {hist name: hist}
+    """
+    nb, pt_min, pt_max = pt_binning
+    pt_axis, rsp_axis = (nb, pt_min, pt_max), (150, 0, 5)
+    eta_range = dict(absetamin=absetamin, absetamax=absetamax)
+    hrsp_eta_name = "hrsp_eta_%g_%g" % (absetamin, absetamax)
+    requests = [
+        DrawRequest("rsp>>" + hrsp_eta_name, total_cut,
+                    hist=book_hist(hrsp_eta_name, "", (50, 0, 2), storage="double"), **eta_range),
+        DrawRequest("rsp:ptRef>>h2d_rsp_gen", total_cut,
+                    hist=book_hist("h2d_rsp_gen", "", pt_axis, rsp_axis), **eta_range),
+    ]
+    if not lean:
+        requests.extend([
+            DrawRequest("rsp:pt>>h2d_rsp_l1", total_cut,
+                        hist=book_hist("h2d_rsp_l1", "", pt_axis, rsp_axis), **eta_range),
+            DrawRequest("pt:ptRef>>h2d_gen_l1", total_cut,
+                        hist=book_hist("h2d_gen_l1", "", pt_axis, pt_axis), **eta_range)
+        ])
+    for xlow, xhigh in pairwise(ptBins):
+        # cut on ref jet pt
+        pt_cut = ROOT.TCut("ptRef < %g && ptRef > %g " % (xhigh, xlow))
+        pt_bin_cut = ROOT.TCut(total_cut)
+        pt_bin_cut += pt_cut
+        print pt_bin_cut
+        hpt_name = "L1_pt_genpt_%g_%g" % (xlow, xhigh)
+        requests.append(DrawRequest("pt>>" + hpt_name, pt_bin_cut,
+                                    hist=book_hist(hpt_name, "", (4000, 0, 2000), storage="double"),
+                                    pt_ref_min=xlow, pt_ref_max=xhigh, **eta_range))
+        if do_genjet_plots:
+            # fixed range, so hists from several pairs files can be added
+            hpt_gen_name = "gen_pt_genpt_%g_%g" % (xlow, xhigh)
+            requests.append(DrawRequest("ptRef>>" + hpt_gen_name, pt_bin_cut,
+                                        hist=book_hist(hpt_gen_name, "", (200, xlow, xhigh), storage="double"),
+                                        pt_ref_min=xlow, pt_ref_max=xhigh, **eta_range))
+    hists = {req.hist_name: h for req, h in zip(requests, pairs.draw_many(requests))}
+    print "Booked %.1f MB of hists" % (sum(get_hist_memory(h) for h in hists.values()) / 1024. ** 2)
+    return hists
+
+
+def make_correction_curves(pairs, outputfile, ptBins_in, absetamin, absetamax,
                            fitfcn, do_genjet_plots, do_correction_fit,
-                           pu_min, pu_max, do_burr):
+                           pu_min, pu_max, do_burr, n_bootstrap=0, n_jobs=1, summary=None,
+                           lean=False):
     """
     Do all the relevant hists and fitting, for one eta bin.
 
@@ -269,7 +368,7 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
 
     Returns parameters of succeful fit.
 
-    inputfile: TFile. Must contain TTree named "valid", full of pair quantities.
+    pairs: PairsDataset. Pairs file(s) from RunMatcher. Not used if summary is set.
 
     outputfile: TFile. To store output histograms.
 
@@ -292,14 +391,23 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
 
     do_burr: bool. If True, use Burr fn to fit response histograms.
     The default is to use a Gaussian.
+
+    n_bootstrap: int. Number of bootstrap samples to make an uncertainty band
+    on the correction curve. If 0, don't do it.
+
+    n_jobs: int. Number of processes to use for bootstrapping.
+
+    summary: CalibSummary. If set, use the hists filled by RunMatcher --summary
+    instead of making them from the pairs. The per pT Gen bin L1 (& Gen) pT hists
+    are then replaced by profiles of the mean pT, and bootstrapping can't be done.
+
+    lean: bool. If True, don't make or store the 2D hists that are only for
+    debugging (rsp Vs L1 pT, pT^L1 Vs pT^Gen), and don't store rsp Vs pT^Gen.
     """
 
     print "Doing PU range: %g - %g" % (pu_min, pu_max)
     print "Running over pT bins:", ptBins_in
 
-    # Input tree
-    tree_raw = cu.get_from_file(inputfile, "valid")
-
     # Output folders
     output_f = outputfile.mkdir('eta_%g_%g' % (absetamin, absetamax))
     output_f_hists = output_f.mkdir("Histograms")
@@ -308,7 +416,7 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
     eta_cut = ROOT.TCut("TMath::Abs(eta)<%g && TMath::Abs(eta) > %g" % (absetamax, absetamin))
 
     # PU cut string
-    if hasattr(tree_raw, "numPUVertices"):
+    if pairs and pairs.has_branch("numPUVertices"):
         pu_cut = ROOT.TCut("numPUVertices >= %g && numPUVertices <= %g" % (pu_min, pu_max))
     else:
         pu_cut = ROOT.TCut("")
@@ -322,45 +430,63 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
     total_cut += avoidSaturation_cut
     print total_cut
 
-    # Draw response (pT^L1/pT^Gen) for all pt bins
-    tree_raw.Draw("rsp>>hrsp_eta_%g_%g(50,0,2)" % (absetamin, absetamax), total_cut, "goff")
-    hrsp_eta = ROOT.gROOT.FindObject("hrsp_eta_%g_%g" % (absetamin, absetamax))
-    hrsp_eta.SetTitle(";response (p_{T}^{L1}/p_{T}^{Ref});")
-    output_f_hists.WriteTObject(hrsp_eta)
-
     nb, pt_min, pt_max = 2048, 0, 1024
 
-    # Draw rsp (pT^L1/pT^Gen) Vs GenJet pT
-    tree_raw.Draw("rsp:ptRef>>h2d_rsp_gen(%d,%g,%g,150,0,5)" % (nb, pt_min, pt_max), total_cut, "goff")
-    h2d_rsp_gen = ROOT.gROOT.FindObject("h2d_rsp_gen")
-    h2d_rsp_gen.SetTitle(";p_{T}^{Ref} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})")
-    output_f_hists.WriteTObject(h2d_rsp_gen)
-
-    # Draw rsp (pT^L1/pT^Gen) Vs L1 pT
-    tree_raw.Draw("rsp:pt>>h2d_rsp_l1(%d,%g,%g,150,0,5)" % (nb, pt_min, pt_max), total_cut, "goff")
-    h2d_rsp_l1 = ROOT.gROOT.FindObject("h2d_rsp_l1")
-    h2d_rsp_l1.SetTitle(";p_{T}^{L1} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})")
-    output_f_hists.WriteTObject(h2d_rsp_l1)
-
-    # draw pT^L1 Vs pT^Gen
-    tree_raw.Draw("pt:ptRef>>h2d_gen_l1(%d,%g,%g,%d,%g,%g)" % (nb, pt_min, pt_max, nb, pt_min, pt_max), total_cut, "goff")
-    h2d_gen_l1 = ROOT.gROOT.FindObject("h2d_gen_l1")
-    h2d_gen_l1.SetTitle(";p_{T}^{Ref} [GeV];p_{T}^{L1} [GeV]")
-    output_f_hists.WriteTObject(h2d_gen_l1)
-
     # Go through and find histogram bin edges that are closest to the input pt
     # bin edges, and store for future use
+    pt_axis = ROOT.TAxis(nb, pt_min, pt_max)  # same as the pT^Gen axis of h2d_rsp_gen
     ptBins = []
     bin_indices = []
     for i, ptR in enumerate(ptBins_in[0:-1]):
-        bin1 = h2d_rsp_gen.GetXaxis().FindBin(ptR)
-        bin2 = h2d_rsp_gen.GetXaxis().FindBin(ptBins_in[i + 1]) - 1
-        xlow = h2d_rsp_gen.GetXaxis().GetBinLowEdge(bin1)
-        xup = h2d_rsp_gen.GetXaxis().GetBinLowEdge(bin2 + 1)
+        bin1 = pt_axis.FindBin(ptR)
+        bin2 = pt_axis.FindBin(ptBins_in[i + 1]) - 1
+        xlow = pt_axis.GetBinLowEdge(bin1)
+        xup = pt_axis.GetBinLowEdge(bin2 + 1)
         bin_indices.append([bin1, bin2])
         ptBins.append(xlow)
     ptBins.append(xup)  # only need this last one
 
+    # Owns all the hists for this eta bin, so they are freed at the end
+    store = HistStore()
+
+    eta_range = dict(absetamin=absetamin, absetamax=absetamax)
+    if summary:
+        with metrics.stage("read_summary"):
+            hists = summary.get_hists(absetamin, absetamax, pu_min, pu_max)
+        # <pT L1> (& <pT Gen>) for each pT Gen bin
+        hprof_pt = store.adopt(rebin_profile(hists["hprof_pt_gen"], ptBins, "L1_pt_genpt"))
+        hprof_ptref = store.adopt(rebin_profile(hists["hprof_ptref_gen"], ptBins, "gen_pt_genpt"))
+        output_f_hists.WriteTObject(hprof_pt)
+        if do_genjet_plots:
+            output_f_hists.WriteTObject(hprof_ptref)
+    else:
+        with metrics.stage("draw_hists"):
+            hists = draw_calib_hists(pairs, ptBins, absetamin, absetamax, total_cut,
+                                     (nb, pt_min, pt_max), do_genjet_plots, lean)
+    for hist in hists.values():
+        store.adopt(hist)
+
+    hrsp_eta = hists["hrsp_eta_%g_%g" % (absetamin, absetamax)]
+    hrsp_eta.SetTitle(";response (p_{T}^{L1}/p_{T}^{Ref});")
+    h2d_rsp_gen = hists["h2d_rsp_gen"]
+    h2d_rsp_gen.SetTitle(";p_{T}^{Ref} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})")
+
+    with metrics.stage("write_output"):
+        output_f_hists.WriteTObject(hrsp_eta)
+        if not lean:
+            output_f_hists.WriteTObject(h2d_rsp_gen)
+
+        # not in the summary, or in lean mode
+        if "h2d_rsp_l1" in hists:
+            h2d_rsp_l1 = hists["h2d_rsp_l1"]
+            h2d_rsp_l1.SetTitle(";p_{T}^{L1} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})")
+            output_f_hists.WriteTObject(h2d_rsp_l1)
+
+        if "h2d_gen_l1" in hists:
+            h2d_gen_l1 = hists["h2d_gen_l1"]
+            h2d_gen_l1.SetTitle(";p_{T}^{Ref} [GeV];p_{T}^{L1} [GeV]")
+            output_f_hists.WriteTObject(h2d_gen_l1)
+
     gr = ROOT.TGraphErrors()  # 1/<rsp> VS ptL1
     gr_gen = ROOT.TGraphErrors()  # 1/<rsp> VS ptGen
     grc = 0
@@ -384,48 +510,49 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
         xhigh = ptBins[i + 1]
 
         # Plot of response for given pT Gen bin
-        hrsp = h2d_rsp_gen.ProjectionY("Rsp_genpt_%g_%g" % (xlow, xhigh), bin1, bin2)
+        hrsp = store.adopt(h2d_rsp_gen.ProjectionY("Rsp_genpt_%g_%g" % (xlow, xhigh), bin1, bin2))
 
-        # cut on ref jet pt
-        pt_cut = ROOT.TCut("ptRef < %g && ptRef > %g " % (xhigh, xlow))
-        total_cut = ROOT.TCut(eta_cut)
-        total_cut += pu_cut
-        total_cut += avoidSaturation_cut
-        total_cut += pt_cut
-        print total_cut
-
-        # Plots of pT L1 for given pT Gen bin
-        tree_raw.Draw("pt>>hpt(4000, 0, 2000)", total_cut, "goff")
-        hpt = ROOT.gROOT.FindObject("hpt")
-        hpt.SetName("L1_pt_genpt_%g_%g" % (xlow, xhigh))
-        # hpt = h2d_gen_l1.ProjectionX("L1_pt_genpt_%g_%g" % (xlow, xhigh))
-
-        if hrsp.GetEntries() <= 0 or hpt.GetEntries() <= 0:
+        # <pT L1> (& <pT Gen>) for given pT Gen bin
+        if summary:
+            pt_mean, pt_mean_err = hprof_pt.GetBinContent(i + 1), hprof_pt.GetBinError(i + 1)
+            n_pt = hprof_pt.GetBinEntries(i + 1)
+            ptref_mean = hprof_ptref.GetBinContent(i + 1)
+        else:
+            # Plots of pT L1 for given pT Gen bin
+            hpt = hists["L1_pt_genpt_%g_%g" % (xlow, xhigh)]
+            # hpt = h2d_gen_l1.ProjectionX("L1_pt_genpt_%g_%g" % (xlow, xhigh))
+            pt_mean, pt_mean_err, n_pt = hpt.GetMean(), hpt.GetMeanError(), hpt.GetEntries()
+            if do_genjet_plots:
+                hpt_gen = hists["gen_pt_genpt_%g_%g" % (xlow, xhigh)]
+                ptref_mean = hpt_gen.GetMean()
+
+        if hrsp.GetEntries() <= 0 or n_pt <= 0:
             print "Skipping as 0 entries"
             continue
 
-        output_f_hists.WriteTObject(hpt)
+        if not summary:
+            with metrics.stage("write_output"):
+                store.write(output_f_hists, hpt, free=True)
 
-        # Plots of pT Gen for given pT Gen bin
-        if do_genjet_plots:
-            tree_raw.Draw("ptRef>>hpt_gen(200)", total_cut, "goff")
-            hpt_gen = ROOT.gROOT.FindObject("hpt_gen")
-            hpt_gen.SetName("gen_pt_genpt_%g_%g" % (xlow, xhigh))
-            output_f_hists.WriteTObject(hpt_gen)
+                # Plots of pT Gen for given pT Gen bin
+                if do_genjet_plots:
+                    store.write(output_f_hists, hpt_gen, free=True)
 
         # Fit to resposne hist to get mean response & error on mean
-        if do_burr:
-            if (absetamin > 2 and i == 0):
-                setup_burr3_higherEta()
-            setup_fn = setup_burr3 if absetamin < 2 else setup_burr3_higherEta
-            mean, err = do_burr_response_hist_fit(hrsp, setup_fn)
-        else:
-            mean, err = do_gauss_response_hist_fit(hrsp)
+        with metrics.stage("fit_response"):
+            if do_burr:
+                if (absetamin > 2 and i == 0):
+                    setup_burr3_higherEta()
+                setup_fn = setup_burr3 if absetamin < 2 else setup_burr3_higherEta
+                mean, err = do_burr_response_hist_fit(hrsp, setup_fn)
+            else:
+                mean, err = do_gauss_response_hist_fit(hrsp)
 
-        output_f_hists.WriteTObject(hrsp)
+        with metrics.stage("write_output"):
+            store.write(output_f_hists, hrsp, free=True)
 
-        print "pT Gen: ", ptR, "-", ptBins[i + 1], "<pT L1>:", hpt.GetMean(), \
-              "<pT Gen>:", (hpt_gen.GetMean() if do_genjet_plots else "NA"), "<rsp>:", mean
+        print "pT Gen: ", ptR, "-", ptBins[i + 1], "<pT L1>:", pt_mean, \
+              "<pT Gen>:", (ptref_mean if do_genjet_plots else "NA"), "<rsp>:", mean
 
         # Since we're plotting 1/rsp on y axis, so need jacobian
         err = err / (mean**2)
@@ -434,10 +561,10 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
         # store if new max/min, but only max if pt > pt of previous point
         # max_pt = max(hpt.GetMean(), max_pt) if grc > 0 and hpt.GetMean() > gr.GetX()[grc-1] else max_pt
         # min_pt = min(hpt.GetMean(), min_pt)
-        gr.SetPoint(grc, hpt.GetMean(), 1. / mean)
-        gr.SetPointError(grc, hpt.GetMeanError(), err)
+        gr.SetPoint(grc, pt_mean, 1. / mean)
+        gr.SetPointError(grc, pt_mean_err, err)
         if do_genjet_plots:
-            gr_gen.SetPoint(grc, hpt_gen.GetMean(), 1. / mean)
+            gr_gen.SetPoint(grc, ptref_mean, 1. / mean)
             # gr_gen.SetPointError(grc, hpt.GetMeanError(), err)
         grc += 1
 
@@ -461,11 +588,30 @@ def make_correction_curves(inputfile, outputfile, ptBins_in, absetamin, absetama
     fit_params = []
 
     if do_correction_fit:
-        sub_graph, this_fit = setup_fit(gr, fitfcn, absetamin, absetamax, outputfile)
-        fit_graph, fit_params = fit_correction(sub_graph, this_fit)
+        # store starting params for the bootstrap fits, as fitting changes them
+        start_params = [fitfcn.GetParameter(i) for i in range(fitfcn.GetNpar())]
+        with metrics.stage("fit_correction"):
+            sub_graph, this_fit = setup_fit(gr, fitfcn, absetamin, absetamax, outputfile)
+            fit_graph, fit_params = fit_correction(sub_graph, this_fit)
         outputfile.WriteTObject(this_fit)  # function by itself
         outputfile.WriteTObject(fit_graph)  # has the function stored in it as well
 
+        if n_bootstrap > 0:
+            with metrics.stage("read_columns"):
+                columns = pairs.read_columns(["pt", "ptRef", "rsp"], total_cut, **eta_range)
+            pt_grid = graph_arrays(gr)[0].copy()
+            with metrics.stage("bootstrap"), metrics.counting_paused():
+                curves = bootstrap_correction_curves(columns, ptBins, absetamin, absetamax,
+                                                     fitfcn, start_params, pt_grid,
+                                                     n_bootstrap, n_jobs, do_burr)
+            metrics.count("bootstrap_samples", n_bootstrap)
+            nominal = np.array([this_fit.Eval(x) for x in pt_grid]) if fit_params else None
+            band = make_bootstrap_band(pt_grid, curves, nominal)
+            if band:
+                band.SetName(generate_eta_band_name(absetamin, absetamax))
+                outputfile.WriteTObject(band)
+
+    store.free()
     return fit_params
 
 
@@ -676,6 +822,7 @@ def fit_correction(graph, function, fit_min=-1, fit_max=-1):
             if str(function.GetExpFormula()).startswith("pol"):
                 mode += "F"
             fit_result = int(graph.Fit(function.GetName(), mode, "", fit_min, fit_max))
+            metrics.count("correction_fit_calls")
             if fit_result != 0:
                 fit_min_ind += 1
                 continue
@@ -698,7 +845,9 @@ def fit_correction(graph, function, fit_min=-1, fit_max=-1):
 
     params = []
 
+    metrics.count("correction_fits")
     if fit_result != 0:
+        metrics.count("correction_fit_failures")
         print "Couldn't fit"
     else:
         for i in range(function.GetNumberFreeParameters()):
@@ -726,6 +875,167 @@ def check_sensible_function(function, lim=[3, 1000], spacing=0.05):
     return True
 
 
+def generate_eta_band_name(absetamin, absetamax):
+    """Generate name of bootstrap uncertainty band graph for given eta bin."""
+    return generate_eta_graph_name(absetamin, absetamax) + "_band"
+
+
+# Inputs for the bootstrap samples of the eta bin currently being done.
+# These are set before the worker processes are forked, so the (large) arrays
+# are shared with them rather than being pickled & sent for each sample.
+_bootstrap_inputs = {}
+
+
+def fit_bootstrap_sample(seed):
+    """Make the correction curve for one bootstrap sample.
+
+    Each pair gets a random weight from a Poisson distribution with mean 1.
+    The response hists for all ref jet pt bins are then filled with one pass
+    over the arrays, fitted, and the correction curve fitted exactly as for
+    the nominal curve.
+
+    Returns a numpy.ndarray of the correction curve evaluated at each point
+    in _bootstrap_inputs['pt_grid'], or None if the correction fit failed.
+    """
+    d = _bootstrap_inputs
+    weights = np.random.RandomState(seed).poisson(1, size=len(d['pt']))
+    bin_ind = d['bin_ind']
+    n_bins = len(d['pt_bins']) - 1
+
+    # Weighted sums of L1 pt for <pT^L1> per bin
+    sum_w = np.bincount(bin_ind, weights=weights, minlength=n_bins)
+    sum_pt = np.bincount(bin_ind, weights=weights * d['pt'], minlength=n_bins)
+    sum_pt2 = np.bincount(bin_ind, weights=weights * d['pt']**2, minlength=n_bins)
+
+    # Response hists, same binning as projections of h2d_rsp_gen
+    rsp_nbins, rsp_min, rsp_max = 150, 0, 5
+    hist_args = dict(bins=[n_bins, rsp_nbins], range=[[0, n_bins], [rsp_min, rsp_max]])
+    rsp_sumw, _, _ = np.histogram2d(bin_ind, d['rsp'], weights=weights, **hist_args)
+    rsp_sumw2, _, _ = np.histogram2d(bin_ind, d['rsp'], weights=weights**2, **hist_args)
+
+    gr = ROOT.TGraphErrors()
+    grc = 0
+    for i in xrange(n_bins):
+        if sum_w[i] <= 0:
+            continue
+        hrsp = ROOT.TH1D("Rsp_bootstrap_%d" % i, "", rsp_nbins, rsp_min, rsp_max)
+        hrsp.SetDirectory(0)
+        for j in xrange(rsp_nbins):
+            hrsp.SetBinContent(j + 1, rsp_sumw[i][j])
+            hrsp.SetBinError(j + 1, sqrt(rsp_sumw2[i][j]))
+        hrsp.SetEntries(sum_w[i])
+
+        if d['do_burr']:
+            setup_fn = setup_burr3 if d['absetamin'] < 2 else setup_burr3_higherEta
+            mean, err = do_burr_response_hist_fit(hrsp, setup_fn)
+        else:
+            mean, err = do_gauss_response_hist_fit(hrsp)
+
+        mean_pt = sum_pt[i] / sum_w[i]
+        var_pt = max(sum_pt2[i] / sum_w[i] - mean_pt**2, 0)
+        gr.SetPoint(grc, mean_pt, 1. / mean)
+        gr.SetPointError(grc, sqrt(var_pt / sum_w[i]), err / (mean**2))
+        grc += 1
+
+    if grc == 0:
+        return None
+
+    fitfcn = d['fitfcn']
+    set_fit_params(fitfcn, d['start_params'])
+    try:
+        sub_graph, this_fit = setup_fit(gr, fitfcn, d['absetamin'], d['absetamax'], None)
+    except (RuntimeError, ValueError, IndexError, StopIteration) as e:
+        print "Bootstrap sample %d: cannot setup fit:" % seed, e
+        return None
+    fit_graph, fit_params = fit_correction(sub_graph, this_fit)
+    if not fit_params:
+        return None
+    return np.array([this_fit.Eval(x) for x in d['pt_grid']])
+
+
+def bootstrap_correction_curves(columns, pt_bins, absetamin, absetamax,
+                                fitfcn, start_params, pt_grid,
+                                n_samples, n_jobs, do_burr):
+    """Make correction curves for many bootstrap samples of the pairs.
+
+    columns: dict. Arrays of pair quantities (pt, ptRef, rsp), from PairsDataset.read_columns()
+
+    pt_bins: list. Edges of ref jet pt bins, as used for the nominal curve.
+
+    absetamin, absetamax: float. Eta bin edges
+
+    fitfcn: TF1. Function to fit for correction curve.
+
+    start_params: list. Starting parameters for fitfcn.
+
+    pt_grid: numpy.ndarray. L1 pt values to evaluate each curve at.
+
+    n_samples: int. Number of bootstrap samples.
+
+    n_jobs: int. Number of processes to run samples in parallel.
+
+    do_burr: bool. If True, use Burr fn to fit response histograms.
+
+    Returns a 2D numpy.ndarray, one row per successful sample, where each row
+    is the correction curve evaluated at pt_grid.
+    """
+    print "Bootstrapping correction curve with %d samples, %d processes" % (n_samples, n_jobs)
+    pt_bins = np.array(pt_bins)
+    bin_ind = np.digitize(columns['ptRef'], pt_bins) - 1
+    in_range = (bin_ind >= 0) & (bin_ind < len(pt_bins) - 1)
+
+    _bootstrap_inputs.clear()
+    _bootstrap_inputs.update(pt=columns['pt'][in_range], rsp=columns['rsp'][in_range],
+                             bin_ind=bin_ind[in_range], pt_bins=pt_bins,
+                             absetamin=absetamin, absetamax=absetamax,
+                             fitfcn=fitfcn.Clone(fitfcn.GetName() + "_bootstrap"),
+                             start_params=start_params, pt_grid=pt_grid,
+                             do_burr=do_burr)
+
+    seeds = range(n_samples)
+    if n_jobs > 1:
+        # NB workers exit via os._exit(), so they never close (& write to) the
+        # output TFile they inherit from this process
+        pool = Pool(processes=n_jobs)
+        curves = pool.map(fit_bootstrap_sample, seeds)
+        pool.close()
+        pool.join()
+    else:
+        curves = map(fit_bootstrap_sample, seeds)
+
+    curves = [c for c in curves if c is not None]
+    print "Bootstrap: %d / %d samples had a successful correction fit" % (len(curves), n_samples)
+    _bootstrap_inputs.clear()
+    return np.array(curves)
+
+
+def make_bootstrap_band(pt_grid, curves, nominal=None, percentiles=(16, 84)):
+    """Make a graph of the band containing the central 68% of bootstrap curves.
+
+    pt_grid: numpy.ndarray. L1 pt values at which curves were evaluated.
+
+    curves: numpy.ndarray. 2D, one correction curve per row.
+
+    nominal: numpy.ndarray. Nominal curve at pt_grid, used as the central
+    values. If None, the median of the curves is used instead.
+
+    Returns a TGraphAsymmErrors, or None if there are no curves.
+    """
+    if len(curves) == 0:
+        print "No successful bootstrap samples, not making band"
+        return None
+    lower, median, upper = np.percentile(curves, [percentiles[0], 50, percentiles[1]], axis=0)
+    central = nominal if nominal is not None else median
+    zeros = np.zeros_like(pt_grid)
+    band = ROOT.TGraphAsymmErrors(len(pt_grid), np.array(pt_grid, dtype=float), central,
+                                  zeros, zeros,
+                                  np.clip(central - lower, 0, None),
+                                  np.clip(upper - central, 0, None))
+    band.GetXaxis().SetTitle("<p_{T}^{L1}> [GeV]")
+    band.GetYaxis().SetTitle("Correction (%g%% bootstrap band)" % (percentiles[1] - percentiles[0]))
+    return band
+
+
 def redo_correction_fit(inputfile, outputfile, absetamin, absetamax, fitfcn):
     """Redo correction fit for a given eta bin.
 
@@ -753,7 +1063,9 @@ def redo_correction_fit(inputfile, outputfile, absetamin, absetamax, fitfcn):
 
 def main(in_args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("input", help="input ROOT filename")
+    parser.add_argument("input",
+                        help="input ROOT filename. Can also be a glob pattern " \
+                        "or manifest of pairs files, except with --redo-correction-fit")
     parser.add_argument("output", help="output ROOT filename")
     parser.add_argument("--no-genjet-plots", action='store_false',
                         help="Don't do genjet plots for each pt/eta bin")
@@ -784,6 +1096,21 @@ def main(in_args=sys.argv[1:]):
                         help="Maximum number of PU vertices (refers to *actual* "
                         "number of PU vertices in the event, not the centre "
                         "of of the Poisson distribution)")
+    parser.add_argument("--bootstrap", type=int, default=0,
+                        help="Number of bootstrap samples to make an uncertainty "
+                        "band on each correction curve. 0 to turn off.")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Number of processes to use for filling hists from " \
+                        "several pairs files, and for bootstrapping")
+    parser.add_argument("--summary", action='store_true',
+                        help="Input is calibration summary file(s) from RunMatcher --summary, " \
+                        "instead of pairs")
+    parser.add_argument("--lean", action='store_true',
+                        help="Don't store the big 2D hists that are only for debugging, " \
+                        "to save memory & output file size")
+    parser.add_argument("--profile", action='store_true',
+                        help="Also store a cProfile dump next to the output file, " \
+                        "as well as the JSON metrics report")
     parser.add_argument("--etaInd", nargs="+",
                         help="list of eta bin INDICES to run over - "
                         "if unspecified will do all. "
@@ -793,6 +1120,15 @@ def main(in_args=sys.argv[1:]):
     args = parser.parse_args(args=in_args)
     print args
 
+    metrics.set_info(input=args.input, output=args.output, args=vars(args))
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    if args.summary and (args.bootstrap > 0 or args.redo_correction_fit):
+        raise RuntimeError("Can't use --summary with --bootstrap or --redo-correction-fit")
+
     if args.stage2:
         print "Running with Stage2 defaults"
     elif args.stage1:
@@ -818,15 +1154,23 @@ def main(in_args=sys.argv[1:]):
         print 'Using Burr Type3 for response hist fits'
 
     # Open input & output files, check
+    pairs = None
     print "IN:", args.input
     print "OUT:", args.output
     if (args.redo_correction_fit and
         os.path.realpath(args.input) == os.path.realpath(args.output)):
         input_file = cu.open_root_file(args.input, "UPDATE")
         output_file = input_file
-    else:
+    elif args.redo_correction_fit:
         input_file = cu.open_root_file(args.input, "READ")
         output_file = cu.open_root_file(args.output, "RECREATE")
+    else:
+        input_file = None
+        if args.summary:
+            pairs, summary = None, CalibSummary(args.input)
+        else:
+            pairs, summary = PairsDataset(args.input, n_jobs=args.jobs), None
+        output_file = cu.open_root_file(args.output, "RECREATE")
 
     # Figure out which eta bins the user wants to run over
     etaBins = binning.eta_bins
@@ -872,18 +1216,36 @@ def main(in_args=sys.argv[1:]):
         set_fit_params(fitfunc, default_params)
 
         # Actually do the graph making and/or fitting!
-        if args.redo_correction_fit:
-            fit_params = redo_correction_fit(input_file, output_file, eta_min, eta_max, fitfunc)
-        else:
-            fit_params = make_correction_curves(input_file, output_file, ptBins, eta_min, eta_max,
-                                                fitfunc, do_genjet_plots, do_correction_fit,
-                                                args.PUmin, args.PUmax, args.burr)
+        eta_bin_start = time.time()
+        with metrics.stage("eta_bin"):
+            if args.redo_correction_fit:
+                fit_params = redo_correction_fit(input_file, output_file, eta_min, eta_max, fitfunc)
+            else:
+                fit_params = make_correction_curves(pairs, output_file, ptBins, eta_min, eta_max,
+                                                    fitfunc, do_genjet_plots, do_correction_fit,
+                                                    args.PUmin, args.PUmax, args.burr,
+                                                    args.bootstrap, args.jobs, summary, args.lean)
         # Save successful fit params
         if fit_params != []:
             previous_fit_params = fit_params[:]
 
-    input_file.Close()
-    output_file.Close()
+        cu.print_memory_usage("eta bin %g - %g" % (eta_min, eta_max))
+        metrics.record("eta_bins", eta_min=eta_min, eta_max=eta_max,
+                       wall_s=time.time() - eta_bin_start,
+                       fit_ok=fit_params != [], rss_mb=cu.get_rss_mb(), peak_rss_mb=cu.get_peak_rss_mb())
+
+    with metrics.stage("close_output"):
+        if input_file:
+            input_file.Close()
+        output_file.Close()
+
+    if pairs:
+        metrics.count("entries_scanned", pairs.n_entries_scanned)
+    metrics.write_json(generate_metrics_filename(args.output))
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(generate_profile_filename(args.output))
+        print "Written profile to", generate_profile_filename(args.output)
     return 0
 
 
@@ -0,0 +1,127 @@
+"""
+Instrumentation for the analysis scripts: wall & CPU time per stage,
+counters, and peak memory, written as a machine-readable JSON report.
+
+Stages can be nested (e.g. "fit_response" inside "eta_bin"), and the same
+stage can be entered many times: its times and number of calls are summed.
+CPU time is for this process only, so excludes any worker processes.
+
+Usage:
+
+metrics = RunMetrics()
+with metrics.stage("draw_hists"):
+    ...
+metrics.count("rsp_fit_failures")
+with metrics.counting_paused():
+    ...  # e.g. fits that may or may not be done in worker processes
+metrics.write_json(generate_metrics_filename("calib.root"))
+"""
+
+
+import os
+import sys
+import time
+import json
+import socket
+from collections import OrderedDict
+from contextlib import contextmanager
+import common_utils as cu
+
+
+METRICS_SUFFIX = "_metrics.json"
+PROFILE_SUFFIX = "_profile.prof"
+
+
+def _strip_root_ext(filename):
+    return filename[:-len(".root")] if filename.endswith(".root") else filename
+
+
+def generate_metrics_filename(output_filename):
+    """Get JSON report filename for an output ROOT file,
+    e.g. calib.root -> calib_metrics.json"""
+    return _strip_root_ext(output_filename) + METRICS_SUFFIX
+
+
+def generate_profile_filename(output_filename):
+    """Get cProfile dump filename for an output ROOT file,
+    e.g. calib.root -> calib_profile.prof"""
+    return _strip_root_ext(output_filename) + PROFILE_SUFFIX
+
+
+def get_cpu_time():
+    """Get user + system CPU time used by this process so far, in seconds"""
+    times = os.times()
+    return times[0] + times[1]
+
+
+class RunMetrics(object):
+    """Collect timers & counters for one run of a script."""
+
+    def __init__(self):
+        self.start_wall = time.time()
+        self.start_cpu = get_cpu_time()
+        self.stages = OrderedDict()
+        self.counters = OrderedDict()
+        self.records = OrderedDict()
+        self.info = OrderedDict()
+        self._counting = True
+
+    @contextmanager
+    def stage(self, name):
+        """Time the code inside the with block, adding it to stage name."""
+        stage = self.stages.setdefault(name, OrderedDict([("calls", 0), ("wall_s", 0.), ("cpu_s", 0.)]))
+        wall, cpu = time.time(), get_cpu_time()
+        try:
+            yield
+        finally:
+            stage["calls"] += 1
+            stage["wall_s"] += time.time() - wall
+            stage["cpu_s"] += get_cpu_time() - cpu
+
+    def count(self, name, n=1):
+        """Add n to counter name, unless counting is paused"""
+        if self._counting:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def counting_paused(self):
+        """Ignore count() calls inside the with block.
+
+        For work that is only done in this process for some settings
+        (e.g. a single job), so that the counters don't depend on them.
+        """
+        counting = self._counting
+        self._counting = False
+        try:
+            yield
+        finally:
+            self._counting = counting
+
+    def record(self, name, **values):
+        """Append a row of values to the list name, e.g. one per eta bin"""
+        self.records.setdefault(name, []).append(OrderedDict(sorted(values.items())))
+
+    def set_info(self, **values):
+        """Store values that describe the run, e.g. input & arguments"""
+        self.info.update(values)
+
+    def report(self):
+        """Get the full report as a dict"""
+        return OrderedDict([
+            ("info", self.info),
+            ("host", socket.gethostname()),
+            ("python", sys.version.split()[0]),
+            ("start_time", time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.start_wall))),
+            ("total_wall_s", time.time() - self.start_wall),
+            ("total_cpu_s", get_cpu_time() - self.start_cpu),
+            ("peak_rss_mb", cu.get_peak_rss_mb()),
+            ("stages", self.stages),
+            ("counters", self.counters),
+            ("records", self.records),
+        ])
+
+    def write_json(self, filename):
+        """Write the report as JSON"""
+        with open(filename, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        print "Written metrics to", filename
@@ -28,9 +28,8 @@ import common_utils as cu
 from array import array
 import os
 from runCalibration import generate_eta_graph_name
-from subprocess import check_output
 from shutil import make_archive
-from distutils.spawn import find_executable
+from batch_plots import PlotTask, InputRef, render_tasks
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -328,8 +327,13 @@ def plot_rsp_eta_bin(calib_file, eta_min, eta_max, oDir, oFormat="pdf"):
     return filename
 
 
-def plot_rsp_eta_bin_pt(calib_file, eta_min, eta_max, pt_var, pt_min, pt_max, oDir, oFormat="pdf"):
-    """Plot the response in one eta bin with a pt cut"""
+def plot_rsp_eta_bin_pt(calib_file, eta_min, eta_max, pt_var, pt_min, pt_max, oDir, oFormat="pdf",
+                        canvas=None, save=True):
+    """Plot the response in one eta bin with a pt cut
+
+    Can optionally draw on an existing canvas (e.g. when making animations),
+    and not save the plot.
+    """
     if eta_max <= 3:
         # Quick and dirty correction to folder names, replacing 0_3 and 3_5 with more precise numbers
         hname = "eta_0_2.964/Histograms/hrsp_eta_%g_%g_%s_%g_%g" % (eta_min, eta_max, pt_var, pt_min, pt_max)
@@ -340,13 +344,14 @@ def plot_rsp_eta_bin_pt(calib_file, eta_min, eta_max, pt_var, pt_min, pt_max, oD
     except Exception:
         return None
     func = h_rsp.GetListOfFunctions().At(0)
-    c = generate_canvas()
+    c = canvas or generate_canvas()
     h_rsp.SetTitle(os.path.basename(hname) + ';response (%s)' % rsp_str)
     h_rsp.Draw("HISTE")
     if func:
         func.Draw("SAME")
     output_filename = "%s/h_rsp_%g_%g_%s_%g_%g.%s" % (oDir, eta_min, eta_max, pt_var, pt_min, pt_max, oFormat)
-    c.SaveAs(output_filename)
+    if save:
+        c.SaveAs(output_filename)
     return output_filename
 
 
@@ -578,27 +583,39 @@ def plot_rsp_eta_exclusive_graph(check_file, eta_min, eta_max, pt_bins, pt_var,
     c.SaveAs("%s/gr_rsp_eta_%g_%g_%s_%g_%g_binned.%s" % (oDir, eta_min, eta_max, pt_var, pt_bins[0][0], pt_bins[-1][1], oFormat))
 
 
-def plot_rsp_pt_hists(check_file, eta_min, eta_max, pt_bins, pt_var, oDir, oFormat='pdf'):
-    """Plot component hists of response vs pt graph, for given eta bin"""
+def plot_rsp_pt_hist(check_file, eta_min, eta_max, pt_var, pt_min, pt_max, oDir, oFormat='pdf',
+                     canvas=None, save=True):
+    """Plot one component hist of response vs pt graph, for given eta & pt bin.
 
+    Can optionally draw on an existing canvas (e.g. when making animations),
+    and not save the plot. Returns plot filename, or None if no hist exists.
+    """
     sub_dir = "eta_%g_%g" % (eta_min, eta_max)
-    if not os.path.isdir("%s/%s" % (oDir, sub_dir)):
-        os.mkdir("%s/%s" % (oDir, sub_dir))
+    cu.check_dir_exists_create(os.path.join(oDir, sub_dir))
+    hname = "%s/Histograms/rsp_%s_%g_%g" % (sub_dir, pt_var, pt_min, pt_max)
+    try:
+        hist = cu.get_from_file(check_file, hname)
+    except Exception:
+        print '! No histogram %s exists' % hname
+        return None
+    c = canvas or generate_canvas(plot_title)
+    hist.SetTitle("%s;%s;N" % (plot_title, rsp_str))
+    hist.Draw()
+    filename = "%s/%s/rsp_%s_%g_%g.%s" % (oDir, sub_dir, pt_var, pt_min, pt_max, oFormat)
+    if save:
+        c.SaveAs(filename)
+    return filename
+
 
+def plot_rsp_pt_hists(check_file, eta_min, eta_max, pt_bins, pt_var, oDir, oFormat='pdf'):
+    """Plot component hists of response vs pt graph, for given eta bin"""
     c = generate_canvas(plot_title)
     filenames = []
-    for i, pt_min in enumerate(pt_bins[:-1]):
-        pt_max = pt_bins[i + 1]
-        hname = "%s/Histograms/rsp_%s_%g_%g" % (sub_dir, pt_var, pt_min, pt_max)
-        try:
-            hist = cu.get_from_file(check_file, hname)
-            hist.SetTitle("%s;%s;N" % (plot_title, rsp_str))
-            hist.Draw()
-            filename = "%s/%s/rsp_%s_%g_%g.%s" % (oDir, sub_dir, pt_var, pt_min, pt_max, oFormat)
-            c.SaveAs(filename)
+    for pt_min, pt_max in pairwise(pt_bins):
+        filename = plot_rsp_pt_hist(check_file, eta_min, eta_max, pt_var, pt_min, pt_max,
+                                    oDir, oFormat, canvas=c)
+        if filename:
             filenames.append(filename)
-        except Exception:
-            print '! No histogram %s exists' % hname
     return filenames
 
 
@@ -755,41 +772,51 @@ def plot_correction_graph(calib_file, eta_min, eta_max, oDir, oFormat='pdf'):
     c.SaveAs('%s/%s.%s' % (oDir, gname, oFormat))
 
 
-def plot_rsp_eta_pt_bin(calib_file, eta_min, eta_max, pt_min, pt_max, oDir, oFormat="pdf"):
-    """Plot the response in one pt, eta bin"""
+def plot_rsp_eta_pt_bin(calib_file, eta_min, eta_max, pt_min, pt_max, oDir, oFormat="pdf",
+                        canvas=None, save=True):
+    """Plot the response in one pt, eta bin
+
+    Can optionally draw on an existing canvas (e.g. when making animations),
+    and not save the plot.
+    """
     sub_dir = "eta_%g_%g" % (eta_min, eta_max)
-    if not os.path.isdir("%s/%s" % (oDir, sub_dir)):
-        os.mkdir("%s/%s" % (oDir, sub_dir))
+    cu.check_dir_exists_create(os.path.join(oDir, sub_dir))
     hname = "eta_%g_%g/Histograms/Rsp_genpt_%g_%g" % (eta_min, eta_max, pt_min, pt_max)
     # ignore histogram not found errors... naughty naughty
     try:
         h_rsp = cu.get_from_file(calib_file, hname)
-        c = generate_canvas()
+        c = canvas or generate_canvas()
         h_rsp.Draw("HISTE")
         func = h_rsp.GetListOfFunctions().At(0)
         if func:
             func.Draw("SAME")
         h_rsp.SetTitle("%s;%s;" % (hname, rsp_str))
         filepath = "%s/%s/h_rsp_%g_%g_%g_%g.%s" % (oDir, sub_dir, eta_min, eta_max, pt_min, pt_max, oFormat)
-        c.SaveAs(filepath)
+        if save:
+            c.SaveAs(filepath)
         return filepath
     except Exception:
         print "! No histogram %s exists" % hname
 
 
-def plot_pt_bin(calib_file, eta_min, eta_max, pt_min, pt_max, oDir, oFormat="pdf"):
-    """Plot the L1 pt in a given ref jet pt bin, for a given eta bin"""
+def plot_pt_bin(calib_file, eta_min, eta_max, pt_min, pt_max, oDir, oFormat="pdf",
+                canvas=None, save=True):
+    """Plot the L1 pt in a given ref jet pt bin, for a given eta bin
+
+    Can optionally draw on an existing canvas (e.g. when making animations),
+    and not save the plot.
+    """
     sub_dir = "eta_%g_%g" % (eta_min, eta_max)
-    if not os.path.isdir("%s/%s" % (oDir, sub_dir)):
-        os.mkdir("%s/%s" % (oDir, sub_dir))
+    cu.check_dir_exists_create(os.path.join(oDir, sub_dir))
     hname = "eta_%g_%g/Histograms/L1_pt_genpt_%g_%g" % (eta_min, eta_max, pt_min, pt_max)
     # ignore histogram not found errors... naughty naughty
     try:
         h_pt = cu.get_from_file(calib_file, hname)
-        c = generate_canvas()
+        c = canvas or generate_canvas()
         h_pt.Draw("HISTE")
         filepath = "%s/%s/L1_pt_%g_%g_%g_%g.%s" % (oDir, sub_dir, eta_min, eta_max, pt_min, pt_max, oFormat)
-        c.SaveAs(filepath)
+        if save:
+            c.SaveAs(filepath)
         return filepath
     except Exception:
         print "! No histogram %s exists" % hname
@@ -807,42 +834,79 @@ def write_filelist(plot_filenames, list_file):
         print 'Warning: nothing to write to txt file'
 
 
-def make_gif(input_file_list, output_gif_filename, convert_exe):
-    """Make an animated GIF from a list of images.
-    Requires Imagemagick to be installed.
-
-    Does a preliminary check to ensure that the input filelist is not empty,
-    otherwise convert will error.
+def add_gif_frame(canvas, gif_filename, delay=50):
+    """Append the current contents of a canvas to an animated GIF.
 
-    Note that we cd to the directory with the input file list, as all image
-    files are assumed to be relative to its location.
+    ROOT renders the canvas to an image in memory and appends it to the GIF
+    directly, so there are no intermediate image files. The animation will
+    loop forever.
 
     Parameters
     ----------
-    input_file_list : str
-        Filepath of txt file with locations of images to be made into GIF
-    output_gif_filename : str
+    canvas : ROOT.TCanvas
+        Canvas to add as a frame
+    gif_filename : str
         Filepath of GIF
+    delay : int, optional
+        Time between frames, in units of 10 ms
     """
-    print 'Making GIF', output_gif_filename, 'from', input_file_list
-    input_file_list = os.path.abspath(input_file_list)
+    canvas.Print("%s++%d" % (gif_filename, delay))
 
-    if not os.path.isfile(input_file_list):
-        print 'Skipping GIF making as %s does not exist' % input_file_list
-        return
 
-    if os.stat(input_file_list).st_size == 0:
-        print 'Skipping GIF making as %s is empty' % input_file_list
-        return
+def animate_plots(input_file, frame_func, frame_args, output_gif_filename, save_frames=True, delay=50):
+    """Make an animated GIF, with one frame per plot.
 
+    All frames are drawn on the same canvas in this process, and added to the
+    GIF as they are made. Each animation is independent, so different ones
+    (e.g. for each eta bin) can be made in parallel.
+
+    Parameters
+    ----------
+    input_file : ROOT.TFile
+        File with objects to plot
+    frame_func : function
+        Plotting function to make each frame. Must take the input file as its
+        first argument, have `canvas` and `save` keyword arguments, and return
+        the plot filename, or None if there is nothing to plot.
+    frame_args : list[tuple]
+        Arguments to pass to frame_func (after input_file) for each frame
+    output_gif_filename : str
+        Filepath of GIF
+    save_frames : bool, optional
+        Save each frame as its own plot as well. If False, assumes they have
+        already been made elsewhere.
+    delay : int, optional
+        Time between frames, in units of 10 ms
+
+    Returns
+    -------
+    dict
+        'gif': GIF filepath (None if no frames), 'frames': list of frame filepaths
+    """
+    print 'Making GIF', output_gif_filename
     output_gif_filename = os.path.abspath(output_gif_filename)
-    cwd = os.getcwd()
-    # we have to chdir since list file only has bare filenames
-    os.chdir(os.path.dirname(input_file_list))
-    cmd = "%s -dispose Background -delay 50 -loop 0 @%s %s" % (convert_exe, os.path.relpath(input_file_list), os.path.relpath(output_gif_filename))
-    print cmd
-    check_output(cmd.split())
-    os.chdir(cwd)
+    # ROOT appends to an existing GIF, so start afresh
+    if os.path.isfile(output_gif_filename):
+        os.remove(output_gif_filename)
+    c = generate_canvas(plot_title)
+    frames = []
+    for args in frame_args:
+        filename = frame_func(input_file, *args, canvas=c, save=save_frames)
+        if filename:
+            add_gif_frame(c, output_gif_filename, delay)
+            frames.append(filename)
+    if not frames:
+        print 'Skipping GIF making as there are no plots for %s' % output_gif_filename
+    return {'gif': output_gif_filename if frames else None, 'frames': frames}
+
+
+def get_plot_filenames(result):
+    """Get list of plot filenames from the return value of a plotting function."""
+    if isinstance(result, dict):
+        return result['frames']
+    if isinstance(result, list):
+        return result
+    return [result]
 
 
 def main(in_args=sys.argv[1:]):
@@ -880,8 +944,16 @@ def main(in_args=sys.argv[1:]):
     parser.add_argument("--gifs",
                         help="Make GIFs (only applicable if --detail is also used)",
                         action='store_true')
-    parser.add_argument("--gifexe",
-                        help='Convert executable to use. Default is result of `which convert`')
+    parser.add_argument("--jobs", "-j",
+                        help="Number of parallel processes to render plots with",
+                        type=int, default=1)
+    parser.add_argument("--force",
+                        help="Remake all plots, even if their inputs & style are unchanged "
+                             "since the last run",
+                        action='store_true')
+    parser.add_argument("--noCache",
+                        help="Don't use or store the record of which plots are up to date",
+                        action='store_true')
     args = parser.parse_args(args=in_args)
 
     print args
@@ -895,14 +967,6 @@ def main(in_args=sys.argv[1:]):
         else:
             print "To use the --gifs flag, you also need --detail"
 
-    if not args.gifexe:
-        args.gifexe = find_executable('convert')
-        if not args.gifexe:
-            print 'Cannot find convert exe, not making gifs'
-            args.gif = False
-        else:
-            print 'Using %s to make GIFs' % args.gifexe
-
     # customise titles
     # note the use of global keyword
     if args.title:
@@ -934,33 +998,37 @@ def main(in_args=sys.argv[1:]):
     # Choose eta
     ptBins = binning.pt_bins_stage2
 
+    # Plots are not made straight away, but added to a list of tasks,
+    # which are then rendered in one go (in parallel if --jobs > 1)
+    tasks = []
+    # Lists of (list filename, tasks whose plots go in that list),
+    # for making GIFs once all the plots are made
+    filelists = []
+
     # Do plots with output from RunMatcher
     # ------------------------------------------------------------------------
     if args.pairs:
-        pairs_file = cu.open_root_file(args.pairs)
-        pairs_tree = cu.get_from_file(pairs_file, "valid")
+        pairs_tree = InputRef(args.pairs, "valid")
 
         # eta binned
         for emin, emax in pairwise(binning.eta_bins):
-            plot_dR(pairs_tree, eta_min=emin, eta_max=emax, cut="1", oDir=args.oDir)
-            plot_pt_both(pairs_tree, eta_min=emin, eta_max=emax, cut="1", oDir=args.oDir)
+            tasks.append(PlotTask(plot_dR, pairs_tree, eta_min=emin, eta_max=emax, cut="1", oDir=args.oDir))
+            tasks.append(PlotTask(plot_pt_both, pairs_tree, eta_min=emin, eta_max=emax, cut="1", oDir=args.oDir))
 
         # plot_dR(pairs_tree, eta_min=0, eta_max=5, cut="1", oDir=args.oDir)  # all eta
         # plot_pt_both(pairs_tree, eta_min=0, eta_max=5, cut="1", oDir=args.oDir)  # all eta
-        plot_eta_both(pairs_tree, oDir=args.oDir)  # all eta
-
-        plot_dR(pairs_tree, eta_min=0, eta_max=3, cut="1", oDir=args.oDir)  # central
-        plot_pt_both(pairs_tree, eta_min=0, eta_max=3, cut="1", oDir=args.oDir)  # central
+        tasks.append(PlotTask(plot_eta_both, pairs_tree, oDir=args.oDir))  # all eta
 
-        plot_dR(pairs_tree, eta_min=3, eta_max=5, cut="1", oDir=args.oDir)  # forward
-        plot_pt_both(pairs_tree, eta_min=3, eta_max=5, cut="1", oDir=args.oDir)  # forward
+        tasks.append(PlotTask(plot_dR, pairs_tree, eta_min=0, eta_max=3, cut="1", oDir=args.oDir))  # central
+        tasks.append(PlotTask(plot_pt_both, pairs_tree, eta_min=0, eta_max=3, cut="1", oDir=args.oDir))  # central
 
-        pairs_file.Close()
+        tasks.append(PlotTask(plot_dR, pairs_tree, eta_min=3, eta_max=5, cut="1", oDir=args.oDir))  # forward
+        tasks.append(PlotTask(plot_pt_both, pairs_tree, eta_min=3, eta_max=5, cut="1", oDir=args.oDir))  # forward
 
     # Do plots with output from makeResolutionPlots.py
     # ------------------------------------------------------------------------
     if args.res:
-        res_file = cu.open_root_file(args.res)
+        res_file = InputRef(args.res)
         # pt_min = binning.pt_bins[10]
         # pt_max = binning.pt_bins[11]
         # for the first 4 bins - troublesome
@@ -974,147 +1042,124 @@ def main(in_args=sys.argv[1:]):
 
         # inclusive eta graphs
         for (eta_min, eta_max) in [[0, 3], [3, 5]]:
-            plot_res_all_pt(res_file, eta_min, eta_max, args.oDir, args.format)
-            plot_ptDiff_Vs_pt(res_file, eta_min, eta_max, args.oDir, args.format)
+            tasks.append(PlotTask(plot_res_all_pt, res_file, eta_min, eta_max, args.oDir, args.format))
+            tasks.append(PlotTask(plot_ptDiff_Vs_pt, res_file, eta_min, eta_max, args.oDir, args.format))
 
         # plot_eta_pt_rsp_2d(res_file, binning.eta_bins, binning.pt_bins[4:], args.oDir, args.format)
 
         # components of these:
         for pt_min, pt_max in izip(binning.pt_bins[4:-1], binning.pt_bins[5:]):
-            plot_pt_diff(res_file, 0, 3, pt_min, pt_max, args.oDir, args.format)
+            tasks.append(PlotTask(plot_pt_diff, res_file, 0, 3, pt_min, pt_max, args.oDir, args.format))
             # plot_pt_diff(res_file, 0, 5, pt_min, pt_max, args.oDir, args.format)
             # plot_pt_diff(res_file, 3, 5, pt_min, pt_max, args.oDir, args.format)
 
-        res_file.Close()
-
     # Do plots with output from checkCalibration.py
     # ------------------------------------------------------------------------
     if args.checkcal:
 
         etaBins = binning.eta_bins
-        check_file = cu.open_root_file(args.checkcal)
+        check_file = InputRef(args.checkcal)
 
         # ptBinsWide = list(np.arange(10, 250, 8))
 
         # indiviudal eta bins
         for eta_min, eta_max in pairwise(etaBins):
             for (normX, logZ) in product([True, False], [True, False]):
-                plot_l1_Vs_ref(check_file, eta_min, eta_max, logZ, args.oDir, 'png')
-                plot_rsp_Vs_l1(check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png')
-                plot_rsp_Vs_ref(check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png')
-                plot_rsp_Vs_pt_candle_violin(check_file, eta_min, eta_max, "l1", args.oDir, 'png')
-                plot_rsp_Vs_pt_candle_violin(check_file, eta_min, eta_max, "gen", args.oDir, 'png')
+                tasks.append(PlotTask(plot_l1_Vs_ref, check_file, eta_min, eta_max, logZ, args.oDir, 'png'))
+                tasks.append(PlotTask(plot_rsp_Vs_l1, check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png'))
+                tasks.append(PlotTask(plot_rsp_Vs_ref, check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png'))
+            tasks.append(PlotTask(plot_rsp_Vs_pt_candle_violin, check_file, eta_min, eta_max, "l1", args.oDir, 'png'))
+            tasks.append(PlotTask(plot_rsp_Vs_pt_candle_violin, check_file, eta_min, eta_max, "gen", args.oDir, 'png'))
 
             if args.detail:
                 list_dir = os.path.join(args.oDir, 'eta_%g_%g' % (eta_min, eta_max))
                 cu.check_dir_exists_create(list_dir)
 
                 # print individual histograms, and make a list suitable for imagemagick to turn into a GIF
-                pt_plot_filenames = plot_rsp_pt_hists(check_file, eta_min, eta_max, ptBins, "pt", args.oDir, 'png')
-                pt_plot_filenames_file = os.path.join(list_dir, 'list_pt.txt')
-                write_filelist(pt_plot_filenames, pt_plot_filenames_file)
-
-                # print individual histograms, and make a list suitable for imagemagick to turn into a GIF
-                ptRef_plot_filenames = plot_rsp_pt_hists(check_file, eta_min, eta_max, ptBins, "ptRef", args.oDir, 'png')
-                ptRef_plot_filenames_file = os.path.join(list_dir, 'list_ptRef.txt')
-                write_filelist(ptRef_plot_filenames, ptRef_plot_filenames_file)
-
-                # make dem GIFs
-                if args.gifs:
-                    for inf in [pt_plot_filenames_file, ptRef_plot_filenames_file]:
-                        make_gif(inf, inf.replace('.txt', '.gif'), args.gifexe)
-                else:
-                    print "To make animated gif from PNGs using a plot list:"
-                    print "convert -dispose Background -delay 50 -loop 0 @%s " \
-                        "%s" % (pt_plot_filenames_file,
-                                os.path.basename(pt_plot_filenames_file).replace(".txt", ".gif"))
+                for pt_var in ["pt", "ptRef"]:
+                    list_file = os.path.join(list_dir, 'list_%s.txt' % pt_var)
+                    if args.gifs:
+                        frame_args = [(eta_min, eta_max, pt_var, pt_min, pt_max, args.oDir, 'png')
+                                      for pt_min, pt_max in pairwise(ptBins)]
+                        hists_task = PlotTask(animate_plots, check_file, plot_rsp_pt_hist, frame_args,
+                                              list_file.replace('.txt', '.gif'))
+                    else:
+                        hists_task = PlotTask(plot_rsp_pt_hists, check_file, eta_min, eta_max, ptBins, pt_var, args.oDir, 'png')
+                    tasks.append(hists_task)
+                    filelists.append((list_file, [hists_task]))
 
         # Graph of response vs pt, but in bins of eta
         x_range = [0, 150]  # for zoomed-in low pt
         x_range = None
-        plot_rsp_pt_binned_graph(check_file, etaBins, "pt", args.oDir, args.format, x_range=x_range)
-        plot_rsp_pt_binned_graph(check_file, etaBins, "ptRef", args.oDir, args.format, x_range=x_range)
+        tasks.append(PlotTask(plot_rsp_pt_binned_graph, check_file, etaBins, "pt", args.oDir, args.format, x_range=x_range))
+        tasks.append(PlotTask(plot_rsp_pt_binned_graph, check_file, etaBins, "ptRef", args.oDir, args.format, x_range=x_range))
 
-        all_rsp_pt_plot_filenames = []
-        all_rsp_ptRef_plot_filenames = []
+        all_rsp_pt_frame_args = []
+        all_rsp_ptRef_frame_args = []
 
         # Loop over central/forward eta, do 2D plots, and graphs, and component hists
         # ALSO EDITED THE MIN AND MAX ETAS HERE
         for (eta_min, eta_max) in [[0, 2.964], [2.964, 5.191]]:
-            print eta_min, eta_max
 
             for (normX, logZ) in product([True, False], [True, False]):
-                plot_l1_Vs_ref(check_file, eta_min, eta_max, logZ, args.oDir, 'png')
-                plot_rsp_Vs_l1(check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png')
-                plot_rsp_Vs_ref(check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png')
+                tasks.append(PlotTask(plot_l1_Vs_ref, check_file, eta_min, eta_max, logZ, args.oDir, 'png'))
+                tasks.append(PlotTask(plot_rsp_Vs_l1, check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png'))
+                tasks.append(PlotTask(plot_rsp_Vs_ref, check_file, eta_min, eta_max, normX, logZ, args.oDir, 'png'))
 
             if args.detail:
-                plot_rsp_pt_hists(check_file, eta_min, eta_max, ptBins, "pt", args.oDir, 'png')
-                plot_rsp_pt_hists(check_file, eta_min, eta_max, ptBins, "ptRef", args.oDir, 'png')
+                tasks.append(PlotTask(plot_rsp_pt_hists, check_file, eta_min, eta_max, ptBins, "pt", args.oDir, 'png'))
+                tasks.append(PlotTask(plot_rsp_pt_hists, check_file, eta_min, eta_max, ptBins, "ptRef", args.oDir, 'png'))
 
             # graphs
-            plot_rsp_eta_inclusive_graph(check_file, eta_min, eta_max, 'pt', args.oDir, args.format)
-            plot_rsp_eta_inclusive_graph(check_file, eta_min, eta_max, 'ptRef', args.oDir, args.format)
-            plot_rsp_eta_exclusive_graph(check_file, eta_min, eta_max, binning.check_pt_bins, 'pt', args.oDir, args.format)
-            plot_rsp_eta_exclusive_graph(check_file, eta_min, eta_max, binning.check_pt_bins, 'ptRef', args.oDir, args.format)
+            for pt_var in ['pt', 'ptRef']:
+                tasks.append(PlotTask(plot_rsp_eta_inclusive_graph, check_file, eta_min, eta_max, pt_var, args.oDir, args.format))
+                tasks.append(PlotTask(plot_rsp_eta_exclusive_graph, check_file, eta_min, eta_max, binning.check_pt_bins, pt_var, args.oDir, args.format))
 
-            plot_rsp_pt_graph(check_file, eta_min, eta_max, args.oDir, args.format)
-            plot_rsp_ptRef_graph(check_file, eta_min, eta_max, args.oDir, args.format)
+            tasks.append(PlotTask(plot_rsp_pt_graph, check_file, eta_min, eta_max, args.oDir, args.format))
+            tasks.append(PlotTask(plot_rsp_ptRef_graph, check_file, eta_min, eta_max, args.oDir, args.format))
 
             for etamin, etamax in pairwise(etaBins):
                 if etamin < eta_min or etamax > eta_max:
                     continue
-                print etamin, etamax
-                this_rsp_pt_plot_filenames = []
-                this_rsp_ptRef_plot_filenames = []
                 # component hists/fits for the eta graphs, binned by pt
-                for pt_min, pt_max in binning.check_pt_bins:
-                    pt_filename = plot_rsp_eta_bin_pt(check_file, etamin, etamax, 'pt', pt_min, pt_max, args.oDir, 'png')
-                    if pt_filename:
-                        this_rsp_pt_plot_filenames.append(pt_filename)
-                    ptRef_filename = plot_rsp_eta_bin_pt(check_file, etamin, etamax, 'ptRef', pt_min, pt_max, args.oDir, 'png')
-                    if ptRef_filename:
-                        this_rsp_ptRef_plot_filenames.append(ptRef_filename)
-
-                pt_list_file = os.path.join(args.oDir, 'list_pt_eta_%g_%g.txt' % (etamin, etamax))
-                write_filelist(this_rsp_pt_plot_filenames, pt_list_file)
-                if args.gifs:
-                    make_gif(pt_list_file, pt_list_file.replace('.txt', '.gif'), args.gifexe)
-
-                ptRef_list_file = os.path.join(args.oDir, 'list_ptRef_eta_%g_%g.txt' % (etamin, etamax))
-                write_filelist(this_rsp_ptRef_plot_filenames, ptRef_list_file)
-                if args.gifs:
-                    make_gif(ptRef_list_file, ptRef_list_file.replace('.txt', '.gif'), args.gifexe)
-
-                all_rsp_pt_plot_filenames.extend(this_rsp_pt_plot_filenames)
-                all_rsp_ptRef_plot_filenames.extend(this_rsp_ptRef_plot_filenames)
-
-        pt_list_file = os.path.join(args.oDir, 'list_pt_eta_%g_%g.txt' % (etaBins[0], etaBins[-1]))
-        write_filelist(all_rsp_pt_plot_filenames, pt_list_file)
-        if args.gifs:
-            make_gif(pt_list_file, pt_list_file.replace('.txt', '.gif'), args.gifexe)
-
-        ptRef_list_file = os.path.join(args.oDir, 'list_ptRef_eta_%g_%g.txt' % (etaBins[0], etaBins[-1]))
-        write_filelist(all_rsp_ptRef_plot_filenames, ptRef_list_file)
-        if args.gifs:
-            make_gif(ptRef_list_file, ptRef_list_file.replace('.txt', '.gif'), args.gifexe)
-
-        check_file.Close()
+                for pt_var, all_frame_args in [('pt', all_rsp_pt_frame_args),
+                                               ('ptRef', all_rsp_ptRef_frame_args)]:
+                    frame_args = [(etamin, etamax, pt_var, pt_min, pt_max, args.oDir, 'png')
+                                  for pt_min, pt_max in binning.check_pt_bins]
+                    all_frame_args.extend(frame_args)
+                    list_file = os.path.join(args.oDir, 'list_%s_eta_%g_%g.txt' % (pt_var, etamin, etamax))
+                    if args.gifs:
+                        list_tasks = [PlotTask(animate_plots, check_file, plot_rsp_eta_bin_pt, frame_args,
+                                               list_file.replace('.txt', '.gif'))]
+                    else:
+                        list_tasks = [PlotTask(plot_rsp_eta_bin_pt, check_file, *fa) for fa in frame_args]
+                    tasks.extend(list_tasks)
+                    filelists.append((list_file, list_tasks))
+
+        # animations over all eta bins re-use the frames already made for each eta bin
+        for pt_var, all_frame_args in [('pt', all_rsp_pt_frame_args),
+                                       ('ptRef', all_rsp_ptRef_frame_args)]:
+            list_file = os.path.join(args.oDir, 'list_%s_eta_%g_%g.txt' % (pt_var, etaBins[0], etaBins[-1]))
+            if args.gifs:
+                list_tasks = [PlotTask(animate_plots, check_file, plot_rsp_eta_bin_pt, all_frame_args,
+                                       list_file.replace('.txt', '.gif'), save_frames=False)]
+                tasks.extend(list_tasks)
+            else:
+                list_tasks = [PlotTask(plot_rsp_eta_bin_pt, check_file, *fa) for fa in all_frame_args]
+            filelists.append((list_file, list_tasks))
 
     # Do plots with output from runCalibration.py
     # ------------------------------------------------------------------------
     if args.calib:
 
-        calib_file = cu.open_root_file(args.calib)
+        calib_file = InputRef(args.calib)
 
         for eta_min, eta_max in pairwise(binning.eta_bins):
 
-            print eta_min, eta_max
-
             # 2D correlation heat maps
             for (normX, logZ) in product([True, False], [True, False]):
-                plot_rsp_Vs_ref(calib_file, eta_min, eta_max, normX, logZ, args.oDir, 'png')
-                plot_rsp_Vs_l1(calib_file, eta_min, eta_max, normX, logZ, args.oDir, 'png')
+                tasks.append(PlotTask(plot_rsp_Vs_ref, calib_file, eta_min, eta_max, normX, logZ, args.oDir, 'png'))
+                tasks.append(PlotTask(plot_rsp_Vs_l1, calib_file, eta_min, eta_max, normX, logZ, args.oDir, 'png'))
 
             # individual fit histograms for each pt bin
             if args.detail:
@@ -1125,36 +1170,44 @@ def main(in_args=sys.argv[1:]):
                 if eta_min > 2.9:
                     ptBins = binning.pt_bins_stage2_hf
 
-                rsp_plot_filenames = []
-                pt_plot_filenames = []
-
-                for pt_min, pt_max in pairwise(ptBins):
-                    rsp_name = plot_rsp_eta_pt_bin(calib_file, eta_min, eta_max, pt_min, pt_max, args.oDir, 'png')
-                    rsp_plot_filenames.append(rsp_name)
-                    pt_name = plot_pt_bin(calib_file, eta_min, eta_max, pt_min, pt_max, args.oDir, 'png')
-                    pt_plot_filenames.append(pt_name)
-
                 # print individual histograms, and make a list suitable for imagemagick to turn into a GIF
-                rsp_plot_filenames_file = os.path.join(list_dir, 'list_rsp.txt')
-                write_filelist(rsp_plot_filenames, rsp_plot_filenames_file)
-
-                # print individual histograms, and make a list suitable for imagemagick to turn into a GIF
-                pt_plot_filenames_file = os.path.join(list_dir, 'list_pt.txt')
-                write_filelist(pt_plot_filenames, pt_plot_filenames_file)
-
-                # make dem gifs
-                if args.gifs:
-                    for inf in [pt_plot_filenames_file, rsp_plot_filenames_file]:
-                        make_gif(inf, inf.replace('.txt', '.gif'), args.gifexe)
-                else:
-                    print "To make animated gif from PNGs using a plot list:"
-                    print "convert -dispose Background -delay 50 -loop 0 @%s "\
-                        "pt_eta_%g_%g.gif" % (pt_plot_filenames_file, eta_min, eta_max)
+                frame_args = [(eta_min, eta_max, pt_min, pt_max, args.oDir, 'png')
+                              for pt_min, pt_max in pairwise(ptBins)]
+                for plot_func, list_name in [(plot_pt_bin, 'list_pt.txt'),
+                                             (plot_rsp_eta_pt_bin, 'list_rsp.txt')]:
+                    list_file = os.path.join(list_dir, list_name)
+                    if args.gifs:
+                        list_tasks = [PlotTask(animate_plots, calib_file, plot_func, frame_args,
+                                               list_file.replace('.txt', '.gif'))]
+                    else:
+                        list_tasks = [PlotTask(plot_func, calib_file, *fa) for fa in frame_args]
+                    tasks.extend(list_tasks)
+                    filelists.append((list_file, list_tasks))
 
             # the correction curve graph
-            plot_correction_graph(calib_file, eta_min, eta_max, args.oDir, args.format)
+            tasks.append(PlotTask(plot_correction_graph, calib_file, eta_min, eta_max, args.oDir, args.format))
 
-        calib_file.Close()
+    # Now actually make the plots
+    # ------------------------------------------------------------------------
+    # anything global that changes the look of plots goes here,
+    # so that changing it forces all plots to be remade
+    style = {'plot_title': plot_title, 'l1_str': l1_str, 'ref_str': ref_str,
+             'rsp_min': rsp_min, 'rsp_max': rsp_max}
+    cache_filename = None if args.noCache else os.path.join(args.oDir, '.plot_cache.json')
+    results = render_tasks(tasks, n_jobs=args.jobs, cache_filename=cache_filename,
+                           style=style, force=args.force)
+    task_results = dict(izip([t.key() for t in tasks], results))
+
+    for list_file, list_tasks in filelists:
+        plot_filenames = []
+        for task in list_tasks:
+            plot_filenames.extend(get_plot_filenames(task_results[task.key()]))
+        write_filelist(plot_filenames, list_file)
+
+    if filelists and not args.gifs:
+        print "To make animated gif from PNGs using a plot list:"
+        print "convert -dispose Background -delay 50 -loop 0 @%s " \
+            "%s" % (filelists[0][0], os.path.basename(filelists[0][0]).replace(".txt", ".gif"))
 
     if args.zip:
         print 'Zipping up files'
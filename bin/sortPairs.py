@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Rewrite a pairs file sorted by L1 |eta| bin, then ref jet pT.
+
+All the pairs in each |eta| bin are then stored together, so the calibration,
+check & resolution tools only have to read the entries for the bin they are
+doing, rather than decompressing the whole TTree and cutting on it.
+The entry ranges for each bin are stored in a sidecar index next to the
+output file (see pairs_index.py), which those tools use automatically if it
+exists & is up to date.
+
+For the normalised layout, the events TTree is copied as it is, so the iEvent
+index of each pair is still valid.
+
+Usage: see
+python sortPairs.py -h
+"""
+
+
+import ROOT
+import sys
+import argparse
+import numpy as np
+import binning
+import common_utils as cu
+from pair_columns import read_tree_columns, EVENTS_TREE_NAME, EVENT_INDEX_BRANCH
+from pairs_index import make_pairs_index, save_pairs_index
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(1)
+
+
+def sort_pairs_tree(tree, order):
+    """Make a copy of the pairs TTree, with entries in the given order.
+
+    Should be called with the output TFile as the current directory.
+    """
+    sorted_tree = tree.CloneTree(0)
+    for i, entry in enumerate(order):
+        if i % 1000000 == 0:
+            print "Entry:", i
+        tree.GetEntry(int(entry))
+        sorted_tree.Fill()
+    return sorted_tree
+
+
+def main(in_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("input", help="input ROOT file with pairs")
+    parser.add_argument("output", help="output ROOT file for sorted pairs")
+    parser.add_argument("--ptStep", default=1., type=float,
+                        help="Step size (GeV) of the ptRef grid stored in the index")
+    parser.add_argument("--ptMax", default=1024., type=float,
+                        help="Maximum of the ptRef grid stored in the index")
+    parser.add_argument("--maxMemory", default=2000000000, type=int,
+                        help="Maximum memory (bytes) used to hold the input baskets, " \
+                        "since the input is read in a random order")
+    args = parser.parse_args(args=in_args)
+
+    if cu.get_full_path(args.input) == cu.get_full_path(args.output):
+        raise RuntimeError("Cannot use input filename as output filename!")
+
+    input_file = cu.open_root_file(args.input)
+    tree = cu.get_from_file(input_file, "valid")
+    cols = read_tree_columns(tree, ["eta", "ptRef"])
+    pt_edges = np.arange(0, args.ptMax + args.ptStep, args.ptStep)
+    order, pairs_index = make_pairs_index(cols['eta'], cols['ptRef'], binning.eta_bins, pt_edges)
+    print "Sorting %d pairs into %d eta bins" % (len(order), len(binning.eta_bins))
+
+    tree.LoadBaskets(args.maxMemory)
+    output_file = cu.open_root_file(args.output, "RECREATE")
+    sorted_tree = sort_pairs_tree(tree, order)
+    sorted_tree.Write("", ROOT.TObject.kOverwrite)
+
+    if cu.exists_in_file(input_file, EVENTS_TREE_NAME):
+        events_tree = input_file.Get(EVENTS_TREE_NAME)
+        output_file.cd()
+        events_copy = events_tree.CloneTree(-1, "fast")
+        events_copy.BuildIndex(EVENT_INDEX_BRANCH)
+        events_copy.Write("", ROOT.TObject.kOverwrite)
+
+    output_file.Close()
+    input_file.Close()
+
+    save_pairs_index(pairs_index, args.output)
+    print "Written sorted pairs to", args.output
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
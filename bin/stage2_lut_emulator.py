@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Apply a set of Stage 2 jet calibration LUTs to pairs, without the CMSSW emulator.
+
+Reads the eta compression, pT compression, and addend+multiplier LUT files
+(as written by write_eta_compress_lut, write_pt_compress_lut, and
+write_stage2_addend_multiplicative_lut in correction_LUT_stage2.py),
+and applies them to whole numpy arrays of (iet, ieta) at once.
+The integer arithmetic is the same as correct_iet(), so the corrected iet
+values are bit-exact.
+
+The input pairs must be made with *uncalibrated* L1 jets, i.e. the same
+input as runCalibration.py. Physical pT & eta are converted back to HW values:
+iet = pt / 0.5 GeV, and ieta from the trigger tower that contains eta (L1
+jet eta is always a tower centre).
+
+Usage: see
+python stage2_lut_emulator.py -h
+"""
+
+
+import ROOT
+import sys
+import argparse
+import numpy as np
+import binning
+from binning import pairwise
+import common_utils as cu
+from pair_columns import read_tree_columns
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(1)
+
+
+# Upper edge of each trigger tower in |eta|, starting at 0.
+# Anything beyond the last edge is put into calo ieta 41.
+TOWER_ETA_EDGES = np.array([0.000, 0.087, 0.174, 0.261, 0.348, 0.435, 0.522,
+                            0.609, 0.696, 0.783, 0.870, 0.957, 1.044, 1.131,
+                            1.218, 1.305, 1.392, 1.479, 1.566, 1.653, 1.740,
+                            1.830, 1.930, 2.043, 2.172, 2.322, 2.500, 2.650,
+                            2.964, 3.139, 3.314, 3.489, 3.664, 3.839, 4.013,
+                            4.191, 4.363, 4.538, 4.716, 4.889, 5.191])
+
+MAX_CALO_IETA = 41
+
+# HW pT LSB in GeV
+IET_LSB = 0.5
+
+
+def read_lut(lut_filename):
+    """Read LUT file into numpy array, indexed by address.
+
+    The array size is taken from the number of address bits in the header;
+    any addresses not in the file are 0.
+
+    Parameters
+    ----------
+    lut_filename : str
+        LUT file, with lines of "address value", and a header line like
+        "#<header> v1 nrBitsAddress nrBitsData </header>"
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    n_address_bits = None
+    contents = {}
+    with open(lut_filename) as f:
+        for line in f:
+            if line.startswith("#<header>") and n_address_bits is None:
+                n_address_bits = int(line.split()[2])
+                continue
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            address, value = [int(x) for x in line.split()]
+            contents[address] = value
+    if n_address_bits is None:
+        n_address_bits = int(np.ceil(np.log2(max(contents.keys()) + 1)))
+    lut = np.zeros(2**n_address_bits, dtype=np.int64)
+    for address, value in contents.iteritems():
+        lut[address] = value
+    return lut
+
+
+def pt_to_iet(pt):
+    """Convert physical pT array to HW iet."""
+    return np.rint(np.asarray(pt) / IET_LSB).astype(np.int64)
+
+
+def iet_to_pt(iet):
+    """Convert HW iet array to physical pT."""
+    return np.asarray(iet) * IET_LSB
+
+
+def eta_to_calo_ieta(eta):
+    """Convert physical eta array to signed calo ieta, from the tower that contains it."""
+    eta = np.asarray(eta)
+    # counting towers gives the MP ieta, since there's no calo ieta 29 in TOWER_ETA_EDGES
+    mp_ieta = np.clip(np.searchsorted(TOWER_ETA_EDGES, np.abs(eta), side='right'), 1, MAX_CALO_IETA - 1)
+    ieta = np.where(mp_ieta >= 29, mp_ieta + 1, mp_ieta)
+    return np.where(eta < 0, -ieta, ieta)
+
+
+def calo_ieta_to_mp_ieta(ieta):
+    """Array version of correction_LUT_stage2.calo_ieta_to_mp_ieta:
+    there is no calo ieta 29 in the MP, so everything above it shifts down by 1"""
+    ieta = np.asarray(ieta)
+    return np.where(np.abs(ieta) > 29, ieta - np.sign(ieta), ieta)
+
+
+class Stage2LUTEmulator(object):
+    """Apply Stage 2 jet calibration LUTs to arrays of HW jets.
+
+    Parameters
+    ----------
+    eta_lut_filename : str
+        LUT that converts abs(MP ieta) to eta index
+    pt_lut_filename : str
+        LUT that converts bits 1:8 of iet to pT index
+    add_mult_lut_filename : str
+        LUT that converts address to (addend << num_mult_bits) | multiplier
+    right_shift : int
+        Right-shift applied after multiplication
+    num_add_bits : int
+        Number of bits for the (signed) addend
+    num_mult_bits : int
+        Number of bits for the multiplier
+    """
+
+    def __init__(self, eta_lut_filename, pt_lut_filename, add_mult_lut_filename,
+                 right_shift=9, num_add_bits=8, num_mult_bits=10):
+        self.eta_lut = read_lut(eta_lut_filename)
+        self.pt_lut = read_lut(pt_lut_filename)
+        add_mult_lut = read_lut(add_mult_lut_filename)
+        self.right_shift = right_shift
+        # unpack both factors once, rather than for every jet
+        self.mult_lut = add_mult_lut & ((1 << num_mult_bits) - 1)
+        add = (add_mult_lut >> num_mult_bits) & ((1 << num_add_bits) - 1)
+        # addend is stored as two's complement
+        self.add_lut = np.where(add >= (1 << (num_add_bits - 1)), add - (1 << num_add_bits), add)
+        # pT LUT only takes bits 1:8, so saturate at the highest value it covers
+        self.max_pt_address_iet = (len(self.pt_lut) << 1) - 1
+
+    def addresses(self, iet, calo_ieta):
+        """Get the add/mult LUT address for each jet, i.e. (eta index << 4) | pt index"""
+        iet = np.asarray(iet, dtype=np.int64)
+        mp_ieta = np.abs(calo_ieta_to_mp_ieta(calo_ieta))
+        eta_index = self.eta_lut[mp_ieta]
+        pt_index = self.pt_lut[np.minimum(iet, self.max_pt_address_iet) >> 1]
+        return (eta_index << 4) | pt_index
+
+    def correct_iet(self, iet, calo_ieta):
+        """Get the corrected iet for each jet.
+
+        Same arithmetic as correction_LUT_stage2.correct_iet:
+        ((iet * multiplier) >> right_shift) + addend
+        """
+        iet = np.asarray(iet, dtype=np.int64)
+        address = self.addresses(iet, calo_ieta)
+        return np.right_shift(iet * self.mult_lut[address], self.right_shift) + self.add_lut[address]
+
+    def correct_pt(self, pt, eta):
+        """Get corrected physical pT, for arrays of uncorrected physical pT & eta."""
+        return iet_to_pt(self.correct_iet(pt_to_iet(pt), eta_to_calo_ieta(eta)))
+
+
+def calc_closure(pt, eta, pt_ref, pt_corr, eta_bins):
+    """Calculate response before & after corrections in each eta bin.
+
+    Parameters
+    ----------
+    pt, eta, pt_ref, pt_corr : numpy.ndarray
+        L1 pT, L1 eta, ref jet pT, corrected L1 pT for each pair
+    eta_bins : list[float]
+        Bin edges in abs(eta)
+
+    Returns
+    -------
+    list[dict]
+        One dict per eta bin, with number of pairs, and mean & median response
+        before (rsp_*) and after (rsp_corr_*) corrections.
+    """
+    abs_eta = np.abs(eta)
+    rsp = pt / pt_ref
+    rsp_corr = pt_corr / pt_ref
+    results = []
+    for eta_min, eta_max in pairwise(eta_bins):
+        mask = (abs_eta >= eta_min) & (abs_eta < eta_max)
+        n = np.count_nonzero(mask)
+        result = dict(eta_min=eta_min, eta_max=eta_max, n=n,
+                      rsp_mean=np.nan, rsp_median=np.nan,
+                      rsp_corr_mean=np.nan, rsp_corr_median=np.nan)
+        if n > 0:
+            result.update(rsp_mean=rsp[mask].mean(), rsp_median=np.median(rsp[mask]),
+                          rsp_corr_mean=rsp_corr[mask].mean(), rsp_corr_median=np.median(rsp_corr[mask]))
+        results.append(result)
+    return results
+
+
+def print_closure(results):
+    """Print table of closure results"""
+    print "%-16s %10s %10s %10s %10s %10s" % ("eta bin", "N", "<rsp>", "med(rsp)", "<rsp_corr>", "med(corr)")
+    for r in results:
+        print "%5.3f - %-8.3f %10d %10.4f %10.4f %10.4f %10.4f" % (r['eta_min'], r['eta_max'], r['n'],
+                                                                   r['rsp_mean'], r['rsp_median'],
+                                                                   r['rsp_corr_mean'], r['rsp_corr_median'])
+
+
+def main(in_args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("input", help="input ROOT file with pairs, from uncalibrated L1 jets")
+    parser.add_argument("--etaLUT", required=True, help="eta compression LUT file")
+    parser.add_argument("--ptLUT", required=True, help="pT compression LUT file")
+    parser.add_argument("--addMultLUT", required=True, help="addend+multiplier LUT file")
+    parser.add_argument("--rightShift", type=int, default=9, help="right shift after multiplication")
+    parser.add_argument("--numAddBits", type=int, default=8, help="number of bits for addend")
+    parser.add_argument("--numMultBits", type=int, default=10, help="number of bits for multiplier")
+    parser.add_argument("--cut", default="", help="cut on pairs, e.g. \"ptRef>30\"")
+    args = parser.parse_args(args=in_args)
+
+    emulator = Stage2LUTEmulator(args.etaLUT, args.ptLUT, args.addMultLUT,
+                                 right_shift=args.rightShift,
+                                 num_add_bits=args.numAddBits,
+                                 num_mult_bits=args.numMultBits)
+
+    input_file = cu.open_root_file(args.input)
+    tree = cu.get_pairs_tree(input_file)
+    cols = read_tree_columns(tree, ["pt", "eta", "ptRef"], args.cut)
+    input_file.Close()
+    print "Read %d pairs" % len(cols['pt'])
+
+    pt_corr = emulator.correct_pt(cols['pt'], cols['eta'])
+    print_closure(calc_closure(cols['pt'], cols['eta'], cols['ptRef'], pt_corr, binning.eta_bins))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
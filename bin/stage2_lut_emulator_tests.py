@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+"""Unit tests for Stage2 LUT emulator"""
+
+
+import correction_LUT_stage2 as cls
+import stage2_lut_emulator as emu
+import unittest
+import numpy as np
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+
+class TestLUTEmulator(unittest.TestCase):
+    def setUp(self):
+        """Write a set of LUTs with varied multipliers & +ve/-ve addends"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.right_shift = 9
+        self.num_add_bits = 8
+        self.num_mult_bits = 10
+        self.hw_pt_orig = np.arange(0, 2**11)
+        self.pt_index = np.minimum(self.hw_pt_orig / 40, 15)
+        self.mapping_info = OrderedDict()
+        for eta_ind in range(16):
+            self.mapping_info[eta_ind] = dict(
+                pt_index=self.pt_index,
+                hw_corr_compressed=np.array([500 + (37 * (eta_ind + 1) * (p + 1)) % 500 for p in self.pt_index]),
+                hw_corr_compressed_add=np.array([((eta_ind * 16 + p) % 255) - 127 for p in self.pt_index])
+            )
+        self.eta_lut = os.path.join(self.tmp_dir, 'eta.txt')
+        self.pt_lut = os.path.join(self.tmp_dir, 'pt.txt')
+        self.add_mult_lut = os.path.join(self.tmp_dir, 'add_mult.txt')
+        cls.write_eta_compress_lut(self.eta_lut, nbits_in=6)
+        cls.write_pt_compress_lut(self.pt_lut, self.hw_pt_orig, self.pt_index)
+        cls.write_stage2_addend_multiplicative_lut(self.add_mult_lut, self.mapping_info,
+                                                   self.num_add_bits, self.num_mult_bits)
+        self.emulator = emu.Stage2LUTEmulator(self.eta_lut, self.pt_lut, self.add_mult_lut,
+                                              self.right_shift, self.num_add_bits, self.num_mult_bits)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def expected_iet(self, iet, calo_ieta):
+        """Scalar version, using the LUT maker functions directly"""
+        mp_ieta = cls.calo_ieta_to_mp_ieta(calo_ieta)
+        eta_ind = cls.calo_ieta_to_index(cls.mp_ieta_to_calo_ieta(abs(mp_ieta)))
+        pt_ind = self.pt_index[(min(iet, 511) / 2) * 2]
+        map_info = self.mapping_info[eta_ind]
+        ind = list(map_info['pt_index']).index(pt_ind)
+        return cls.correct_iet(iet, map_info['hw_corr_compressed'][ind], self.right_shift,
+                               add_factor=map_info['hw_corr_compressed_add'][ind])
+
+    def test_read_lut_size(self):
+        self.assertEqual(len(emu.read_lut(self.eta_lut)), 2**6)
+        self.assertEqual(len(emu.read_lut(self.pt_lut)), 2**8)
+        self.assertEqual(len(emu.read_lut(self.add_mult_lut)), 2**11)
+
+    def test_negative_addend(self):
+        self.assertTrue(np.any(self.emulator.add_lut < 0))
+        self.assertTrue(np.all(self.emulator.add_lut >= -128))
+        self.assertTrue(np.all(self.emulator.add_lut <= 127))
+
+    def test_correct_iet_bit_exact(self):
+        iets, ietas = [], []
+        for ieta in range(-41, 42):
+            if ieta == 0:
+                continue
+            iets.extend(range(0, 1100, 3))
+            ietas.extend([ieta] * len(range(0, 1100, 3)))
+        result = self.emulator.correct_iet(np.array(iets), np.array(ietas))
+        expected = [self.expected_iet(iet, ieta) for iet, ieta in zip(iets, ietas)]
+        self.assertTrue(np.array_equal(result, np.array(expected)))
+
+    def test_eta_to_calo_ieta(self):
+        edges = emu.TOWER_ETA_EDGES
+        centres = 0.5 * (edges[:-1] + edges[1:])
+        # no calo ieta 29
+        ietas = np.concatenate((np.arange(1, 29), np.arange(30, 42)))
+        self.assertTrue(np.array_equal(emu.eta_to_calo_ieta(centres), ietas))
+        self.assertTrue(np.array_equal(emu.eta_to_calo_ieta(-centres), -ietas))
+        self.assertEqual(emu.eta_to_calo_ieta(5.191), 41)
+
+    def test_hf_addresses(self):
+        # one HF tower for each HF eta index: (|eta| of tower centre, calo ieta)
+        towers = [(0.5 * (2.964 + 3.139), 30), (0.5 * (3.489 + 3.664), 33), (0.5 * (4.191 + 4.363), 37)]
+        for eta, calo_ieta in towers:
+            for sign in [1, -1]:
+                address = self.emulator.addresses(np.array([100]), emu.eta_to_calo_ieta(np.array([sign * eta])))
+                self.assertEqual(address[0] >> 4, cls.calo_ieta_to_index(calo_ieta))
+        self.assertEqual([cls.calo_ieta_to_index(ieta) for _, ieta in towers], [13, 14, 15])
+
+    def test_calo_ieta_to_mp_ieta(self):
+        ietas = np.array([-41, -30, -29, -1, 1, 28, 29, 30, 41])
+        expected = [cls.calo_ieta_to_mp_ieta(i) for i in ietas]
+        self.assertTrue(np.array_equal(emu.calo_ieta_to_mp_ieta(ietas), expected))
+
+    def test_pt_iet_roundtrip(self):
+        iet = np.arange(0, 2048)
+        self.assertTrue(np.array_equal(emu.pt_to_iet(emu.iet_to_pt(iet)), iet))
+
+
+if __name__ == '__main__':
+    unittest.main()
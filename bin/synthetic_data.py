@@ -0,0 +1,236 @@
+"""
+Make synthetic jets at a chosen scale, for measuring the speed of the
+calibration chain without CMS data (see runBenchmarks.py).
+
+Each event has a Poisson number of reference (gen) jets, and a Poisson number
+of PU vertices. Each reference jet has a matching L1 jet, with:
+
+- pT: reference pT * a response that rises with pT (lower in HF), plus an
+  offset that grows with PU, then smeared & rounded to the HW pT LSB
+- eta: the centre of the trigger tower that contains the reference jet
+- phi: reference phi, smeared
+
+Two outputs can be written from the same jets:
+
+- a pairs file, with the same "valid" TTree & branches as the RunMatcher output,
+  to run runCalibration.py, checkCalibration.py etc on
+- an L1Ntuple-like file, with L1GenTree, L1UpgradeTree & L1EventTree, to run
+  the RunMatcher executables on. This needs the L1Analysis data format
+  dictionaries, i.e. a CMSSW environment.
+
+The same seed & scale always gives the same jets, so results can be compared
+between runs.
+
+Usage:
+
+jets = make_synthetic_jets(n_events=10000, jets_per_event=8, pu_mean=40, seed=1)
+write_pairs_file("pairs_synthetic.root", jets)
+write_ntuple_file("ntuple_synthetic.root", jets)
+"""
+
+
+import ROOT
+import os
+import tempfile
+import numpy as np
+from stage2_lut_emulator import TOWER_ETA_EDGES, IET_LSB, eta_to_calo_ieta, calo_ieta_to_mp_ieta
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+ROOT.gROOT.SetBatch(1)
+
+
+# Reference jet pT is flat in log(pT) between these, like the flat QCD samples,
+# so all pT bins have pairs to fit
+PT_MIN = 10.
+PT_MAX = 1023.
+
+MAX_ETA = 5.191
+
+TOWER_ETA_CENTRES = 0.5 * (TOWER_ETA_EDGES[:-1] + TOWER_ETA_EDGES[1:])
+
+# Branches in the synthetic pairs TTree, all floats
+PAIRS_BRANCHES = ["pt", "eta", "phi", "ptRef", "etaRef", "phiRef",
+                  "ptDiff", "rsp", "resL1", "resRef", "dr", "deta", "dphi",
+                  "numPUVertices", "trueNumInteractions", "event"]
+
+# (TDirectory, TTree, TBranch, data format) in the synthetic L1Ntuple,
+# as read by RunMatcherStage2L1Gen with --refDir l1GeneratorTree --l1Dir l1UpgradeEmuTree
+NTUPLE_REF_TREE = ("l1GeneratorTree", "L1GenTree", "Generator", "L1AnalysisGeneratorDataFormat")
+NTUPLE_L1_TREE = ("l1UpgradeEmuTree", "L1UpgradeTree", "L1Upgrade", "L1AnalysisL1UpgradeDataFormat")
+NTUPLE_EVENT_TREE = ("l1EventTree", "L1EventTree", "Event", "L1AnalysisEventDataFormat")
+
+
+def l1_response(pt_ref, eta_ref, n_pu):
+    """Mean L1 pT / reference pT: rises towards a plateau, which is lower in HF,
+    plus an offset of 0.1 GeV per PU vertex."""
+    plateau = np.where(np.abs(eta_ref) > 3., 0.75, 0.9)
+    return plateau * (1. - 1.5 / np.sqrt(pt_ref)) + 0.1 * n_pu / pt_ref
+
+
+def l1_resolution(pt_ref):
+    """Relative width of the L1 pT smearing"""
+    return 1.2 / np.sqrt(pt_ref) + 0.05
+
+
+def tower_centre_eta(eta):
+    """Get the eta of the centre of the trigger tower that contains each eta"""
+    # MP ieta counts the towers in TOWER_ETA_EDGES
+    ieta = np.abs(calo_ieta_to_mp_ieta(eta_to_calo_ieta(eta)))
+    centre = TOWER_ETA_CENTRES[ieta - 1]
+    return np.where(np.asarray(eta) < 0, -centre, centre)
+
+
+def wrap_phi(phi):
+    """Put phi into [-pi, pi)"""
+    return np.mod(phi + np.pi, 2 * np.pi) - np.pi
+
+
+def make_synthetic_jets(n_events, jets_per_event=8, pu_mean=40, seed=1):
+    """Make reference jets & their matching L1 jets.
+
+    Parameters
+    ----------
+    n_events : int
+        Number of events
+    jets_per_event : float, optional
+        Mean number of reference jets per event
+    pu_mean : float, optional
+        Mean number of PU vertices per event
+    seed : int, optional
+        Seed for the random numbers
+
+    Returns
+    -------
+    dict
+        {name: numpy.ndarray} with one entry per jet: event (index of the
+        event), numPUVertices, pt, eta, phi (L1 jet), ptRef, etaRef, phiRef.
+        Jets in the same event are together, in order of decreasing ptRef.
+    """
+    rng = np.random.RandomState(seed)
+    n_jets = rng.poisson(jets_per_event, n_events)
+    n_pu = rng.poisson(pu_mean, n_events)
+    event = np.repeat(np.arange(n_events), n_jets)
+    n = len(event)
+
+    pt_ref = PT_MIN * (PT_MAX / PT_MIN) ** rng.uniform(0, 1, n)
+    # sort jets in each event by decreasing pT, as in the ntuples
+    order = np.lexsort((-pt_ref, event))
+    pt_ref = pt_ref[order]
+    eta_ref = rng.uniform(-MAX_ETA, MAX_ETA, n)
+    phi_ref = rng.uniform(-np.pi, np.pi, n)
+    pu = n_pu[event].astype(float)
+
+    pt = pt_ref * rng.normal(l1_response(pt_ref, eta_ref, pu), l1_resolution(pt_ref))
+    pt = np.clip(np.floor(pt / IET_LSB), 1, 2**11 - 1) * IET_LSB
+    return dict(event=event, numPUVertices=pu,
+                pt=pt, eta=tower_centre_eta(eta_ref), phi=wrap_phi(phi_ref + rng.normal(0, 0.04, n)),
+                ptRef=pt_ref, etaRef=eta_ref, phiRef=phi_ref)
+
+
+def make_pair_columns(jets):
+    """Get all PAIRS_BRANCHES for each jet from make_synthetic_jets(),
+    calculated the same way as in RunMatcher."""
+    cols = dict(jets)
+    cols['ptDiff'] = jets['pt'] - jets['ptRef']
+    cols['rsp'] = jets['pt'] / jets['ptRef']
+    cols['resL1'] = cols['ptDiff'] / jets['pt']
+    cols['resRef'] = cols['ptDiff'] / jets['ptRef']
+    cols['deta'] = jets['etaRef'] - jets['eta']
+    cols['dphi'] = wrap_phi(jets['phiRef'] - jets['phi'])
+    cols['dr'] = np.hypot(cols['deta'], cols['dphi'])
+    cols['trueNumInteractions'] = jets['numPUVertices']
+    return cols
+
+
+def write_pairs_file(filename, jets):
+    """Write a pairs file with a "valid" TTree of PAIRS_BRANCHES.
+
+    The columns are written to a temporary text file and read in with
+    TTree::ReadFile(), which is much faster than filling entry-by-entry in python.
+    """
+    cols = make_pair_columns(jets)
+    fd, txt_filename = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(fd, "w") as f:
+            np.savetxt(f, np.column_stack([cols[b] for b in PAIRS_BRANCHES]), fmt="%.7g")
+        tfile = ROOT.TFile(filename, "RECREATE")
+        tree = ROOT.TTree("valid", "valid")
+        tree.ReadFile(txt_filename, ":".join("%s/F" % b for b in PAIRS_BRANCHES), " ")
+        tree.Write("", ROOT.TObject.kOverwrite)
+        n_entries = tree.GetEntries()
+        tfile.Close()
+    finally:
+        os.remove(txt_filename)
+    print "Written %d pairs to %s" % (n_entries, filename)
+    return n_entries
+
+
+def _make_ntuple_tree(tfile, tree_info):
+    """Make TTree in its TDirectory, with a branch for a new data format object"""
+    dir_name, tree_name, branch_name, data_format = tree_info
+    tfile.mkdir(dir_name).cd()
+    tree = ROOT.TTree(tree_name, tree_name)
+    data = getattr(ROOT.L1Analysis, data_format)()
+    tree.Branch(branch_name, data)
+    return tree, data
+
+
+def _fill_vector(vec, values):
+    vec.clear()
+    for v in values:
+        vec.push_back(v)
+
+
+def write_ntuple_file(filename, jets):
+    """Write the jets as an L1Ntuple, with one entry per event in each of the
+    NTUPLE_*_TREE TTrees. L1 sums are the HT & MHT of all L1 jets.
+    Events after the last one with a jet are not written.
+    Needs the L1Analysis dictionaries from CMSSW."""
+    tfile = ROOT.TFile(filename, "RECREATE")
+    ref_tree, ref_data = _make_ntuple_tree(tfile, NTUPLE_REF_TREE)
+    l1_tree, l1_data = _make_ntuple_tree(tfile, NTUPLE_L1_TREE)
+    event_tree, event_data = _make_ntuple_tree(tfile, NTUPLE_EVENT_TREE)
+
+    n_events = int(jets['event'][-1]) + 1 if len(jets['event']) else 0
+    starts = np.searchsorted(jets['event'], np.arange(n_events + 1))
+    # PU is only stored per jet, so events without jets get 0
+    n_pu = np.zeros(n_events)
+    n_pu[jets['event']] = jets['numPUVertices']
+    for i_event in xrange(n_events):
+        first, last = int(starts[i_event]), int(starts[i_event + 1])
+        ref_data.nJet = last - first
+        _fill_vector(ref_data.jetPt, jets['ptRef'][first:last])
+        _fill_vector(ref_data.jetEta, jets['etaRef'][first:last])
+        _fill_vector(ref_data.jetPhi, jets['phiRef'][first:last])
+        ref_data.nVtx = int(n_pu[i_event])
+        ref_data.nMeanPU = n_pu[i_event]
+
+        pt, phi = jets['pt'][first:last], jets['phi'][first:last]
+        l1_data.nJets = last - first
+        _fill_vector(l1_data.jetEt, pt)
+        _fill_vector(l1_data.jetEta, jets['eta'][first:last])
+        _fill_vector(l1_data.jetPhi, phi)
+        _fill_vector(l1_data.jetBx, [0] * (last - first))
+        ht = pt.sum()
+        mhx, mhy = -np.sum(pt * np.cos(phi)), -np.sum(pt * np.sin(phi))
+        l1_data.nSums = 4
+        _fill_vector(l1_data.sumType, range(4))
+        _fill_vector(l1_data.sumEt, [ht, ht, ht, np.hypot(mhx, mhy)])
+        _fill_vector(l1_data.sumPhi, [0, 0, 0, np.arctan2(mhy, mhx)])
+        _fill_vector(l1_data.sumBx, [0] * 4)
+
+        event_data.event = i_event
+        event_data.nPV = int(n_pu[i_event])
+        event_data.nPV_True = n_pu[i_event]
+
+        ref_tree.Fill()
+        l1_tree.Fill()
+        event_tree.Fill()
+
+    for tree in [ref_tree, l1_tree, event_tree]:
+        tree.GetDirectory().cd()
+        tree.Write("", ROOT.TObject.kOverwrite)
+    tfile.Close()
+    print "Written %d events to %s" % (n_events, filename)
+    return n_events
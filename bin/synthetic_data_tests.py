@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""Unit tests for synthetic benchmark data"""
+
+
+import ROOT
+import synthetic_data as sd
+from stage2_lut_emulator import eta_to_calo_ieta
+import unittest
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+class TestSyntheticJets(unittest.TestCase):
+    def setUp(self):
+        self.jets = sd.make_synthetic_jets(2000, jets_per_event=6, pu_mean=30, seed=3)
+
+    def test_reproducible(self):
+        jets = sd.make_synthetic_jets(2000, jets_per_event=6, pu_mean=30, seed=3)
+        for key, values in self.jets.items():
+            self.assertTrue(np.array_equal(values, jets[key]))
+
+    def test_event_order(self):
+        event, pt_ref = self.jets['event'], self.jets['ptRef']
+        self.assertTrue(np.all(np.diff(event) >= 0))
+        same_event = event[1:] == event[:-1]
+        self.assertTrue(np.all(pt_ref[1:][same_event] <= pt_ref[:-1][same_event]))
+
+    def test_l1_jets(self):
+        eta, eta_ref = self.jets['eta'], self.jets['etaRef']
+        self.assertTrue(np.all(np.in1d(np.abs(eta), sd.TOWER_ETA_CENTRES)))
+        self.assertTrue(np.array_equal(eta_to_calo_ieta(eta), eta_to_calo_ieta(eta_ref)))
+        pt = self.jets['pt']
+        self.assertTrue(np.all(pt > 0))
+        self.assertTrue(np.array_equal(np.floor(pt * 2), pt * 2))
+
+    def test_pair_columns(self):
+        cols = sd.make_pair_columns(self.jets)
+        self.assertEqual(set(cols.keys()), set(sd.PAIRS_BRANCHES))
+        self.assertTrue(np.allclose(cols['rsp'], self.jets['pt'] / self.jets['ptRef']))
+        self.assertTrue(np.all(np.abs(cols['dphi']) <= np.pi))
+
+
+class TestWritePairs(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_write_pairs_file(self):
+        jets = sd.make_synthetic_jets(500, seed=4)
+        filename = os.path.join(self.tmp_dir, "pairs.root")
+        self.assertEqual(sd.write_pairs_file(filename, jets), len(jets['pt']))
+        tfile = ROOT.TFile(filename)
+        tree = tfile.Get("valid")
+        self.assertEqual(tree.GetEntries(), len(jets['pt']))
+        tree.GetEntry(0)
+        self.assertAlmostEqual(tree.ptRef, jets['ptRef'][0], places=3)
+        self.assertAlmostEqual(tree.rsp, jets['pt'][0] / jets['ptRef'][0], places=5)
+        tfile.Close()
+
+
+if __name__ == '__main__':
+    unittest.main()
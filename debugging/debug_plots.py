@@ -11,6 +11,8 @@ import sys
 import glob
 import random
 import string
+import math
+from event_index import get_event_index
 
 
 ROOT.PyConfig.IgnoreCommandLineOptions = True
@@ -37,7 +39,11 @@ def generate_canvas(title="", width=800, height=800):
     return c
 
 
-def plot_jets(evt_tree, l1_upgrade_tree, reco_jet_tree, evt_num, oDir):
+def plot_jets(evt_tree, l1_upgrade_tree, reco_jet_tree, evt_num, oDir, event_index):
+    entry = event_index.get_entry(evt_num)
+    if entry is None:
+        print 'Cannot find event', evt_num
+        return
     evt_num = str(evt_num)
     print 'Plotting jet map for event', evt_num
     h2d_l1_jet_hw = ROOT.TH2F("h2d_l1_jet_hw_%s" % evt_num, evt_num + ' (L1Jet HW);ieta;iphi;iet', 83, -41.5, 41.5, 72, .5, 72.5)
@@ -49,31 +55,26 @@ def plot_jets(evt_tree, l1_upgrade_tree, reco_jet_tree, evt_num, oDir):
     c = generate_canvas()
     c.SetLogz()
 
-    for i in xrange(tp_tree.GetEntries()):
-        l1_upgrade_tree.GetEntry(i)
-        pf_jet_tree.GetEntry(i)
-        evt_tree.GetEntry(i)
-        if int(evt_tree.Event.event) == int(evt_num):
+    l1_upgrade_tree.GetEntry(entry)
+    reco_jet_tree.GetEntry(entry)
 
-            print 'Plotting L1 jets'
-            for it in range(l1_upgrade_tree.L1Upgrade.nJets):
-                h2d_l1_jet_hw.Fill(0.5 * l1_upgrade_tree.L1Upgrade.jetIEta[it], 0.5 * l1_upgrade_tree.L1Upgrade.jetIPhi[it], l1_upgrade_tree.L1Upgrade.jetIEt[it])
-                h2d_l1_jet.Fill(l1_upgrade_tree.L1Upgrade.jetEta[it], l1_upgrade_tree.L1Upgrade.jetPhi[it], l1_upgrade_tree.L1Upgrade.jetEt[it])
+    print 'Plotting L1 jets'
+    for it in range(l1_upgrade_tree.L1Upgrade.nJets):
+        h2d_l1_jet_hw.Fill(0.5 * l1_upgrade_tree.L1Upgrade.jetIEta[it], 0.5 * l1_upgrade_tree.L1Upgrade.jetIPhi[it], l1_upgrade_tree.L1Upgrade.jetIEt[it])
+        h2d_l1_jet.Fill(l1_upgrade_tree.L1Upgrade.jetEta[it], l1_upgrade_tree.L1Upgrade.jetPhi[it], l1_upgrade_tree.L1Upgrade.jetEt[it])
 
-            print 'Plotting L1 eg'
-            for it in range(l1_upgrade_tree.L1Upgrade.nEGs):
-                h2d_l1_eg_hw.Fill(0.5 * l1_upgrade_tree.L1Upgrade.egIEta[it], 0.5 * l1_upgrade_tree.L1Upgrade.egIPhi[it], l1_upgrade_tree.L1Upgrade.egIEt[it])
+    print 'Plotting L1 eg'
+    for it in range(l1_upgrade_tree.L1Upgrade.nEGs):
+        h2d_l1_eg_hw.Fill(0.5 * l1_upgrade_tree.L1Upgrade.egIEta[it], 0.5 * l1_upgrade_tree.L1Upgrade.egIPhi[it], l1_upgrade_tree.L1Upgrade.egIEt[it])
 
-            print 'Plotting L1 taus'
-            for it in range(l1_upgrade_tree.L1Upgrade.nTaus):
-                # taus don't get a 0.5
-                h2d_l1_tau_hw.Fill(l1_upgrade_tree.L1Upgrade.tauIEta[it], l1_upgrade_tree.L1Upgrade.tauIPhi[it], l1_upgrade_tree.L1Upgrade.tauIEt[it])
+    print 'Plotting L1 taus'
+    for it in range(l1_upgrade_tree.L1Upgrade.nTaus):
+        # taus don't get a 0.5
+        h2d_l1_tau_hw.Fill(l1_upgrade_tree.L1Upgrade.tauIEta[it], l1_upgrade_tree.L1Upgrade.tauIPhi[it], l1_upgrade_tree.L1Upgrade.tauIEt[it])
 
-            print 'Plotting pf jets'
-            for it in range(pf_jet_tree.Jet.nJets):
-                h2d_pf_jet.Fill(pf_jet_tree.Jet.eta[it], pf_jet_tree.Jet.phi[it], pf_jet_tree.Jet.et[it])
-
-            break
+    print 'Plotting pf jets'
+    for it in range(reco_jet_tree.Jet.nJets):
+        h2d_pf_jet.Fill(reco_jet_tree.Jet.eta[it], reco_jet_tree.Jet.phi[it], reco_jet_tree.Jet.et[it])
 
     if not os.path.isdir(oDir):
         os.makedirs(oDir)
@@ -109,8 +110,12 @@ def plot_jets(evt_tree, l1_upgrade_tree, reco_jet_tree, evt_num, oDir):
     c.SaveAs(os.path.join(oDir, 'pf_jet_map.pdf'))
 
 
-def plot_egtau(evt_tree, eg_tree, tau_tree, evt_num, oDir):
+def plot_egtau(evt_tree, eg_tree, tau_tree, evt_num, oDir, event_index):
     """Plots reco eg tau"""
+    entry = event_index.get_entry(evt_num)
+    if entry is None:
+        print 'Cannot find event', evt_num
+        return
     evt_num = str(evt_num)
     print 'Plotting eg & tau maps for event', evt_num
     h2d_eg = ROOT.TH2F("h2d_eg_%s" % evt_num, evt_num + ' (EG);eta;phi;et', 120, -3, 3, 144, -ROOT.TMath.Pi(), ROOT.TMath.Pi())
@@ -119,21 +124,16 @@ def plot_egtau(evt_tree, eg_tree, tau_tree, evt_num, oDir):
     c = generate_canvas()
     c.SetLogz()
 
-    for i in xrange(tp_tree.GetEntries()):
-        eg_tree.GetEntry(i)
-        tau_tree.GetEntry(i)
-        evt_tree.GetEntry(i)
-        if int(evt_tree.Event.event) == int(evt_num):
-
-            print 'Plotting eg'
-            for it in range(eg_tree.Electron.nElectrons):
-                h2d_eg.Fill(eg_tree.Electron.eta[it], eg_tree.Electron.phi[it], eg_tree.Electron.et[it])
+    eg_tree.GetEntry(entry)
+    tau_tree.GetEntry(entry)
 
-            print 'Plotting taus'
-            for it in range(tau_tree.Tau.nTaus):
-                h2d_tau.Fill(tau_tree.Tau.eta[it], tau_tree.Tau.phi[it], tau_tree.Tau.et[it])
+    print 'Plotting eg'
+    for it in range(eg_tree.Electron.nElectrons):
+        h2d_eg.Fill(eg_tree.Electron.eta[it], eg_tree.Electron.phi[it], eg_tree.Electron.et[it])
 
-            break
+    print 'Plotting taus'
+    for it in range(tau_tree.Tau.nTaus):
+        h2d_tau.Fill(tau_tree.Tau.eta[it], tau_tree.Tau.phi[it], tau_tree.Tau.et[it])
 
     if not os.path.isdir(oDir):
         os.makedirs(oDir)
@@ -151,7 +151,11 @@ def plot_egtau(evt_tree, eg_tree, tau_tree, evt_num, oDir):
     c.SaveAs(os.path.join(oDir, 'tau_map.pdf'))
 
 
-def plot_towers(evt_tree, tp_tree, evt_num, oDir):
+def plot_towers(evt_tree, tp_tree, evt_num, oDir, event_index):
+    entry = event_index.get_entry(evt_num)
+    if entry is None:
+        print 'Cannot find event', evt_num
+        return
     evt_num = str(evt_num)
     print 'Plotting tower/tp maps for event', evt_num
 
@@ -168,33 +172,29 @@ def plot_towers(evt_tree, tp_tree, evt_num, oDir):
 
     iet_max, ieta_max, iphi_max = 0, 999, 999
 
-    for i in xrange(tp_tree.GetEntries()):
-        tp_tree.GetEntry(i)
-        evt_tree.GetEntry(i)
-        if int(evt_tree.Event.event) == int(evt_num):
-            print evt_tree.Event.lumi
-
-            # print 'Plotting HCAL TP'
-            # for it in xrange(tp_tree.CaloTP.nHCALTP):
-            #     h2d_hcal.Fill(tp_tree.CaloTP.hcalTPieta[it], tp_tree.CaloTP.hcalTPCaliphi[it], tp_tree.CaloTP.hcalTPet[it])
+    tp_tree.GetEntry(entry)
+    evt_tree.GetBranch("Event").GetEntry(entry)
+    print evt_tree.Event.lumi
 
-            # print 'Plotting ECAL TP'
-            # for it in range(tp_tree.CaloTP.nECALTP):
-            #     h2d_ecal.Fill(tp_tree.CaloTP.ecalTPieta[it], tp_tree.CaloTP.ecalTPCaliphi[it], tp_tree.CaloTP.ecalTPcompEt[it])
+    # print 'Plotting HCAL TP'
+    # for it in xrange(tp_tree.CaloTP.nHCALTP):
+    #     h2d_hcal.Fill(tp_tree.CaloTP.hcalTPieta[it], tp_tree.CaloTP.hcalTPCaliphi[it], tp_tree.CaloTP.hcalTPet[it])
 
-            print 'Plotting Tower'
-            for it in range(tp_tree.L1CaloTower.nTower):
-                tow_ieta = tp_tree.L1CaloTower.ieta[it]
-                tow_iphi = tp_tree.L1CaloTower.iphi[it]
-                tow_iet = tp_tree.L1CaloTower.iet[it]
+    # print 'Plotting ECAL TP'
+    # for it in range(tp_tree.CaloTP.nECALTP):
+    #     h2d_ecal.Fill(tp_tree.CaloTP.ecalTPieta[it], tp_tree.CaloTP.ecalTPCaliphi[it], tp_tree.CaloTP.ecalTPcompEt[it])
 
-                h2d_calo.Fill(tow_ieta, tow_iphi, tow_iet)
-                if tow_iet > iet_max:
-                    iet_max, ieta_max, iphi_max = tow_iet, tow_ieta, tow_iphi
-                h2d_caloiem.Fill(tow_ieta, tow_iphi, tp_tree.L1CaloTower.iem[it])
-                h2d_caloihad.Fill(tow_ieta, tow_iphi, tp_tree.L1CaloTower.ihad[it])
+    print 'Plotting Tower'
+    for it in range(tp_tree.L1CaloTower.nTower):
+        tow_ieta = tp_tree.L1CaloTower.ieta[it]
+        tow_iphi = tp_tree.L1CaloTower.iphi[it]
+        tow_iet = tp_tree.L1CaloTower.iet[it]
 
-            break
+        h2d_calo.Fill(tow_ieta, tow_iphi, tow_iet)
+        if tow_iet > iet_max:
+            iet_max, ieta_max, iphi_max = tow_iet, tow_ieta, tow_iphi
+        h2d_caloiem.Fill(tow_ieta, tow_iphi, tp_tree.L1CaloTower.iem[it])
+        h2d_caloihad.Fill(tow_ieta, tow_iphi, tp_tree.L1CaloTower.ihad[it])
 
     if not os.path.isdir(oDir):
         os.makedirs(oDir)
@@ -235,6 +235,33 @@ def plot_towers(evt_tree, tp_tree, evt_num, oDir):
     c.SaveAs(os.path.join(oDir, 'calo_ihad_map.pdf'))
 
 
+def plot_events(evt_nums, trees, oDir_suffix, event_index, do_egtau=False):
+    """Make tower & jet maps for a batch of events, in one pass over the ntuple.
+
+    The events are plotted in entry order, so the trees are only read forwards.
+
+    Parameters
+    ----------
+    evt_nums : list[int]
+        Event numbers to plot
+    trees : dict
+        Trees to plot from, with keys 'event', 'tp', 'l1_upgrade', 'reco_jet',
+        and 'eg', 'tau' if do_egtau
+    oDir_suffix : str
+        Plots for each event go in directory <event number><oDir_suffix>
+    event_index : EventIndex
+        Index to find events in the trees
+    do_egtau : bool, optional
+        Plot reco eg & tau maps as well
+    """
+    for entry, evt_num in event_index.get_entries(set(evt_nums)):
+        oDir = str(evt_num) + oDir_suffix
+        plot_towers(trees['event'], trees['tp'], evt_num, oDir, event_index)
+        plot_jets(trees['event'], trees['l1_upgrade'], trees['reco_jet'], evt_num, oDir, event_index)
+        if do_egtau:
+            plot_egtau(trees['event'], trees['eg'], trees['tau'], evt_num, oDir, event_index)
+
+
 def draw_jet_towers(ieta, iphi):
     small_box = ROOT.TBox(ieta-0.5, iphi-0.5, ieta+0.5, iphi+0.5)
     ROOT.SetOwnership(small_box, False)
@@ -384,31 +411,20 @@ if __name__ == "__main__":
     event_tree.AddFriend(eg_tree)
     event_tree.AddFriend(tau_tree)
 
-    # for evt_num in set(dodgy_event_numbers_pefLt0p7):
-    #     plot_towers(event_tree, tp_tree, evt_num, str(evt_num)+'highRsp_pefLt0p7')
-    #     plot_jets(event_tree, l1_upgrade_tree, pf_jet_tree, evt_num, str(evt_num)+'highRsp_pefLt0p7')
-    #     plot_egtau(event_tree, eg_tree, tau_tree, evt_num, str(evt_num)+'highRsp_pefLt0p7')
-
-    # for evt_num in set(dodgy_event_numbers_pefGt0p7_phi0or3):
-    #     plot_towers(event_tree, tp_tree, evt_num, str(evt_num)+'highRsp_pefGt0p7_phi0or3')
-    #     plot_jets(event_tree, l1_upgrade_tree, pf_jet_tree, evt_num, str(evt_num)+'highRsp_pefGt0p7_phi0or3')
-
-    # for evt_num in set(dodgy_event_numbers_pefGt0p7_notPhi0or3):
-    #     plot_towers(event_tree, tp_tree, evt_num, str(evt_num)+'highRsp_pefGt0p7_notPhi0or3')
-    #     plot_jets(event_tree, l1_upgrade_tree, pf_jet_tree, evt_num, str(evt_num)+'highRsp_pefGt0p7_notPhi0or3')
-
-    # for evt_num in set(dodgy_event_numbers_rsp1):
-    #     plot_towers(event_tree, tp_tree, evt_num, str(evt_num)+'rsp1_elMultGt0')
-    #     plot_jets(event_tree, l1_upgrade_tree, pf_jet_tree, evt_num, str(evt_num)+'rsp1_elMultGt0')
+    trees = {'event': event_tree, 'tp': tp_tree, 'l1_upgrade': l1_upgrade_tree,
+             'reco_jet': pf_jet_tree, 'eg': eg_tree, 'tau': tau_tree}
 
-    # for evt_num in set(dodgy_event_numbers_dphiOffset):
-    #     plot_towers(event_tree, tp_tree, evt_num, str(evt_num)+'dphiOffset')
-    #     plot_jets(event_tree, l1_upgrade_tree, pf_jet_tree, evt_num, str(evt_num)+'dphiOffset')
-        # plot_egtau(event_tree, eg_tree, tau_tree, evt_num, str(evt_num)+'dphiOffset')
+    # (run, lumi, event) -> entry lookup, cached alongside the ntuple
+    # (or in the current dir if we can't write there)
+    index_dir = None if os.access(os.path.dirname(l1ntuple_filename), os.W_OK) else os.getcwd()
+    event_index = get_event_index(l1ntuple_filename, event_tree, index_dir)
 
-    # for evt_num in set(good_event_numbers):
-    #     plot_towers(event_tree, tp_tree, evt_num, str(evt_num)+'similarL1')
-    #     plot_jets(event_tree, l1_upgrade_tree, pf_jet_tree, evt_num, str(evt_num)+'similarL1')
+    # plot_events(dodgy_event_numbers_pefLt0p7, trees, 'highRsp_pefLt0p7', event_index, do_egtau=True)
+    # plot_events(dodgy_event_numbers_pefGt0p7_phi0or3, trees, 'highRsp_pefGt0p7_phi0or3', event_index)
+    # plot_events(dodgy_event_numbers_pefGt0p7_notPhi0or3, trees, 'highRsp_pefGt0p7_notPhi0or3', event_index)
+    # plot_events(dodgy_event_numbers_rsp1, trees, 'rsp1_elMultGt0', event_index)
+    # plot_events(dodgy_event_numbers_dphiOffset, trees, 'dphiOffset', event_index)
+    # plot_events(good_event_numbers, trees, 'similarL1', event_index)
 
     # see if correlation between dodgy event nums and CSC halo list
     # -------------------------------------------------------------------------
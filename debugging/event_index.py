@@ -0,0 +1,177 @@
+"""
+Persistent (run, lumi, event) -> entry index for L1Ntuples.
+
+Finding a given event in an ntuple by looping over GetEntry() is a linear scan
+of every tree involved. Instead, the event numbers are read once (only the
+Event branch is read), and stored in a sidecar file next to the ntuple.
+Subsequent lookups are a dict access, and the trees only need to load the
+entries actually wanted.
+
+The sidecar stores the size & modification time of the ntuple, so it is
+rebuilt automatically if the ntuple changes.
+
+Usage:
+
+event_index = get_event_index(l1ntuple_filename, event_tree)
+entry = event_index.get_entry(evt_num)
+event_tree.GetEntry(entry)
+"""
+
+
+import ROOT
+import os
+
+
+ROOT.PyConfig.IgnoreCommandLineOptions = True
+
+
+INDEX_SUFFIX = ".evtidx"
+
+
+class EventIndex(object):
+    """Map of (run, lumi, event) to tree entry number."""
+
+    def __init__(self):
+        self.entries = {}
+        # for looking up by event number alone
+        self.event_entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, run, lumi, event, entry):
+        self.entries[(run, lumi, event)] = entry
+        self.event_entries.setdefault(event, []).append(entry)
+
+    def get_entry(self, event, run=None, lumi=None):
+        """Get the tree entry for an event.
+
+        Parameters
+        ----------
+        event : int
+            Event number
+        run, lumi : int, optional
+            Run & lumisection. Only needed if the event number is not unique
+            in the ntuple.
+
+        Returns
+        -------
+        int
+            Entry number, or None if not found.
+
+        Raises
+        ------
+        KeyError
+            If the event number is ambiguous, and run & lumi are not given.
+        """
+        event = int(event)
+        if run is not None and lumi is not None:
+            return self.entries.get((int(run), int(lumi), event), None)
+        matches = self.event_entries.get(event, [])
+        if len(matches) > 1:
+            raise KeyError("Event %d appears %d times, need to specify run & lumi" % (event, len(matches)))
+        return matches[0] if matches else None
+
+    def get_entries(self, events):
+        """Get entries for a list of event numbers, sorted by entry number,
+        so that the trees can be read in one forward pass.
+
+        Events not in the index are skipped.
+
+        Returns
+        -------
+        list[(int, int)]
+            (entry, event number) pairs
+        """
+        found = []
+        for event in events:
+            entry = self.get_entry(event)
+            if entry is None:
+                print "Event %s not found in index" % event
+                continue
+            found.append((entry, event))
+        return sorted(found)
+
+
+def build_event_index(event_tree):
+    """Make an EventIndex by reading the run/lumi/event numbers from event_tree.
+
+    Parameters
+    ----------
+    event_tree : ROOT.TTree
+        Tree with the Event branch, i.e. l1Tree/L1Tree
+
+    Returns
+    -------
+    EventIndex
+    """
+    n_entries = event_tree.GetEntries()
+    print "Building event index for %d entries" % n_entries
+    # only read the Event branch, not the whole tree (and any friends)
+    branch = event_tree.GetBranch("Event")
+    evt = event_tree.Event  # sets up the branch address
+    index = EventIndex()
+    for i in xrange(n_entries):
+        branch.GetEntry(i)
+        index.add(int(evt.run), int(evt.lumi), int(evt.event), i)
+    return index
+
+
+def _file_stamp(filename):
+    stat = os.stat(filename)
+    return "%d %d" % (stat.st_size, int(stat.st_mtime))
+
+
+def generate_index_filename(ntuple_filename, index_dir=None):
+    """Get sidecar filename for ntuple. Stored alongside the ntuple unless
+    index_dir is specified."""
+    basename = os.path.basename(ntuple_filename) + INDEX_SUFFIX
+    if index_dir:
+        return os.path.join(index_dir, basename)
+    return os.path.join(os.path.dirname(os.path.abspath(ntuple_filename)), basename)
+
+
+def save_event_index(index, index_filename, ntuple_filename):
+    """Write index to sidecar file: first line is the ntuple stamp,
+    then one 'run lumi event entry' line per event, in entry order."""
+    with open(index_filename, "w") as f:
+        f.write("# %s\n" % _file_stamp(ntuple_filename))
+        for key, entry in sorted(index.entries.iteritems(), key=lambda x: x[1]):
+            f.write("%d %d %d %d\n" % (key[0], key[1], key[2], entry))
+
+
+def load_event_index(index_filename, ntuple_filename):
+    """Read index from sidecar file. Returns None if the sidecar doesn't exist,
+    or is out of date compared to the ntuple."""
+    if not os.path.isfile(index_filename):
+        return None
+    index = EventIndex()
+    with open(index_filename) as f:
+        header = f.readline()
+        if header.strip() != "# %s" % _file_stamp(ntuple_filename):
+            print "Event index %s out of date" % index_filename
+            return None
+        for line in f:
+            run, lumi, event, entry = [int(x) for x in line.split()]
+            index.add(run, lumi, event, entry)
+    return index
+
+
+def get_event_index(ntuple_filename, event_tree, index_dir=None):
+    """Get the EventIndex for an ntuple, loading it from its sidecar file if
+    up to date, otherwise building it from event_tree & saving it.
+
+    If the ntuple directory is not writable (e.g. on /hdfs), pass index_dir
+    to store the sidecar somewhere else.
+    """
+    index_filename = generate_index_filename(ntuple_filename, index_dir)
+    index = load_event_index(index_filename, ntuple_filename)
+    if index is not None:
+        return index
+    index = build_event_index(event_tree)
+    try:
+        save_event_index(index, index_filename, ntuple_filename)
+        print "Saved event index to", index_filename
+    except IOError as e:
+        print "Cannot save event index to %s: %s" % (index_filename, e)
+    return index
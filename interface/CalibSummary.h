@@ -0,0 +1,106 @@
+#ifndef L1Trigger_L1JetEnergyCorrections_CalibSummary_h
+#define L1Trigger_L1JetEnergyCorrections_CalibSummary_h
+
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     CalibSummary
+//
+/**\class CalibSummary CalibSummary.h "L1Trigger/L1JetEnergyCorrections/interface/CalibSummary.h"
+
+ Description: Histograms needed by runCalibration.py, filled in the matcher event loop.
+
+ Usage:
+    CalibSummary summary(etaBins, puBins);
+    for each matched pair:
+        summary.fill(l1Eta, l1Pt, refPt, numPUVertices);
+    summary.write(CalibSummary::summaryFilename("pairs.root"));
+*/
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include <memory>
+#include <string>
+#include <vector>
+
+#include "TH1F.h"
+#include "TH2F.h"
+#include "TProfile.h"
+
+/**
+ * @brief Histograms needed to make the correction curves, for each (PU range, |eta| bin).
+ * @details Instead of storing every pair and making the histograms in
+ * runCalibration.py, they are filled directly in the matcher event loop,
+ * with the same binning & cuts as runCalibration.py:
+ *
+ * - hrsp_eta_<etamin>_<etamax>: response for all pT
+ * - h2d_rsp_gen: response Vs ref jet pT
+ * - hprof_pt_gen: mean L1 jet pT Vs ref jet pT
+ * - hprof_ptref_gen: mean ref jet pT Vs ref jet pT
+ *
+ * The profiles replace the per-ptRef-bin L1 (& ref) pT hists, since only
+ * their means (& errors on the means) are used. They have the same ptRef axis
+ * as h2d_rsp_gen, so can be rebinned to any ptRef bins.
+ *
+ * The histograms for each |eta| bin are stored in the TDirectory
+ * PU_all/eta_<etamin>_<etamax>, along with PU_<pumin>_<pumax>/eta_<etamin>_<etamax>
+ * for each PU range. All the histograms add, so summaries from several
+ * files can be hadd-ed.
+ */
+class CalibSummary
+{
+
+public:
+
+    /**
+     * @brief Constructor, specifying bins to make the histograms for.
+     *
+     * @param etaBins Edges of L1 jet |eta| bins.
+     * @param puBins Edges of numPUVertices ranges, inclusive at both ends.
+     * Histograms for all PU are always made.
+     */
+    CalibSummary(const std::vector<float> & etaBins, const std::vector<float> & puBins);
+
+    virtual ~CalibSummary();
+
+    /**
+     * @brief Fill histograms for one matched pair.
+     * @details Pairs outside the |eta| bins, or with saturated L1 jets, are skipped.
+     */
+    void fill(float eta, float pt, float ptRef, float numPUVertices);
+
+    /**
+     * @brief Write all histograms to a new ROOT file.
+     */
+    void write(const std::string & filename) const;
+
+    /**
+     * @brief Get summary filename to go with a pairs filename,
+     * e.g. pairs.root -> pairs_summary.root
+     */
+    static std::string summaryFilename(const std::string & pairsFilename);
+
+private:
+
+    CalibSummary(const CalibSummary&); // stop default
+
+    const CalibSummary& operator=(const CalibSummary&); // stop default
+
+    struct BinHists {
+        std::unique_ptr<TH1F> hrsp;
+        std::unique_ptr<TH2F> h2d_rsp_gen;
+        std::unique_ptr<TProfile> hprof_pt_gen;
+        std::unique_ptr<TProfile> hprof_ptref_gen;
+    };
+
+    void fillBin(BinHists & hists, float pt, float ptRef, float rsp);
+
+    std::vector<float> etaBins_;
+    std::vector<float> puBins_;
+    // dirNames_[iPU] for iPU = 0 (all PU), 1..puBins_.size()-1 (PU ranges)
+    std::vector<std::string> dirNames_;
+    // hists_[iPU][iEta]
+    std::vector<std::vector<BinHists>> hists_;
+};
+
+#endif
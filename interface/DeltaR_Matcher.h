@@ -21,6 +21,7 @@
 //         Created:  Wed, 12 Nov 2014 21:21:21 GMT
 //
 #include "Matcher.h"
+#include "JetCollection.h"
 
 #include <iostream>
 #include <algorithm>
@@ -87,6 +88,34 @@ public:
      */
     virtual void setL1Jets(const std::vector<TLorentzVector>& l1Jets) override;
 
+    /**
+     * @brief Set reference jet collection & sorts by descending pT
+     * @details Applies cuts on jets. Only those that pass are saved.
+     * Avoids creating any TLorentzVectors, except for matched jets.
+     *
+     * @param refJets JetCollection holding reference jets
+     */
+    virtual void setRefJets(const JetCollection& refJets) override;
+
+    /**
+     * @brief Set L1 jet collection & sorts by descending pT
+     * @details Applies cuts on jets. Only those that pass are saved.
+     * Avoids creating any TLorentzVectors, except for matched jets.
+     *
+     * @param l1Jets JetCollection holding L1 jets
+     */
+    virtual void setL1Jets(const JetCollection& l1Jets) override;
+
+    /**
+     * @brief Access ref jet collection used in matching process
+     */
+    virtual std::vector<TLorentzVector> getRefJets() const override;
+
+    /**
+     * @brief Access L1 jet collection used in matching process
+     */
+    virtual std::vector<TLorentzVector> getL1Jets() const override;
+
     /**
      * @brief Set minimum jet pT cut to be applied to reference jets.
      *
@@ -128,7 +157,8 @@ public:
      * @details For each L1 jet, we loop over all reference jets. For each
      * pair, we calculate deltaR between the jets. If deltaR < maxDeltaR_, it
      * counts as a match. If there are > 1 possible matches, the one with the
-     * smallest deltaR is used.
+     * smallest deltaR is used. Matching uses the cached eta/phi in the
+     * JetCollections, and compares deltaR^2 to avoid the sqrt.
      * Note that because the jets are sorted by pT, higher pT L1 jets get priority
      * in matching, since we remove a refJet from potential matches once matched
      * to a L1 jet.
@@ -138,53 +168,67 @@ public:
     virtual std::vector<MatchedPair> getMatchingPairs() override;
 
 
-private:
+protected:
 
     /**
      * @brief Check reference jet passes cuts
      *
-     * @param jet Jet to check
+     * @param pt Jet pT
+     * @param eta Jet eta
      * @return [description]
      */
-    bool checkRefJet(const TLorentzVector& jet);
+    bool checkRefJet(const double pt, const double eta) const;
 
     /**
      * @brief Check L1 jet passes cuts
      *
-     * @param jet Jet to check
+     * @param pt Jet pT
+     * @param eta Jet eta
      * @return [description]
      */
-    bool checkL1Jet(const TLorentzVector& jet);
+    bool checkL1Jet(const double pt, const double eta) const;
 
     /**
      * @brief Check if jet pT >= minPt.
      *
-     * @param jet Jet under test.
+     * @param pt pT of jet under test.
      * @param minPt Minimum pT cut value.
      *
      * @return Whether jet passed test.
      */
-    bool checkJetMinPt(const TLorentzVector& jet, const double minPt) const;
+    bool checkJetMinPt(const double pt, const double minPt) const;
 
     /**
      * @brief Check if jet pT <= maxPt
      *
-     * @param jet Jet under test
+     * @param pt pT of jet under test
      * @param maxPt Maximum pT cut value
      *
      * @return Whether jet passed test.
      */
-    bool checkJetMaxPt(const TLorentzVector& jet, const double maxPt) const;
+    bool checkJetMaxPt(const double pt, const double maxPt) const;
 
     /**
      * @brief Check if abs(eta) of jet <= maxEta.
      *
-     * @param jet Jet under test.
+     * @param eta Eta of jet under test.
      * @param eta Maximum absolute eta allowed.
      *
      * @return Whether jet passed test.
      */
-    bool checkJetMaxEta(const TLorentzVector& jet, const double maxEta) const;
+    bool checkJetMaxEta(const double eta, const double maxEta) const;
+
+    /**
+     * @brief Get 4-vector of ref jet i for storing in a MatchedPair.
+     * @details If the jets were passed in as TLorentzVectors, the original is
+     * used, otherwise one is made from the JetCollection.
+     */
+    TLorentzVector refJetP4(unsigned i) const { return refFromP4_ ? refJets_[i] : refColl_.p4(i); };
+
+    /**
+     * @brief Get 4-vector of L1 jet i for storing in a MatchedPair.
+     */
+    TLorentzVector l1JetP4(unsigned i) const { return l1FromP4_ ? l1Jets_[i] : l1Coll_.p4(i); };
 
     /**
      * @brief Binary predicate to use in std::sort, to allow sorting TLorentzVectors by descending pT
@@ -209,6 +253,12 @@ private:
     double minL1JetPt_; // Minimum pT for L1 jet to take part in matching.
     double maxL1JetPt_; // Maximum pT for L1 jet to take part in matching.
     double maxJetEta_;  // Maximum absolute eta for any jet to take part in matching.
+
+    JetCollection refColl_; // Reference jets that pass cuts, sorted by descending pT
+    JetCollection l1Coll_; // L1 jets that pass cuts, sorted by descending pT
+    bool refFromP4_; // Whether ref jets were set from TLorentzVectors (stored in refJets_)
+    bool l1FromP4_; // Whether L1 jets were set from TLorentzVectors (stored in l1Jets_)
+    std::vector<char> refUsed_; // Whether each ref jet has already been matched
 };
 
 #endif /* L1Trigger_L1JetEnergyCorrections_DeltaR_Matcher_h */
\ No newline at end of file
@@ -0,0 +1,128 @@
+#ifndef L1Trigger_L1JetEnergyCorrections_EventDisplayRecorder_h
+#define L1Trigger_L1JetEnergyCorrections_EventDisplayRecorder_h
+
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     EventDisplayRecorder
+//
+/**\class EventDisplayRecorder EventDisplayRecorder.h "L1Trigger/L1JetEnergyCorrections/interface/EventDisplayRecorder.h"
+
+ Description: Store the ref jets, L1 jets & matched pairs of selected events
+ in a small side file, so their eta-phi event displays can be made after the
+ matcher has finished, by renderEventDisplays.py.
+
+ Usage:
+    EventDisplayRecorder recorder(EventDisplayRecorder::sideFilename("pairs.root"), "plots_ntuple_gen_l1");
+    for each event to draw:
+        recorder.record(iEntry, eventNumber, refJets, l1Jets, matchResults, label);
+    recorder.close();
+
+ Then make the plots with:
+    python renderEventDisplays.py pairs_eventDisplay.root --jobs 4
+*/
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include <string>
+#include <vector>
+
+#include "Rtypes.h"
+#include "TLorentzVector.h"
+#include "TString.h"
+
+#include "MatchedPair.h"
+
+class TFile;
+class TTree;
+
+/**
+ * @brief Records the jets in selected events to a TTree, one entry per event.
+ * @details This replaces making a JetDrawer in the event loop, which creates
+ * a canvas & saves a PDF for every event drawn. Here recording an event only
+ * fills a TTree entry.
+ *
+ * The TTree is called "eventDisplay", with branches:
+ * - entry, event: entry number in the input ntuple, & event number
+ * - label: text to put on the plot
+ * - refPt, refEta, refPhi: reference jets
+ * - l1Pt, l1Eta, l1Phi: L1 jets
+ * - pairRefPt, pairRefEta, pairRefPhi, pairL1Pt, pairL1Eta, pairL1Phi: the
+ *   ref & L1 jet in each matched pair
+ *
+ * The directory the plots should be saved in is stored in the file as a
+ * TNamed called "plotDir".
+ */
+class EventDisplayRecorder
+{
+
+public:
+    /**
+     * @brief Create the side file. Any existing file is overwritten.
+     *
+     * @param filename Side file to write
+     * @param plotDir Directory to make the plots in, stored in the file
+     */
+    EventDisplayRecorder(const std::string & filename, const std::string & plotDir);
+
+    /**
+     * @brief Calls close() if not already done
+     */
+    virtual ~EventDisplayRecorder();
+
+    /**
+     * @brief Store the jets for one event
+     *
+     * @param entry Entry number in input ntuple
+     * @param event Event number
+     * @param refJets Reference jets
+     * @param l1Jets L1 jets
+     * @param matchedJets Pairs of matched jets (e.g. from Matcher::getMatchingPairs())
+     * @param label Text for the plot
+     */
+    void record(Long64_t entry, ULong64_t event,
+                const std::vector<TLorentzVector> & refJets,
+                const std::vector<TLorentzVector> & l1Jets,
+                const std::vector<MatchedPair> & matchedJets,
+                const TString & label="");
+
+    /**
+     * @brief Write the TTree & close the file. Does nothing if already closed.
+     */
+    void close();
+
+    Long64_t nRecorded() const { return nRecorded_; };
+
+    const std::string & filename() const { return filename_; };
+
+    /**
+     * @brief Get the side filename for a matcher output file,
+     * e.g. pairs.root -> pairs_eventDisplay.root
+     */
+    static std::string sideFilename(const std::string & pairsFilename);
+
+private:
+    EventDisplayRecorder(const EventDisplayRecorder&); // stop default
+
+    const EventDisplayRecorder& operator=(const EventDisplayRecorder&); // stop default
+
+    static void fillJets(const std::vector<TLorentzVector> & jets,
+                         std::vector<float> & pt, std::vector<float> & eta, std::vector<float> & phi);
+
+    std::string filename_;
+    std::string plotDir_;
+    TFile * file_;
+    TTree * tree_;
+    Long64_t nRecorded_;
+
+    // branch contents
+    Long64_t entry_;
+    ULong64_t event_;
+    std::string label_;
+    std::vector<float> refPt_, refEta_, refPhi_;
+    std::vector<float> l1Pt_, l1Eta_, l1Phi_;
+    std::vector<float> pairRefPt_, pairRefEta_, pairRefPhi_;
+    std::vector<float> pairL1Pt_, pairL1Eta_, pairL1Phi_;
+};
+
+#endif
@@ -0,0 +1,161 @@
+#ifndef L1Trigger_L1JetEnergyCorrections_JetCollection_h
+#define L1Trigger_L1JetEnergyCorrections_JetCollection_h
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     JetCollection
+//
+/**\class JetCollection JetCollection.h "L1Trigger/L1JetEnergyCorrections/interface/JetCollection.h"
+
+ Description: Lightweight structure-of-arrays collection of jets.
+
+ Usage:
+    JetCollection l1Jets; // declare outside the event loop
+    for (...) {
+        l1Jets.fill(l1Data->jetEt, l1Data->jetEta, l1Data->jetPhi, l1Data->jetBx);
+        matcher->setL1Jets(l1Jets);
+        ...
+    }
+
+*/
+//
+// Original Author:  Robin Cameron Aggleton
+//
+
+// system include files
+#include <vector>
+#include <cmath>
+
+// user include files
+#include "TLorentzVector.h"
+
+/**
+ * @brief Lightweight structure-of-arrays collection of jets.
+ * @details Stores pT, eta, phi, BX for each jet, along with cos(phi) and
+ * sin(phi) so that they are only calculated once per jet.
+ * Unlike a std::vector<TLorentzVector>, eta & phi don't need to be re-derived
+ * from the momentum components every time they are used.
+ *
+ * The object is designed to be declared once, and re-filled every event:
+ * clear() keeps the allocated memory, so there are no per-event allocations
+ * once the collection has grown to the largest event size.
+ */
+class JetCollection
+{
+
+public:
+    JetCollection() {};
+
+    virtual ~JetCollection() {};
+
+    // ---------- const member functions ---------------------
+
+    unsigned size() const { return pt_.size(); };
+
+    bool empty() const { return pt_.empty(); };
+
+    double pt(unsigned i) const { return pt_[i]; };
+
+    double eta(unsigned i) const { return eta_[i]; };
+
+    double phi(unsigned i) const { return phi_[i]; };
+
+    double cosPhi(unsigned i) const { return cosPhi_[i]; };
+
+    double sinPhi(unsigned i) const { return sinPhi_[i]; };
+
+    double px(unsigned i) const { return pt_[i] * cosPhi_[i]; };
+
+    double py(unsigned i) const { return pt_[i] * sinPhi_[i]; };
+
+    int bx(unsigned i) const { return bx_[i]; };
+
+    /**
+     * @brief Make a massless TLorentzVector for jet i
+     */
+    TLorentzVector p4(unsigned i) const;
+
+    /**
+     * @brief Make a std::vector of massless TLorentzVectors for all jets
+     */
+    std::vector<TLorentzVector> p4s() const;
+
+    // ---------- static member functions --------------------
+
+    /**
+     * @brief Calculate (deltaR)^2 between jet i in collection a,
+     * and jet j in collection b.
+     */
+    static double deltaR2(const JetCollection& a, unsigned i,
+                          const JetCollection& b, unsigned j)
+    {
+        double dEta = a.eta_[i] - b.eta_[j];
+        double dPhi = a.phi_[i] - b.phi_[j];
+        // both phis are in [-pi, pi], so only need to wrap once
+        if (dPhi > M_PI) dPhi -= 2. * M_PI;
+        else if (dPhi <= -M_PI) dPhi += 2. * M_PI;
+        return (dEta * dEta) + (dPhi * dPhi);
+    };
+
+    // ---------- member functions ---------------------------
+
+    /**
+     * @brief Remove all jets. Allocated memory is kept for re-use.
+     */
+    void clear();
+
+    void reserve(unsigned n);
+
+    /**
+     * @brief Add a jet to the end of the collection
+     */
+    void push_back(double pt, double eta, double phi, int bx=0);
+
+    /**
+     * @brief Add a copy of jet i from another collection
+     */
+    void push_back(const JetCollection& other, unsigned i);
+
+    /**
+     * @brief Replace contents with jets from input vectors of et, eta, phi.
+     */
+    template<typename T>
+    void fill(const std::vector<T> & et,
+              const std::vector<T> & eta,
+              const std::vector<T> & phi);
+
+    /**
+     * @brief Replace contents with jets from input vectors of et, eta, phi.
+     * Only jets with BX = 0 are kept.
+     */
+    template<typename T, typename T2>
+    void fill(const std::vector<T> & et,
+              const std::vector<T> & eta,
+              const std::vector<T> & phi,
+              const std::vector<T2> & bx);
+
+    /**
+     * @brief Replace contents with jets from vector of TLorentzVectors.
+     */
+    void fill(const std::vector<TLorentzVector> & jets);
+
+    /**
+     * @brief Sort jets by descending pT. Jets with equal pT keep their order.
+     */
+    void sortByPtDescending();
+
+private:
+    std::vector<double> pt_;
+    std::vector<double> eta_;
+    std::vector<double> phi_;
+    std::vector<double> cosPhi_;
+    std::vector<double> sinPhi_;
+    std::vector<int> bx_;
+
+    // scratch space for sorting, kept to avoid reallocating
+    std::vector<unsigned> order_;
+    std::vector<double> scratch_;
+    std::vector<int> scratchInt_;
+};
+
+#endif /* L1Trigger_L1JetEnergyCorrections_JetCollection_h */
@@ -31,13 +31,13 @@ class MatchedPair
 {
 
    public:
-      MatchedPair(TLorentzVector refJet, TLorentzVector l1Jet);
+      MatchedPair(const TLorentzVector& refJet, const TLorentzVector& l1Jet);
       virtual ~MatchedPair();
 
       // ---------- const member functions ---------------------
 
-      TLorentzVector refJet() const { return refJet_; };
-      TLorentzVector l1Jet() const { return l1Jet_; };
+      const TLorentzVector& refJet() const { return refJet_; };
+      const TLorentzVector& l1Jet() const { return l1Jet_; };
 
       // ---------- static member functions --------------------
 
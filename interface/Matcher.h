@@ -24,6 +24,7 @@
 #include "TMultiGraph.h"
 
 #include "MatchedPair.h"
+#include "JetCollection.h"
 /**
  * @brief Base class that defines interface for all Matcher implementations.
  * @details A "Matcher" takes in 2 collections: one reference jet collection, and
@@ -51,6 +52,24 @@ public:
      */
     virtual void setL1Jets(const std::vector<TLorentzVector>& l1Jets) = 0;
 
+    /**
+     * @brief Set reference jet collection from a JetCollection.
+     * @details Default converts to TLorentzVectors. Derived classes should
+     * override this to avoid the conversion.
+     *
+     * @param refJets JetCollection holding reference jets
+     */
+    virtual void setRefJets(const JetCollection& refJets) { setRefJets(refJets.p4s()); };
+
+    /**
+     * @brief Set L1 jet collection from a JetCollection.
+     * @details Default converts to TLorentzVectors. Derived classes should
+     * override this to avoid the conversion.
+     *
+     * @param l1Jets JetCollection holding L1 jets
+     */
+    virtual void setL1Jets(const JetCollection& l1Jets) { setL1Jets(l1Jets.p4s()); };
+
     /**
      * @brief Produce pairs of L1 jets matched to reference jets based on some criteria.
      * @details Details of how matching is done will be provided by derived classes.
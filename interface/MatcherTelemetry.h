@@ -0,0 +1,143 @@
+#ifndef L1Trigger_L1JetEnergyCorrections_MatcherTelemetry_h
+#define L1Trigger_L1JetEnergyCorrections_MatcherTelemetry_h
+
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     MatcherTelemetry
+//
+/**\class MatcherTelemetry MatcherTelemetry.h "L1Trigger/L1JetEnergyCorrections/interface/MatcherTelemetry.h"
+
+ Description: Throughput & I/O measurements for the matcher event loop.
+
+ Usage:
+    MatcherTelemetry telemetry;
+    unsigned iRefTree = telemetry.addInputTree("ref", refJetTree.getTChain());
+    for each event:
+        {
+            MatcherTelemetry::StageTimer timer(telemetry, MatcherTelemetry::kRead);
+            nBytes = refJetTree.getEntry(iEntry);
+        }
+        telemetry.addEvent();
+        telemetry.addBytesRead(iRefTree, nBytes);
+        ...
+        telemetry.addPairs(matchResults.size());
+    telemetry.printReport(std::cout);
+    telemetry.writeSummary(MatcherTelemetry::summaryFilename("pairs.root"));
+*/
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include <chrono>
+#include <ostream>
+#include <string>
+#include <vector>
+
+#include "Rtypes.h"
+
+class TTree;
+
+/**
+ * @brief Measures event & matched pair rates, bytes read per input tree,
+ * and the time spent in each stage of the matcher event loop.
+ * @details Bytes read per tree are the uncompressed bytes returned by
+ * TTree::GetEntry(). The compressed bytes for each tree are estimated from
+ * its compression factor. The actual bytes read from all files is also
+ * reported, from TFile::GetFileBytesRead().
+ *
+ * Any time not in one of the stages (e.g. making debug plots) is reported
+ * as "other".
+ */
+class MatcherTelemetry
+{
+
+public:
+
+    enum Stage { kRead, kMatch, kSums, kFill, kWrite, kNStages };
+
+    /**
+     * @brief Time from construction to destruction, adding it to a stage.
+     */
+    class StageTimer
+    {
+    public:
+        StageTimer(MatcherTelemetry & telemetry, Stage stage);
+        ~StageTimer();
+    private:
+        MatcherTelemetry & telemetry_;
+        Stage stage_;
+        std::chrono::steady_clock::time_point start_;
+    };
+
+    MatcherTelemetry();
+
+    virtual ~MatcherTelemetry();
+
+    /**
+     * @brief Add an input tree to measure bytes read for.
+     * @return Index of the tree, for addBytesRead()
+     */
+    unsigned addInputTree(const std::string & name, TTree * tree);
+
+    /**
+     * @brief Add uncompressed bytes read for tree iTree, as returned by TTree::GetEntry().
+     */
+    void addBytesRead(unsigned iTree, Long64_t nBytes);
+
+    /**
+     * @brief Count one event processed.
+     */
+    void addEvent() { ++nEvents_; };
+
+    /**
+     * @brief Count matched pairs
+     */
+    void addPairs(Long64_t nPairs) { nPairs_ += nPairs; };
+
+    /**
+     * @brief Print event, pair & read rates since the last report, and overall.
+     * @details The split of time between stages, and the MB read per tree,
+     * are totals since the start of the run, not since the last report.
+     */
+    void printReport(std::ostream & os);
+
+    /**
+     * @brief Write totals to a JSON file.
+     */
+    void writeSummary(const std::string & filename) const;
+
+    /**
+     * @brief Get telemetry filename to go with a pairs filename,
+     * e.g. pairs.root -> pairs_telemetry.json
+     */
+    static std::string summaryFilename(const std::string & pairsFilename);
+
+    static const char * stageName(Stage stage);
+
+private:
+
+    MatcherTelemetry(const MatcherTelemetry&); // stop default
+
+    const MatcherTelemetry& operator=(const MatcherTelemetry&); // stop default
+
+    void addTime(Stage stage, double seconds) { stageTimes_[stage] += seconds; };
+
+    double elapsed() const;
+
+    struct InputTree {
+        std::string name;
+        TTree * tree;
+        Long64_t bytesRead;
+    };
+
+    std::chrono::steady_clock::time_point start_;
+    Long64_t nEvents_, nPairs_;
+    std::vector<InputTree> inputTrees_;
+    std::vector<double> stageTimes_;
+
+    // totals at the last printReport(), for rates over the interval
+    double lastTime_;
+    Long64_t lastEvents_, lastPairs_, lastFileBytes_;
+};
+
+#endif
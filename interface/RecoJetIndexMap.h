@@ -0,0 +1,76 @@
+#ifndef L1Trigger_L1JetEnergyCorrections_RecoJetIndexMap_h
+#define L1Trigger_L1JetEnergyCorrections_RecoJetIndexMap_h
+
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     RecoJetIndexMap
+//
+/**\class RecoJetIndexMap RecoJetIndexMap.h "L1Trigger/L1JetEnergyCorrections/interface/RecoJetIndexMap.h"
+
+ Description: Hash map from jet (eta, phi) to its index in the reco jet
+ collection. Replaces findRecoJetIndex(), which searches all jets for each
+ matched jet.
+
+ Usage:
+    RecoJetIndexMap recoIndex;
+    for each event:
+        recoIndex.fill(*refData);
+        for each matched pair:
+            int rInd = recoIndex.find(out_etaRef, out_phiRef);
+*/
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include <vector>
+
+#include "L1Trigger/L1TNtuples/interface/L1AnalysisRecoJetDataFormat.h"
+
+/**
+ * @brief Finds the index of a jet in a collection, from its eta & phi.
+ * @details Gives the same result as findRecoJetIndex(): the first jet with
+ * eta & phi both within the tolerance. As there, et isn't used.
+ *
+ * Jets are put in cells of size tolerance x tolerance in (eta, phi), and each
+ * cell is hashed into a table of buckets. So a jet within the tolerance must
+ * be in the same or a neighbouring cell, and find() only has to check the jets
+ * in 9 buckets. The table is re-used between events, so fill() doesn't
+ * allocate memory unless the number of jets is more than ever before.
+ */
+class RecoJetIndexMap
+{
+
+public:
+    RecoJetIndexMap(double tolerance=0.01);
+
+    virtual ~RecoJetIndexMap();
+
+    /**
+     * @brief Build the map for a new collection of jets
+     */
+    void fill(const L1Analysis::L1AnalysisRecoJetDataFormat & jets);
+
+    /**
+     * @brief Get index of jet in the collection matching eta/phi
+     * @details If not found, returns -1
+     */
+    int find(double eta, double phi) const;
+
+private:
+    RecoJetIndexMap(const RecoJetIndexMap&); // stop default
+
+    const RecoJetIndexMap& operator=(const RecoJetIndexMap&); // stop default
+
+    long cell(double x) const;
+
+    unsigned bucket(long etaCell, long phiCell) const;
+
+    const double tolerance_;
+    unsigned bucketMask_; // number of buckets - 1 (number of buckets is a power of 2)
+    std::vector<float> eta_;
+    std::vector<float> phi_;
+    std::vector<int> bucketHeads_; // first jet in each bucket, -1 if none
+    std::vector<int> nextInBucket_; // next jet in same bucket as each jet, -1 if none
+};
+
+#endif
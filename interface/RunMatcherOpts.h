@@ -13,6 +13,8 @@
      int main(int argc, char* argv[]) {
             RunMatcherOpts opts(arc, argv);
             std::string fName = opts.inputFilename();
+            // one entry per matcher configuration (--config)
+            for (const auto & cfg: opts.matcherConfigs()) { ... }
      }
 
 */
@@ -30,6 +32,23 @@
 // forward declarations
 class TString;
 
+
+/**
+ * @brief Settings for one matcher, and where to store its output.
+ * @details Several of these can be run over the same input in one pass,
+ * see the --config option.
+ */
+struct MatcherConfig
+{
+    std::string output; // output ROOT filename
+    float deltaR; // maximum deltaR(Ref Jet, L1 Jet) for a match
+    float l1MinPt; // minimum pT for L1 jets
+    float refMinPt; // minimum pT for reference jets
+    std::string cleanJets; // level of cleaning cuts for reference jets, "" for none
+    std::string matcher; // matcher type, see makeMatcher()
+};
+
+
 /**
  * @brief Class to deal with command-line options for RunMatcher program
  * @details Based on boost:program_options
@@ -146,6 +165,107 @@ class RunMatcherOpts
          */
         std::string cleanJets() { return cleanJets_; };
 
+        /**
+         * @brief Get type of matcher to use: deltaR or towerGrid
+         * @details Both give the same matches, towerGrid is faster for
+         * events with many jets.
+         */
+        std::string matcherType() { return matcher_; };
+
+        /**
+         * @brief Get all matcher configurations to run.
+         * @details The first is always made from the main options
+         * (--output, --deltaR, etc). Any extra ones come from --config.
+         */
+        std::vector<MatcherConfig> matcherConfigs() const { return matcherConfigs_; };
+
+        /**
+         * @brief Parse a --config string of comma-separated key=value pairs.
+         * @details Any keys not specified take their values from defaults.
+         * l1MaxEta & refMaxEta are not accepted, since the matchers apply
+         * the same |eta| cut to all jets.
+         *
+         * @throws std::invalid_argument for a setting that isn't key=value,
+         * an unknown key, a value that can't be converted, or no output key.
+         */
+        static MatcherConfig parseMatcherConfig(const std::string & configStr, const MatcherConfig & defaults);
+
+        /**
+         * @brief Check a --config string doesn't set key.
+         * @throws std::invalid_argument if it does, with the same message
+         * format as for the unsupported keys in parseMatcherConfig(), plus reason.
+         */
+        static void checkConfigKeySupported(const std::string & configStr, const std::string & key, const std::string & reason);
+
+        /**
+         * @brief For programs that can't apply a --config key:
+         * exits if any --config sets it.
+         */
+        void rejectConfigKey(const std::string & key, const std::string & reason) const;
+
+        /**
+         * @brief Whether to write the normalised output layout.
+         * @details If true, per-event quantities (PU, sums, number of jets,
+         * etc) are stored once per event in an "events" TTree, instead of in
+         * every pair. Each entry in the "valid" pairs TTree then has an
+         * iEvent branch, the entry number of its event in the "events" TTree.
+         */
+        bool normalisedOutput() const { return normalised_; };
+
+        /**
+         * @brief Whether to fill the calibration summary histograms, see CalibSummary.
+         */
+        bool writeSummary() const { return summary_; };
+
+        /**
+         * @brief Whether to only write the calibration summary, and not store the pairs.
+         */
+        bool summaryOnly() const { return summaryOnly_; };
+
+        /**
+         * @brief Get edges of L1 jet |eta| bins for the calibration summary
+         */
+        std::vector<float> summaryEtaBins() const { return summaryEtaBins_; };
+
+        /**
+         * @brief Get edges of numPUVertices ranges for the calibration summary
+         */
+        std::vector<float> summaryPUBins() const { return summaryPUBins_; };
+
+        /**
+         * @brief Number of events between progress (& telemetry) reports. 0 for none.
+         */
+        int reportInterval() const { return reportInterval_; };
+
+        /**
+         * @brief Whether to write throughput & I/O measurements, see MatcherTelemetry.
+         */
+        bool writeTelemetry() const { return telemetry_; };
+
+        /**
+         * @brief For programs that only support one matcher configuration:
+         * exits if any --config were specified.
+         */
+        void requireSingleConfig() const;
+
+        /**
+         * @brief For programs that only support the flat output layout:
+         * exits if --normalised was specified.
+         */
+        void requireFlatOutput() const;
+
+        /**
+         * @brief For programs that don't fill the calibration summary:
+         * exits if --summary or --summaryOnly was specified.
+         */
+        void requireNoSummary() const;
+
+        /**
+         * @brief For programs that don't measure telemetry:
+         * exits if --telemetry was specified.
+         */
+        void requireNoTelemetry() const;
+
     private:
         RunMatcherOpts(const RunMatcherOpts&); // stop default
 
@@ -158,6 +278,14 @@ class RunMatcherOpts
         std::vector<std::string> refJetBranchNames_, l1JetBranchNames_;
         float deltaR_, l1MinPt_, refMinPt_, l1MaxEta_, refMaxEta_;
         std::string cleanJets_;
+        std::string matcher_;
+        bool normalised_;
+        bool summary_, summaryOnly_;
+        std::vector<float> summaryEtaBins_, summaryPUBins_;
+        int reportInterval_;
+        bool telemetry_;
+        std::vector<std::string> configStrs_;
+        std::vector<MatcherConfig> matcherConfigs_;
 };
 
 
@@ -14,11 +14,16 @@
  Usage:
      SortFilterEmulator emu(4);  // keep top 4
      emu.setJets(myJets); // loads jets & does sorting, filtering
-     auto allJets = emu.getAllJets();
+     const auto & allJets = emu.getAllJets();
      // if you only want central jets:
-     auto cenJets = emu.getCenJets();
+     const auto & cenJets = emu.getCenJets();
      // if you only want forward jets:
-     auto fwdJets = emu.getFwdJets();
+     const auto & fwdJets = emu.getFwdJets();
+
+ Only the top nMax jets in each region are selected (in one pass over the
+ input), rather than sorting all of them. The output collections are re-used
+ between calls, and returned by const reference, so no memory is allocated
+ per event. They are overwritten by the next setJets() call.
 
 */
 //
@@ -35,6 +40,7 @@
 
 // user include files
 #include "TLorentzVector.h"
+#include "JetCollection.h"
 
 // forward declarations
 
@@ -65,33 +71,53 @@ public:
     // ---------- member functions ---------------------------
 
     /**
-     * @brief [brief description]
-     * @details [long description]
+     * @brief Load jets & do sorting, filtering.
+     * @details Results are accessed with getAllJets(), getCenJets(), getFwdJets().
+     * Jets with equal pT are kept in their input order.
      *
-     * @param jets [description]
+     * @param jets Input jets
      */
     void setJets(const std::vector<TLorentzVector>& jets);
 
     /**
-     * @brief [brief description]
-     * @details [long description]
-     * @return [description]
+     * @brief Get top central jets, then top forward jets, from last setJets(std::vector<TLorentzVector>)
      */
-    std::vector<TLorentzVector> getAllJets() { return allJets_; };
+    const std::vector<TLorentzVector>& getAllJets() const { return allJets_; };
 
     /**
-     * @brief [brief description]
-     * @details [long description]
-     * @return [description]
+     * @brief Get top central jets from last setJets(std::vector<TLorentzVector>)
      */
-    std::vector<TLorentzVector> getCenJets() { return cenJets_; };
+    const std::vector<TLorentzVector>& getCenJets() const { return cenJets_; };
 
     /**
-     * @brief [brief description]
-     * @details [long description]
-     * @return [description]
+     * @brief Get top forward jets from last setJets(std::vector<TLorentzVector>)
+     */
+    const std::vector<TLorentzVector>& getFwdJets() const { return fwdJets_; };
+
+    /**
+     * @brief Load jets from a JetCollection & do sorting, filtering.
+     * @details Results are accessed with getAllJetCollection(),
+     * getCenJetCollection(), getFwdJetCollection(). The output collections
+     * are re-used between calls, so don't allocate any memory each event.
+     *
+     * @param jets Input jets
      */
-    std::vector<TLorentzVector> getFwdJets() { return fwdJets_; };
+    void setJets(const JetCollection& jets);
+
+    /**
+     * @brief Get top central jets, then top forward jets, from last setJets(JetCollection)
+     */
+    const JetCollection& getAllJetCollection() const { return allColl_; };
+
+    /**
+     * @brief Get top central jets from last setJets(JetCollection)
+     */
+    const JetCollection& getCenJetCollection() const { return cenColl_; };
+
+    /**
+     * @brief Get top forward jets from last setJets(JetCollection)
+     */
+    const JetCollection& getFwdJetCollection() const { return fwdColl_; };
 
 private:
     SortFilterEmulator(const SortFilterEmulator&); // stop default
@@ -111,29 +137,37 @@ private:
     static bool isCentral(const TLorentzVector& vec) { return fabs(vec.Eta()) < 3.0; };
 
     /**
-     * @brief Binary predicate to use in std algorithms, to allow sorting TLorentzVectors by descending pT
-     * @details Since this is a CLASS method, need to make it static for it to work in std::sort. Maybe
-     * I should make it a common function outside of the class?
-     *
-     * @param a One TLorentzVector
-     * @param b Other TLorentzVector
-     *
-     * @return True if a.Pt() > b.Pt()
+     * @brief Clear the top-N selection buffers, ready for a new set of jets
      */
-    static bool sortPtDescending(const TLorentzVector &a, const TLorentzVector &b) { return (a.Pt() > b.Pt()); } ;
+    void clearSelection();
 
     /**
-     * @brief Only keep top nMax jets in a collection
+     * @brief Offer a jet to a top-nMax selection, kept in order of descending pT.
+     * @details If the selection is full, the jet replaces the lowest pT one
+     * only if it has a higher pT. So jets with equal pT stay in the order they
+     * were offered.
      *
-     * @param jets Input collection to filter
+     * @param topIndices Input indices of selected jets
+     * @param topPts pTs of selected jets
+     * @param index Input index of jet
+     * @param pt pT of jet
      */
-    void filterJets(std::vector<TLorentzVector>& jets);
+    void selectTopN(std::vector<unsigned>& topIndices, std::vector<double>& topPts,
+                    unsigned index, double pt) const;
 
     // ---------- member data --------------------------------
     const unsigned nMax_; // maximum number of jets to keep when filtering
     std::vector<TLorentzVector> allJets_;
     std::vector<TLorentzVector> cenJets_;
     std::vector<TLorentzVector> fwdJets_;
+    // input indices & pTs of the top central & forward jets
+    std::vector<unsigned> cenIndices_;
+    std::vector<unsigned> fwdIndices_;
+    std::vector<double> cenPts_;
+    std::vector<double> fwdPts_;
+    JetCollection allColl_;
+    JetCollection cenColl_;
+    JetCollection fwdColl_;
 };
 
 
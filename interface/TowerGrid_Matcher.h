@@ -0,0 +1,130 @@
+#ifndef L1Trigger_L1JetEnergyCorrections_TowerGrid_Matcher_h
+#define L1Trigger_L1JetEnergyCorrections_TowerGrid_Matcher_h
+
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     TowerGrid_Matcher
+//
+/**\class TowerGrid_Matcher TowerGrid_Matcher.h "L1Trigger/L1JetEnergyCorrections/interface/TowerGrid_Matcher.h"
+
+ Description: DeltaR matcher that uses the calorimeter tower grid to find candidate pairs.
+
+ Usage:
+    TowerGrid_Matcher m(0.4);
+    m.setRefJets(myRefJets);
+    m.setL1Jets(myL1Jets);
+    vector<MatchedPair> results = m.getMatchingPairs();
+*/
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include "DeltaR_Matcher.h"
+
+#include <stdint.h>
+#include <vector>
+
+/**
+ * @brief DeltaR matcher that only compares jets in nearby calorimeter towers.
+ * @details Both jet collections are mapped onto the (ieta, iphi) trigger tower
+ * grid. Lookup tables of the minimum possible (deltaR)^2 between any two
+ * towers are made once in the constructor, from the tower eta boundaries and
+ * the difference in iphi. Each event, the ref jets are put into an occupancy
+ * bitmap of towers (one row of bits per ieta), and for each L1 jet only the
+ * occupied towers that could possibly be within maxDeltaR are looked at, by
+ * masking each ieta row in the search window with a precomputed iphi window.
+ *
+ * The lookup tables are only used to reject pairs: candidates are still
+ * ranked using the exact (deltaR)^2 as in DeltaR_Matcher, so the matched pairs
+ * are identical to those from DeltaR_Matcher, for the same cuts.
+ */
+class TowerGrid_Matcher : public DeltaR_Matcher
+{
+
+public:
+
+    /**
+     * @brief Constructor specifying maximum DeltaR for matching.
+     *
+     * @param maxDeltaR Maximum deltaR for matching between ref and L1 jet.
+     */
+    explicit TowerGrid_Matcher(const double maxDeltaR);
+
+    /**
+     * @brief Constructor, specifying maximum DeltaR for matching, and jet cuts.
+     * See DeltaR_Matcher for details.
+     */
+    TowerGrid_Matcher(const double maxDeltaR,
+                      const double minRefJetPt,
+                      const double maxRefJetPt,
+                      const double minL1JetPt,
+                      const double maxL1JetPt,
+                      const double maxJetEta);
+
+    virtual ~TowerGrid_Matcher();
+
+    /**
+     * @brief Produce pairs of L1 jets matched to reference jets based on deltaR(refJet-l1Jet).
+     *
+     * @details Same algorithm as DeltaR_Matcher::getMatchingPairs(), but the
+     * search over reference jets for each L1 jet only looks in towers
+     * within maxDeltaR of the L1 jet's tower. Ties in deltaR are resolved in
+     * favour of the highest pT ref jet, as in DeltaR_Matcher.
+     * Events with only a few jets skip the grid and compare every pair.
+     *
+     * @return Returns a vector of of matched jets, held in MatchedPair object.
+     */
+    virtual std::vector<MatchedPair> getMatchingPairs() override;
+
+    /**
+     * @brief Get the index of the eta tower for a given eta.
+     * @details Index runs from 0 (most negative eta) to 2*nTowersEta - 1.
+     * Jets beyond the last tower boundary are put in the outermost tower.
+     */
+    static unsigned ietaIndex(const double eta);
+
+    /**
+     * @brief Get the index of the phi tower for a given phi, from 0 to nTowersPhi - 1.
+     */
+    static unsigned iphiIndex(const double phi);
+
+    static const unsigned nTowersEta = 40; // number of towers in each half of the detector
+    static const unsigned nTowersPhi = 72;
+    static const unsigned nEtaIndices = 2 * nTowersEta;
+    static const unsigned nCells = nEtaIndices * nTowersPhi;
+    static const unsigned nWordsPhi = (nTowersPhi + 63) / 64; // 64-bit words per ieta row of the bitmap
+
+private:
+
+    /**
+     * @brief Fill the lookup tables & search windows for maxDeltaR_.
+     */
+    void makeLookupTables();
+
+    /**
+     * @brief Put ref jets into the tower occupancy bitmap
+     */
+    void fillRefGrid();
+
+    /**
+     * @brief Empty the tower occupancy bitmap, only resetting occupied towers.
+     */
+    void clearRefGrid();
+
+    virtual std::ostream&  printName(std::ostream& os) const override;
+
+    std::vector<double> etaGap2_; // minimum (deltaEta)^2 between ieta indices i & j, at [i * nEtaIndices + j]
+    std::vector<double> phiGap2_; // minimum (deltaPhi)^2 for a difference of n iphi towers, at [n]
+    std::vector<unsigned> etaWindowLow_; // lowest ieta index within maxDeltaR of each ieta index
+    std::vector<unsigned> etaWindowHigh_; // highest ieta index within maxDeltaR of each ieta index
+    unsigned phiWindow_; // max number of iphi towers away within maxDeltaR
+    std::vector<uint64_t> phiWindowMask_; // bits set for iphi within phiWindow_ of each iphi, at [iphi * nWordsPhi + word]
+    double maxDeltaR2Window_; // (maxDeltaR)^2, with a small margin for rounding, used for rejecting towers
+
+    std::vector<uint64_t> occupancy_; // bit set if tower has any ref jets, at [ieta * nWordsPhi + iphi / 64]
+    std::vector<int> cellFirstRef_; // index of first ref jet in each tower, -1 if empty
+    std::vector<int> nextRef_; // index of the next ref jet in the same tower, -1 if last
+    std::vector<unsigned> refCell_; // tower index of each ref jet
+};
+
+#endif /* L1Trigger_L1JetEnergyCorrections_TowerGrid_Matcher_h */
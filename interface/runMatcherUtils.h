@@ -12,6 +12,10 @@
 // L1T headers
 #include "L1Trigger/L1TNtuples/interface/L1AnalysisRecoJetDataFormat.h"
 
+// Headers from this package
+#include "JetCollection.h"
+#include "Matcher.h"
+
 using L1Analysis::L1AnalysisRecoJetDataFormat;
 
 
@@ -113,6 +117,64 @@ void rescaleEnergyFractions(L1AnalysisRecoJetDataFormat * jets);
 std::vector<TLorentzVector> makeRecoTLorentzVectorsCleaned(const L1AnalysisRecoJetDataFormat & jets, std::string quality);
 
 
+/**
+ * @brief Fill a JetCollection with reco jets that pass JetID cuts.
+ * @details Same as makeRecoTLorentzVectorsCleaned, but re-uses the memory in
+ * the output collection.
+ *
+ * @param jets Input reco jets
+ * @param quality Can be LOOSE, TIGHT or TIGHTLEPVETO
+ * @param output Collection to fill. Any existing jets are removed.
+ */
+void fillRecoJetsCleaned(const L1AnalysisRecoJetDataFormat & jets, const std::string & quality, JetCollection & output);
+
+
+/**
+ * @brief Fill a JetCollection with reco jets that pass JetID cuts,
+ * from a mask made by makeJetIDMask().
+ *
+ * @param jets Input reco jets
+ * @param mask Non-zero for jets to keep
+ * @param output Collection to fill. Any existing jets are removed.
+ */
+void fillRecoJetsCleaned(const L1AnalysisRecoJetDataFormat & jets, const std::vector<char> & mask, JetCollection & output);
+
+
+enum JetIDQuality { kLooseJetID, kTightJetID, kTightLepVetoJetID };
+
+
+/**
+ * @brief Convert a JetID quality string to a JetIDQuality.
+ * @details Throws std::runtime_error if not one of LOOSE, TIGHT or TIGHTLEPVETO
+ */
+JetIDQuality parseJetIDQuality(const std::string & quality);
+
+
+/**
+ * @brief Apply JetID cuts to all reco jets at once.
+ * @details Gives the same results as looseCleaning(), tightCleaning() &
+ * tightLepVetoCleaning(), but the quality is only decided once,
+ * and the loop over jets has no branches, so the compiler can vectorise it.
+ *
+ * @param jets Input reco jets
+ * @param quality JetID to apply
+ * @param mask Set to 1 for each jet that passes, 0 otherwise. Memory is re-used.
+ */
+void makeJetIDMask(const L1AnalysisRecoJetDataFormat & jets, JetIDQuality quality, std::vector<char> & mask);
+
+
+/**
+ * @brief Check if reco jet i passes JetID cuts
+ *
+ * @param jets Input reco jets
+ * @param i Index of jet to test
+ * @param quality Can be LOOSE, TIGHT or TIGHTLEPVETO
+ *
+ * @return bool If jet passed cuts or not
+ */
+bool passJetID(const L1AnalysisRecoJetDataFormat & jets, unsigned i, const std::string & quality);
+
+
 /**
  * @brief Loose JetID
  * @return bool If jet passed cuts or not
@@ -173,7 +235,16 @@ bool checkTriggerFired(const std::vector<TString> & hlt, const std::string & sel
  * @param jets [description]
  * @return [description]
  */
-float scalarSumPt(std::vector<TLorentzVector> jets);
+float scalarSumPt(const std::vector<TLorentzVector> & jets);
+
+
+/**
+ * @brief Scalar sum of jet pTs in a JetCollection
+ *
+ * @param jets [description]
+ * @return [description]
+ */
+float scalarSumPt(const JetCollection & jets);
 
 
 /**
@@ -182,7 +253,17 @@ float scalarSumPt(std::vector<TLorentzVector> jets);
  * @param jets [description]
  * @return [description]
  */
-TLorentzVector vectorSum(std::vector<TLorentzVector> jets);
+TLorentzVector vectorSum(const std::vector<TLorentzVector> & jets);
+
+
+/**
+ * @brief Vector sum of jets in a JetCollection, treating them as massless.
+ * @details Uses the cached cos/sin(phi) for the transverse components.
+ *
+ * @param jets [description]
+ * @return [description]
+ */
+TLorentzVector vectorSum(const JetCollection & jets);
 
 
 /**
@@ -192,7 +273,16 @@ TLorentzVector vectorSum(std::vector<TLorentzVector> jets);
  * @param jets [description]
  * @return [description]
  */
-std::vector<TLorentzVector> getJetsForHTT(std::vector<TLorentzVector> jets);
+std::vector<TLorentzVector> getJetsForHTT(const std::vector<TLorentzVector> & jets);
+
+
+/**
+ * @brief Fill collection of jets that go into calcualting HTT
+ *
+ * @param jets Input jets
+ * @param outputJets Collection to fill. Any existing jets are removed.
+ */
+void getJetsForHTT(const JetCollection & jets, JetCollection & outputJets);
 
 
 /**
@@ -202,6 +292,44 @@ std::vector<TLorentzVector> getJetsForHTT(std::vector<TLorentzVector> jets);
  * @param jet [description]
  * @return [description]
  */
-bool passHTTCut(TLorentzVector jet);
+bool passHTTCut(const TLorentzVector & jet);
+
+
+/**
+ * @brief Cut for jets to go into HTT calculation
+ *
+ * @param pt Jet pT
+ * @param eta Jet eta
+ * @return [description]
+ */
+bool passHTTCut(double pt, double eta);
+
+
+/**
+ * @brief Make a matcher of the given type, with deltaR & jet cuts.
+ * @details type is "deltaR" (DeltaR_Matcher) or "towerGrid" (TowerGrid_Matcher).
+ * Both give the same matches, towerGrid is faster for events with many jets.
+ * Caller takes ownership.
+ *
+ * @throws std::invalid_argument if type is not recognised
+ */
+Matcher * makeMatcher(const std::string & type,
+                      double maxDeltaR,
+                      double minRefJetPt,
+                      double maxRefJetPt,
+                      double minL1JetPt,
+                      double maxL1JetPt,
+                      double maxJetEta);
+
+
+/**
+ * @brief Get the name of a file to store alongside the pairs file.
+ * @details The ".root" extension, if any, is replaced by suffix,
+ * e.g. sideFilename("pairs.root", "_summary.root") is "pairs_summary.root".
+ *
+ * @param pairsFilename Pairs output filename
+ * @param suffix Added to the filename without its ".root" extension
+ */
+std::string sideFilename(const std::string & pairsFilename, const std::string & suffix);
 
 #endif
\ No newline at end of file
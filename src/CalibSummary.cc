@@ -0,0 +1,145 @@
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     CalibSummary
+//
+// Implementation:
+//     For more comments, see header file.
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include "CalibSummary.h"
+
+// STL include
+#include <algorithm>
+#include <cmath>
+#include <stdexcept>
+
+// ROOT include
+#include "TFile.h"
+#include "TDirectory.h"
+#include "TString.h"
+
+// Headers from this package
+#include "runMatcherUtils.h"
+
+namespace {
+
+// Binning as in make_correction_curves() in runCalibration.py
+const int nBinsPt = 2048;
+const double ptMin = 0.;
+const double ptMax = 1024.;
+const int nBinsRsp = 150;
+const double rspMin = 0.;
+const double rspMax = 5.;
+const int nBinsRspEta = 50;
+const double rspEtaMax = 2.;
+
+// L1 jets with a saturated tower get pT = 1024 GeV, skip them as in runCalibration.py
+const float maxL1Pt = 1023.1;
+
+} // namespace
+
+
+CalibSummary::CalibSummary(const std::vector<float> & etaBins, const std::vector<float> & puBins):
+    etaBins_(etaBins),
+    puBins_(puBins)
+{
+    if (etaBins_.size() < 2) {
+        throw std::invalid_argument("CalibSummary needs at least 2 eta bin edges");
+    }
+    if (!std::is_sorted(etaBins_.begin(), etaBins_.end()) || !std::is_sorted(puBins_.begin(), puBins_.end())) {
+        throw std::invalid_argument("CalibSummary bin edges must be in increasing order");
+    }
+
+    dirNames_.push_back("PU_all");
+    for (unsigned iPU = 1; iPU < puBins_.size(); ++iPU) {
+        dirNames_.push_back(TString::Format("PU_%g_%g", puBins_[iPU-1], puBins_[iPU]).Data());
+    }
+
+    for (unsigned iPU = 0; iPU < dirNames_.size(); ++iPU) {
+        std::vector<BinHists> etaHists(etaBins_.size() - 1);
+        for (unsigned iEta = 0; iEta < etaHists.size(); ++iEta) {
+            BinHists & hists = etaHists[iEta];
+            // names are only unique within their TDirectory
+            TString suffix = TString::Format("_%u_%u", iPU, iEta);
+            hists.hrsp.reset(new TH1F("hrsp_eta"+suffix, ";response (p_{T}^{L1}/p_{T}^{Ref});",
+                                      nBinsRspEta, rspMin, rspEtaMax));
+            hists.h2d_rsp_gen.reset(new TH2F("h2d_rsp_gen"+suffix, ";p_{T}^{Ref} [GeV];response (p_{T}^{L1}/p_{T}^{Ref})",
+                                             nBinsPt, ptMin, ptMax, nBinsRsp, rspMin, rspMax));
+            hists.hprof_pt_gen.reset(new TProfile("hprof_pt_gen"+suffix, ";p_{T}^{Ref} [GeV];<p_{T}^{L1}> [GeV]",
+                                                  nBinsPt, ptMin, ptMax));
+            hists.hprof_ptref_gen.reset(new TProfile("hprof_ptref_gen"+suffix, ";p_{T}^{Ref} [GeV];<p_{T}^{Ref}> [GeV]",
+                                                     nBinsPt, ptMin, ptMax));
+            for (TH1 * h: std::vector<TH1*>{hists.hrsp.get(), hists.h2d_rsp_gen.get(),
+                                           hists.hprof_pt_gen.get(), hists.hprof_ptref_gen.get()}) {
+                h->SetDirectory(nullptr); // we own them, not the current TFile
+                h->Sumw2();
+            }
+        }
+        hists_.push_back(std::move(etaHists));
+    }
+}
+
+
+CalibSummary::~CalibSummary()
+{
+}
+
+
+void CalibSummary::fill(float eta, float pt, float ptRef, float numPUVertices)
+{
+    if (pt >= maxL1Pt) return;
+    // same as TMath::Abs(eta) > etamin && TMath::Abs(eta) < etamax
+    float absEta = fabs(eta);
+    auto upper = std::upper_bound(etaBins_.begin(), etaBins_.end(), absEta);
+    if (upper == etaBins_.begin() || upper == etaBins_.end() || absEta == *(upper-1)) return;
+    unsigned iEta = upper - etaBins_.begin() - 1;
+
+    float rsp = pt / ptRef;
+    fillBin(hists_[0][iEta], pt, ptRef, rsp);
+    // PU ranges are inclusive at both ends, as in runCalibration.py, so can overlap at the edges
+    for (unsigned iPU = 1; iPU < puBins_.size(); ++iPU) {
+        if (numPUVertices >= puBins_[iPU-1] && numPUVertices <= puBins_[iPU]) {
+            fillBin(hists_[iPU][iEta], pt, ptRef, rsp);
+        }
+    }
+}
+
+
+void CalibSummary::fillBin(BinHists & hists, float pt, float ptRef, float rsp)
+{
+    hists.hrsp->Fill(rsp);
+    hists.h2d_rsp_gen->Fill(ptRef, rsp);
+    hists.hprof_pt_gen->Fill(ptRef, pt);
+    hists.hprof_ptref_gen->Fill(ptRef, ptRef);
+}
+
+
+void CalibSummary::write(const std::string & filename) const
+{
+    TFile outFile(filename.c_str(), "RECREATE");
+    if (outFile.IsZombie()) {
+        throw std::runtime_error("Cannot open summary file " + filename);
+    }
+    for (unsigned iPU = 0; iPU < dirNames_.size(); ++iPU) {
+        TDirectory * puDir = outFile.mkdir(dirNames_[iPU].c_str());
+        for (unsigned iEta = 0; iEta < hists_[iPU].size(); ++iEta) {
+            float etaMin(etaBins_[iEta]), etaMax(etaBins_[iEta+1]);
+            TDirectory * etaDir = puDir->mkdir(TString::Format("eta_%g_%g", etaMin, etaMax));
+            const BinHists & hists = hists_[iPU][iEta];
+            // use the same names as runCalibration.py
+            etaDir->WriteTObject(hists.hrsp.get(), TString::Format("hrsp_eta_%g_%g", etaMin, etaMax));
+            etaDir->WriteTObject(hists.h2d_rsp_gen.get(), "h2d_rsp_gen");
+            etaDir->WriteTObject(hists.hprof_pt_gen.get(), "hprof_pt_gen");
+            etaDir->WriteTObject(hists.hprof_ptref_gen.get(), "hprof_ptref_gen");
+        }
+    }
+    outFile.Close();
+}
+
+
+std::string CalibSummary::summaryFilename(const std::string & pairsFilename)
+{
+    return sideFilename(pairsFilename, "_summary.root");
+}
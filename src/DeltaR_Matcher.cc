@@ -14,9 +14,6 @@
 // STL include
 #include <algorithm>    // std::sort
 
-// BOOST include
-#include <boost/bind.hpp>
-
 // User include
 
 using std::cout;
@@ -31,7 +28,9 @@ DeltaR_Matcher::DeltaR_Matcher(const double maxDeltaR) :
     maxRefJetPt_(9999.0),
     minL1JetPt_(0.0),
     maxL1JetPt_(9999.0),
-    maxJetEta_(99)
+    maxJetEta_(99),
+    refFromP4_(false),
+    l1FromP4_(false)
 {};
 
 
@@ -46,7 +45,9 @@ DeltaR_Matcher::DeltaR_Matcher(const double maxDeltaR,
     maxRefJetPt_(maxRefJetPt),
     minL1JetPt_(minL1JetPt),
     maxL1JetPt_(maxL1JetPt),
-    maxJetEta_(maxJetEta)
+    maxJetEta_(maxJetEta),
+    refFromP4_(false),
+    l1FromP4_(false)
 {};
 
 
@@ -63,19 +64,37 @@ void DeltaR_Matcher::setRefJets(const std::vector<TLorentzVector>& refJets)
     refJets_.clear();
     for (const auto &jetIt: refJets)
     {
-        if (checkRefJet(jetIt)) {
+        if (checkRefJet(jetIt.Pt(), jetIt.Eta())) {
             refJets_.push_back(jetIt);
         }
     }
     std::sort(refJets_.begin(), refJets_.end(), DeltaR_Matcher::sortPtDescending);
+    // store eta/phi so they're only calculated once per jet, not once per pair
+    refColl_.fill(refJets_);
+    refFromP4_ = true;
 }
 
 
-bool DeltaR_Matcher::checkRefJet(const TLorentzVector& jet)
+void DeltaR_Matcher::setRefJets(const JetCollection& refJets)
 {
-    return (checkJetMinPt(jet, minRefJetPt_)
-        && checkJetMaxPt(jet, maxRefJetPt_)
-        && checkJetMaxEta(jet, maxJetEta_));
+    refJets_.clear();
+    refColl_.clear();
+    for (unsigned i = 0; i < refJets.size(); ++i)
+    {
+        if (checkRefJet(refJets.pt(i), refJets.eta(i))) {
+            refColl_.push_back(refJets, i);
+        }
+    }
+    refColl_.sortByPtDescending();
+    refFromP4_ = false;
+}
+
+
+bool DeltaR_Matcher::checkRefJet(const double pt, const double eta) const
+{
+    return (checkJetMinPt(pt, minRefJetPt_)
+        && checkJetMaxPt(pt, maxRefJetPt_)
+        && checkJetMaxEta(eta, maxJetEta_));
 }
 
 
@@ -84,19 +103,48 @@ void DeltaR_Matcher::setL1Jets(const std::vector<TLorentzVector>& l1Jets)
     l1Jets_.clear();
     for (const auto &jetIt: l1Jets)
     {
-        if (checkL1Jet(jetIt)) {
+        if (checkL1Jet(jetIt.Pt(), jetIt.Eta())) {
             l1Jets_.push_back(jetIt);
         }
     }
     std::sort(l1Jets_.begin(), l1Jets_.end(), DeltaR_Matcher::sortPtDescending);
+    l1Coll_.fill(l1Jets_);
+    l1FromP4_ = true;
+}
+
+
+void DeltaR_Matcher::setL1Jets(const JetCollection& l1Jets)
+{
+    l1Jets_.clear();
+    l1Coll_.clear();
+    for (unsigned i = 0; i < l1Jets.size(); ++i)
+    {
+        if (checkL1Jet(l1Jets.pt(i), l1Jets.eta(i))) {
+            l1Coll_.push_back(l1Jets, i);
+        }
+    }
+    l1Coll_.sortByPtDescending();
+    l1FromP4_ = false;
+}
+
+
+bool DeltaR_Matcher::checkL1Jet(const double pt, const double eta) const
+{
+    return (checkJetMinPt(pt, minL1JetPt_)
+        && checkJetMaxPt(pt, maxL1JetPt_)
+        && checkJetMaxEta(eta, maxJetEta_));
 }
 
 
-bool DeltaR_Matcher::checkL1Jet(const TLorentzVector& jet)
+std::vector<TLorentzVector> DeltaR_Matcher::getRefJets() const
 {
-    return (checkJetMinPt(jet, minL1JetPt_)
-        && checkJetMaxPt(jet, maxL1JetPt_)
-        && checkJetMaxEta(jet, maxJetEta_));
+    return refFromP4_ ? refJets_ : refColl_.p4s();
+}
+
+
+std::vector<TLorentzVector> DeltaR_Matcher::getL1Jets() const
+{
+    return l1FromP4_ ? l1Jets_ : l1Coll_.p4s();
 }
 
 
@@ -104,69 +152,51 @@ std::vector<MatchedPair> DeltaR_Matcher::getMatchingPairs()
 {
     matchedJets_.clear();
 
-    // make a vector of pointers to refJets - this way we can remove successfully
-    // matched refJets from possible matches so they can't be used again
-    std::vector<TLorentzVector*> refJetPtrs;
-    for (auto &ref_it: refJets_ )
-    {
-        refJetPtrs.push_back(&ref_it);
-    }
+    // keep track of successfully matched refJets so they can't be used again
+    refUsed_.assign(refColl_.size(), false);
 
-    // TODO: throw exception if no vectors?
-    // TODO: do I need to worry about this being deleted at end of mathod?
-    std::vector<MatchedPair> matchedJets; // to hold matching pairs
-    for (const auto &l1_it: l1Jets_)
+    const double maxDeltaR2 = maxDeltaR_ * maxDeltaR_;
+    for (unsigned l1Ind = 0; l1Ind < l1Coll_.size(); ++l1Ind)
     {
-        // store all matching ref jets & their deltaR for this l1 jet
-        std::vector<std::pair<TLorentzVector*,double>> possibleMatches;
-
-        // for each, calculate deltaR, add to vector if satisfies maxDeltaR
-        for (const auto &ref_it: refJetPtrs)
+        // find the closest unused ref jet with deltaR < maxDeltaR (if it exists)
+        int bestRefInd = -1;
+        double bestDeltaR2 = maxDeltaR2;
+        for (unsigned refInd = 0; refInd < refColl_.size(); ++refInd)
         {
-            double deltaR = ref_it->DeltaR(l1_it);
-            if (deltaR < maxDeltaR_)
+            if (refUsed_[refInd]) continue;
+            double deltaR2 = JetCollection::deltaR2(refColl_, refInd, l1Coll_, l1Ind);
+            if (deltaR2 < bestDeltaR2)
             {
-                possibleMatches.push_back(std::make_pair(ref_it, deltaR));
+                bestDeltaR2 = deltaR2;
+                bestRefInd = refInd;
             }
         }
 
-        // after matching, we want the closest ref jet (if it exists)
-        if (possibleMatches.size() != 0)
+        if (bestRefInd >= 0)
         {
-            if (possibleMatches.size() != 1)
-            {
-                // sort by ascending deltaR
-                std::sort(possibleMatches.begin(), possibleMatches.end(),
-                    boost::bind(&std::pair<TLorentzVector*, double>::second, _1) <
-                    boost::bind(&std::pair<TLorentzVector*, double>::second, _2));
-            }
-            MatchedPair m(*(possibleMatches[0].first), l1_it);
-            matchedJets.push_back(m);
-            // remove sucessfully matched refJet from vector of possible matches so it can't be used again
-            // uses Erase-Remove idiom: https://en.wikipedia.org/wiki/Erase-remove_idiom
-            refJetPtrs.erase(remove(refJetPtrs.begin(), refJetPtrs.end(), possibleMatches[0].first), refJetPtrs.end());
+            matchedJets_.push_back(MatchedPair(refJetP4(bestRefInd), l1JetP4(l1Ind)));
+            refUsed_[bestRefInd] = true;
         }
     }
-    matchedJets_ = matchedJets;
-    return matchedJets;
+    return matchedJets_;
 }
 
 
-bool DeltaR_Matcher::checkJetMinPt(const TLorentzVector& jet, const double minPt) const
+bool DeltaR_Matcher::checkJetMinPt(const double pt, const double minPt) const
 {
-    return (jet.Pt() >= minPt);
+    return (pt >= minPt);
 }
 
 
-bool DeltaR_Matcher::checkJetMaxPt(const TLorentzVector& jet, const double maxPt) const
+bool DeltaR_Matcher::checkJetMaxPt(const double pt, const double maxPt) const
 {
-    return (jet.Pt() <= maxPt);
+    return (pt <= maxPt);
 }
 
 
-bool DeltaR_Matcher::checkJetMaxEta(const TLorentzVector& jet, const double maxEta) const
+bool DeltaR_Matcher::checkJetMaxEta(const double eta, const double maxEta) const
 {
-    return (fabs(jet.Eta()) <= maxEta);
+    return (fabs(eta) <= maxEta);
 }
 
 std::ostream&  DeltaR_Matcher::printName(std::ostream& os) const {
@@ -0,0 +1,127 @@
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     EventDisplayRecorder
+//
+// Implementation:
+//     For more comments, see header file.
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include "EventDisplayRecorder.h"
+
+// STL include
+#include <stdexcept>
+
+// ROOT include
+#include "TDirectory.h"
+#include "TFile.h"
+#include "TNamed.h"
+#include "TObject.h"
+#include "TTree.h"
+
+// Headers from this package
+#include "runMatcherUtils.h"
+
+
+EventDisplayRecorder::EventDisplayRecorder(const std::string & filename, const std::string & plotDir):
+    filename_(filename),
+    plotDir_(plotDir),
+    file_(nullptr),
+    tree_(nullptr),
+    nRecorded_(0),
+    entry_(0),
+    event_(0)
+{
+    // don't change the current directory, as the matcher output trees use it
+    TDirectory::TContext context;
+    file_ = TFile::Open(filename_.c_str(), "RECREATE");
+    if (file_ == nullptr || file_->IsZombie()) {
+        throw std::runtime_error("Couldn't open event display file " + filename_);
+    }
+    tree_ = new TTree("eventDisplay", "eventDisplay"); // owned by file_
+    tree_->Branch("entry", &entry_, "entry/L");
+    tree_->Branch("event", &event_, "event/l");
+    tree_->Branch("label", &label_);
+    tree_->Branch("refPt", &refPt_);
+    tree_->Branch("refEta", &refEta_);
+    tree_->Branch("refPhi", &refPhi_);
+    tree_->Branch("l1Pt", &l1Pt_);
+    tree_->Branch("l1Eta", &l1Eta_);
+    tree_->Branch("l1Phi", &l1Phi_);
+    tree_->Branch("pairRefPt", &pairRefPt_);
+    tree_->Branch("pairRefEta", &pairRefEta_);
+    tree_->Branch("pairRefPhi", &pairRefPhi_);
+    tree_->Branch("pairL1Pt", &pairL1Pt_);
+    tree_->Branch("pairL1Eta", &pairL1Eta_);
+    tree_->Branch("pairL1Phi", &pairL1Phi_);
+}
+
+
+EventDisplayRecorder::~EventDisplayRecorder()
+{
+    close();
+}
+
+
+void EventDisplayRecorder::record(Long64_t entry, ULong64_t event,
+                                  const std::vector<TLorentzVector> & refJets,
+                                  const std::vector<TLorentzVector> & l1Jets,
+                                  const std::vector<MatchedPair> & matchedJets,
+                                  const TString & label)
+{
+    if (tree_ == nullptr) {
+        throw std::runtime_error("Cannot record event, event display file already closed");
+    }
+    entry_ = entry;
+    event_ = event;
+    label_ = label.Data();
+    fillJets(refJets, refPt_, refEta_, refPhi_);
+    fillJets(l1Jets, l1Pt_, l1Eta_, l1Phi_);
+    pairRefPt_.clear(); pairRefEta_.clear(); pairRefPhi_.clear();
+    pairL1Pt_.clear(); pairL1Eta_.clear(); pairL1Phi_.clear();
+    for (const auto & pair: matchedJets) {
+        pairRefPt_.push_back(pair.refJet().Pt());
+        pairRefEta_.push_back(pair.refJet().Eta());
+        pairRefPhi_.push_back(pair.refJet().Phi());
+        pairL1Pt_.push_back(pair.l1Jet().Pt());
+        pairL1Eta_.push_back(pair.l1Jet().Eta());
+        pairL1Phi_.push_back(pair.l1Jet().Phi());
+    }
+    tree_->Fill();
+    nRecorded_++;
+}
+
+
+void EventDisplayRecorder::close()
+{
+    if (file_ == nullptr) return;
+    TDirectory::TContext context(file_);
+    tree_->Write("", TObject::kOverwrite);
+    TNamed plotDir("plotDir", plotDir_.c_str());
+    plotDir.Write("", TObject::kOverwrite);
+    file_->Close();
+    delete file_;
+    file_ = nullptr;
+    tree_ = nullptr;
+}
+
+
+void EventDisplayRecorder::fillJets(const std::vector<TLorentzVector> & jets,
+                                    std::vector<float> & pt, std::vector<float> & eta, std::vector<float> & phi)
+{
+    pt.clear();
+    eta.clear();
+    phi.clear();
+    for (const auto & jet: jets) {
+        pt.push_back(jet.Pt());
+        eta.push_back(jet.Eta());
+        phi.push_back(jet.Phi());
+    }
+}
+
+
+std::string EventDisplayRecorder::sideFilename(const std::string & pairsFilename)
+{
+    return ::sideFilename(pairsFilename, "_eventDisplay.root");
+}
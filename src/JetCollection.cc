@@ -0,0 +1,180 @@
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     JetCollection
+//
+// Implementation:
+//     For more comments, see header file.
+//
+// Original Author:  Robin Cameron Aggleton
+//
+
+// system include files
+#include <algorithm>
+#include <stdexcept>
+
+// BOOST include
+#include <boost/lexical_cast.hpp>
+
+// user include files
+#include "JetCollection.h"
+
+using boost::lexical_cast;
+
+
+namespace {
+
+/**
+ * Rearrange v according to order, i.e. v_new[i] = v[order[i]].
+ * scratch is used as temporary storage.
+ */
+template<typename T>
+void applyOrder(const std::vector<unsigned>& order, std::vector<T>& v, std::vector<T>& scratch)
+{
+    scratch.resize(v.size());
+    for (unsigned i = 0; i < order.size(); ++i) {
+        scratch[i] = v[order[i]];
+    }
+    v.swap(scratch);
+}
+
+template<typename T>
+void checkSizes(const std::vector<T> & et, const std::vector<T> & eta, const std::vector<T> & phi)
+{
+    if (et.size() != eta.size() || et.size() != phi.size()) {
+        throw std::range_error("Et/eta/phi vectors different sizes, cannot make JetCollection from sizes " +
+                                lexical_cast<std::string>(et.size()) + "/" + lexical_cast<std::string>(eta.size()) +
+                                "/" + lexical_cast<std::string>(phi.size()));
+    }
+}
+
+}
+
+
+//
+// member functions
+//
+void JetCollection::clear()
+{
+    pt_.clear();
+    eta_.clear();
+    phi_.clear();
+    cosPhi_.clear();
+    sinPhi_.clear();
+    bx_.clear();
+}
+
+
+void JetCollection::reserve(unsigned n)
+{
+    pt_.reserve(n);
+    eta_.reserve(n);
+    phi_.reserve(n);
+    cosPhi_.reserve(n);
+    sinPhi_.reserve(n);
+    bx_.reserve(n);
+}
+
+
+void JetCollection::push_back(double pt, double eta, double phi, int bx)
+{
+    pt_.push_back(pt);
+    eta_.push_back(eta);
+    phi_.push_back(phi);
+    cosPhi_.push_back(cos(phi));
+    sinPhi_.push_back(sin(phi));
+    bx_.push_back(bx);
+}
+
+
+void JetCollection::push_back(const JetCollection& other, unsigned i)
+{
+    pt_.push_back(other.pt_[i]);
+    eta_.push_back(other.eta_[i]);
+    phi_.push_back(other.phi_[i]);
+    cosPhi_.push_back(other.cosPhi_[i]);
+    sinPhi_.push_back(other.sinPhi_[i]);
+    bx_.push_back(other.bx_[i]);
+}
+
+
+template<typename T>
+void JetCollection::fill(const std::vector<T> & et,
+                         const std::vector<T> & eta,
+                         const std::vector<T> & phi)
+{
+    checkSizes(et, eta, phi);
+    clear();
+    for (unsigned i = 0; i < et.size(); i++) {
+        push_back(et[i], eta[i], phi[i]);
+    }
+}
+// need to explicity write down template implementations here, or put function implementation into header...
+template void JetCollection::fill<float>(const std::vector<float> & et, const std::vector<float> & eta, const std::vector<float> & phi);
+template void JetCollection::fill<double>(const std::vector<double> & et, const std::vector<double> & eta, const std::vector<double> & phi);
+
+
+template<typename T, typename T2>
+void JetCollection::fill(const std::vector<T> & et,
+                         const std::vector<T> & eta,
+                         const std::vector<T> & phi,
+                         const std::vector<T2> & bx)
+{
+    checkSizes(et, eta, phi);
+    clear();
+    for (unsigned i = 0; i < et.size(); i++) {
+        if (bx.at(i) == 0) {
+            push_back(et[i], eta[i], phi[i], bx[i]);
+        }
+    }
+}
+template void JetCollection::fill<float, short int>(const std::vector<float> & et, const std::vector<float> & eta, const std::vector<float> & phi, const std::vector<short int> & bx);
+template void JetCollection::fill<float, int>(const std::vector<float> & et, const std::vector<float> & eta, const std::vector<float> & phi, const std::vector<int> & bx);
+template void JetCollection::fill<double, int>(const std::vector<double> & et, const std::vector<double> & eta, const std::vector<double> & phi, const std::vector<int> & bx);
+
+
+void JetCollection::fill(const std::vector<TLorentzVector> & jets)
+{
+    clear();
+    for (const auto & jetItr: jets) {
+        push_back(jetItr.Pt(), jetItr.Eta(), jetItr.Phi());
+    }
+}
+
+
+void JetCollection::sortByPtDescending()
+{
+    order_.resize(size());
+    for (unsigned i = 0; i < order_.size(); ++i) {
+        order_[i] = i;
+    }
+    std::stable_sort(order_.begin(), order_.end(),
+                     [this](unsigned a, unsigned b) { return pt_[a] > pt_[b]; });
+    applyOrder(order_, pt_, scratch_);
+    applyOrder(order_, eta_, scratch_);
+    applyOrder(order_, phi_, scratch_);
+    applyOrder(order_, cosPhi_, scratch_);
+    applyOrder(order_, sinPhi_, scratch_);
+    applyOrder(order_, bx_, scratchInt_);
+}
+
+//
+// const member functions
+//
+TLorentzVector JetCollection::p4(unsigned i) const
+{
+    TLorentzVector v;
+    v.SetPtEtaPhiM(pt_[i], eta_[i], phi_[i], 0);
+    return v;
+}
+
+
+std::vector<TLorentzVector> JetCollection::p4s() const
+{
+    std::vector<TLorentzVector> vecs;
+    vecs.reserve(size());
+    for (unsigned i = 0; i < size(); ++i) {
+        vecs.push_back(p4(i));
+    }
+    return vecs;
+}
@@ -27,7 +27,7 @@
 //
 // constructors and destructor
 //
-MatchedPair::MatchedPair(TLorentzVector refJet, TLorentzVector l1Jet):
+MatchedPair::MatchedPair(const TLorentzVector& refJet, const TLorentzVector& l1Jet):
 refJet_(refJet),
 l1Jet_(l1Jet)
 {
@@ -0,0 +1,190 @@
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     MatcherTelemetry
+//
+// Implementation:
+//     For more comments, see header file.
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include "MatcherTelemetry.h"
+
+// STL include
+#include <fstream>
+#include <iostream>
+#include <numeric>
+#include <stdexcept>
+
+// ROOT include
+#include "TFile.h"
+#include "TString.h"
+#include "TTree.h"
+
+// Headers from this package
+#include "runMatcherUtils.h"
+
+namespace {
+
+const double MB = 1024. * 1024.;
+
+// Estimate compressed bytes from uncompressed bytes, using the current tree
+// (for a TChain, the current file)
+double compressedBytes(TTree * tree, Long64_t bytes)
+{
+    TTree * current = tree->GetTree();
+    if (current == nullptr || current->GetTotBytes() <= 0) return bytes;
+    return bytes * double(current->GetZipBytes()) / current->GetTotBytes();
+}
+
+double rate(double n, double seconds)
+{
+    return (seconds > 0) ? n / seconds : 0.;
+}
+
+} // namespace
+
+
+MatcherTelemetry::StageTimer::StageTimer(MatcherTelemetry & telemetry, Stage stage):
+    telemetry_(telemetry),
+    stage_(stage),
+    start_(std::chrono::steady_clock::now())
+{
+}
+
+
+MatcherTelemetry::StageTimer::~StageTimer()
+{
+    std::chrono::duration<double> dt = std::chrono::steady_clock::now() - start_;
+    telemetry_.addTime(stage_, dt.count());
+}
+
+
+MatcherTelemetry::MatcherTelemetry():
+    start_(std::chrono::steady_clock::now()),
+    nEvents_(0),
+    nPairs_(0),
+    stageTimes_(kNStages, 0.),
+    lastTime_(0.),
+    lastEvents_(0),
+    lastPairs_(0),
+    lastFileBytes_(TFile::GetFileBytesRead())
+{
+}
+
+
+MatcherTelemetry::~MatcherTelemetry()
+{
+}
+
+
+unsigned MatcherTelemetry::addInputTree(const std::string & name, TTree * tree)
+{
+    if (tree == nullptr) {
+        throw std::invalid_argument("MatcherTelemetry: null TTree for " + name);
+    }
+    inputTrees_.push_back({name, tree, 0});
+    return inputTrees_.size() - 1;
+}
+
+
+void MatcherTelemetry::addBytesRead(unsigned iTree, Long64_t nBytes)
+{
+    if (nBytes > 0) inputTrees_.at(iTree).bytesRead += nBytes;
+}
+
+
+double MatcherTelemetry::elapsed() const
+{
+    std::chrono::duration<double> dt = std::chrono::steady_clock::now() - start_;
+    return dt.count();
+}
+
+
+const char * MatcherTelemetry::stageName(Stage stage)
+{
+    switch (stage) {
+        case kRead: return "read";
+        case kMatch: return "match";
+        case kSums: return "sums";
+        case kFill: return "fill";
+        case kWrite: return "write";
+        default: return "other";
+    }
+}
+
+
+void MatcherTelemetry::printReport(std::ostream & os)
+{
+    double now = elapsed();
+    double dt = now - lastTime_;
+    Long64_t fileBytes = TFile::GetFileBytesRead();
+
+    os << TString::Format("Telemetry: %lld events, %.1f events/s (%.1f overall), "
+                          "%.1f pairs/s, %.2f pairs/event, %.2f MB/s read from file",
+                          nEvents_, rate(nEvents_ - lastEvents_, dt), rate(nEvents_, now),
+                          rate(nPairs_ - lastPairs_, dt), rate(nPairs_, nEvents_),
+                          rate((fileBytes - lastFileBytes_) / MB, dt)) << std::endl;
+
+    os << "Telemetry: time split so far:";
+    double staged = std::accumulate(stageTimes_.begin(), stageTimes_.end(), 0.);
+    for (int iStage = 0; iStage < kNStages; ++iStage) {
+        os << TString::Format(" %s %.1f%%", stageName(Stage(iStage)), 100. * rate(stageTimes_[iStage], now));
+    }
+    os << TString::Format(" other %.1f%%", 100. * rate(now - staged, now)) << std::endl;
+
+    os << "Telemetry: uncompressed (est. compressed) MB read per tree:";
+    for (const auto & input: inputTrees_) {
+        os << TString::Format(" %s %.1f (%.1f)", input.name.c_str(), input.bytesRead / MB,
+                              compressedBytes(input.tree, input.bytesRead) / MB);
+    }
+    os << std::endl;
+
+    lastTime_ = now;
+    lastEvents_ = nEvents_;
+    lastPairs_ = nPairs_;
+    lastFileBytes_ = fileBytes;
+}
+
+
+void MatcherTelemetry::writeSummary(const std::string & filename) const
+{
+    std::ofstream out(filename.c_str());
+    if (!out) {
+        throw std::runtime_error("Cannot open telemetry file " + filename);
+    }
+    double total = elapsed();
+    double staged = std::accumulate(stageTimes_.begin(), stageTimes_.end(), 0.);
+    out << "{\n";
+    out << TString::Format("  \"wall_s\": %.3f,\n", total);
+    out << TString::Format("  \"events\": %lld,\n", nEvents_);
+    out << TString::Format("  \"events_per_s\": %.3f,\n", rate(nEvents_, total));
+    out << TString::Format("  \"pairs\": %lld,\n", nPairs_);
+    out << TString::Format("  \"pairs_per_s\": %.3f,\n", rate(nPairs_, total));
+    out << TString::Format("  \"pairs_per_event\": %.4f,\n", rate(nPairs_, nEvents_));
+    out << TString::Format("  \"file_bytes_read\": %lld,\n", TFile::GetFileBytesRead());
+    out << TString::Format("  \"file_read_calls\": %d,\n", TFile::GetFileReadCalls());
+    out << "  \"stages_s\": {\n";
+    for (int iStage = 0; iStage < kNStages; ++iStage) {
+        out << TString::Format("    \"%s\": %.3f,\n", stageName(Stage(iStage)), stageTimes_[iStage]);
+    }
+    out << TString::Format("    \"other\": %.3f\n", total - staged);
+    out << "  },\n";
+    out << "  \"trees\": {\n";
+    for (unsigned iTree = 0; iTree < inputTrees_.size(); ++iTree) {
+        const InputTree & input = inputTrees_[iTree];
+        out << TString::Format("    \"%s\": {\"bytes_read\": %lld, \"est_compressed_bytes_read\": %.0f}%s\n",
+                               input.name.c_str(), input.bytesRead,
+                               compressedBytes(input.tree, input.bytesRead),
+                               (iTree + 1 < inputTrees_.size()) ? "," : "");
+    }
+    out << "  }\n";
+    out << "}\n";
+    std::cout << "Written telemetry to " << filename << std::endl;
+}
+
+
+std::string MatcherTelemetry::summaryFilename(const std::string & pairsFilename)
+{
+    return sideFilename(pairsFilename, "_telemetry.json");
+}
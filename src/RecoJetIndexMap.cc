@@ -0,0 +1,80 @@
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     RecoJetIndexMap
+//
+// Implementation:
+//     For more comments, see header file.
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include "RecoJetIndexMap.h"
+
+// STL include
+#include <algorithm>
+#include <cmath>
+
+
+RecoJetIndexMap::RecoJetIndexMap(double tolerance):
+    tolerance_(tolerance),
+    bucketMask_(0)
+{
+}
+
+
+RecoJetIndexMap::~RecoJetIndexMap()
+{
+}
+
+
+long RecoJetIndexMap::cell(double x) const
+{
+    return std::lround(std::floor(x / tolerance_));
+}
+
+
+unsigned RecoJetIndexMap::bucket(long etaCell, long phiCell) const
+{
+    unsigned long h = (unsigned long) etaCell * 0x9E3779B1UL ^ (unsigned long) phiCell * 0x85EBCA77UL;
+    return (h ^ (h >> 15)) & bucketMask_;
+}
+
+
+void RecoJetIndexMap::fill(const L1Analysis::L1AnalysisRecoJetDataFormat & jets)
+{
+    // at least twice as many buckets as jets, to keep chains short
+    unsigned nBuckets = 16;
+    while (nBuckets < 2 * jets.nJets) nBuckets *= 2;
+    bucketMask_ = nBuckets - 1;
+    bucketHeads_.assign(nBuckets, -1);
+
+    eta_.assign(jets.eta.begin(), jets.eta.begin() + jets.nJets);
+    phi_.assign(jets.phi.begin(), jets.phi.begin() + jets.nJets);
+    nextInBucket_.resize(jets.nJets);
+    // insert in reverse, so each chain is in increasing index order
+    for (int i = int(jets.nJets) - 1; i >= 0; --i) {
+        unsigned b = bucket(cell(eta_[i]), cell(phi_[i]));
+        nextInBucket_[i] = bucketHeads_[b];
+        bucketHeads_[b] = i;
+    }
+}
+
+
+int RecoJetIndexMap::find(double eta, double phi) const
+{
+    if (eta_.empty()) return -1;
+    long etaCell = cell(eta), phiCell = cell(phi);
+    int best = -1;
+    for (long iEta = etaCell - 1; iEta <= etaCell + 1; ++iEta) {
+        for (long iPhi = phiCell - 1; iPhi <= phiCell + 1; ++iPhi) {
+            for (int i = bucketHeads_[bucket(iEta, iPhi)]; i >= 0; i = nextInBucket_[i]) {
+                // a different cell can hash to the same bucket, so check every jet
+                if (fabs(eta_[i] - eta) < tolerance_ && fabs(phi_[i] - phi) < tolerance_) {
+                    if (best < 0 || i < best) best = i;
+                    break;  // rest of chain has higher indices
+                }
+            }
+        }
+    }
+    return best;
+}
@@ -13,12 +13,15 @@
 
 // system include files
 #include <iostream>
+#include <stdexcept>
 
 // ROOT include files
 #include "TString.h"
 
 // BOOST include
 #include <boost/program_options.hpp>
+#include <boost/algorithm/string.hpp>
+#include <boost/lexical_cast.hpp>
 
 // user include files
 
@@ -28,6 +31,17 @@ using std::endl;
 //
 // constants, enums and typedefs
 //
+namespace {
+
+/**
+ * Error message for a --config key that the program can't apply.
+ */
+std::string unsupportedKeyMessage(const std::string & key, const std::string & reason)
+{
+    return "--config key " + key + " is not supported: " + reason;
+}
+
+}
 
 //
 // static data member definitions
@@ -51,7 +65,16 @@ RunMatcherOpts::RunMatcherOpts(int argc, char* argv[]):
     refMinPt_(10),
     l1MaxEta_(5.),
     refMaxEta_(5.),
-    cleanJets_("")
+    cleanJets_(""),
+    matcher_("deltaR"),
+    normalised_(false),
+    summary_(false),
+    summaryOnly_(false),
+    // same as binning.eta_bins in the python scripts
+    summaryEtaBins_({0.000, 0.435, 0.783, 1.131, 1.305, 1.479, 1.653, 1.830, 1.930,
+                     2.043, 2.172, 2.322, 2.500, 2.964, 3.489, 4.191, 5.191}),
+    reportInterval_(10000),
+    telemetry_(false)
 {
     namespace po = boost::program_options;
 
@@ -93,8 +116,8 @@ RunMatcherOpts::RunMatcherOpts(int argc, char* argv[]):
         ("draw,d",
             po::value<int>(&drawN_)->default_value(drawN_),
             "number of events to draw 2D eta-phi plot of ref, L1 & matched " \
-            "jets (for debugging). Plots saved in $PWD/match_plots." \
-            " 0 for no plots.")
+            "jets (for debugging). The jets are stored in <output>_eventDisplay.root, " \
+            "make the plots with renderEventDisplays.py. 0 for no plots.")
         ("deltaR",
             po::value<float>(&deltaR_)->default_value(deltaR_),
             "Maximum deltaR(RefJet, L1 Jet) to consider a match.")
@@ -113,6 +136,47 @@ RunMatcherOpts::RunMatcherOpts(int argc, char* argv[]):
         ("cleanJets",
             po::value<std::string>(&cleanJets_)->default_value(cleanJets_),
             "Specify level of cleaning cuts to apply to reference jets. Only for use on RECO (PF) jets.")
+        ("matcher",
+            po::value<std::string>(&matcher_)->default_value(matcher_),
+            "Matcher type: deltaR (compare every pair of jets), or towerGrid " \
+            "(only compare jets in nearby calorimeter towers). Both give the same matches, " \
+            "towerGrid is faster for events with many jets.")
+        ("normalised",
+            po::bool_switch(&normalised_),
+            "Store per-event quantities once per event in a separate \"events\" TTree, " \
+            "instead of in every pair. Pairs in the \"valid\" TTree store the index " \
+            "of their event in the iEvent branch.")
+        ("summary",
+            po::bool_switch(&summary_),
+            "Also fill the histograms used by runCalibration.py during the event loop, " \
+            "and write them to <output stem>_summary.root (one per config). " \
+            "runCalibration.py --summary can then use this instead of the pairs.")
+        ("summaryOnly",
+            po::bool_switch(&summaryOnly_),
+            "As --summary, but don't store the pairs: the \"valid\" TTree is left empty.")
+        ("summaryEtaBins",
+            po::value<std::vector<float>>(&summaryEtaBins_)->multitoken(),
+            "Edges of L1 jet |eta| bins for --summary. Defaults to binning.eta_bins.")
+        ("summaryPUBins",
+            po::value<std::vector<float>>(&summaryPUBins_)->multitoken(),
+            "Edges of numPUVertices ranges for --summary, " \
+            "as for runCalibration.py --PUmin/--PUmax (inclusive). " \
+            "Histograms for all PU are always made.")
+        ("reportInterval",
+            po::value<int>(&reportInterval_)->default_value(reportInterval_),
+            "Number of events between progress reports, including event & pair rates, " \
+            "bytes read and time split between read/match/sums/fill/write. 0 for none.")
+        ("telemetry",
+            po::bool_switch(&telemetry_),
+            "Write totals of the progress report measurements to " \
+            "<output stem>_telemetry.json, e.g. to size batch jobs.")
+        ("config",
+            po::value<std::vector<std::string>>(&configStrs_)->multitoken(),
+            "Extra matcher configuration(s) to run in the same pass over the input, " \
+            "each writing to its own output file. Format: comma-separated key=value, " \
+            "e.g. \"output=pairs_dr0p25.root,deltaR=0.25,cleanJets=TIGHTLEPVETO\". " \
+            "Keys: output (required), deltaR, l1MinPt, refMinPt, cleanJets, matcher. " \
+            "Unspecified keys take the values of the main options.")
     ;
     po::variables_map vm;
     try {
@@ -140,6 +204,36 @@ RunMatcherOpts::RunMatcherOpts(int argc, char* argv[]):
         << " to jets with pT > " << vm["corrMinPt"].as<float>() << endl;
     }
 
+    if (summaryOnly_) {
+        summary_ = true;
+    }
+
+    // main options are always the first config
+    MatcherConfig mainConfig = {output_, deltaR_, l1MinPt_, refMinPt_, cleanJets_, matcher_};
+    matcherConfigs_.push_back(mainConfig);
+    for (const auto & configStr: configStrs_) {
+        try {
+            matcherConfigs_.push_back(parseMatcherConfig(configStr, mainConfig));
+        } catch (const std::invalid_argument& e) {
+            cout << e.what() << endl;
+            std::exit(1);
+        }
+    }
+    for (const auto & config: matcherConfigs_) {
+        if (config.matcher != "deltaR" && config.matcher != "towerGrid") {
+            cout << "Invalid matcher type " << config.matcher << ", should be deltaR or towerGrid" << endl;
+            std::exit(1);
+        }
+    }
+    // check we're not going to write 2 configs to the same file
+    for (unsigned i = 0; i < matcherConfigs_.size(); ++i) {
+        for (unsigned j = 0; j < i; ++j) {
+            if (matcherConfigs_[i].output == matcherConfigs_[j].output) {
+                cout << "Output file " << matcherConfigs_[i].output << " used by more than one config" << endl;
+                std::exit(1);
+            }
+        }
+    }
 }
 
 // RunMatcherOpts::RunMatcherOpts(const RunMatcherOpts& rhs)
@@ -170,6 +264,105 @@ RunMatcherOpts::~RunMatcherOpts()
 //
 // const member functions
 //
+MatcherConfig RunMatcherOpts::parseMatcherConfig(const std::string & configStr, const MatcherConfig & defaults)
+{
+    MatcherConfig config = defaults;
+    config.output = "";
+
+    std::vector<std::string> settings;
+    boost::split(settings, configStr, boost::is_any_of(","));
+    for (auto & setting: settings) {
+        std::vector<std::string> keyValue;
+        boost::split(keyValue, setting, boost::is_any_of("="));
+        if (keyValue.size() != 2) {
+            throw std::invalid_argument("Invalid --config setting \"" + setting + "\", should be key=value");
+        }
+        std::string key = boost::trim_copy(keyValue[0]);
+        std::string value = boost::trim_copy(keyValue[1]);
+        try {
+            if (key == "output") config.output = value;
+            else if (key == "deltaR") config.deltaR = boost::lexical_cast<float>(value);
+            else if (key == "l1MinPt") config.l1MinPt = boost::lexical_cast<float>(value);
+            else if (key == "refMinPt") config.refMinPt = boost::lexical_cast<float>(value);
+            else if (key == "cleanJets") config.cleanJets = value;
+            else if (key == "matcher") config.matcher = value;
+            else if (key == "l1MaxEta" || key == "refMaxEta") {
+                throw std::invalid_argument(unsupportedKeyMessage(key, "the matchers apply the same |eta| cut to all jets"));
+            }
+            else {
+                throw std::invalid_argument("Unrecognised --config key " + key);
+            }
+        } catch (const boost::bad_lexical_cast& e) {
+            throw std::invalid_argument("Invalid value for --config key " + key + ": " + value);
+        }
+    }
+
+    if (config.output == "") {
+        throw std::invalid_argument("Must specify output=<filename> in --config " + configStr);
+    }
+    return config;
+}
+
+
+void RunMatcherOpts::checkConfigKeySupported(const std::string & configStr, const std::string & key, const std::string & reason)
+{
+    std::vector<std::string> settings;
+    boost::split(settings, configStr, boost::is_any_of(","));
+    for (auto & setting: settings) {
+        if (boost::trim_copy(setting.substr(0, setting.find('='))) == key) {
+            throw std::invalid_argument(unsupportedKeyMessage(key, reason));
+        }
+    }
+}
+
+
+void RunMatcherOpts::rejectConfigKey(const std::string & key, const std::string & reason) const
+{
+    for (const auto & configStr: configStrs_) {
+        try {
+            checkConfigKeySupported(configStr, key, reason);
+        } catch (const std::invalid_argument& e) {
+            cout << e.what() << endl;
+            std::exit(1);
+        }
+    }
+}
+
+
+void RunMatcherOpts::requireSingleConfig() const
+{
+    if (matcherConfigs_.size() > 1) {
+        cout << "This program does not support multiple matcher configs (--config)" << endl;
+        std::exit(1);
+    }
+}
+
+
+void RunMatcherOpts::requireFlatOutput() const
+{
+    if (normalised_) {
+        cout << "This program does not support the normalised output layout (--normalised)" << endl;
+        std::exit(1);
+    }
+}
+
+
+void RunMatcherOpts::requireNoSummary() const
+{
+    if (summary_) {
+        cout << "This program does not support calibration summaries (--summary, --summaryOnly)" << endl;
+        std::exit(1);
+    }
+}
+
+
+void RunMatcherOpts::requireNoTelemetry() const
+{
+    if (telemetry_) {
+        cout << "This program does not support telemetry (--telemetry)" << endl;
+        std::exit(1);
+    }
+}
 
 //
 // static member functions
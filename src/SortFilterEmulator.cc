@@ -28,13 +28,24 @@
 // constructors and destructor
 //
 SortFilterEmulator::SortFilterEmulator():
-    nMax_(4)
+    SortFilterEmulator(4)
 {
 }
 
 SortFilterEmulator::SortFilterEmulator(const unsigned nMax):
     nMax_(nMax)
 {
+    // allocate everything up front, so setJets() never has to
+    allJets_.reserve(2 * nMax_);
+    cenJets_.reserve(nMax_);
+    fwdJets_.reserve(nMax_);
+    cenIndices_.reserve(nMax_);
+    fwdIndices_.reserve(nMax_);
+    cenPts_.reserve(nMax_);
+    fwdPts_.reserve(nMax_);
+    allColl_.reserve(2 * nMax_);
+    cenColl_.reserve(nMax_);
+    fwdColl_.reserve(nMax_);
 }
 
 // SortFilterEmulator::SortFilterEmulator(const SortFilterEmulator& rhs)
@@ -62,49 +73,86 @@ SortFilterEmulator::~SortFilterEmulator()
 // member functions
 //
 void SortFilterEmulator::setJets(const std::vector<TLorentzVector>& jets) {
+    clearSelection();
+    for (unsigned i = 0; i < jets.size(); ++i) {
+        if (isCentral(jets[i])) {
+            selectTopN(cenIndices_, cenPts_, i, jets[i].Pt());
+        } else {
+            selectTopN(fwdIndices_, fwdPts_, i, jets[i].Pt());
+        }
+    }
+
+    // Store copies of selected jets - don't want to modify original
+    // allJets_ is [central jets..., fwd jets...]
     allJets_.clear();
     cenJets_.clear();
     fwdJets_.clear();
-
-    // Store copies of jets - don't want to modify original
-    for(auto& jetItr: jets) {
-        allJets_.push_back(TLorentzVector(jetItr));
+    for (auto i: cenIndices_) {
+        cenJets_.push_back(jets[i]);
+        allJets_.push_back(jets[i]);
     }
+    for (auto i: fwdIndices_) {
+        fwdJets_.push_back(jets[i]);
+        allJets_.push_back(jets[i]);
+    }
+}
 
-    // First sort by pT
-    std::sort(allJets_.begin(), allJets_.end(), SortFilterEmulator::sortPtDescending);
-
-    // Rearrange by eta region, so [central jets..., fwd jets...]
-    auto fwdItr = std::stable_partition(allJets_.begin(), allJets_.end(), SortFilterEmulator::isCentral);
-
-    // Store central and forward jets as separate collections
-    cenJets_ = std::vector<TLorentzVector>(allJets_.begin(), fwdItr);
-    fwdJets_ = std::vector<TLorentzVector>(fwdItr, allJets_.end());
 
-    // Now filter jets to keep top ones
-    filterJets(cenJets_);
-    filterJets(fwdJets_);
+void SortFilterEmulator::setJets(const JetCollection& jets) {
+    // Keep the top nMax central & forward jets
+    // Central = |eta| < 3.0. Fwd = |eta| > 3.0.
+    clearSelection();
+    for (unsigned i = 0; i < jets.size(); ++i) {
+        if (fabs(jets.eta(i)) < 3.0) {
+            selectTopN(cenIndices_, cenPts_, i, jets.pt(i));
+        } else {
+            selectTopN(fwdIndices_, fwdPts_, i, jets.pt(i));
+        }
+    }
 
-    // Bit complicated for allJets_ - do fwd jets first (to not screw up fwdItr)
-    // then cen jets
-    if ((allJets_.end() - fwdItr) > nMax_) {
-        allJets_.erase(fwdItr+nMax_, allJets_.end());
+    // allColl_ is [central jets..., fwd jets...]
+    allColl_.clear();
+    cenColl_.clear();
+    fwdColl_.clear();
+    for (auto i: cenIndices_) {
+        cenColl_.push_back(jets, i);
+        allColl_.push_back(jets, i);
     }
-    if ((fwdItr - allJets_.begin()) > nMax_) {
-        allJets_.erase(allJets_.begin()+nMax_, fwdItr);
+    for (auto i: fwdIndices_) {
+        fwdColl_.push_back(jets, i);
+        allColl_.push_back(jets, i);
     }
 }
 
 
-void SortFilterEmulator::filterJets(std::vector<TLorentzVector>& jets) {
-    if (jets.size() > nMax_) {
-        jets.erase(jets.begin()+nMax_, jets.end());
-    }
+void SortFilterEmulator::clearSelection() {
+    cenIndices_.clear();
+    fwdIndices_.clear();
+    cenPts_.clear();
+    fwdPts_.clear();
 }
 
 //
 // const member functions
 //
+void SortFilterEmulator::selectTopN(std::vector<unsigned>& topIndices, std::vector<double>& topPts,
+                                    unsigned index, double pt) const {
+    if (topIndices.size() < nMax_) {
+        topIndices.push_back(index);
+        topPts.push_back(pt);
+    } else if (nMax_ > 0 && pt > topPts.back()) {
+        topIndices.back() = index;
+        topPts.back() = pt;
+    } else {
+        return;
+    }
+
+    // Move the new jet up past any with lower pT
+    for (unsigned i = topIndices.size() - 1; i > 0 && topPts[i - 1] < topPts[i]; --i) {
+        std::swap(topIndices[i - 1], topIndices[i]);
+        std::swap(topPts[i - 1], topPts[i]);
+    }
+}
 
 //
 // static member functions
@@ -0,0 +1,260 @@
+// -*- C++ -*-
+//
+// Package:     L1Trigger/L1JetEnergyCorrections
+// Class  :     TowerGrid_Matcher
+//
+// Implementation:
+//     For more comments, see header file.
+//
+// Original Author:  Robin Cameron Aggleton
+//
+#include "TowerGrid_Matcher.h"
+
+// STL include
+#include <algorithm>
+#include <cmath>
+#include <cstdlib>
+
+namespace {
+
+// Upper |eta| boundaries of the trigger towers, starting at |eta| = 0.
+// The HF tower ieta = 29 is skipped, as in the Stage 2 geometry.
+const double towerEtaEdges[TowerGrid_Matcher::nTowersEta + 1] = {
+    0.000, 0.087, 0.174, 0.261, 0.348, 0.435, 0.522, 0.609, 0.696, 0.783,
+    0.870, 0.957, 1.044, 1.131, 1.218, 1.305, 1.392, 1.479, 1.566, 1.653,
+    1.740, 1.830, 1.930, 2.043, 2.172, 2.322, 2.500, 2.650, 2.964, 3.139,
+    3.314, 3.489, 3.664, 3.839, 4.013, 4.191, 4.363, 4.538, 4.716, 4.889,
+    5.191
+};
+
+const double towerPhiWidth = 2. * M_PI / TowerGrid_Matcher::nTowersPhi;
+
+// Margin added to maxDeltaR when rejecting towers, so that a jet sitting
+// exactly on a tower boundary can't be lost due to rounding
+const double windowMargin = 1E-6;
+
+// Below this many possible pairs, filling the grid costs more than it saves,
+// so just compare every pair as in DeltaR_Matcher
+const unsigned minPairsForGrid = 256;
+
+/**
+ * Get the lower & upper eta of tower with ieta index i.
+ * The outermost towers extend to +/- infinity, since they also hold any jets
+ * beyond the last boundary.
+ */
+void towerEtaRange(unsigned i, double & low, double & high)
+{
+    const unsigned n = TowerGrid_Matcher::nTowersEta;
+    if (i >= n) {
+        low = towerEtaEdges[i - n];
+        high = (i - n == n - 1) ? HUGE_VAL : towerEtaEdges[i - n + 1];
+    } else {
+        low = (n - 1 - i == n - 1) ? -HUGE_VAL : -towerEtaEdges[n - i];
+        high = -towerEtaEdges[n - 1 - i];
+    }
+}
+
+}
+
+
+/////////////////////////////////
+// constructors and destructor //
+/////////////////////////////////
+TowerGrid_Matcher::TowerGrid_Matcher(const double maxDeltaR) :
+    DeltaR_Matcher(maxDeltaR),
+    occupancy_(nEtaIndices * nWordsPhi, 0),
+    cellFirstRef_(nCells, -1)
+{
+    makeLookupTables();
+}
+
+
+TowerGrid_Matcher::TowerGrid_Matcher(const double maxDeltaR,
+                                     const double minRefJetPt,
+                                     const double maxRefJetPt,
+                                     const double minL1JetPt,
+                                     const double maxL1JetPt,
+                                     const double maxJetEta) :
+    DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta),
+    occupancy_(nEtaIndices * nWordsPhi, 0),
+    cellFirstRef_(nCells, -1)
+{
+    makeLookupTables();
+}
+
+
+TowerGrid_Matcher::~TowerGrid_Matcher()
+{
+}
+
+//////////////////////
+// member functions //
+//////////////////////
+
+void TowerGrid_Matcher::makeLookupTables()
+{
+    const double maxDeltaRWindow = maxDeltaR_ + windowMargin;
+    maxDeltaR2Window_ = maxDeltaRWindow * maxDeltaRWindow;
+
+    // eta: minimum gap between the edges of each pair of towers
+    etaGap2_.assign(nEtaIndices * nEtaIndices, 0.);
+    etaWindowLow_.assign(nEtaIndices, 0);
+    etaWindowHigh_.assign(nEtaIndices, 0);
+    for (unsigned i = 0; i < nEtaIndices; ++i) {
+        double lowI, highI;
+        towerEtaRange(i, lowI, highI);
+        bool foundLow = false;
+        for (unsigned j = 0; j < nEtaIndices; ++j) {
+            double lowJ, highJ;
+            towerEtaRange(j, lowJ, highJ);
+            double gap = std::max(0., std::max(lowI, lowJ) - std::min(highI, highJ));
+            etaGap2_[i * nEtaIndices + j] = gap * gap;
+            if (gap * gap < maxDeltaR2Window_) {
+                if (!foundLow) {
+                    etaWindowLow_[i] = j;
+                    foundLow = true;
+                }
+                etaWindowHigh_[i] = j;
+            }
+        }
+    }
+
+    // phi: towers n apart have at least (n-1) towers between them
+    phiGap2_.assign(nTowersPhi / 2 + 1, 0.);
+    phiWindow_ = 0;
+    for (unsigned n = 0; n < phiGap2_.size(); ++n) {
+        double gap = (n > 0) ? (n - 1) * towerPhiWidth : 0.;
+        phiGap2_[n] = gap * gap;
+        if (phiGap2_[n] < maxDeltaR2Window_) phiWindow_ = n;
+    }
+
+    phiWindowMask_.assign(nTowersPhi * nWordsPhi, 0);
+    for (unsigned iphi = 0; iphi < nTowersPhi; ++iphi) {
+        for (unsigned jphi = 0; jphi < nTowersPhi; ++jphi) {
+            unsigned n = (iphi > jphi) ? iphi - jphi : jphi - iphi;
+            n = std::min(n, nTowersPhi - n);
+            if (n <= phiWindow_) {
+                phiWindowMask_[iphi * nWordsPhi + jphi / 64] |= uint64_t(1) << (jphi % 64);
+            }
+        }
+    }
+}
+
+
+unsigned TowerGrid_Matcher::ietaIndex(const double eta)
+{
+    unsigned tower = std::upper_bound(towerEtaEdges + 1, towerEtaEdges + nTowersEta, fabs(eta)) - (towerEtaEdges + 1);
+    return (eta >= 0) ? nTowersEta + tower : nTowersEta - 1 - tower;
+}
+
+
+unsigned TowerGrid_Matcher::iphiIndex(const double phi)
+{
+    int iphi = static_cast<int>(floor((phi + M_PI) / towerPhiWidth));
+    iphi %= static_cast<int>(nTowersPhi);
+    if (iphi < 0) iphi += nTowersPhi;
+    return iphi;
+}
+
+
+void TowerGrid_Matcher::fillRefGrid()
+{
+    const unsigned nRef = refColl_.size();
+    nextRef_.assign(nRef, -1);
+    refCell_.resize(nRef);
+    // go backwards so each tower's list is in ascending index order
+    for (int refInd = nRef - 1; refInd >= 0; --refInd) {
+        unsigned ieta = ietaIndex(refColl_.eta(refInd));
+        unsigned iphi = iphiIndex(refColl_.phi(refInd));
+        unsigned cell = ieta * nTowersPhi + iphi;
+        refCell_[refInd] = cell;
+        nextRef_[refInd] = cellFirstRef_[cell];
+        cellFirstRef_[cell] = refInd;
+        occupancy_[ieta * nWordsPhi + iphi / 64] |= uint64_t(1) << (iphi % 64);
+    }
+}
+
+
+void TowerGrid_Matcher::clearRefGrid()
+{
+    for (const auto cell: refCell_) {
+        cellFirstRef_[cell] = -1;
+        unsigned ieta = cell / nTowersPhi;
+        occupancy_[ieta * nWordsPhi + (cell % nTowersPhi) / 64] = 0;
+    }
+    refCell_.clear();
+}
+
+
+std::vector<MatchedPair> TowerGrid_Matcher::getMatchingPairs()
+{
+    if (refColl_.size() * l1Coll_.size() < minPairsForGrid) {
+        return DeltaR_Matcher::getMatchingPairs();
+    }
+
+    matchedJets_.clear();
+
+    refUsed_.assign(refColl_.size(), false);
+    fillRefGrid();
+
+    const double maxDeltaR2 = maxDeltaR_ * maxDeltaR_;
+    const int nPhi = nTowersPhi;
+    for (unsigned l1Ind = 0; l1Ind < l1Coll_.size(); ++l1Ind)
+    {
+        const unsigned l1Ieta = ietaIndex(l1Coll_.eta(l1Ind));
+        const int l1Iphi = iphiIndex(l1Coll_.phi(l1Ind));
+
+        int bestRefInd = -1;
+        double bestDeltaR2 = maxDeltaR2;
+        for (unsigned ieta = etaWindowLow_[l1Ieta]; ieta <= etaWindowHigh_[l1Ieta]; ++ieta)
+        {
+            const double etaGap2 = etaGap2_[l1Ieta * nEtaIndices + ieta];
+            for (unsigned word = 0; word < nWordsPhi; ++word)
+            {
+                // occupied towers in this ieta row, within the iphi window
+                uint64_t bits = occupancy_[ieta * nWordsPhi + word] & phiWindowMask_[l1Iphi * nWordsPhi + word];
+                while (bits)
+                {
+                    const int iphi = word * 64 + __builtin_ctzll(bits);
+                    bits &= bits - 1;
+                    int absDPhi = abs(iphi - l1Iphi);
+                    absDPhi = std::min(absDPhi, nPhi - absDPhi);
+                    if (etaGap2 + phiGap2_[absDPhi] >= maxDeltaR2Window_) continue;
+
+                    // exact deltaR for the jets in this tower
+                    const unsigned cell = ieta * nTowersPhi + iphi;
+                    for (int refInd = cellFirstRef_[cell]; refInd >= 0; refInd = nextRef_[refInd])
+                    {
+                        if (refUsed_[refInd]) continue;
+                        double deltaR2 = JetCollection::deltaR2(refColl_, refInd, l1Coll_, l1Ind);
+                        if (deltaR2 < bestDeltaR2 || (deltaR2 == bestDeltaR2 && bestRefInd >= 0 && refInd < bestRefInd))
+                        {
+                            bestDeltaR2 = deltaR2;
+                            bestRefInd = refInd;
+                        }
+                    }
+                }
+            }
+        }
+
+        if (bestRefInd >= 0)
+        {
+            matchedJets_.push_back(MatchedPair(refJetP4(bestRefInd), l1JetP4(l1Ind)));
+            refUsed_[bestRefInd] = true;
+        }
+    }
+
+    clearRefGrid();
+    return matchedJets_;
+}
+
+
+std::ostream&  TowerGrid_Matcher::printName(std::ostream& os) const {
+    return os << "\nTower grid deltaR Matcher :: max DeltaR: " << maxDeltaR_
+            << " (+/- " << etaWindowHigh_[nTowersEta] - nTowersEta << " ieta, +/- " << phiWindow_ << " iphi)"
+            << ", matching reference jets with " << minRefJetPt_
+            << " < pT < " << maxRefJetPt_
+            << ", L1 jet with " << minL1JetPt_
+            << " < pT < " << maxL1JetPt_
+            << ", jet |eta| < " << maxJetEta_ << "\n";
+}
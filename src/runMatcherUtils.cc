@@ -18,6 +18,8 @@
 
 // Headers from this package
 #include "commonRootUtils.h"
+#include "DeltaR_Matcher.h"
+#include "TowerGrid_Matcher.h"
 
 using boost::lexical_cast;
 
@@ -180,26 +182,11 @@ void rescaleEnergyFractions(L1AnalysisRecoJetDataFormat * jets) {
 std::vector<TLorentzVector> makeRecoTLorentzVectorsCleaned(const L1AnalysisRecoJetDataFormat & jets, std::string quality) {
 
     std::vector<TLorentzVector> vecs;
+    std::vector<char> mask;
+    makeJetIDMask(jets, parseJetIDQuality(quality), mask);
 
     for (unsigned i = 0; i < jets.nJets; ++i) {
-        if (quality == "LOOSE") {
-            if (!looseCleaning(jets.eta[i],
-                               jets.chef[i], jets.nhef[i], jets.pef[i], jets.eef[i], jets.mef[i], jets.hfhef[i], jets.hfemef[i],
-                               jets.chMult[i], jets.nhMult[i], jets.phMult[i], jets.elMult[i], jets.muMult[i], jets.hfhMult[i], jets.hfemMult[i]))
-                continue;
-        } else if (quality == "TIGHT") {
-            if (!tightCleaning(jets.eta[i],
-                               jets.chef[i], jets.nhef[i], jets.pef[i], jets.eef[i], jets.mef[i], jets.hfhef[i], jets.hfemef[i],
-                               jets.chMult[i], jets.nhMult[i], jets.phMult[i], jets.elMult[i], jets.muMult[i], jets.hfhMult[i], jets.hfemMult[i]))
-                continue;
-        } else if (quality == "TIGHTLEPVETO") {
-            if (!tightLepVetoCleaning(jets.eta[i],
-                                      jets.chef[i], jets.nhef[i], jets.pef[i], jets.eef[i], jets.mef[i], jets.hfhef[i], jets.hfemef[i],
-                                      jets.chMult[i], jets.nhMult[i], jets.phMult[i], jets.elMult[i], jets.muMult[i], jets.hfhMult[i], jets.hfemMult[i]))
-                continue;
-        } else {
-            throw std::runtime_error("quality must be LOOSE/TIGHT/TIGHTLEPVETO");
-        }
+        if (!mask[i]) continue;
         // If got this far, then can add to list.
         TLorentzVector v;
         v.SetPtEtaPhiM(jets.etCorr[i], jets.eta[i], jets.phi[i], 0);
@@ -210,6 +197,72 @@ std::vector<TLorentzVector> makeRecoTLorentzVectorsCleaned(const L1AnalysisRecoJ
 }
 
 
+void fillRecoJetsCleaned(const L1AnalysisRecoJetDataFormat & jets, const std::string & quality, JetCollection & output) {
+    std::vector<char> mask;
+    makeJetIDMask(jets, parseJetIDQuality(quality), mask);
+    fillRecoJetsCleaned(jets, mask, output);
+}
+
+
+void fillRecoJetsCleaned(const L1AnalysisRecoJetDataFormat & jets, const std::vector<char> & mask, JetCollection & output) {
+    output.clear();
+    for (unsigned i = 0; i < jets.nJets; ++i) {
+        if (mask[i]) {
+            output.push_back(jets.etCorr[i], jets.eta[i], jets.phi[i]);
+        }
+    }
+}
+
+
+JetIDQuality parseJetIDQuality(const std::string & quality) {
+    if (quality == "LOOSE") return kLooseJetID;
+    if (quality == "TIGHT") return kTightJetID;
+    if (quality == "TIGHTLEPVETO") return kTightLepVetoJetID;
+    throw std::runtime_error("quality must be LOOSE/TIGHT/TIGHTLEPVETO");
+}
+
+
+void makeJetIDMask(const L1AnalysisRecoJetDataFormat & jets, JetIDQuality quality, std::vector<char> & mask) {
+    // Cuts that differ between qualities, for |eta| <= 3
+    // (see looseCleaning, tightCleaning, tightLepVetoCleaning)
+    const double maxEef = (quality == kTightLepVetoJetID) ? 0.9 : 0.99;
+    const double maxNhefPef = (quality == kLooseJetID) ? 0.99 : 0.9;
+    const bool lepVeto = (quality == kTightLepVetoJetID);
+
+    mask.resize(jets.nJets);
+    for (unsigned i = 0; i < jets.nJets; ++i) {
+        float absEta = fabs(jets.eta[i]);
+        int nCharged = jets.chMult[i] + jets.elMult[i] + jets.muMult[i];
+        int nConstituents = nCharged + jets.nhMult[i] + jets.phMult[i];
+        // use & not && so every cut is evaluated, without branching
+        bool passCharged = (absEta > 2.4) | ((jets.chef[i] > 0) & (nCharged > 0) & (jets.eef[i] < maxEef));
+        bool passLepVeto = !lepVeto | ((jets.mef[i] < 0.8) & (jets.muMult[i] == 0) & (jets.elMult[i] == 0));
+        bool passCentral = passCharged & (jets.nhef[i] < maxNhefPef) & (jets.pef[i] < maxNhefPef)
+                           & (nConstituents > 1) & passLepVeto;
+        bool passForward = (jets.pef[i] < 0.9) & ((jets.nhMult[i] + jets.phMult[i]) > 10);
+        mask[i] = (absEta <= 3) ? passCentral : passForward;
+    }
+}
+
+
+bool passJetID(const L1AnalysisRecoJetDataFormat & jets, unsigned i, const std::string & quality) {
+    if (quality == "LOOSE") {
+        return looseCleaning(jets.eta[i],
+                             jets.chef[i], jets.nhef[i], jets.pef[i], jets.eef[i], jets.mef[i], jets.hfhef[i], jets.hfemef[i],
+                             jets.chMult[i], jets.nhMult[i], jets.phMult[i], jets.elMult[i], jets.muMult[i], jets.hfhMult[i], jets.hfemMult[i]);
+    } else if (quality == "TIGHT") {
+        return tightCleaning(jets.eta[i],
+                             jets.chef[i], jets.nhef[i], jets.pef[i], jets.eef[i], jets.mef[i], jets.hfhef[i], jets.hfemef[i],
+                             jets.chMult[i], jets.nhMult[i], jets.phMult[i], jets.elMult[i], jets.muMult[i], jets.hfhMult[i], jets.hfemMult[i]);
+    } else if (quality == "TIGHTLEPVETO") {
+        return tightLepVetoCleaning(jets.eta[i],
+                                    jets.chef[i], jets.nhef[i], jets.pef[i], jets.eef[i], jets.mef[i], jets.hfhef[i], jets.hfemef[i],
+                                    jets.chMult[i], jets.nhMult[i], jets.phMult[i], jets.elMult[i], jets.muMult[i], jets.hfhMult[i], jets.hfemMult[i]);
+    }
+    throw std::runtime_error("quality must be LOOSE/TIGHT/TIGHTLEPVETO");
+}
+
+
 bool looseCleaning(float eta,
                    float chef, float nhef, float pef, float eef, float mef, float hfhef, float hfemef,
                    short chMult, short nhMult, short phMult, short elMult, short muMult, short hfhMult, short hfemMult) {
@@ -273,7 +326,7 @@ bool checkTriggerFired(const std::vector<TString> & hlt, const std::string & sel
 }
 
 
-float scalarSumPt(std::vector<TLorentzVector> jets) {
+float scalarSumPt(const std::vector<TLorentzVector> & jets) {
     float sum = 0.;
     for (const auto& itr: jets) {
         sum += itr.Pt();
@@ -282,7 +335,16 @@ float scalarSumPt(std::vector<TLorentzVector> jets) {
 }
 
 
-TLorentzVector vectorSum(std::vector<TLorentzVector> jets) {
+float scalarSumPt(const JetCollection & jets) {
+    float sum = 0.;
+    for (unsigned i = 0; i < jets.size(); ++i) {
+        sum += jets.pt(i);
+    }
+    return sum;
+}
+
+
+TLorentzVector vectorSum(const std::vector<TLorentzVector> & jets) {
     TLorentzVector sum;
     for (const auto& itr: jets) {
         sum += itr;
@@ -291,7 +353,20 @@ TLorentzVector vectorSum(std::vector<TLorentzVector> jets) {
 }
 
 
-std::vector<TLorentzVector> getJetsForHTT(std::vector<TLorentzVector> jets) {
+TLorentzVector vectorSum(const JetCollection & jets) {
+    double px(0.), py(0.), pz(0.), e(0.);
+    for (unsigned i = 0; i < jets.size(); ++i) {
+        px += jets.px(i);
+        py += jets.py(i);
+        // massless, so pz = pT sinh(eta), E = pT cosh(eta)
+        pz += jets.pt(i) * sinh(jets.eta(i));
+        e += jets.pt(i) * cosh(jets.eta(i));
+    }
+    return TLorentzVector(px, py, pz, e);
+}
+
+
+std::vector<TLorentzVector> getJetsForHTT(const std::vector<TLorentzVector> & jets) {
     std::vector<TLorentzVector> outputJets;
     for (const auto& itr: jets) {
         if (passHTTCut(itr))
@@ -301,6 +376,47 @@ std::vector<TLorentzVector> getJetsForHTT(std::vector<TLorentzVector> jets) {
 }
 
 
-bool passHTTCut(TLorentzVector jet) {
-    return (jet.Pt() > 30 && fabs(jet.Eta()) <= 3);
+void getJetsForHTT(const JetCollection & jets, JetCollection & outputJets) {
+    outputJets.clear();
+    for (unsigned i = 0; i < jets.size(); ++i) {
+        if (passHTTCut(jets.pt(i), jets.eta(i)))
+            outputJets.push_back(jets, i);
+    }
+}
+
+
+bool passHTTCut(const TLorentzVector & jet) {
+    return passHTTCut(jet.Pt(), jet.Eta());
+}
+
+
+bool passHTTCut(double pt, double eta) {
+    return (pt > 30 && fabs(eta) <= 3);
+}
+
+
+Matcher * makeMatcher(const std::string & type,
+                      double maxDeltaR,
+                      double minRefJetPt,
+                      double maxRefJetPt,
+                      double minL1JetPt,
+                      double maxL1JetPt,
+                      double maxJetEta) {
+    if (type == "deltaR") {
+        return new DeltaR_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
+    } else if (type == "towerGrid") {
+        return new TowerGrid_Matcher(maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta);
+    }
+    throw std::invalid_argument("Unknown matcher type " + type + ", should be deltaR or towerGrid");
+}
+
+
+std::string sideFilename(const std::string & pairsFilename, const std::string & suffix)
+{
+    std::string stem(pairsFilename);
+    const std::string ext(".root");
+    if (stem.size() >= ext.size() && stem.compare(stem.size() - ext.size(), ext.size(), ext) == 0) {
+        stem.erase(stem.size() - ext.size());
+    }
+    return stem + suffix;
 }
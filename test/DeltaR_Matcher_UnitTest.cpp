@@ -1,5 +1,6 @@
 #include <iostream>
 #include <memory>
+#include <random>
 
 #include <cppunit/TestFixture.h>
 #include <cppunit/extensions/TestFactoryRegistry.h>
@@ -10,6 +11,7 @@
 
 #include "TLorentzVector.h"
 #include "DeltaR_Matcher.h"
+#include "TowerGrid_Matcher.h"
 
 /**
  * @brief Unit tests for DeltaR_Matcher class & subclasses
@@ -35,6 +37,10 @@ class DeltaR_Matcher_UnitTest : public CppUnit::TestCase {
     CPPUNIT_TEST( checkDeltaRMax );
     CPPUNIT_TEST( checkPtOrdering );
     CPPUNIT_TEST( checkRefJetRemoval );
+    CPPUNIT_TEST( runJetCollectionMatch );
+    CPPUNIT_TEST( checkDeltaR2PhiWrap );
+    CPPUNIT_TEST( checkFillBx );
+    CPPUNIT_TEST( checkTowerGridMatchesDeltaR );
     CPPUNIT_TEST_SUITE_END();
 
 public:
@@ -49,6 +55,10 @@ public:
     void checkDeltaRMax();
     void checkPtOrdering();
     void checkRefJetRemoval();
+    void runJetCollectionMatch();
+    void checkDeltaR2PhiWrap();
+    void checkFillBx();
+    void checkTowerGridMatchesDeltaR();
 
 private:
     bool printStatements;
@@ -65,6 +75,7 @@ private:
  */
 void DeltaR_Matcher_UnitTest::setUp() {
     printStatements = false;
+    matcher = nullptr;
 }
 
 
@@ -263,6 +274,152 @@ void DeltaR_Matcher_UnitTest::checkRefJetRemoval() {
 }
 
 
+/**
+ * @brief Check matching with JetCollection input gives the same pairs,
+ * including across the phi = +/-pi boundary.
+ * @details Jets are added in ascending pT order, to check they get sorted.
+ */
+void DeltaR_Matcher_UnitTest::runJetCollectionMatch() {
+    JetCollection refColl;
+    refColl.push_back(30, 1, 1.4);
+    refColl.push_back(32, 1, 0.75);
+    refColl.push_back(50, -2, -3.1);
+    JetCollection l1Coll;
+    l1Coll.push_back(38, 1, 1.0);
+    l1Coll.push_back(40, 1, 0.5);
+    l1Coll.push_back(45, -2, 3.1);
+
+    matcher = new DeltaR_Matcher(0.5);
+    matcher->setRefJets(refColl);
+    matcher->setL1Jets(l1Coll);
+    pairs = matcher->getMatchingPairs();
+    if (printStatements) {
+        std::cout << *matcher << std::endl;
+        matcher->printMatches();
+    }
+    CPPUNIT_ASSERT( pairs.size() == 3 );
+    CPPUNIT_ASSERT( pairs.at(0).l1Jet() == l1Coll.p4(2) );
+    CPPUNIT_ASSERT( pairs.at(0).refJet() == refColl.p4(2) );
+    CPPUNIT_ASSERT( pairs.at(1).l1Jet() == l1Coll.p4(1) );
+    CPPUNIT_ASSERT( pairs.at(1).refJet() == refColl.p4(1) );
+    CPPUNIT_ASSERT( pairs.at(2).l1Jet() == l1Coll.p4(0) );
+    CPPUNIT_ASSERT( pairs.at(2).refJet() == refColl.p4(0) );
+}
+
+
+/**
+ * @brief Check JetCollection::deltaR2 matches TLorentzVector::DeltaR,
+ * including when the phi difference wraps around +/-pi.
+ */
+void DeltaR_Matcher_UnitTest::checkDeltaR2PhiWrap() {
+    JetCollection a;
+    a.push_back(40, 1, 3.1);
+    a.push_back(40, -2, -3.1);
+    a.push_back(40, 0.5, 0.2);
+    a.push_back(40, 0.5, M_PI);
+    JetCollection b;
+    b.push_back(30, 1.2, -3.1);
+    b.push_back(30, -2.1, 3.0);
+    b.push_back(30, 0.3, -0.2);
+    b.push_back(30, 0.5, -M_PI);
+
+    // deltaPhi = 2pi - 6.2, not 6.2
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( 0.2 * 0.2 + std::pow(2 * M_PI - 6.2, 2), JetCollection::deltaR2(a, 0, b, 0), 1E-9 );
+    // phi = pi & -pi are the same point
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( 0., JetCollection::deltaR2(a, 3, b, 3), 1E-9 );
+    for (unsigned i = 0; i < a.size(); ++i) {
+        for (unsigned j = 0; j < b.size(); ++j) {
+            double dr = a.p4(i).DeltaR(b.p4(j));
+            CPPUNIT_ASSERT_DOUBLES_EQUAL( dr * dr, JetCollection::deltaR2(a, i, b, j), 1E-6 );
+            CPPUNIT_ASSERT_DOUBLES_EQUAL( JetCollection::deltaR2(b, j, a, i), JetCollection::deltaR2(a, i, b, j), 1E-12 );
+        }
+    }
+}
+
+
+/**
+ * @brief Check JetCollection::fill only keeps jets with BX = 0,
+ * in their input order, and replaces any existing jets.
+ */
+void DeltaR_Matcher_UnitTest::checkFillBx() {
+    std::vector<float> et = {40, 35, 30, 25, 20};
+    std::vector<float> eta = {1, -1, 2, -2, 3};
+    std::vector<float> phi = {0.1, 0.2, 0.3, 0.4, 0.5};
+    std::vector<short> bx = {0, 1, 0, -1, 0};
+
+    JetCollection coll;
+    coll.push_back(100, 0, 0);
+    coll.fill(et, eta, phi, bx);
+    CPPUNIT_ASSERT( coll.size() == 3 );
+    unsigned inds[] = {0, 2, 4};
+    for (unsigned i = 0; i < coll.size(); ++i) {
+        CPPUNIT_ASSERT_DOUBLES_EQUAL( et[inds[i]], coll.pt(i), 1E-6 );
+        CPPUNIT_ASSERT_DOUBLES_EQUAL( eta[inds[i]], coll.eta(i), 1E-6 );
+        CPPUNIT_ASSERT_DOUBLES_EQUAL( phi[inds[i]], coll.phi(i), 1E-6 );
+        CPPUNIT_ASSERT( coll.bx(i) == 0 );
+    }
+
+    // without BX, all jets are kept
+    coll.fill(et, eta, phi);
+    CPPUNIT_ASSERT( coll.size() == et.size() );
+}
+
+
+/**
+ * @brief Check TowerGrid_Matcher gives exactly the same pairs as DeltaR_Matcher
+ * @details Uses random events with some L1 jets placed on tower boundaries
+ * & at phi = pi. Done for several maxDeltaR & jet cuts, and for a range of
+ * jet multiplicities, so that events both with & without the tower grid are checked.
+ */
+void DeltaR_Matcher_UnitTest::checkTowerGridMatchesDeltaR() {
+    std::mt19937 rng(12345);
+    std::uniform_real_distribution<double> randEta(-5.5, 5.5), randPhi(-M_PI, M_PI), randPt(10, 200), randShift(-0.2, 0.2);
+    std::uniform_int_distribution<int> randNJets(1, 40);
+    // maxDeltaR, minRefJetPt, maxRefJetPt, minL1JetPt, maxL1JetPt, maxJetEta
+    std::vector<std::vector<double> > settings = {
+        {0.4, 0, 5000, 0, 5000, 9.9},
+        {0.25, 20, 150, 15, 180, 5},
+        {0.7, 0, 5000, 30, 5000, 3}
+    };
+    JetCollection refColl, l1Coll;
+    for (const auto & s: settings) {
+        matcher = new DeltaR_Matcher(s[0], s[1], s[2], s[3], s[4], s[5]);
+        TowerGrid_Matcher gridMatcher(s[0], s[1], s[2], s[3], s[4], s[5]);
+        for (int iEvent = 0; iEvent < 100; ++iEvent) {
+            refColl.clear();
+            l1Coll.clear();
+            // every 4th event has as many jets as possible, to make sure the grid is used
+            int nJets = (iEvent % 4 == 0) ? 40 : randNJets(rng);
+            for (int i = 0; i < nJets; ++i) {
+                refColl.push_back(randPt(rng), randEta(rng), randPhi(rng));
+            }
+            for (int i = 0; i < nJets; ++i) {
+                double eta = refColl.eta(i) + randShift(rng);
+                double phi = refColl.phi(i) + randShift(rng);
+                if (phi > M_PI) phi -= 2 * M_PI;
+                else if (phi < -M_PI) phi += 2 * M_PI;
+                if (i % 5 == 0) phi = M_PI;
+                if (i % 7 == 0) eta = 0.087 * static_cast<int>(eta / 0.087);
+                l1Coll.push_back(randPt(rng), eta, phi);
+            }
+            matcher->setRefJets(refColl);
+            matcher->setL1Jets(l1Coll);
+            gridMatcher.setRefJets(refColl);
+            gridMatcher.setL1Jets(l1Coll);
+            pairs = matcher->getMatchingPairs();
+            std::vector<MatchedPair> gridPairs = gridMatcher.getMatchingPairs();
+            CPPUNIT_ASSERT( pairs.size() == gridPairs.size() );
+            for (unsigned i = 0; i < pairs.size(); ++i) {
+                CPPUNIT_ASSERT( pairs.at(i).refJet() == gridPairs.at(i).refJet() );
+                CPPUNIT_ASSERT( pairs.at(i).l1Jet() == gridPairs.at(i).l1Jet() );
+            }
+        }
+        delete matcher;
+    }
+    matcher = nullptr;
+}
+
+
 /**
  * @brief Main routine that runs the tests and output the results to screen.
  */
@@ -274,11 +431,7 @@ int main() {
      */
     CppUnit::TextUi::TestRunner runner;
     runner.addTest( DeltaR_Matcher_UnitTest::suite() );
-    runner.run();
-    return 0;
-
-    // alternatively, to include in BuildProcess, have to return value
-    // diff to 0 in event of Failure
-    // bool wasSuccessful = runner.run("", false);
-    // return !wasSuccessful;
+    // return non-zero in event of failure, so scram b runtests picks it up
+    bool wasSuccessful = runner.run("", false);
+    return !wasSuccessful;
 }
\ No newline at end of file
@@ -0,0 +1,276 @@
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdlib>
+#include <functional>
+#include <iostream>
+#include <new>
+#include <random>
+#include <string>
+#include <vector>
+
+#include "TF1.h"
+#include "TLorentzVector.h"
+#include "TString.h"
+#include "TVector2.h"
+
+#include "DeltaR_Matcher.h"
+#include "JetCollection.h"
+#include "RecoJetIndexMap.h"
+#include "SortFilterEmulator.h"
+#include "runMatcherUtils.h"
+
+using std::cout;
+using std::endl;
+
+/**
+ * @brief Microbenchmarks for the functions called in every event of the
+ * matcher event loop, at varying jet multiplicities.
+ * @details For each number of jets per event, a set of random events is made,
+ * then each function is run over all of them several times. The time per
+ * event is from the fastest pass. Heap allocations per event are counted by
+ * replacing the global operator new, so include any made inside ROOT
+ * (e.g. copying a TF1).
+ *
+ * Functions with a JetCollection version are also run with that, for comparison.
+ *
+ * To build and run, do:
+ * scram b
+ * MatcherUtils_Benchmark [nEvents] [nPasses]
+ */
+
+
+// Number of calls to operator new since the start of the program
+static unsigned long long gNAllocs = 0;
+
+
+void * operator new(std::size_t size) {
+    ++gNAllocs;
+    void * ptr = std::malloc(size == 0 ? 1 : size);
+    if (ptr == nullptr) throw std::bad_alloc();
+    return ptr;
+}
+
+
+void operator delete(void * ptr) noexcept {
+    std::free(ptr);
+}
+
+
+/**
+ * @brief Jets for one event: ntuple-style vectors, and the same jets as
+ * TLorentzVectors and JetCollections
+ */
+struct BenchmarkEvent {
+    std::vector<float> refEt, refEta, refPhi;
+    std::vector<float> l1Et, l1Eta, l1Phi;
+    std::vector<short> l1Bx;
+    std::vector<TLorentzVector> refP4s, l1P4s;
+    JetCollection refJets, l1Jets;
+    L1AnalysisRecoJetDataFormat recoJets; // ref jets, as in the data ntuples
+};
+
+
+/**
+ * @brief Make events with nJets ref jets, each with a nearby L1 jet.
+ * @details Ref jet pT is flat in log(pT) between 10 & 1000 GeV, |eta| < 5.
+ * L1 jets have ~80% of the ref jet pT.
+ */
+std::vector<BenchmarkEvent> makeEvents(unsigned nEvents, unsigned nJets, unsigned seed) {
+    std::mt19937 rng(seed);
+    std::uniform_real_distribution<float> logPt(std::log(10.), std::log(1000.));
+    std::uniform_real_distribution<float> eta(-5., 5.);
+    std::uniform_real_distribution<float> phi(-M_PI, M_PI);
+    std::normal_distribution<float> rsp(0.8, 0.1);
+    std::normal_distribution<float> dPos(0., 0.05);
+
+    std::vector<BenchmarkEvent> events(nEvents);
+    for (auto & evt: events) {
+        for (unsigned i = 0; i < nJets; ++i) {
+            evt.refEt.push_back(std::exp(logPt(rng)));
+            evt.refEta.push_back(eta(rng));
+            evt.refPhi.push_back(phi(rng));
+            evt.l1Et.push_back(std::max(0.5f, evt.refEt.back() * rsp(rng)));
+            evt.l1Eta.push_back(evt.refEta.back() + dPos(rng));
+            evt.l1Phi.push_back(TVector2::Phi_mpi_pi(evt.refPhi.back() + dPos(rng)));
+            evt.l1Bx.push_back(0);
+        }
+        evt.refP4s = makeTLorentzVectors(evt.refEt, evt.refEta, evt.refPhi);
+        evt.l1P4s = makeTLorentzVectors(evt.l1Et, evt.l1Eta, evt.l1Phi);
+        evt.refJets.fill(evt.refEt, evt.refEta, evt.refPhi);
+        evt.l1Jets.fill(evt.l1Et, evt.l1Eta, evt.l1Phi, evt.l1Bx);
+
+        // energy fractions & multiplicities such that ~half the jets pass tight JetID
+        L1AnalysisRecoJetDataFormat & reco = evt.recoJets;
+        reco.nJets = nJets;
+        reco.etCorr = evt.refEt;
+        reco.eta = evt.refEta;
+        reco.phi = evt.refPhi;
+        for (unsigned i = 0; i < nJets; ++i) {
+            float nhef = (i % 2) ? 0.95 : 0.3;
+            reco.chef.push_back(0.5); reco.nhef.push_back(nhef); reco.pef.push_back(0.5 - nhef / 2.);
+            reco.eef.push_back(0.); reco.mef.push_back(0.); reco.hfhef.push_back(0.); reco.hfemef.push_back(0.);
+            reco.chMult.push_back(5); reco.nhMult.push_back(5); reco.phMult.push_back(5); reco.elMult.push_back(0);
+            reco.muMult.push_back(0); reco.hfhMult.push_back(0); reco.hfemMult.push_back(0);
+        }
+    }
+    return events;
+}
+
+
+/**
+ * @brief Make one correction function per eta bin, like those from runCalibration.py
+ */
+std::vector<TF1> makeCorrectionFunctions(const std::vector<float> & etaBins) {
+    std::vector<TF1> corrFns;
+    for (unsigned i = 0; i < etaBins.size() - 1; ++i) {
+        TF1 fn(TString::Format("fitfcn_benchmark_%u", i), "1./([0]*(1.-[1]/sqrt(TMath::Max(x,[2]))))", 0, 1024);
+        fn.SetParameters((etaBins[i] > 3) ? 0.75 : 0.9, 1.5, 10.);
+        corrFns.push_back(fn);
+    }
+    return corrFns;
+}
+
+
+/**
+ * @brief Run fn over all events nPasses times, and print the time & allocations per event.
+ * @details The first pass is not timed, so the allocations don't include
+ * any memory that is only allocated once, e.g. buffers that are kept for re-use.
+ */
+void runBenchmark(const std::string & name, unsigned nJets, std::vector<BenchmarkEvent> & events,
+                  unsigned nPasses, std::function<double(BenchmarkEvent &)> fn) {
+    double checksum = 0;
+    for (auto & evt: events) checksum += fn(evt);
+
+    double bestSeconds = -1;
+    unsigned long long nAllocs = 0;
+    for (unsigned iPass = 0; iPass < nPasses; ++iPass) {
+        unsigned long long allocsStart = gNAllocs;
+        auto start = std::chrono::steady_clock::now();
+        for (auto & evt: events) checksum += fn(evt);
+        std::chrono::duration<double> dt = std::chrono::steady_clock::now() - start;
+        nAllocs = gNAllocs - allocsStart;
+        if (bestSeconds < 0 || dt.count() < bestSeconds) bestSeconds = dt.count();
+    }
+    // print checksum so the work can't be optimised away
+    cout << TString::Format("%-48s %6u %12.1f %14.2f   (checksum %g)",
+                            name.c_str(), nJets, 1E9 * bestSeconds / events.size(),
+                            double(nAllocs) / events.size(), checksum) << endl;
+}
+
+
+int main(int argc, char* argv[]) {
+    unsigned nEvents = (argc > 1) ? std::atoi(argv[1]) : 10000;
+    unsigned nPasses = (argc > 2) ? std::atoi(argv[2]) : 5;
+    const std::vector<unsigned> nJetsPerEvent = {4, 8, 16, 32, 64};
+
+    // same as binning.eta_bins
+    std::vector<float> etaBins = {0.000, 0.435, 0.783, 1.131, 1.305, 1.479, 1.653, 1.830, 1.930,
+                                  2.043, 2.172, 2.322, 2.500, 2.964, 3.489, 4.191, 5.191};
+    std::vector<TF1> corrFns = makeCorrectionFunctions(etaBins);
+
+    // objects re-used between events, as in the matcher event loop
+    DeltaR_Matcher matcher(0.25, 10, 5000, 0, 5000, 5.);
+    SortFilterEmulator sortFilter(4);
+    JetCollection jetColl, httJetColl;
+    std::vector<TLorentzVector> corrJets;
+    std::vector<char> jetIDMask;
+    RecoJetIndexMap recoJetIndex;
+
+    cout << "Running over " << nEvents << " events, fastest of " << nPasses << " passes" << endl;
+    cout << TString::Format("%-48s %6s %12s %14s", "Function", "nJets", "ns/event", "allocs/event") << endl;
+
+    for (unsigned nJets: nJetsPerEvent) {
+        std::vector<BenchmarkEvent> events = makeEvents(nEvents, nJets, 1234 + nJets);
+
+        runBenchmark("makeTLorentzVectors", nJets, events, nPasses,
+            [](BenchmarkEvent & evt) {
+                return makeTLorentzVectors(evt.l1Et, evt.l1Eta, evt.l1Phi, evt.l1Bx).size();
+            });
+        runBenchmark("JetCollection::fill", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                jetColl.fill(evt.l1Et, evt.l1Eta, evt.l1Phi, evt.l1Bx);
+                return jetColl.size();
+            });
+
+        runBenchmark("DeltaR_Matcher::getMatchingPairs (TLorentzVector)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                matcher.setRefJets(evt.refP4s);
+                matcher.setL1Jets(evt.l1P4s);
+                return matcher.getMatchingPairs().size();
+            });
+        runBenchmark("DeltaR_Matcher::getMatchingPairs (JetCollection)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                matcher.setRefJets(evt.refJets);
+                matcher.setL1Jets(evt.l1Jets);
+                return matcher.getMatchingPairs().size();
+            });
+
+        runBenchmark("SortFilterEmulator::setJets+getAllJets (TLV)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                sortFilter.setJets(evt.l1P4s);
+                return sortFilter.getAllJets().size();
+            });
+        runBenchmark("SortFilterEmulator::setJets (JetCollection)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                sortFilter.setJets(evt.l1Jets);
+                return sortFilter.getAllJetCollection().size();
+            });
+
+        runBenchmark("fillRecoJetsCleaned (TIGHT, per-jet passJetID)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                jetColl.clear();
+                for (unsigned i = 0; i < evt.recoJets.nJets; ++i) {
+                    if (passJetID(evt.recoJets, i, "TIGHT")) {
+                        jetColl.push_back(evt.recoJets.etCorr[i], evt.recoJets.eta[i], evt.recoJets.phi[i]);
+                    }
+                }
+                return jetColl.size();
+            });
+        runBenchmark("makeJetIDMask+fillRecoJetsCleaned (TIGHT)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                makeJetIDMask(evt.recoJets, kTightJetID, jetIDMask);
+                fillRecoJetsCleaned(evt.recoJets, jetIDMask, jetColl);
+                return jetColl.size();
+            });
+
+        // look up every ref jet, as for each matched pair
+        runBenchmark("findRecoJetIndex (all jets)", nJets, events, nPasses,
+            [](BenchmarkEvent & evt) {
+                int sum = 0;
+                for (unsigned i = 0; i < evt.refEt.size(); ++i) {
+                    sum += findRecoJetIndex(evt.refEt[i], evt.refEta[i], evt.refPhi[i], evt.recoJets);
+                }
+                return sum;
+            });
+        runBenchmark("RecoJetIndexMap::fill+find (all jets)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                recoJetIndex.fill(evt.recoJets);
+                int sum = 0;
+                for (unsigned i = 0; i < evt.refEt.size(); ++i) {
+                    sum += recoJetIndex.find(evt.refEta[i], evt.refPhi[i]);
+                }
+                return sum;
+            });
+
+        // includes copying the jets, since correctJets modifies them
+        runBenchmark("correctJets", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                corrJets = evt.l1P4s;
+                correctJets(corrJets, corrFns, etaBins, 0.);
+                return corrJets.empty() ? 0. : corrJets.front().Pt();
+            });
+
+        runBenchmark("getJetsForHTT+scalarSumPt+vectorSum (TLV)", nJets, events, nPasses,
+            [](BenchmarkEvent & evt) {
+                std::vector<TLorentzVector> httJets = getJetsForHTT(evt.l1P4s);
+                return scalarSumPt(httJets) + vectorSum(httJets).Pt();
+            });
+        runBenchmark("getJetsForHTT+scalarSumPt+vectorSum (JetColl)", nJets, events, nPasses,
+            [&](BenchmarkEvent & evt) {
+                getJetsForHTT(evt.l1Jets, httJetColl);
+                return scalarSumPt(httJetColl) + vectorSum(httJetColl).Pt();
+            });
+    }
+    return 0;
+}
@@ -0,0 +1,238 @@
+#include <cmath>
+#include <iostream>
+#include <random>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include <cppunit/TestFixture.h>
+#include <cppunit/extensions/TestFactoryRegistry.h>
+#include <cppunit/ui/text/TestRunner.h>
+#include <cppunit/CompilerOutputter.h>
+#include <cppunit/TestCase.h>
+#include <cppunit/extensions/HelperMacros.h>
+
+#include "JetCollection.h"
+#include "RecoJetIndexMap.h"
+#include "runMatcherUtils.h"
+
+/**
+ * @brief Unit tests for the reco jet functions in runMatcherUtils
+ * @details To build and run, do:
+ * scram b runtests
+ */
+class MatcherUtils_UnitTest : public CppUnit::TestCase {
+
+    CPPUNIT_TEST_SUITE( MatcherUtils_UnitTest );
+    CPPUNIT_TEST( passJetIDQualities );
+    CPPUNIT_TEST( fillRecoJetsCleanedMatchesPassJetID );
+    CPPUNIT_TEST( badQuality );
+    CPPUNIT_TEST( jetIDMaskMatchesPassJetID );
+    CPPUNIT_TEST( indexMapMatchesFindRecoJetIndex );
+    CPPUNIT_TEST_SUITE_END();
+
+public:
+    MatcherUtils_UnitTest() {};
+
+    void setUp();
+    void tearDown() {};
+
+    // Tests
+    void passJetIDQualities();
+    void fillRecoJetsCleanedMatchesPassJetID();
+    void badQuality();
+    void jetIDMaskMatchesPassJetID();
+    void indexMapMatchesFindRecoJetIndex();
+
+private:
+    void addRecoJet(float et, float eta, float phi,
+                    float chef, float nhef, float pef, float eef, float mef,
+                    short chMult, short nhMult, short phMult, short elMult, short muMult);
+
+    void makeRandomJets(std::mt19937 & rng, unsigned nJets);
+
+    L1AnalysisRecoJetDataFormat recoJets;
+    std::vector<std::string> qualities;
+    // expected passJetID result for each jet in recoJets, for each of qualities
+    std::vector<std::vector<bool> > expected;
+};
+
+
+/**
+ * @brief Make reco jets that pass/fail the different JetID cuts
+ */
+void MatcherUtils_UnitTest::setUp() {
+    recoJets.nJets = 0;
+    addRecoJet(40, 0.5, 0.1, 0.5, 0.3, 0.2, 0., 0., 5, 5, 5, 0, 0);     // passes all
+    addRecoJet(35, 1.0, 0.2, 0.05, 0.95, 0., 0., 0., 5, 5, 5, 0, 0);   // fails tight nhef
+    addRecoJet(30, -1.5, 0.3, 0.5, 0.3, 0.1, 0., 0.1, 5, 5, 5, 0, 1);  // has a muon
+    addRecoJet(25, 2.0, 0.4, 0., 0.5, 0.5, 0., 0., 0, 5, 5, 0, 0);     // no charged
+    addRecoJet(25, 2.7, 0.5, 0., 0.5, 0.5, 0., 0., 0, 5, 5, 0, 0);     // no charged, outside tracker
+    addRecoJet(20, 4.0, -0.5, 0., 0.5, 0.5, 0., 0., 0, 6, 6, 0, 0);    // forward, passes all
+    addRecoJet(20, -3.5, -0.4, 0., 0.5, 0.5, 0., 0., 0, 4, 4, 0, 0);   // forward, too few constituents
+    addRecoJet(15, 0.2, -3.1, 0.04, 0.01, 0., 0.95, 0., 5, 1, 1, 1, 0); // electron-like, fails TIGHTLEPVETO eef
+
+    qualities = {"LOOSE", "TIGHT", "TIGHTLEPVETO"};
+    expected = {
+        {true, true, true, false, true, true, false, true},
+        {true, false, true, false, true, true, false, true},
+        {true, false, false, false, true, true, false, false}
+    };
+}
+
+
+/**
+ * @brief Add a reco jet with the given energy fractions & multiplicities
+ */
+void MatcherUtils_UnitTest::addRecoJet(float et, float eta, float phi,
+                                       float chef, float nhef, float pef, float eef, float mef,
+                                       short chMult, short nhMult, short phMult, short elMult, short muMult) {
+    recoJets.nJets++;
+    recoJets.et.push_back(et); recoJets.etCorr.push_back(et); recoJets.eta.push_back(eta); recoJets.phi.push_back(phi);
+    recoJets.chef.push_back(chef); recoJets.nhef.push_back(nhef); recoJets.pef.push_back(pef);
+    recoJets.eef.push_back(eef); recoJets.mef.push_back(mef); recoJets.hfhef.push_back(0.); recoJets.hfemef.push_back(0.);
+    recoJets.chMult.push_back(chMult); recoJets.nhMult.push_back(nhMult); recoJets.phMult.push_back(phMult);
+    recoJets.elMult.push_back(elMult); recoJets.muMult.push_back(muMult);
+    recoJets.hfhMult.push_back(0); recoJets.hfemMult.push_back(0);
+}
+
+
+void MatcherUtils_UnitTest::passJetIDQualities() {
+    for (unsigned q = 0; q < qualities.size(); ++q) {
+        for (unsigned i = 0; i < recoJets.nJets; ++i) {
+            CPPUNIT_ASSERT( passJetID(recoJets, i, qualities[q]) == expected[q][i] );
+        }
+    }
+}
+
+
+/**
+ * @brief Check fillRecoJetsCleaned & makeRecoTLorentzVectorsCleaned keep
+ * the jets that pass passJetID, in order, with the corrected Et.
+ */
+void MatcherUtils_UnitTest::fillRecoJetsCleanedMatchesPassJetID() {
+    JetCollection cleaned;
+    cleaned.push_back(100, 0, 0); // should be removed
+    for (const auto & quality: qualities) {
+        fillRecoJetsCleaned(recoJets, quality, cleaned);
+        std::vector<TLorentzVector> cleanedP4s = makeRecoTLorentzVectorsCleaned(recoJets, quality);
+        CPPUNIT_ASSERT( cleanedP4s.size() == cleaned.size() );
+        unsigned j = 0;
+        for (unsigned i = 0; i < recoJets.nJets; ++i) {
+            if (!passJetID(recoJets, i, quality)) continue;
+            CPPUNIT_ASSERT( j < cleaned.size() );
+            CPPUNIT_ASSERT_DOUBLES_EQUAL( recoJets.etCorr[i], cleaned.pt(j), 1E-6 );
+            CPPUNIT_ASSERT_DOUBLES_EQUAL( recoJets.eta[i], cleaned.eta(j), 1E-6 );
+            CPPUNIT_ASSERT_DOUBLES_EQUAL( recoJets.phi[i], cleaned.phi(j), 1E-6 );
+            CPPUNIT_ASSERT( cleanedP4s[j] == cleaned.p4(j) );
+            ++j;
+        }
+        CPPUNIT_ASSERT( j == cleaned.size() );
+    }
+}
+
+
+void MatcherUtils_UnitTest::badQuality() {
+    JetCollection cleaned;
+    CPPUNIT_ASSERT_THROW( passJetID(recoJets, 0, "MEDIUM"), std::runtime_error );
+    CPPUNIT_ASSERT_THROW( fillRecoJetsCleaned(recoJets, "MEDIUM", cleaned), std::runtime_error );
+}
+
+
+/**
+ * @brief Replace recoJets with nJets random jets
+ * @details Energy fractions & multiplicities are spread around the JetID
+ * cut values, and some jets are put exactly on the |eta| boundaries of
+ * the cuts, or on the edges of the RecoJetIndexMap cells.
+ */
+void MatcherUtils_UnitTest::makeRandomJets(std::mt19937 & rng, unsigned nJets) {
+    std::uniform_real_distribution<float> randEta(-5, 5), randPhi(-M_PI, M_PI), randFrac(0, 1), randUnit(0, 1);
+    std::uniform_int_distribution<int> randMult(0, 12), randCell(-300, 300);
+    const std::vector<float> etaEdges = {2.4, -2.4, 3., -3.};
+
+    recoJets = L1AnalysisRecoJetDataFormat();
+    recoJets.nJets = 0;
+    for (unsigned i = 0; i < nJets; ++i) {
+        float eta = randEta(rng), phi = randPhi(rng);
+        float r = randUnit(rng);
+        if (r < 0.1) {
+            eta = etaEdges[i % etaEdges.size()];
+        } else if (r < 0.2) {
+            // on a cell edge
+            eta = 0.01 * randCell(rng);
+            phi = 0.01 * randCell(rng);
+        } else if (r < 0.3) {
+            phi = (i % 2) ? M_PI - 0.001 : -M_PI + 0.001;
+        } else if (r < 0.4 && i > 0) {
+            // close to the previous jet, so both are within the tolerance
+            eta = recoJets.eta.back() + 0.004;
+            phi = recoJets.phi.back() - 0.003;
+        }
+        addRecoJet(10 + 100 * randUnit(rng), eta, phi,
+                   randFrac(rng), randFrac(rng), randFrac(rng), randFrac(rng), randFrac(rng),
+                   randMult(rng), randMult(rng), randMult(rng), randMult(rng) / 6, randMult(rng) / 6);
+    }
+}
+
+
+/**
+ * @brief Check makeJetIDMask gives the same as passJetID for every jet,
+ * for each JetID quality
+ */
+void MatcherUtils_UnitTest::jetIDMaskMatchesPassJetID() {
+    std::mt19937 rng(2016);
+    std::vector<char> mask;
+    for (int iEvent = 0; iEvent < 200; ++iEvent) {
+        makeRandomJets(rng, iEvent % 30);
+        for (const auto & quality: qualities) {
+            makeJetIDMask(recoJets, parseJetIDQuality(quality), mask);
+            CPPUNIT_ASSERT( mask.size() == recoJets.nJets );
+            for (unsigned i = 0; i < recoJets.nJets; ++i) {
+                CPPUNIT_ASSERT( bool(mask[i]) == passJetID(recoJets, i, quality) );
+            }
+        }
+    }
+}
+
+
+/**
+ * @brief Check RecoJetIndexMap::find gives the same index as findRecoJetIndex
+ * @details Looks for each jet, and for points shifted by less & more than
+ * the tolerance, including across phi = +/-pi (which findRecoJetIndex
+ * doesn't wrap, so neither should the map).
+ */
+void MatcherUtils_UnitTest::indexMapMatchesFindRecoJetIndex() {
+    std::mt19937 rng(2017);
+    const std::vector<float> shifts = {0., 0.004, -0.004, 0.0099, -0.0099, 0.0101, -0.0101, 0.015, -0.015};
+    RecoJetIndexMap recoIndex;
+    for (int iEvent = 0; iEvent < 200; ++iEvent) {
+        makeRandomJets(rng, iEvent % 40);
+        recoIndex.fill(recoJets);
+        for (unsigned i = 0; i < recoJets.nJets; ++i) {
+            for (auto dEta: shifts) {
+                for (auto dPhi: shifts) {
+                    float eta = recoJets.eta[i] + dEta;
+                    float phi = recoJets.phi[i] + dPhi;
+                    CPPUNIT_ASSERT( recoIndex.find(eta, phi) == findRecoJetIndex(recoJets.et[i], eta, phi, recoJets) );
+                }
+            }
+            // other side of phi = +/-pi
+            float wrapped = recoJets.phi[i] - std::copysign(2 * M_PI, recoJets.phi[i]);
+            CPPUNIT_ASSERT( recoIndex.find(recoJets.eta[i], wrapped) ==
+                            findRecoJetIndex(recoJets.et[i], recoJets.eta[i], wrapped, recoJets) );
+        }
+        // a point not near any jet
+        CPPUNIT_ASSERT( recoIndex.find(6., 0.) == -1 );
+    }
+}
+
+
+/**
+ * @brief Main routine that runs the tests and output the results to screen.
+ */
+int main() {
+    CppUnit::TextUi::TestRunner runner;
+    runner.addTest( MatcherUtils_UnitTest::suite() );
+    bool wasSuccessful = runner.run("", false);
+    return !wasSuccessful;
+}
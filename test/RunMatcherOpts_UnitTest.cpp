@@ -0,0 +1,148 @@
+#include <iostream>
+#include <stdexcept>
+#include <string>
+
+#include <cppunit/TestFixture.h>
+#include <cppunit/extensions/TestFactoryRegistry.h>
+#include <cppunit/ui/text/TestRunner.h>
+#include <cppunit/CompilerOutputter.h>
+#include <cppunit/TestCase.h>
+#include <cppunit/extensions/HelperMacros.h>
+
+#include "RunMatcherOpts.h"
+
+/**
+ * @brief Unit tests for parsing --config strings in RunMatcherOpts
+ * @details To build and run, do:
+ * scram b runtests
+ */
+class RunMatcherOpts_UnitTest : public CppUnit::TestCase {
+
+    CPPUNIT_TEST_SUITE( RunMatcherOpts_UnitTest );
+    CPPUNIT_TEST( allKeys );
+    CPPUNIT_TEST( defaultsKept );
+    CPPUNIT_TEST( unknownKey );
+    CPPUNIT_TEST( etaKeysRejected );
+    CPPUNIT_TEST( badValue );
+    CPPUNIT_TEST( notKeyValue );
+    CPPUNIT_TEST( missingOutput );
+    CPPUNIT_TEST( unsupportedKey );
+    CPPUNIT_TEST_SUITE_END();
+
+public:
+    RunMatcherOpts_UnitTest() {};
+
+    void setUp();
+    void tearDown() {};
+
+    // Tests
+    void allKeys();
+    void defaultsKept();
+    void unknownKey();
+    void etaKeysRejected();
+    void badValue();
+    void notKeyValue();
+    void missingOutput();
+    void unsupportedKey();
+
+private:
+    MatcherConfig defaults;
+};
+
+
+/**
+ * @brief Main options that --config strings start from
+ */
+void RunMatcherOpts_UnitTest::setUp() {
+    defaults = {"pairs.root", 0.4, 10., 10., "", "deltaR"};
+}
+
+
+void RunMatcherOpts_UnitTest::allKeys() {
+    MatcherConfig config = RunMatcherOpts::parseMatcherConfig(
+        "output=pairs_dr0p25.root, deltaR=0.25,l1MinPt=12,refMinPt=14,cleanJets=TIGHTLEPVETO,matcher=towerGrid",
+        defaults);
+    CPPUNIT_ASSERT( config.output == "pairs_dr0p25.root" );
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( 0.25, config.deltaR, 1E-6 );
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( 12., config.l1MinPt, 1E-6 );
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( 14., config.refMinPt, 1E-6 );
+    CPPUNIT_ASSERT( config.cleanJets == "TIGHTLEPVETO" );
+    CPPUNIT_ASSERT( config.matcher == "towerGrid" );
+}
+
+
+void RunMatcherOpts_UnitTest::defaultsKept() {
+    MatcherConfig config = RunMatcherOpts::parseMatcherConfig("output=pairs_dr0p3.root,deltaR=0.3", defaults);
+    CPPUNIT_ASSERT( config.output == "pairs_dr0p3.root" );
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( 0.3, config.deltaR, 1E-6 );
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( defaults.l1MinPt, config.l1MinPt, 1E-6 );
+    CPPUNIT_ASSERT_DOUBLES_EQUAL( defaults.refMinPt, config.refMinPt, 1E-6 );
+    CPPUNIT_ASSERT( config.cleanJets == defaults.cleanJets );
+    CPPUNIT_ASSERT( config.matcher == defaults.matcher );
+}
+
+
+void RunMatcherOpts_UnitTest::unknownKey() {
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,maxDeltaR=0.3", defaults),
+                          std::invalid_argument );
+}
+
+
+void RunMatcherOpts_UnitTest::etaKeysRejected() {
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,l1MaxEta=3", defaults),
+                          std::invalid_argument );
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,refMaxEta=3", defaults),
+                          std::invalid_argument );
+}
+
+
+void RunMatcherOpts_UnitTest::badValue() {
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,deltaR=abc", defaults),
+                          std::invalid_argument );
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,l1MinPt=", defaults),
+                          std::invalid_argument );
+}
+
+
+void RunMatcherOpts_UnitTest::notKeyValue() {
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,deltaR", defaults),
+                          std::invalid_argument );
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=a.root,deltaR=0.3=0.4", defaults),
+                          std::invalid_argument );
+}
+
+
+void RunMatcherOpts_UnitTest::missingOutput() {
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("deltaR=0.3", defaults),
+                          std::invalid_argument );
+    // output isn't taken from the main options, as both would write to the same file
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::parseMatcherConfig("output=,deltaR=0.3", defaults),
+                          std::invalid_argument );
+}
+
+
+void RunMatcherOpts_UnitTest::unsupportedKey() {
+    CPPUNIT_ASSERT_THROW( RunMatcherOpts::checkConfigKeySupported("output=a.root, cleanJets =TIGHT", "cleanJets", "no jet ID"),
+                          std::invalid_argument );
+    // other keys, and values that happen to be the same as the key, are fine
+    RunMatcherOpts::checkConfigKeySupported("output=cleanJets,deltaR=0.3", "cleanJets", "no jet ID");
+    // same message as for the unsupported eta keys
+    std::string message;
+    try {
+        RunMatcherOpts::checkConfigKeySupported("output=a.root,cleanJets=TIGHT", "cleanJets", "no jet ID");
+    } catch (const std::invalid_argument& e) {
+        message = e.what();
+    }
+    CPPUNIT_ASSERT( message == "--config key cleanJets is not supported: no jet ID" );
+}
+
+
+/**
+ * @brief Main routine that runs the tests and output the results to screen.
+ */
+int main() {
+    CppUnit::TextUi::TestRunner runner;
+    runner.addTest( RunMatcherOpts_UnitTest::suite() );
+    bool wasSuccessful = runner.run("", false);
+    return !wasSuccessful;
+}
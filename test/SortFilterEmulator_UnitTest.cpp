@@ -2,6 +2,7 @@
 #include <memory>
 #include <vector>
 #include <algorithm>
+#include <random>
 
 #include <cppunit/TestFixture.h>
 #include <cppunit/extensions/TestFactoryRegistry.h>
@@ -40,6 +41,9 @@ class SortFilterEmulator_UnitTest : public CppUnit::TestCase {
     CPPUNIT_TEST( noCenJets );
     CPPUNIT_TEST( noFwdJets );
     CPPUNIT_TEST( fewJets );
+    CPPUNIT_TEST( equalPtJets );
+    CPPUNIT_TEST( jetCollection );
+    CPPUNIT_TEST( randomTopN );
     CPPUNIT_TEST_SUITE_END();
 
 public:
@@ -53,6 +57,9 @@ public:
     void noCenJets();
     void noFwdJets();
     void fewJets();
+    void equalPtJets();
+    void jetCollection();
+    void randomTopN();
 
 private:
     bool printStatements;
@@ -70,6 +77,7 @@ private:
  */
 void SortFilterEmulator_UnitTest::setUp() {
     printStatements = false;
+    emu = nullptr;
 }
 
 
@@ -207,6 +215,102 @@ void SortFilterEmulator_UnitTest::fewJets() {
 
 }
 
+/**
+ * @brief Jets with equal pT are kept in input order, & repeated calls don't
+ * keep old jets
+ */
+void SortFilterEmulator_UnitTest::equalPtJets() {
+    TLorentzVector c1; c1.SetPtEtaPhiM(50, 0.1, 0.1, 0.0);
+    TLorentzVector c2; c2.SetPtEtaPhiM(50, 0.2, -0.1, 0.0);
+    TLorentzVector c3; c3.SetPtEtaPhiM(50, 0.3, 0.2, 0.0);
+    TLorentzVector c4; c4.SetPtEtaPhiM(60, 0.4, -0.3, 0.0);
+    TLorentzVector f1; f1.SetPtEtaPhiM(41, 3.1, 0.1, 0.0);
+    jets = {c1, c2, c3, c4, f1};
+
+    unsigned nMax = 3;
+    emu = new SortFilterEmulator(nMax);
+    emu->setJets(jets);
+    allJets = emu->getAllJets();
+
+    vector<TLorentzVector> allProper = {c4, c1, c2, f1};
+    CPPUNIT_ASSERT( allJets == allProper );
+
+    jets = {c3};
+    emu->setJets(jets);
+    allJets = emu->getAllJets();
+    allProper = {c3};
+    CPPUNIT_ASSERT( allJets == allProper );
+    CPPUNIT_ASSERT( emu->getFwdJets().empty() );
+}
+
+/**
+ * @brief JetCollection version gives the same jets as the TLorentzVector version
+ */
+void SortFilterEmulator_UnitTest::jetCollection() {
+    vector<double> et =  {50, 41, 60, 52, 74, 80, 40, 63, 70, 85};
+    vector<double> eta = {0.2, 3.1, 0.3, 3.2, 4.4, 0.5, 0.1, 4.3, 0.4, 4.5};
+    vector<double> phi = {-0.1, 0.1, 0.2, -0.1, -0.3, 0.4, 0.1, 0.2, -0.3, 0.4};
+    jets.clear();
+    for (unsigned i = 0; i < et.size(); ++i) {
+        TLorentzVector jet; jet.SetPtEtaPhiM(et[i], eta[i], phi[i], 0.0);
+        jets.push_back(jet);
+    }
+    JetCollection jetColl;
+    jetColl.fill(et, eta, phi);
+
+    unsigned nMax = 4;
+    emu = new SortFilterEmulator(nMax);
+    emu->setJets(jets);
+    emu->setJets(jetColl);
+    const vector<TLorentzVector>& allP4s = emu->getAllJets();
+    const JetCollection& allColl = emu->getAllJetCollection();
+
+    CPPUNIT_ASSERT( allColl.size() == allP4s.size() );
+    for (unsigned i = 0; i < allColl.size(); ++i) {
+        CPPUNIT_ASSERT_DOUBLES_EQUAL( allP4s[i].Pt(), allColl.pt(i), 1E-6 );
+        CPPUNIT_ASSERT_DOUBLES_EQUAL( allP4s[i].Eta(), allColl.eta(i), 1E-6 );
+    }
+    CPPUNIT_ASSERT( emu->getCenJetCollection().size() == 4 );
+    CPPUNIT_ASSERT( emu->getFwdJetCollection().size() == 4 );
+}
+
+/**
+ * @brief Random events with lots of equal pT jets give the same jets as
+ * a stable sort of all jets, then taking the top nMax central & forward jets.
+ */
+void SortFilterEmulator_UnitTest::randomTopN() {
+    std::mt19937 rng(42);
+    // few distinct pT values, so there are lots of ties
+    std::uniform_int_distribution<int> randPt(1, 8);
+    std::uniform_real_distribution<double> randEta(-5, 5);
+    std::uniform_int_distribution<int> randNJets(0, 20);
+    unsigned nMax = 4;
+    emu = new SortFilterEmulator(nMax);
+    for (int iEvent = 0; iEvent < 200; ++iEvent) {
+        jets.clear();
+        int nJets = randNJets(rng);
+        for (int i = 0; i < nJets; ++i) {
+            TLorentzVector jet; jet.SetPtEtaPhiM(10. * randPt(rng), randEta(rng), 0.01 * i, 0.0);
+            jets.push_back(jet);
+        }
+        vector<TLorentzVector> sorted = jets;
+        std::stable_sort(sorted.begin(), sorted.end(),
+                         [](const TLorentzVector& a, const TLorentzVector& b) { return a.Pt() > b.Pt(); });
+        vector<TLorentzVector> cenProper, fwdProper;
+        for (const auto & jet: sorted) {
+            vector<TLorentzVector> & proper = (fabs(jet.Eta()) < 3.0) ? cenProper : fwdProper;
+            if (proper.size() < nMax) proper.push_back(jet);
+        }
+        vector<TLorentzVector> allProper = cenProper;
+        allProper.insert(allProper.end(), fwdProper.begin(), fwdProper.end());
+
+        emu->setJets(jets);
+        CPPUNIT_ASSERT( emu->getCenJets() == cenProper );
+        CPPUNIT_ASSERT( emu->getFwdJets() == fwdProper );
+        CPPUNIT_ASSERT( emu->getAllJets() == allProper );
+    }
+}
+
 /**
  * @brief Main routine that runs the tests and output the results to screen.
  */
@@ -218,11 +322,7 @@ int main() {
      */
     CppUnit::TextUi::TestRunner runner;
     runner.addTest( SortFilterEmulator_UnitTest::suite() );
-    runner.run();
-    return 0;
-
-    // alternatively, to include in BuildProcess, have to return value
-    // diff to 0 in event of Failure
-    // bool wasSuccessful = runner.run("", false);
-    // return !wasSuccessful;
+    // return non-zero in event of failure, so scram b runtests picks it up
+    bool wasSuccessful = runner.run("", false);
+    return !wasSuccessful;
 }
\ No newline at end of file